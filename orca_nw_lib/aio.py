@@ -0,0 +1,266 @@
+""" asyncio gNMI client APIs based on grpc.aio """
+
+import asyncio
+import weakref
+from typing import AsyncIterable, Awaitable, Callable, Dict, Iterable, TypeVar, Union
+
+import grpc
+
+from .gnmi_pb2 import (
+    JSON_IETF,
+    GetRequest,
+    Path,
+    SetRequest,
+    SubscribeRequest,
+)
+from .gnmi_pb2_grpc import gNMIStub
+from .gnmi_util import (
+    RetryPolicy,
+    _channel_manager,
+    create_aio_channel,
+    get_circuit_breaker,
+    get_response_to_dict,
+    is_device_ready,
+    record_rpc_error,
+)
+from .utils import get_logging, get_request_timeout, is_grpc_device_listening
+
+_logger = get_logging().getLogger(__name__)
+
+T = TypeVar("T")
+
+"""
+grpc.aio channels are bound to the event loop they are created in,
+hence the channels are kept per event loop.
+    Key: event loop
+    Value: dict of device_ip vs. gNMI stub
+"""
+_loop_stubs: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, gNMIStub]]" = (
+    weakref.WeakKeyDictionary()
+)
+_loop_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Lock]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class gNMIAioStub(gNMIStub):
+    def __init__(self, channel: grpc.aio.Channel):
+        super().__init__(channel)
+        self.channel = channel
+
+
+def _get_loop_stubs() -> Dict[str, gNMIAioStub]:
+    return _loop_stubs.setdefault(asyncio.get_running_loop(), {})
+
+
+def _get_device_lock(device_ip: str) -> asyncio.Lock:
+    return _loop_locks.setdefault(asyncio.get_running_loop(), {}).setdefault(
+        device_ip, asyncio.Lock()
+    )
+
+
+async def get_aio_stub(device_ip: str) -> gNMIAioStub:
+    """
+    Returns the gNMI stub of the device for the running event loop,
+    creates the channel if there is none yet.
+    Blocking steps i.e. the device reachability check and fetching of the
+    server certificate are executed in the default executor.
+
+    Args:
+        device_ip (str): The IP address of the device.
+
+    Returns:
+        gNMIAioStub: The gNMI stub of the device.
+    """
+    stubs = _get_loop_stubs()
+    if stub := stubs.get(device_ip):
+        return stub
+    async with _get_device_lock(device_ip):
+        if stub := stubs.get(device_ip):
+            return stub
+        if not await asyncio.to_thread(is_grpc_device_listening, device_ip, 10):
+            raise Exception("Device %s is not reachable !!" % device_ip)
+        creds = await asyncio.to_thread(_channel_manager.get_credentials, device_ip)
+        stub = gNMIAioStub(create_aio_channel(device_ip, creds))
+        stubs[device_ip] = stub
+        return stub
+
+
+async def remove_aio_stub(device_ip: str):
+    """
+    Close and remove the gNMI channel of the device for the running event loop.
+
+    Args:
+        device_ip (str): The IP address of the device.
+    """
+    if stub := _get_loop_stubs().pop(device_ip, None):
+        await stub.channel.close()
+
+
+async def close_all_aio_stubs():
+    """
+    Close all the gNMI channels of the running event loop.
+    """
+    stubs = _get_loop_stubs()
+    channels = [stub.channel for stub in stubs.values()]
+    stubs.clear()
+    await asyncio.gather(*[channel.close() for channel in channels])
+
+
+async def _call_with_retry(
+    device_ip: str,
+    request: Callable[[gNMIAioStub], Awaitable[T]],
+    retry_policy: RetryPolicy = None,
+) -> T:
+    """
+    asyncio version of gnmi_util._call_with_retry,
+    the circuit breakers are shared with the blocking APIs.
+    """
+    policy = retry_policy or RetryPolicy()
+    breaker = get_circuit_breaker(device_ip)
+    attempt = 0
+    while True:
+        breaker.allow_request()
+        try:
+            result = await request(await get_aio_stub(device_ip))
+        except grpc.RpcError as e:
+            record_rpc_error(device_ip, e)
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                _logger.debug("Removing stub for %s", device_ip)
+                await remove_aio_stub(device_ip)
+            attempt += 1
+            if attempt >= policy.max_attempts or not policy.is_retryable(e):
+                raise
+            delay = policy.get_delay(attempt - 1)
+            _logger.info(
+                "Request to %s failed with %s, retrying in %.2f seconds (attempt %s of %s).",
+                device_ip,
+                e.code(),
+                delay,
+                attempt + 1,
+                policy.max_attempts,
+            )
+            await asyncio.sleep(delay)
+            continue
+        except Exception:
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return result
+
+
+async def send_gnmi_get(device_ip: str, path: list[Path], resend: bool = False):
+    """
+    asyncio version of gnmi_util.send_gnmi_get.
+    Paths can be created with the same path helpers as used with the blocking APIs,
+    e.g. from the *_gnmi modules.
+
+    .. code-block:: python
+
+        await asyncio.gather(
+            *[send_gnmi_get(ip, [get_interface_base_path()]) for ip in device_ips]
+        )
+
+    Args:
+        device_ip (str): The IP address of the device.
+        path (list[Path]): The paths to get.
+        resend (bool, optional): Whether the request is being resent, i.e. not to be retried. Defaults to False.
+
+    Returns:
+        dict: The merged JSON values of the response.
+    """
+    await asyncio.to_thread(is_device_ready, device_ip)
+    try:
+        resp = await _call_with_retry(
+            device_ip,
+            lambda stub: stub.Get(
+                GetRequest(path=path, type=GetRequest.ALL, encoding=JSON_IETF),
+                timeout=get_request_timeout(),
+            ),
+            RetryPolicy(max_attempts=1) if resend else None,
+        )
+        return get_response_to_dict(resp) if resp else {}
+    except grpc.RpcError as e:
+        _logger.error("Failed to get details from %s: %s", device_ip, e)
+        if e.code() == grpc.StatusCode.UNAVAILABLE:  # check if the device is not ready
+            _logger.error("Device %s is not reachable !!" % device_ip)
+        raise
+    except Exception as e:
+        _logger.debug(
+            f"{e} \n on device_ip : {device_ip} \n requested gnmi_path : {path}"
+        )
+        raise
+
+
+async def send_gnmi_set(req: SetRequest, device_ip: str, resend: bool = False):
+    """
+    asyncio version of gnmi_util.send_gnmi_set.
+
+    Args:
+        req (SetRequest): The set request, e.g. created with gnmi_util.create_req_for_update.
+        device_ip (str): The IP address of the device.
+        resend (bool, optional): Whether the request is being resent, i.e. not to be retried. Defaults to False.
+
+    Returns:
+        SetResponse: The response of the set request.
+    """
+    await asyncio.to_thread(is_device_ready, device_ip)
+    try:
+        return await _call_with_retry(
+            device_ip,
+            lambda stub: stub.Set(req, timeout=get_request_timeout()),
+            RetryPolicy(max_attempts=1) if resend else None,
+        )
+    except grpc.RpcError as e:
+        _logger.info("Failed to send set request for device %s" % device_ip)
+        if e.code() == grpc.StatusCode.UNAVAILABLE:  # check if the device is not ready
+            _logger.error("Device %s is not reachable !!" % device_ip)
+        raise
+    except Exception as e:
+        _logger.debug(f"{e} \n on device_ip : {device_ip} \n set request : {req}")
+        raise
+
+
+async def send_gnmi_subscribe(
+    device_ip: str,
+    subscribe_request: Union[Iterable[SubscribeRequest], AsyncIterable[SubscribeRequest]],
+    resend: bool = False,
+):
+    """
+    asyncio version of gnmi_util.send_gnmi_subscribe.
+    The returned call is an async iterator of SubscribeResponse, it can be cancelled with cancel().
+
+    .. code-block:: python
+
+        subscription = await send_gnmi_subscribe(device_ip, subscribe_to_path(sub_req))
+        async for resp in subscription:
+            ...
+
+    Args:
+        device_ip (str): The IP address of the device.
+        subscribe_request (Iterable or AsyncIterable): The subscribe requests.
+        resend (bool, optional): Whether the request is being resent, i.e. not to be retried. Defaults to False.
+
+    Returns:
+        grpc.aio.StreamStreamCall: The subscription call.
+    """
+    await asyncio.to_thread(is_device_ready, device_ip)
+
+    async def _subscribe(stub: gNMIAioStub):
+        return stub.Subscribe(subscribe_request)
+
+    try:
+        return await _call_with_retry(
+            device_ip,
+            _subscribe,
+            RetryPolicy(max_attempts=1) if resend else None,
+        )
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.UNAVAILABLE:  # check if the device is not ready
+            _logger.error("Device %s is not reachable !!" % device_ip)
+        raise
+    except Exception as e:
+        _logger.debug(
+            f"{e} \n on device_ip : {device_ip} \n subscribe request : {subscribe_request}"
+        )
+        raise
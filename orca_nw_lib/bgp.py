@@ -25,7 +25,9 @@ from .bgp_gnmi import (
     config_bgp_global_af_aggregate_addr_on_device, del_bgp_global_af_aggregate_addr_on_device,
     get_bgp_details_from_device, del_bgp_neighbor_from_device,
 )
+from .common import DiscoveryFeature
 from .device_db import get_device_db_obj
+from .fingerprint import discover_if_changed
 
 from .graph_db_models import (
     BGP,
@@ -269,7 +271,12 @@ def discover_bgp(device_ip: str = None):
     for device in devices:
         try:
             _logger.info(f"Discovering BGP on device {device}.")
-            insert_device_bgp_in_db(device, _create_bgp_graph_objects(device.mgt_ip))
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.bgp,
+                lambda: _create_bgp_graph_objects(device.mgt_ip),
+                lambda bgp_global_list: insert_device_bgp_in_db(device, bgp_global_list),
+            )
         except Exception as e:
             _logger.error(
                 f"BGP Discovery Failed on device {device.mgt_ip}, Reason: {e}"
@@ -617,7 +624,12 @@ def discover_bgp_neighbors(device_ip: str):
     for device in devices:
         try:
             _logger.info(f"Discovering BGP Neighbors on device {device}.")
-            insert_device_bgp_neighbors_in_db(device, _create_bgp_neighbors_graph_objects(device.mgt_ip))
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.bgp_neighbors,
+                lambda: _create_bgp_neighbors_graph_objects(device.mgt_ip),
+                lambda bgp_neighbors: insert_device_bgp_neighbors_in_db(device, bgp_neighbors),
+            )
         except Exception as e:
             _logger.error(
                 f"BGP Neighbor Discovery Failed on device {device.mgt_ip}, Reason: {e}"
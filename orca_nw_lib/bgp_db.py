@@ -12,6 +12,7 @@ from .graph_db_models import (
     BGP_NEIGHBOR,
     BGP_NEIGHBOR_AF
 )
+from .fingerprint import save_if_changed
 
 _logger = get_logging().getLogger(__name__)
 
@@ -79,8 +80,7 @@ def insert_device_bgp_in_db(device: Device, bgp_global_list: dict):
     """
     for bgp, family in bgp_global_list.items():
         if b := get_bgp_global_with_asn_from_db(device.mgt_ip, bgp.local_asn):
-            copy_bgp_object_prop(b, bgp)
-            b.save()
+            save_if_changed(b, copy_bgp_object_prop, bgp)
             device.bgp.connect(b)
         else:
             bgp.save()
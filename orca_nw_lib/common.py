@@ -1,4 +1,5 @@
 from enum import Enum, auto
+from typing import Dict, List, Set
 
 
 class Speed(Enum):
@@ -256,3 +257,53 @@ class DiscoveryFeature(str, Enum):
     @staticmethod
     def get_enum_from_str(name: str):
         return DiscoveryFeature[name] if name in DiscoveryFeature.__members__ else None
+
+
+"""
+Dependencies among the features, a feature is discovered only after
+the features it depends on, if they are discovered together.
+    Key: feature
+    Value: features the graph nodes of which are linked to by the feature
+"""
+feature_dependencies: Dict[DiscoveryFeature, List[DiscoveryFeature]] = {
+    DiscoveryFeature.device_info: [],
+    DiscoveryFeature.interface: [DiscoveryFeature.device_info],
+    DiscoveryFeature.port_group: [DiscoveryFeature.interface],
+    DiscoveryFeature.lldp_info: [DiscoveryFeature.interface],
+    DiscoveryFeature.port_channel: [DiscoveryFeature.interface],
+    DiscoveryFeature.vlan: [DiscoveryFeature.interface, DiscoveryFeature.port_channel],
+    DiscoveryFeature.mclag: [DiscoveryFeature.interface, DiscoveryFeature.port_channel],
+    DiscoveryFeature.mclag_gw_macs: [DiscoveryFeature.device_info],
+    DiscoveryFeature.bgp: [DiscoveryFeature.interface],
+    DiscoveryFeature.bgp_neighbors: [DiscoveryFeature.bgp],
+    DiscoveryFeature.stp: [DiscoveryFeature.device_info],
+    DiscoveryFeature.stp_port: [
+        DiscoveryFeature.interface,
+        DiscoveryFeature.port_channel,
+        DiscoveryFeature.stp,
+    ],
+    DiscoveryFeature.stp_vlan: [DiscoveryFeature.vlan, DiscoveryFeature.stp],
+}
+
+
+def get_feature_dependencies(
+    feature: DiscoveryFeature, features: Set[DiscoveryFeature]
+) -> Set[DiscoveryFeature]:
+    """
+    Returns the features among the given ones the feature depends on, directly or transitively.
+
+    Args:
+        feature (DiscoveryFeature): The feature.
+        features (Set[DiscoveryFeature]): The features to look for.
+
+    Returns:
+        Set[DiscoveryFeature]: The dependencies of the feature among the features.
+    """
+    deps = set()
+    to_visit = list(feature_dependencies.get(feature, []))
+    while to_visit:
+        dep = to_visit.pop()
+        if dep not in deps:
+            deps.add(dep)
+            to_visit.extend(feature_dependencies.get(dep, []))
+    return deps & features
@@ -6,18 +6,51 @@ device_password='device_password'
 device_conn_timeout='device_conn_timeout'
 request_timeout='request_timeout'
 ping_timeout='ping_timeout'
+grpc_keepalive_time_ms='grpc_keepalive_time_ms'
+grpc_keepalive_timeout_ms='grpc_keepalive_timeout_ms'
+grpc_keepalive_permit_without_calls='grpc_keepalive_permit_without_calls'
+grpc_max_channels='grpc_max_channels'
+grpc_channel_idle_timeout='grpc_channel_idle_timeout'
+grpc_retry_max_attempts='grpc_retry_max_attempts'
+grpc_retry_backoff='grpc_retry_backoff'
+grpc_retry_backoff_max='grpc_retry_backoff_max'
+grpc_retry_codes='grpc_retry_codes'
+grpc_circuit_breaker_threshold='grpc_circuit_breaker_threshold'
+grpc_circuit_breaker_cooldown='grpc_circuit_breaker_cooldown'
+discovery_max_workers='discovery_max_workers'
+discovery_sweep_concurrency='discovery_sweep_concurrency'
+subscription_sync_timeout='subscription_sync_timeout'
+gnmi_subscription_wildcards='gnmi_subscription_wildcards'
+subscription_workers='subscription_workers'
+subscription_retry_backoff='subscription_retry_backoff'
+subscription_engine='subscription_engine'
+subscription_shards='subscription_shards'
+subscription_retry_backoff_max='subscription_retry_backoff_max'
+subscription_queue_size='subscription_queue_size'
+gnmi_cassette_mode='gnmi_cassette_mode'
+gnmi_cassette_dir='gnmi_cassette_dir'
+gnmi_cassette_speedup='gnmi_cassette_speedup'
 
 #neo4j
 neo4j_protocol='neo4j_protocol'
 neo4j_url='neo4j_url'
 neo4j_user='neo4j_user'
 neo4j_password='neo4j_password'
+neo4j_retry_max_attempts='neo4j_retry_max_attempts'
+neo4j_retry_backoff='neo4j_retry_backoff'
+neo4j_retry_backoff_max='neo4j_retry_backoff_max'
 
 #influxdb
 influxdb_url='influxdb_url'
 influxdb_token='influxdb_token'
 influxdb_org='influxdb_org'
 influxdb_bucket='influxdb_bucket'
+influxdb_batch_size='influxdb_batch_size'
+influxdb_flush_interval='influxdb_flush_interval'
+influxdb_max_queue_size='influxdb_max_queue_size'
+influxdb_retry_max_attempts='influxdb_retry_max_attempts'
+influxdb_retry_backoff='influxdb_retry_backoff'
+influxdb_retry_backoff_max='influxdb_retry_backoff_max'
 
 ## Prometheus pushgateway credentials used by orca_nw_lib
 promdb_pushgateway_url= 'promdb_pushgateway_url'
@@ -25,6 +58,9 @@ promdb_job= 'promdb_job'
 
 #flasgs
 telemetry_db= 'telemetry_db'
+telemetry_queue_size='telemetry_queue_size'
+telemetry_overflow_policy='telemetry_overflow_policy'
+telemetry_workers='telemetry_workers'
 
 #env_var
 env_default_orca_nw_lib_config_file="ORCA_NW_LIB_CONFIG_FILE"
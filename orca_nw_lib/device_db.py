@@ -1,3 +1,4 @@
+from orca_nw_lib.fingerprint import clear_fingerprints
 from orca_nw_lib.graph_db_models import Device
 from orca_nw_lib.utils import clean_db, get_logging
 _logger = get_logging().getLogger(__name__)
@@ -66,6 +67,8 @@ def delete_device(mgt_ip: str = None):
         else:
             ## Delete all devices and their components. When mgt_ip is not provided.
             clean_db()
+        ## Rediscovery must write the device components to DB again.
+        clear_fingerprints(mgt_ip)
         return True
     except Exception as e:
         _logger.error(f"Error: {e}")
@@ -79,6 +82,8 @@ def insert_devices_in_db(device:Device):
         dev.save()
     else:
         device.save()
+        ## New device or removed from DB otherwise, components must be written to DB again.
+        clear_fingerprints(device.mgt_ip)
 
 
 def update_device_status(mgt_ip: str, status: str):
@@ -1,12 +1,16 @@
 import ipaddress
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Executor, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Set
 
 from orca_nw_lib.lldp_db import create_lldp_relations_in_db
-from .common import DiscoveryFeature
+from .common import DiscoveryFeature, get_feature_dependencies
 
 from .device import discover_device, get_device_details
 from .device_db import get_all_devices_ip_from_db
-from .gnmi_sub import gnmi_subscribe, sync_response_received
+from .gnmi_sub import gnmi_subscribe, wait_for_sync
 
 from .interface import discover_interfaces, enable_all_ifs
 from .lldp import discover_lldp_info, get_all_lldp_neighbor_device_ips
@@ -21,44 +25,76 @@ from .stp import discover_stp
 from .stp_port import discover_stp_port
 from .stp_vlan import discover_stp_vlan
 from .vlan import discover_vlan
-from .utils import get_logging, get_networks, is_grpc_device_listening
+from .utils import (
+    get_discovery_max_workers,
+    get_logging,
+    get_networks,
+    is_grpc_device_listening,
+    sweep_grpc_devices,
+)
 
 _logger = get_logging().getLogger(__name__)
 
 topology = {}
 
 
-def _discover_device_and_enable_ifs(device_ip: str):
+class _VisitedSet:
+    """
+    Set of device IPs already claimed for discovery, safe to be used from multiple threads.
+    """
+
+    def __init__(self):
+        self._ips: Set[str] = set()
+        self._lock = threading.Lock()
+
+    def add(self, device_ip: str) -> bool:
+        """
+        Claims a device for discovery.
+
+        Args:
+            device_ip (str): The IP address of the device.
+
+        Returns:
+            bool: True if the device was not claimed before, False otherwise.
+        """
+        with self._lock:
+            if device_ip in self._ips:
+                return False
+            self._ips.add(device_ip)
+            return True
+
+
+def _discover_device_and_enable_ifs(device_ip: str) -> List[str]:
+    """
+    Discovers the device, its interfaces and port groups, subscribes to the device
+    and enables all interfaces so that the LLDP neighbors can be discovered.
+
+    Args:
+        device_ip (str): The IP address of the device.
+
+    Returns:
+        List[str]: Error messages of the failed steps, empty if all succeeded.
+    """
     report = []
     device_ip = str(device_ip)
     if not is_grpc_device_listening(device_ip):
         log_msg = f"Can not discover, Device {device_ip} is not reachable !!"
         _logger.error(log_msg)
-        report.append(log_msg)
-        return
+        raise ConnectionError(log_msg)
     _logger.info("Discovering device :{}".format(device_ip))
 
-    discover_nw_features(device_ip, DiscoveryFeature.device_info)
-
-    discover_nw_features(device_ip, DiscoveryFeature.interface)
-
-    discover_nw_features(device_ip, DiscoveryFeature.port_group)
+    for feature in [
+        DiscoveryFeature.device_info,
+        DiscoveryFeature.interface,
+        DiscoveryFeature.port_group,
+    ]:
+        if err := discover_nw_features(device_ip, feature):
+            report.append(err)
 
     ## Once Discovered the device's interfaces and port groups, Subscribe for notifications
     gnmi_subscribe(device_ip, force_resubscribe=True)
-    # Retry mechanism with sleep time for sync_response_received
-    max_retries = 5  # Set maximum number of retries
-    retry_delay = 2  # Set delay between retries in seconds
-    for _ in range(max_retries):
-        sync_received = sync_response_received(device_ip)
-        if sync_received:
-            _logger.info(f"Sync response received for device {device_ip}.")
-            break
-        else:
-            _logger.warning(
-                f"Sync response not received for device {device_ip}, retrying in {retry_delay} seconds..."
-            )
-            time.sleep(retry_delay)
+    if wait_for_sync(device_ip):
+        _logger.info(f"Sync response received for device {device_ip}.")
     else:
         _logger.error(f"Timeout waiting for sync response from device {device_ip}")
         report.append(f"Timeout waiting for sync response from device {device_ip}")
@@ -71,90 +107,326 @@ def _discover_device_and_enable_ifs(device_ip: str):
         enable_all_ifs(device_ip)
     except Exception as e:
         _logger.info(f"Interface Enable Failed on device {device_ip}, Reason: {e}")
+        report.append(f"Interface Enable Failed on device {device_ip}, Reason: {e}")
+
+    if err := discover_nw_features(device_ip, DiscoveryFeature.lldp_info):
+        report.append(err)
+    return report
 
-    discover_nw_features(device_ip, DiscoveryFeature.lldp_info)
+
+def _discover_device(device_ip: str, depth: int) -> dict:
+    """
+    Discovers a single device and reports the outcome.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        depth (int): Number of LLDP hops from the device discovery was triggered on.
+
+    Returns:
+        dict: The discovery report of the device, see trigger_discovery.
+    """
+    start = time.perf_counter()
+    report = {"device_ip": device_ip, "depth": depth, "errors": [], "neighbors": []}
+    try:
+        report["errors"] = _discover_device_and_enable_ifs(device_ip)
+        report["status"] = "discovered"
+        # Discover only neighbors not discovered already in order to prevent loop
+        report["neighbors"] = sorted(
+            nbr_ip
+            for nbr_ip in get_all_lldp_neighbor_device_ips(device_ip)
+            if not get_device_details(nbr_ip)
+        )
+    except ConnectionError as e:
+        report["status"] = "unreachable"
+        report["errors"].append(str(e))
+    except Exception as e:
+        _logger.error(f"Discovery Failed on device {device_ip}, Reason: {e}")
+        report["status"] = "failed"
+        report["errors"].append(f"Discovery Failed on device {device_ip}, Reason: {e}")
+    report["duration"] = time.perf_counter() - start
+    return report
 
 
-def _discover_device_and_lldp_info(device_ip):
+def _discover_device_and_lldp_info(
+    device_ip: str, max_workers: Optional[int] = None
+) -> List[dict]:
     """
-    Recursively discover a device and its neighbors using LLDP information.
+    Discover a device and its neighbors using LLDP information.
 
-    The function first discovers the device using discover_device_and_enable_ifs
-    and then discovers all its LLDP neighbors. If a neighbor is not already
-    discovered, it calls itself to discover the neighbor and so on.
+    The topology is walked breadth first, the devices of a hop are discovered in parallel
+    by a pool of workers. Once a device is discovered, its LLDP neighbors not
+    discovered already are queued for discovery.
 
     Args:
         device_ip (str): The IP address of the device to be discovered.
+        max_workers (int, optional): Max. number of devices discovered in parallel.
+            Defaults to discovery_max_workers from config.
 
     Returns:
-        None
+        List[dict]: The discovery reports of the devices, in the order of completion.
+    """
+    device_ip = str(device_ip)
+    visited = _VisitedSet()
+    visited.add(device_ip)
+    reports = []
+    with ThreadPoolExecutor(
+        max_workers=max_workers or get_discovery_max_workers(),
+        thread_name_prefix="discovery",
+    ) as executor:
+        in_flight = {executor.submit(_discover_device, device_ip, 0)}
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                report = future.result()
+                reports.append(report)
+                for nbr_ip in report["neighbors"]:
+                    if visited.add(nbr_ip):
+                        in_flight.add(
+                            executor.submit(
+                                _discover_device, nbr_ip, report["depth"] + 1
+                            )
+                        )
+    return reports
+
+
+def _discover_remaining_features(
+    device_ip: str,
+    feature_to_discover: Optional[DiscoveryFeature] = None,
+    executor: Optional[Executor] = None,
+) -> List[dict]:
     """
-    _discover_device_and_enable_ifs(device_ip)
-    for nbr_ip in get_all_lldp_neighbor_device_ips(device_ip):
-        if not get_device_details(
-                nbr_ip
-        ):  # Discover only if not already discovered in order to prevent loop
-            _discover_device_and_lldp_info(nbr_ip)
+    Discovers the features depending on the complete topology being discovered first.
 
+    Args:
+        device_ip (str): The IP address of the device.
+        feature_to_discover (DiscoveryFeature, optional): The only feature to discover.
+            Defaults to all.
+        executor (Executor, optional): Executor the features are discovered on,
+            see discover_nw_features_concurrently.
 
-def trigger_discovery(device_ip, feature_to_discover: DiscoveryFeature = None):
+    Returns:
+        List[dict]: Report per feature, see discover_nw_features_concurrently.
+    """
+    features = (
+        [feature_to_discover]
+        if feature_to_discover
+        else [
+            DiscoveryFeature.port_channel,
+            DiscoveryFeature.vlan,
+            DiscoveryFeature.mclag,
+            DiscoveryFeature.mclag_gw_macs,
+            DiscoveryFeature.bgp,
+            DiscoveryFeature.bgp_neighbors,
+            DiscoveryFeature.stp,
+            DiscoveryFeature.stp_port,
+            DiscoveryFeature.stp_vlan,
+        ]
+    )
+    feature_reports = discover_nw_features_concurrently(
+        device_ip, features, executor=executor
+    )
+    gnmi_subscribe(device_ip)
+    return feature_reports
+
+
+def trigger_discovery(
+    device_ip,
+    feature_to_discover: DiscoveryFeature = None,
+    max_workers: Optional[int] = None,
+) -> List[dict]:
     """
-    Trigger discovery for a given device.
+    Trigger discovery for a given device and its LLDP neighbors.
 
     Parameters:
         device_ip (str): Device IP address.
+        feature_to_discover (DiscoveryFeature, optional): The only feature to discover
+            after the topology is discovered. Defaults to all.
+        max_workers (int, optional): Max. number of devices discovered in parallel,
+            also the max. number of features discovered in parallel across all devices
+            once the topology is discovered. Defaults to discovery_max_workers from config.
 
     Returns:
-        None
+        List[dict]: Report per device with keys -
+            device_ip: The IP address of the device.
+            status: "discovered", "unreachable", "failed" or "refreshed" for
+                devices discovered earlier and only updated.
+            depth: Number of LLDP hops from device_ip, None for refreshed devices.
+            errors: Error messages of the failed discovery steps.
+            neighbors: LLDP neighbors queued for discovery by this device.
+            features: Report per feature discovered after the topology,
+                see discover_nw_features_concurrently.
+            duration: Time in seconds spent on discovering the device.
     """
-    
-    _discover_device_and_lldp_info(device_ip)
+    reports = {
+        report["device_ip"]: report
+        for report in _discover_device_and_lldp_info(device_ip, max_workers)
+    }
     # some links can only be created after all teh topology devices are discovered
-    for ip in get_all_devices_ip_from_db() or []:
+    device_ips = get_all_devices_ip_from_db() or []
+    for ip in device_ips:
         create_lldp_relations_in_db(ip)
-        if feature_to_discover:
-            discover_nw_features(ip, feature_to_discover)
-        else:
-            discover_nw_features(ip, DiscoveryFeature.port_channel)
-            discover_nw_features(ip, DiscoveryFeature.vlan)
-            discover_nw_features(ip, DiscoveryFeature.mclag)
-            discover_nw_features(ip, DiscoveryFeature.mclag_gw_macs)
-            discover_nw_features(ip, DiscoveryFeature.bgp)
-            discover_nw_features(ip, DiscoveryFeature.bgp_neighbors)
-            discover_nw_features(ip, DiscoveryFeature.stp)
-            discover_nw_features(ip, DiscoveryFeature.stp_port)
-            discover_nw_features(ip, DiscoveryFeature.stp_vlan)
-        gnmi_subscribe(ip)
-
-
-def discover_device_from_config() -> []:
+
+    max_workers = max_workers or get_discovery_max_workers()
+
+    def _refresh(ip: str):
+        start = time.perf_counter()
+        feature_reports = _discover_remaining_features(
+            ip, feature_to_discover, feature_executor
+        )
+        return ip, feature_reports, time.perf_counter() - start
+
+    ## The features of all the devices share one pool, so that at most max_workers
+    # threads write to DB at a time, the device threads only schedule the features.
+    with ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="discovery_features"
+    ) as feature_executor, ThreadPoolExecutor(
+        max_workers=max_workers, thread_name_prefix="discovery"
+    ) as executor:
+        for ip, feature_reports, duration in executor.map(_refresh, device_ips):
+            report = reports.setdefault(
+                ip,
+                {
+                    "device_ip": ip,
+                    "status": "refreshed",
+                    "depth": None,
+                    "errors": [],
+                    "neighbors": [],
+                    "duration": 0.0,
+                },
+            )
+            report["features"] = feature_reports
+            report["errors"].extend(
+                f["error"] for f in feature_reports if f["status"] == "failed"
+            )
+            report["duration"] += duration
+    return list(reports.values())
+
+
+def discover_device_from_config() -> List[dict]:
     """
     Discover devices from the configuration file.
 
     This function iterates over the network addresses obtained from the
-    'get_networks' function and calls the 'discover_device' function for each
-    address. After iterating over all the addresses, it returns True.
+    'get_networks' function. The gNMI port of all hosts of a network is probed
+    concurrently first and discovery is triggered only on the reachable hosts,
+    skipping hosts already discovered as LLDP neighbors of an earlier host.
 
     Returns:
-        report (list): A report of discovered devices and statuses.
+        report (list): Report per network with keys -
+            network: The network address.
+            reachable: Hosts the gNMI port is reachable on.
+            unreachable: Hosts the gNMI port is not reachable on.
+            devices: Discovery reports of the devices, see trigger_discovery.
     """
     report = []
+    discovered = set()
     for ip_or_nw in get_networks():
         _logger.info(
             "Network Discovery Started using network provided {0}".format(ip_or_nw)
         )
-        report = []
         if not ip_or_nw:
             _logger.error(
                 "Invalid network address- {ip_or_nw}, can not discover devices !!"
             )
             return report
-        for device_ip in ipaddress.ip_network(ip_or_nw):
-            device_ip = str(device_ip)
-            trigger_discovery(device_ip)
+        network = ipaddress.ip_network(ip_or_nw, strict=False)
+        reachable, unreachable = sweep_grpc_devices(
+            list(network.hosts()) or [network.network_address]
+        )
+        _logger.info(
+            f"Found {len(reachable)} reachable and {len(unreachable)} unreachable hosts in network {ip_or_nw}"
+        )
+        nw_report = {
+            "network": ip_or_nw,
+            "reachable": reachable,
+            "unreachable": unreachable,
+            "devices": [],
+        }
+        for device_ip in reachable:
+            if device_ip in discovered:
+                continue
+            for device_report in trigger_discovery(device_ip):
+                if device_report["status"] != "refreshed":
+                    discovered.add(device_report["device_ip"])
+                nw_report["devices"].append(device_report)
+        report.append(nw_report)
     return report
 
 
+def discover_nw_features_concurrently(
+    device_ip: str,
+    features: List[DiscoveryFeature],
+    max_workers: Optional[int] = None,
+    executor: Optional[Executor] = None,
+) -> List[dict]:
+    """
+    Discover network features of a device, features not depending on each other
+    as per common.feature_dependencies are discovered in parallel.
+    A feature is discovered even if a feature it depends on fails, same as when discovering them one by one.
+
+    .. code-block:: python
+
+        discover_nw_features_concurrently(
+            "10.10.10.10", [DiscoveryFeature.vlan, DiscoveryFeature.port_channel, DiscoveryFeature.bgp]
+        )
+
+    Args:
+        device_ip (str): Device IP address.
+        features (List[DiscoveryFeature]): Features to discover.
+        max_workers (int, optional): Max. number of features discovered in parallel.
+            Defaults to the number of features, ignored if executor is given.
+        executor (Executor, optional): Executor the features are discovered on, e.g. shared by
+            the discoveries of many devices to bound the total concurrency. Defaults to a pool per call.
+
+    Returns:
+        List[dict]: Report per feature in the order of features, with keys -
+            feature: The feature.
+            status: "succeeded" or "failed".
+            error: The error message if failed, else None.
+            duration: Time in seconds spent on discovering the feature.
+    """
+    features = list(dict.fromkeys(features))
+    if not features:
+        return []
+    pending = {
+        f: get_feature_dependencies(f, set(features)) - {f} for f in features
+    }
+    reports: Dict[DiscoveryFeature, dict] = {}
+
+    def _discover(feature: DiscoveryFeature) -> dict:
+        start = time.perf_counter()
+        error = discover_nw_features(device_ip, feature)
+        return {
+            "feature": feature,
+            "status": "failed" if error else "succeeded",
+            "error": error,
+            "duration": time.perf_counter() - start,
+        }
+
+    with (
+        nullcontext(executor)
+        if executor
+        else ThreadPoolExecutor(
+            max_workers=max_workers or len(features),
+            thread_name_prefix=f"discovery_{device_ip}",
+        )
+    ) as executor:
+        in_flight = {}
+        while pending or in_flight:
+            for feature in [f for f, deps in pending.items() if not deps]:
+                del pending[feature]
+                in_flight[executor.submit(_discover, feature)] = feature
+            if not in_flight:
+                raise ValueError(f"Cyclic dependencies among features {list(pending)}")
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                feature = in_flight.pop(future)
+                reports[feature] = future.result()
+                for deps in pending.values():
+                    deps.discard(feature)
+    return [reports[f] for f in features]
+
+
 def discover_nw_features(device_ip: str, feature: DiscoveryFeature) -> None:
     """
     Discover network features for a given device.
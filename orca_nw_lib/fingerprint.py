@@ -0,0 +1,176 @@
+""" Fingerprints of the device responses of discovered features, used to skip DB writes of unchanged features """
+
+import copy
+import hashlib
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .common import DiscoveryFeature, feature_dependencies, get_feature_dependencies
+from .gnmi_pb2 import GetResponse
+from .utils import call_with_neo4j_retry, get_logging
+
+_logger = get_logging().getLogger(__name__)
+
+"""
+dictionary to store the fingerprints of the last discovery written to DB.
+    Key: (device_ip, feature, sub key of a partial discovery e.g. interface name or None)
+    Value: sha256 hex digest of the gNMI Get responses the graph objects were created from
+"""
+_fingerprints: Dict[Tuple[str, DiscoveryFeature, Optional[str]], str] = {}
+_fingerprints_lock = threading.Lock()
+
+## Digests of the active recordings of the current thread.
+_recordings = threading.local()
+
+
+@contextmanager
+def record_get_responses():
+    """
+    Records the gNMI Get responses received by the current thread while in the context.
+    Recordings can be nested, a response is recorded by all active recordings.
+
+    .. code-block:: python
+
+        with record_get_responses() as digest:
+            vlans = _create_vlan_db_obj(device_ip)
+        fingerprint = digest.hexdigest()
+
+    Yields:
+        hashlib.sha256: The digest the responses are fed into.
+    """
+    digest = hashlib.sha256()
+    if not hasattr(_recordings, "digests"):
+        _recordings.digests = []
+    _recordings.digests.append(digest)
+    try:
+        yield digest
+    finally:
+        _recordings.digests.remove(digest)
+
+
+def record_get_response(resp: GetResponse):
+    """
+    Feeds a gNMI Get response to the active recordings of the current thread, called by gnmi_util.
+    Timestamps change with every response, hence only the paths and values are recorded.
+
+    Args:
+        resp (GetResponse): The gNMI Get response.
+    """
+    if not (digests := getattr(_recordings, "digests", None)):
+        return
+    for notification in resp.notification:
+        parts = [notification.prefix.SerializeToString(deterministic=True)]
+        parts.extend(u.SerializeToString(deterministic=True) for u in notification.update)
+        parts.extend(d.SerializeToString(deterministic=True) for d in notification.delete)
+        for digest in digests:
+            for part in parts:
+                digest.update(len(part).to_bytes(4, "big"))
+                digest.update(part)
+
+
+def _invalidate_dependents(device_ip: str, feature: DiscoveryFeature):
+    ## Graph nodes of the dependent features link to the nodes of the feature,
+    # those links may have been affected by the write, hence they must be written again.
+    dependents = {
+        f
+        for f in feature_dependencies
+        if feature in get_feature_dependencies(f, {feature})
+    }
+    for key in [k for k in _fingerprints if k[0] == device_ip and k[1] in dependents]:
+        del _fingerprints[key]
+
+
+def discover_if_changed(
+    device_ip: str,
+    feature: DiscoveryFeature,
+    create_graph_objects: Callable[[], Any],
+    insert_in_db: Callable[[Any], None],
+    sub_key: Optional[str] = None,
+    force: bool = False,
+) -> Tuple[Any, bool]:
+    """
+    Creates the graph objects of a feature from the device and writes them to DB
+    only if the device responses changed since the last write.
+    Fingerprints of the other full or partial discoveries of the feature,
+    and of the features depending on it, are cleared on write.
+
+    .. code-block:: python
+
+        discover_if_changed(
+            device.mgt_ip,
+            DiscoveryFeature.vlan,
+            lambda: _create_vlan_db_obj(device.mgt_ip),
+            lambda vlans: insert_vlan_in_db(device, vlans),
+        )
+
+    Args:
+        device_ip (str): The IP address of the device.
+        feature (DiscoveryFeature): The feature being discovered.
+        create_graph_objects (Callable): Fetches the feature from the device and creates the graph objects.
+        insert_in_db (Callable): Writes the graph objects to DB, retried on transient Neo4j errors.
+        sub_key (str, optional): Key of a partial discovery e.g. the interface name. Defaults to None.
+        force (bool, optional): Write even if unchanged. Defaults to False.
+
+    Returns:
+        Tuple[Any, bool]: The graph objects and whether they were written to DB.
+    """
+    with record_get_responses() as digest:
+        graph_objects = create_graph_objects()
+    fingerprint = digest.hexdigest()
+    key = (device_ip, feature, sub_key)
+    with _fingerprints_lock:
+        unchanged = _fingerprints.get(key) == fingerprint
+    if unchanged and not force:
+        _logger.info(
+            f"{feature.name} of device {device_ip} unchanged since last discovery, skipping DB update."
+        )
+        return graph_objects, False
+    call_with_neo4j_retry(insert_in_db, graph_objects)
+    with _fingerprints_lock:
+        ## The full and the partial discoveries of a feature write the same graph nodes,
+        # hence the fingerprints of the other discoveries of the feature are stale now.
+        for k in [k for k in _fingerprints if k[:2] == (device_ip, feature)]:
+            del _fingerprints[k]
+        _fingerprints[key] = fingerprint
+        _invalidate_dependents(device_ip, feature)
+    return graph_objects, True
+
+
+def clear_fingerprints(device_ip: str = None, feature: DiscoveryFeature = None):
+    """
+    Clears the fingerprints so that the next discovery writes to DB, e.g. when the DB is modified otherwise.
+
+    Args:
+        device_ip (str, optional): The IP address of the device. Defaults to all devices.
+        feature (DiscoveryFeature, optional): The feature. Defaults to all features.
+    """
+    with _fingerprints_lock:
+        for key in [
+            k
+            for k in _fingerprints
+            if (device_ip is None or k[0] == device_ip)
+            and (feature is None or k[1] == feature)
+        ]:
+            del _fingerprints[key]
+
+
+def save_if_changed(target, copy_props: Callable[[Any, Any], None], source) -> bool:
+    """
+    Copies the properties of the source graph node to the target node saved in DB,
+    the target is saved only if any of its properties changed.
+
+    Args:
+        target (StructuredNode): The node saved in DB.
+        copy_props (Callable): Copies the properties, called as copy_props(target, source).
+        source (StructuredNode): The node created from the device.
+
+    Returns:
+        bool: True if the target was saved, False otherwise.
+    """
+    before = copy.deepcopy(target.__properties__)
+    copy_props(target, source)
+    if target.__properties__ == before:
+        return False
+    target.save()
+    return True
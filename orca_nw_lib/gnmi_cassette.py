@@ -0,0 +1,589 @@
+""" Recording of the gNMI requests and responses per device, and their replay instead of the devices """
+
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import grpc
+import grpc.aio
+
+from .gnmi_metrics import _add_aio_done_callback, _get_method, _iterate_aio_requests
+from .gnmi_pb2 import GetResponse, SetResponse, SubscribeResponse
+from .utils import get_gnmi_cassette_dir, get_gnmi_cassette_speedup, get_logging
+
+_logger = get_logging().getLogger(__name__)
+
+## Kinds of the records in a cassette.
+GET = 1
+SET = 2
+SUBSCRIBE = 3
+SUBSCRIBE_RESPONSE = 4
+STREAM_END = 5
+
+_unary_kinds = {"Get": GET, "Set": SET}
+_codes = {code.value[0]: code for code in grpc.StatusCode}
+
+
+class CassetteRecord:
+    """
+    A record of a cassette.
+
+    Attributes:
+        kind (int): GET or SET for a request and its response, SUBSCRIBE for a request of a subscription,
+            SUBSCRIBE_RESPONSE for a response received on a subscription and STREAM_END when the subscription is done.
+        stream_id (int): Id of the subscription the record belongs to, 0 for GET and SET.
+        elapsed (float): Duration of the request in seconds for GET and SET,
+            time since the subscription started for the others.
+        code (grpc.StatusCode): Status of the request or the subscription.
+        request (bytes): The serialized request.
+        response (bytes): The serialized response, the error details if the status is not OK.
+    """
+
+    def __init__(
+        self,
+        kind: int,
+        stream_id: int = 0,
+        elapsed: float = 0.0,
+        code: grpc.StatusCode = grpc.StatusCode.OK,
+        request: bytes = b"",
+        response: bytes = b"",
+    ):
+        self.kind = kind
+        self.stream_id = stream_id
+        self.elapsed = elapsed
+        self.code = code
+        self.request = request
+        self.response = response
+
+    def to_bytes(self) -> bytes:
+        record = b"".join(
+            [
+                _encode_varint(self.kind),
+                _encode_varint(self.stream_id),
+                _encode_varint(int(self.elapsed * 1_000_000)),
+                _encode_varint(self.code.value[0]),
+                _encode_varint(len(self.request)),
+                self.request,
+                _encode_varint(len(self.response)),
+                self.response,
+            ]
+        )
+        return _encode_varint(len(record)) + record
+
+    @classmethod
+    def from_bytes(cls, record: bytes) -> "CassetteRecord":
+        kind, pos = _decode_varint(record, 0)
+        stream_id, pos = _decode_varint(record, pos)
+        elapsed, pos = _decode_varint(record, pos)
+        code, pos = _decode_varint(record, pos)
+        length, pos = _decode_varint(record, pos)
+        request, pos = record[pos : pos + length], pos + length
+        length, pos = _decode_varint(record, pos)
+        return cls(
+            kind,
+            stream_id,
+            elapsed / 1_000_000,
+            _codes.get(code, grpc.StatusCode.UNKNOWN),
+            request,
+            record[pos : pos + length],
+        )
+
+
+def _encode_varint(value: int) -> bytes:
+    out = bytearray()
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _decode_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise EOFError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, pos
+        shift += 7
+
+
+def get_cassette_file(device_ip: str, directory: str = None) -> str:
+    return os.path.join(directory or get_gnmi_cassette_dir(), f"{device_ip}.gnmi")
+
+
+def read_cassette(file_path: str) -> Iterator[CassetteRecord]:
+    """
+    Reads the records of a cassette in the order they were recorded,
+    a record truncated e.g. by a crash while recording is ignored.
+
+    Args:
+        file_path (str): Path of the cassette file.
+
+    Yields:
+        CassetteRecord: The records.
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    pos = 0
+    while pos < len(data):
+        try:
+            length, start = _decode_varint(data, pos)
+            if start + length > len(data):
+                raise EOFError("Truncated record")
+            record = CassetteRecord.from_bytes(data[start : start + length])
+        except EOFError:
+            _logger.warning("Ignoring truncated record at the end of %s", file_path)
+            return
+        pos = start + length
+        yield record
+
+
+class _CassetteWriter:
+    def __init__(self, file_path: str, mode: str):
+        self.file_path = file_path
+        self._file = open(file_path, mode)
+        self._lock = threading.Lock()
+
+    def write(self, record: CassetteRecord):
+        data = record.to_bytes()
+        with self._lock:
+            if not self._file.closed:
+                self._file.write(data)
+                self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+"""
+dictionary to store the open cassettes being recorded.
+    Key: device_ip
+    Value: _CassetteWriter
+"""
+_writers: Dict[str, _CassetteWriter] = {}
+## Cassettes recorded by this process, these are appended to instead of being overwritten when reopened.
+_recorded_files = set()
+_stream_ids = itertools.count(1)
+_lock = threading.Lock()
+
+
+def _get_writer(device_ip: str) -> _CassetteWriter:
+    with _lock:
+        if not (writer := _writers.get(device_ip)):
+            file_path = get_cassette_file(device_ip)
+            os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+            writer = _writers[device_ip] = _CassetteWriter(
+                file_path, "ab" if file_path in _recorded_files else "wb"
+            )
+            _recorded_files.add(file_path)
+            _logger.info("Recording gNMI requests of %s to %s", device_ip, file_path)
+        return writer
+
+
+class _RecordedRequests:
+    def __init__(self, requests, writer: _CassetteWriter, stream_id: int, start: float):
+        self._requests = iter(requests)
+        self._writer = writer
+        self._stream_id = stream_id
+        self._start = start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        request = next(self._requests)
+        self._writer.write(
+            CassetteRecord(
+                SUBSCRIBE,
+                self._stream_id,
+                time.monotonic() - self._start,
+                request=request.SerializeToString(deterministic=True),
+            )
+        )
+        return request
+
+
+class _RecordedStream:
+    def __init__(self, call, writer: _CassetteWriter, stream_id: int, start: float):
+        self._call = call
+        self._writer = writer
+        self._stream_id = stream_id
+        self._start = start
+        call.add_done_callback(self._on_done)
+
+    def _on_done(self, call):
+        code = call.code()
+        self._writer.write(
+            CassetteRecord(
+                STREAM_END,
+                self._stream_id,
+                time.monotonic() - self._start,
+                code or grpc.StatusCode.UNKNOWN,
+                response=(call.details() or "").encode("utf-8"),
+            )
+        )
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        response = next(self._call)
+        self._writer.write(
+            CassetteRecord(
+                SUBSCRIBE_RESPONSE,
+                self._stream_id,
+                time.monotonic() - self._start,
+                response=response.SerializeToString(),
+            )
+        )
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class GnmiCassetteRecorder(
+    grpc.UnaryUnaryClientInterceptor, grpc.StreamStreamClientInterceptor
+):
+    """
+    gRPC client interceptor recording the gNMI requests sent over a device channel and their responses
+    to the cassette of the device, see get_cassette_file.
+    """
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        start = time.monotonic()
+        call = continuation(client_call_details, request)
+        if kind := _unary_kinds.get(_get_method(client_call_details)):
+            code = call.code()
+            _get_writer(self.device_ip).write(
+                CassetteRecord(
+                    kind,
+                    elapsed=time.monotonic() - start,
+                    code=code,
+                    request=request.SerializeToString(deterministic=True),
+                    response=(
+                        call.result().SerializeToString()
+                        if code == grpc.StatusCode.OK
+                        else (call.details() or "").encode("utf-8")
+                    ),
+                )
+            )
+        return call
+
+    def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        writer = _get_writer(self.device_ip)
+        stream_id = next(_stream_ids)
+        start = time.monotonic()
+        call = continuation(
+            client_call_details,
+            _RecordedRequests(request_iterator, writer, stream_id, start),
+        )
+        return _RecordedStream(call, writer, stream_id, start)
+
+
+class GnmiCassetteAioUnaryRecorder(grpc.aio.UnaryUnaryClientInterceptor):
+    """
+    grpc.aio version of GnmiCassetteRecorder for the Get and Set requests,
+    grpc.aio channels use an interceptor for one kind of call only.
+    """
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        start = time.monotonic()
+        call = await continuation(client_call_details, request)
+        if kind := _unary_kinds.get(_get_method(client_call_details)):
+            code = await call.code()
+            _get_writer(self.device_ip).write(
+                CassetteRecord(
+                    kind,
+                    elapsed=time.monotonic() - start,
+                    code=code,
+                    request=request.SerializeToString(deterministic=True),
+                    response=(
+                        (await call).SerializeToString()
+                        if code == grpc.StatusCode.OK
+                        else (await call.details() or "").encode("utf-8")
+                    ),
+                )
+            )
+        return call
+
+
+class GnmiCassetteAioStreamRecorder(grpc.aio.StreamStreamClientInterceptor):
+    """
+    grpc.aio version of GnmiCassetteRecorder for the subscriptions.
+    """
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+
+    async def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        writer = _get_writer(self.device_ip)
+        stream_id = next(_stream_ids)
+        start = time.monotonic()
+
+        def _record_request(request):
+            writer.write(
+                CassetteRecord(
+                    SUBSCRIBE,
+                    stream_id,
+                    time.monotonic() - start,
+                    request=request.SerializeToString(deterministic=True),
+                )
+            )
+            return request
+
+        call = await continuation(
+            client_call_details, _iterate_aio_requests(request_iterator, _record_request)
+        )
+
+        async def _on_done(done_call):
+            writer.write(
+                CassetteRecord(
+                    STREAM_END,
+                    stream_id,
+                    time.monotonic() - start,
+                    await done_call.code() or grpc.StatusCode.UNKNOWN,
+                    response=(await done_call.details() or "").encode("utf-8"),
+                )
+            )
+
+        _add_aio_done_callback(call, _on_done)
+
+        async def _responses():
+            async for response in call:
+                writer.write(
+                    CassetteRecord(
+                        SUBSCRIBE_RESPONSE,
+                        stream_id,
+                        time.monotonic() - start,
+                        response=response.SerializeToString(),
+                    )
+                )
+                yield response
+
+        return _responses()
+
+
+class _ReplayRpcError(grpc.RpcError):
+    def __init__(self, code: grpc.StatusCode, details: str):
+        super().__init__(details)
+        self._code = code
+        self._details = details
+
+    def code(self) -> grpc.StatusCode:
+        return self._code
+
+    def details(self) -> str:
+        return self._details
+
+
+class _Cassette:
+    """
+    Recorded responses of a device by request. Responses recorded for the same request are replayed
+    in the recorded order, the last one is replayed again once all of them were replayed.
+    """
+
+    def __init__(self, device_ip: str, file_path: str):
+        self.device_ip = device_ip
+        self._unary: Dict[Tuple[int, bytes], deque] = {}
+        ## Records of the subscriptions by the first request of the subscription.
+        self._streams: Dict[bytes, deque] = {}
+        self._lock = threading.Lock()
+        streams: Dict[int, List[CassetteRecord]] = {}
+        for record in read_cassette(file_path):
+            if record.kind in (GET, SET):
+                self._unary.setdefault((record.kind, record.request), deque()).append(record)
+            elif record.kind == SUBSCRIBE and record.stream_id not in streams:
+                streams[record.stream_id] = [record]
+                self._streams.setdefault(record.request, deque()).append(streams[record.stream_id])
+            elif record.stream_id in streams:
+                streams[record.stream_id].append(record)
+
+    @staticmethod
+    def _pop(records: Optional[deque]):
+        if not records:
+            return None
+        return records.popleft() if len(records) > 1 else records[0]
+
+    def get_unary(self, kind: int, request: bytes) -> Optional[CassetteRecord]:
+        with self._lock:
+            return self._pop(self._unary.get((kind, request)))
+
+    def get_stream(self, request: bytes) -> Optional[List[CassetteRecord]]:
+        with self._lock:
+            return self._pop(self._streams.get(request))
+
+
+class _ReplayStream:
+    """
+    Subscription replaying the recorded responses, at the recorded pace divided by the speedup if there is one.
+    Subscriptions which were not done when the recording stopped, or which were cancelled, stay open
+    after the last response until they are cancelled, like a subscription to a device would.
+    """
+
+    def __init__(self, device_ip: str, records: List[CassetteRecord], speedup: float):
+        self._device_ip = device_ip
+        self._responses = deque(r for r in records if r.kind == SUBSCRIBE_RESPONSE)
+        self._end = next((r for r in records if r.kind == STREAM_END), None)
+        self._speedup = speedup
+        self._start = time.monotonic()
+        self._cancelled = threading.Event()
+        self._callbacks = []
+        self._code = None
+        self._details = None
+        self._lock = threading.Lock()
+
+    def _done(self, code: grpc.StatusCode, details: str = "") -> bool:
+        with self._lock:
+            if self._code:
+                return False
+            self._code, self._details = code, details
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+        return True
+
+    def _raise_cancelled(self):
+        self._done(grpc.StatusCode.CANCELLED, "Locally cancelled by application!")
+        raise _ReplayRpcError(grpc.StatusCode.CANCELLED, self._details)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> SubscribeResponse:
+        if self._cancelled.is_set():
+            self._raise_cancelled()
+        if self._responses:
+            record = self._responses.popleft()
+            if self._speedup > 0:
+                delay = self._start + record.elapsed / self._speedup - time.monotonic()
+                if delay > 0 and self._cancelled.wait(delay):
+                    self._raise_cancelled()
+            return SubscribeResponse.FromString(record.response)
+        if self._end is None or self._end.code == grpc.StatusCode.CANCELLED:
+            self._cancelled.wait()
+            self._raise_cancelled()
+        self._done(self._end.code, self._end.response.decode("utf-8"))
+        if self._end.code == grpc.StatusCode.OK:
+            raise StopIteration
+        raise _ReplayRpcError(self._code, self._details)
+
+    def cancel(self) -> bool:
+        self._cancelled.set()
+        return self._done(grpc.StatusCode.CANCELLED, "Locally cancelled by application!")
+
+    def is_active(self) -> bool:
+        return self._code is None
+
+    def code(self) -> Optional[grpc.StatusCode]:
+        return self._code
+
+    def details(self) -> Optional[str]:
+        return self._details
+
+    def add_done_callback(self, callback):
+        with self._lock:
+            if self._code is None:
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+
+class ReplayStub:
+    """
+    gNMI stub serving the requests from the cassette of the device instead of sending them to the device.
+    Requests which were not recorded fail with NOT_FOUND.
+    """
+
+    def __init__(self, cassette: _Cassette):
+        self.cassette = cassette
+
+    def _replay(self, kind: int, request, response_type):
+        record = self.cassette.get_unary(kind, request.SerializeToString(deterministic=True))
+        if not record:
+            _logger.warning(
+                "No recorded response of %s to request %s", self.cassette.device_ip, request
+            )
+            raise _ReplayRpcError(grpc.StatusCode.NOT_FOUND, "Request was not recorded")
+        if (speedup := get_gnmi_cassette_speedup()) > 0:
+            time.sleep(record.elapsed / speedup)
+        if record.code != grpc.StatusCode.OK:
+            raise _ReplayRpcError(record.code, record.response.decode("utf-8"))
+        return response_type.FromString(record.response)
+
+    def Get(self, request, *args, **kwargs) -> GetResponse:
+        return self._replay(GET, request, GetResponse)
+
+    def Set(self, request, *args, **kwargs) -> SetResponse:
+        return self._replay(SET, request, SetResponse)
+
+    def Subscribe(self, request_iterator, *args, **kwargs) -> _ReplayStream:
+        request = next(iter(request_iterator))
+        records = self.cassette.get_stream(request.SerializeToString(deterministic=True))
+        if records is None:
+            _logger.warning(
+                "No recorded subscription of %s for request %s", self.cassette.device_ip, request
+            )
+            records = [
+                CassetteRecord(
+                    STREAM_END,
+                    code=grpc.StatusCode.NOT_FOUND,
+                    response=b"Subscription was not recorded",
+                )
+            ]
+        return _ReplayStream(self.cassette.device_ip, records, get_gnmi_cassette_speedup())
+
+
+"""
+dictionary to store the stubs replaying the loaded cassettes.
+    Key: device_ip
+    Value: ReplayStub
+"""
+_replay_stubs: Dict[str, ReplayStub] = {}
+
+
+def get_replay_stub(device_ip: str) -> ReplayStub:
+    """
+    Returns the stub replaying the cassette of the device, the cassette is loaded on first use.
+
+    Args:
+        device_ip (str): The IP address of the device.
+
+    Raises:
+        Exception: If there is no cassette of the device.
+    """
+    with _lock:
+        if not (stub := _replay_stubs.get(device_ip)):
+            file_path = get_cassette_file(device_ip)
+            if not os.path.isfile(file_path):
+                raise Exception(f"Device {device_ip} is not reachable, no recording at {file_path} !!")
+            stub = _replay_stubs[device_ip] = ReplayStub(_Cassette(device_ip, file_path))
+            _logger.info("Replaying gNMI requests of %s from %s", device_ip, file_path)
+        return stub
+
+
+def close_cassettes():
+    """
+    Closes the cassettes being recorded and unloads the replayed ones,
+    replay starts from the first recorded responses again afterwards.
+    """
+    with _lock:
+        writers = list(_writers.values())
+        _writers.clear()
+        _replay_stubs.clear()
+    for writer in writers:
+        writer.close()
@@ -0,0 +1,379 @@
+""" Per RPC latency, payload size and error metrics of the gNMI requests to the devices """
+
+import asyncio
+import bisect
+import threading
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import grpc
+import grpc.aio
+
+from .gnmi_pb2 import GetRequest, Path, SetRequest, SubscribeRequest
+
+## Upper bounds in seconds of the latency histogram buckets, the last bucket is +Inf.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+## Number of path elements the metrics are aggregated by, keys of the elements are ignored.
+PATH_PREFIX_DEPTH = 2
+
+
+class _RpcStats:
+    def __init__(self):
+        self.count = 0
+        self.status_codes: Dict[str, int] = {}
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.latency_sum = 0.0
+        self.request_bytes = 0
+        self.response_bytes = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "status_codes": dict(self.status_codes),
+            "latency_buckets": dict(
+                zip(LATENCY_BUCKETS + (float("inf"),), self.latency_buckets)
+            ),
+            "latency_sum": self.latency_sum,
+            "request_bytes": self.request_bytes,
+            "response_bytes": self.response_bytes,
+        }
+
+
+"""
+dictionary to store the metrics of the gNMI requests.
+    Key: (device_ip, method e.g. Get, path prefix)
+    Value: _RpcStats
+"""
+_metrics: Dict[Tuple[str, str, str], _RpcStats] = {}
+_metrics_lock = threading.Lock()
+
+
+def _get_stats(device_ip: str, method: str, path_prefix: str) -> _RpcStats:
+    key = (device_ip, method, path_prefix)
+    if not (stats := _metrics.get(key)):
+        stats = _metrics[key] = _RpcStats()
+    return stats
+
+
+def record_rpc(
+    device_ip: str,
+    method: str,
+    path_prefix: str,
+    code: grpc.StatusCode,
+    latency: float,
+    request_bytes: int = 0,
+    response_bytes: int = 0,
+):
+    """
+    Records a completed gNMI request, called by the interceptor of the device channels.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        method (str): The gNMI method, i.e. Get, Set or Subscribe.
+        path_prefix (str): Prefix of the requested paths, see get_path_prefix.
+        code (grpc.StatusCode): Status of the request.
+        latency (float): Duration of the request in seconds, lifetime of the stream in case of Subscribe.
+        request_bytes (int, optional): Serialized size of the request(s). Defaults to 0.
+        response_bytes (int, optional): Serialized size of the response(s). Defaults to 0.
+    """
+    code_name = code.name if code else grpc.StatusCode.UNKNOWN.name
+    with _metrics_lock:
+        stats = _get_stats(device_ip, method, path_prefix)
+        stats.count += 1
+        stats.status_codes[code_name] = stats.status_codes.get(code_name, 0) + 1
+        stats.latency_buckets[bisect.bisect_left(LATENCY_BUCKETS, latency)] += 1
+        stats.latency_sum += latency
+        stats.request_bytes += request_bytes
+        stats.response_bytes += response_bytes
+
+
+def record_stream_response(device_ip: str, method: str, path_prefix: str, response_bytes: int):
+    """
+    Records the size of a response received on a stream, the stream itself is recorded by record_rpc when it is done.
+    """
+    with _metrics_lock:
+        _get_stats(device_ip, method, path_prefix).response_bytes += response_bytes
+
+
+def get_path_prefix(paths: List[Path], prefix: Optional[Path] = None) -> str:
+    """
+    Returns the common prefix of the paths up to PATH_PREFIX_DEPTH elements, without the keys,
+    e.g. "openconfig-interfaces:interfaces/interface" for the paths of all the interfaces.
+
+    Args:
+        paths (List[Path]): The requested paths.
+        prefix (Path, optional): The prefix of the request the paths are relative to.
+
+    Returns:
+        str: The path prefix, "/" if the paths have nothing in common.
+    """
+    base = [e.name for e in prefix.elem] if prefix else []
+    common = None
+    for path in paths:
+        names = (base + [e.name for e in path.elem])[:PATH_PREFIX_DEPTH]
+        if common is None:
+            common = names
+            continue
+        length = 0
+        while length < min(len(common), len(names)) and common[length] == names[length]:
+            length += 1
+        common = common[:length]
+    return "/".join(common) if common else "/"
+
+
+def _get_request_path_prefix(request) -> str:
+    if isinstance(request, GetRequest):
+        return get_path_prefix(list(request.path), request.prefix)
+    if isinstance(request, SetRequest):
+        return get_path_prefix(
+            list(request.delete)
+            + [u.path for u in request.replace]
+            + [u.path for u in request.update],
+            request.prefix,
+        )
+    if isinstance(request, SubscribeRequest):
+        return get_path_prefix(
+            [s.path for s in request.subscribe.subscription], request.subscribe.prefix
+        )
+    return "/"
+
+
+def _get_method(client_call_details) -> str:
+    method = client_call_details.method
+    if isinstance(method, bytes):
+        method = method.decode()
+    return method.rsplit("/", 1)[-1]
+
+
+class _InstrumentedStream:
+    """
+    Wraps the response iterator of a streaming call to record the response bytes as they are received,
+    the other metrics of the stream are recorded when the call is done.
+    """
+
+    def __init__(self, call, device_ip: str, method: str, requests):
+        self._call = call
+        self._device_ip = device_ip
+        self._method = method
+        self._requests = requests
+        self._start = time.monotonic()
+        call.add_done_callback(self._on_done)
+
+    def _on_done(self, call):
+        record_rpc(
+            self._device_ip,
+            self._method,
+            self._requests.path_prefix or "/",
+            call.code(),
+            time.monotonic() - self._start,
+            self._requests.request_bytes,
+        )
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        response = next(self._call)
+        record_stream_response(
+            self._device_ip,
+            self._method,
+            self._requests.path_prefix or "/",
+            response.ByteSize(),
+        )
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._call, name)
+
+
+class _InstrumentedRequests:
+    """
+    Wraps the request iterator of a streaming call to count the request bytes,
+    the path prefix is taken from the first request.
+    """
+
+    def __init__(self, requests):
+        self._requests = iter(requests)
+        self.path_prefix = None
+        self.request_bytes = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.record(next(self._requests))
+
+    def record(self, request):
+        if self.path_prefix is None:
+            self.path_prefix = _get_request_path_prefix(request)
+        self.request_bytes += request.ByteSize()
+        return request
+
+
+class GnmiMetricsInterceptor(
+    grpc.UnaryUnaryClientInterceptor, grpc.StreamStreamClientInterceptor
+):
+    """
+    gRPC client interceptor recording the metrics of the gNMI requests sent over a device channel.
+    """
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        start = time.monotonic()
+        call = continuation(client_call_details, request)
+        code = call.code()
+        record_rpc(
+            self.device_ip,
+            _get_method(client_call_details),
+            _get_request_path_prefix(request),
+            code,
+            time.monotonic() - start,
+            request.ByteSize(),
+            call.result().ByteSize() if code == grpc.StatusCode.OK else 0,
+        )
+        return call
+
+    def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        requests = _InstrumentedRequests(request_iterator)
+        call = continuation(client_call_details, requests)
+        return _InstrumentedStream(
+            call, self.device_ip, _get_method(client_call_details), requests
+        )
+
+
+def _iterate_aio_requests(requests, on_request: Callable):
+    """
+    Returns the requests of a grpc.aio streaming call, which may be an async iterable, calling on_request with each.
+    """
+    if hasattr(requests, "__aiter__"):
+
+        async def _requests():
+            async for request in requests:
+                yield on_request(request)
+
+        return _requests()
+    return (on_request(request) for request in requests)
+
+
+## Tasks started by the done callbacks of the grpc.aio calls, referenced until done.
+_done_tasks = set()
+
+
+def _add_aio_done_callback(call, callback: Callable[..., Awaitable]):
+    """
+    Runs the coroutine function callback with the grpc.aio call once it is done,
+    the status of a grpc.aio call can only be read by awaiting it.
+    """
+
+    def _on_done(done_call):
+        task = asyncio.ensure_future(callback(done_call))
+        _done_tasks.add(task)
+        task.add_done_callback(_done_tasks.discard)
+
+    call.add_done_callback(_on_done)
+
+
+## grpc.aio channels use an interceptor for one kind of call only, hence there is one per kind.
+
+
+class GnmiMetricsAioUnaryInterceptor(grpc.aio.UnaryUnaryClientInterceptor):
+    """
+    grpc.aio version of GnmiMetricsInterceptor for the Get and Set requests.
+    """
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+
+    async def intercept_unary_unary(self, continuation, client_call_details, request):
+        start = time.monotonic()
+        call = await continuation(client_call_details, request)
+        code = await call.code()
+        record_rpc(
+            self.device_ip,
+            _get_method(client_call_details),
+            _get_request_path_prefix(request),
+            code,
+            time.monotonic() - start,
+            request.ByteSize(),
+            (await call).ByteSize() if code == grpc.StatusCode.OK else 0,
+        )
+        return call
+
+
+class GnmiMetricsAioStreamInterceptor(grpc.aio.StreamStreamClientInterceptor):
+    """
+    grpc.aio version of GnmiMetricsInterceptor for the subscriptions.
+    """
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+
+    async def intercept_stream_stream(self, continuation, client_call_details, request_iterator):
+        requests = _InstrumentedRequests(())
+        method = _get_method(client_call_details)
+        start = time.monotonic()
+        call = await continuation(
+            client_call_details, _iterate_aio_requests(request_iterator, requests.record)
+        )
+
+        async def _on_done(done_call):
+            record_rpc(
+                self.device_ip,
+                method,
+                requests.path_prefix or "/",
+                await done_call.code(),
+                time.monotonic() - start,
+                requests.request_bytes,
+            )
+
+        _add_aio_done_callback(call, _on_done)
+
+        async def _responses():
+            async for response in call:
+                record_stream_response(
+                    self.device_ip, method, requests.path_prefix or "/", response.ByteSize()
+                )
+                yield response
+
+        return _responses()
+
+
+def get_rpc_metrics(device_ip: str = None) -> List[dict]:
+    """
+    Returns the metrics of the gNMI requests per device, method and path prefix.
+
+    .. code-block:: python
+
+        slowest = sorted(
+            get_rpc_metrics(), key=lambda m: m["latency_sum"], reverse=True
+        )[:10]
+
+    Args:
+        device_ip (str, optional): The IP address of the device. Defaults to all devices.
+
+    Returns:
+        List[dict]: The metrics having keys device_ip, method, path_prefix, count, status_codes,
+            latency_buckets (number of requests per bucket upper bound in seconds, not cumulative),
+            latency_sum, request_bytes and response_bytes.
+    """
+    with _metrics_lock:
+        return [
+            {"device_ip": ip, "method": method, "path_prefix": prefix, **stats.to_dict()}
+            for (ip, method, prefix), stats in _metrics.items()
+            if device_ip is None or ip == device_ip
+        ]
+
+
+def reset_rpc_metrics(device_ip: str = None):
+    """
+    Clears the metrics of the gNMI requests.
+
+    Args:
+        device_ip (str, optional): The IP address of the device. Defaults to all devices.
+    """
+    with _metrics_lock:
+        for key in [k for k in _metrics if device_ip is None or k[0] == device_ip]:
+            del _metrics[key]
@@ -0,0 +1,54 @@
+from prometheus_client import CollectorRegistry
+from prometheus_client.core import CounterMetricFamily, HistogramMetricFamily
+from orca_nw_lib.gnmi_metrics import get_rpc_metrics
+from orca_nw_lib.promdb_utils import write_to_prometheus
+from .utils import get_logging
+
+_logger = get_logging().getLogger(__name__)
+
+_labels = ["device_ip", "method", "path_prefix"]
+
+
+class GnmiMetricsCollector:
+    """
+    Prometheus collector of the gNMI request metrics,
+    can also be registered to the registry of an application exposing the metrics itself.
+    """
+
+    def collect(self):
+        requests = CounterMetricFamily(
+            "gnmi_requests", "gNMI requests per status code", labels=_labels + ["code"]
+        )
+        latency = HistogramMetricFamily(
+            "gnmi_request_latency_seconds", "Latency of the gNMI requests", labels=_labels
+        )
+        request_bytes = CounterMetricFamily(
+            "gnmi_request_bytes", "Size of the gNMI requests", labels=_labels
+        )
+        response_bytes = CounterMetricFamily(
+            "gnmi_response_bytes", "Size of the gNMI responses", labels=_labels
+        )
+        for metric in get_rpc_metrics():
+            labels = [metric["device_ip"], metric["method"], metric["path_prefix"]]
+            for code, count in metric["status_codes"].items():
+                requests.add_metric(labels + [code], count)
+            buckets, cumulative = [], 0
+            for bound, count in metric["latency_buckets"].items():
+                cumulative += count
+                buckets.append(("+Inf" if bound == float("inf") else str(bound), cumulative))
+            latency.add_metric(labels, buckets, metric["latency_sum"])
+            request_bytes.add_metric(labels, metric["request_bytes"])
+            response_bytes.add_metric(labels, metric["response_bytes"])
+        yield from (requests, latency, request_bytes, response_bytes)
+
+
+def insert_gnmi_metrics_in_prometheus():
+    """
+    Pushes the metrics of the gNMI requests to the prometheus pushgateway.
+    """
+    try:
+        registry = CollectorRegistry()
+        registry.register(GnmiMetricsCollector())
+        write_to_prometheus(registry=registry)
+    except Exception as e:
+        _logger.error(f"Error inserting gNMI metrics in prometheus: {e}")
@@ -1,14 +1,36 @@
-import time
-from threading import Thread
+import os
 import threading
-from typing import List
+from operator import attrgetter
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
 
 from orca_nw_lib.interface_influxdb import handle_interface_counters_influxdb
 from orca_nw_lib.interface_promdb import handle_interface_counters_promdb
-from orca_nw_lib.utils import get_telemetry_db
+import grpc
+
+from orca_nw_lib.utils import (
+    get_gnmi_cassette_mode,
+    get_gnmi_subscription_wildcards,
+    get_subscription_engine,
+    get_subscription_sync_timeout,
+    get_telemetry_db,
+)
 from .common import PortFec, Speed
 from .device_db import get_all_devices_ip_from_db, update_device_status
 from .device_gnmi import get_device_state_url
+from .update_dispatcher import get_update_dispatcher
+from .telemetry_sink import get_telemetry_sink
+from .gnmi_sub_async import AsyncSupervisedSubscription, get_async_subscription_engine
+from .subscription_shards import get_shard_coordinator, is_shard_worker
+from .subscription_supervisor import (
+    LIVE,
+    SYNCING,
+    SubscriptionHandle,
+    get_subscription_handle,
+    pop_subscription_handle,
+    register_subscription,
+    set_subscription_state,
+    set_subscription_stream,
+)
 from .gnmi_pb2 import (
     Encoding,
     SubscribeRequest,
@@ -45,74 +67,115 @@ from .stp_port_gnmi import get_stp_port_path
 _logger = get_logging().getLogger(__name__)
 
 gnmi_subscriptions = {}
+gnmi_telemetry_subscriptions = {}
+
+## Names of the supervised subscriptions of a device.
+CONFIG_SUBSCRIPTION = "config"
+TELEMETRY_SUBSCRIPTION = "telemetry"
 
 
 def subscribe_to_path(request):
     yield request
 
 
-def handle_interface_config_update(device_ip: str, resp: SubscribeResponse):
-    ether = ""
+"""
+Leaf tables of the update handlers.
+    Key: name of the leaf in the update path
+    Value: (keyword argument of the DB function, function returning the value from the TypedValue)
+"""
+_bool_val = attrgetter("bool_val")
+_uint_val = attrgetter("uint_val")
+_string_val = attrgetter("string_val")
+
+_interface_config_leaves = {
+    "enabled": ("enable", _bool_val),
+    "mtu": ("mtu", _uint_val),
+    "port-speed": ("speed", lambda val: Speed.get_enum_from_str(val.string_val)),
+    "description": ("description", _string_val),
+    "port-fec": ("fec", lambda val: PortFec.get_enum_from_str(val.string_val)),
+    "auto-negotiate": ("autoneg", _bool_val),
+    "advertised-speed": ("adv_speeds", _string_val),
+    "standalone-link-training": ("link_training", _bool_val),
+}
+
+_port_group_config_leaves = {
+    "speed": ("speed", lambda val: Speed.get_enum_from_str(val.string_val)),
+}
+
+_stp_config_leaves = {
+    "enabled-protocol": ("enabled_protocol", _string_val),
+    "bpdu-filter": ("bpdu_filter", _bool_val),
+    "loop-guard": ("loop_guard", _bool_val),
+    "disabled-vlans": ("disabled_vlans", _string_val),
+    "rootguard-timeout": ("rootguard_timeout", _uint_val),
+    "portfast": ("portfast", _bool_val),
+    "hello-time": ("hello_time", _uint_val),
+    "max-age": ("max_age", _uint_val),
+    "forwarding-delay": ("forwarding_delay", _uint_val),
+    "bridge-priority": ("bridge_priority", _uint_val),
+}
+
+_stp_port_config_leaves = {
+    "bpdu-guard": ("bpdu_guard", _bool_val),
+    "bpdu-filter": ("bpdu_filter", _bool_val),
+    "bpdu-guard-port-shutdown": ("bpdu_guard_port_shutdown", _bool_val),
+    "link-type": ("link_type", _string_val),
+    "guard": ("guard", _string_val),
+    "edge-port": ("edge_port", _string_val),
+    "name": ("if_name", _string_val),
+    "portfast": ("portfast", _bool_val),
+    "spanning-tree-enable": ("stp_enabled", _bool_val),
+    "uplink-fast": ("uplink_fast", _bool_val),
+    "cost": ("cost", _uint_val),
+    "port-priority": ("port_priority", _uint_val),
+}
+
+
+def get_leaf_values(resp: SubscribeResponse, leaves: Dict[str, tuple]) -> dict:
+    """
+    Returns the values of the leaves updated by the subscription response.
+
+    Args:
+        resp (SubscribeResponse): The subscription response.
+        leaves (Dict[str, tuple]): Keyword argument and value function per leaf name.
+
+    Returns:
+        dict: Value per keyword argument of all the leaves, None for the leaves not in the response.
+    """
+    values = dict.fromkeys((arg for arg, _ in leaves.values()))
+    for u in resp.update.update:
+        for ele in u.path.elem:
+            if leaf := leaves.get(ele.name):
+                values[leaf[0]] = leaf[1](u.val)
+    return values
+
+
+def _get_interface_name(resp: SubscribeResponse) -> str:
+    """
+    Returns the name of the interface the update is about, empty if there is none in the prefix.
+    """
     for ele in resp.update.prefix.elem:
         if ele.name == "interface":
-            ether = ele.key.get("name")
-            break
+            return ele.key.get("name", "")
+    return ""
+
+
+def handle_interface_config_update(device_ip: str, resp: SubscribeResponse):
+    ether = _get_interface_name(resp)
     if not ether:
         _logger.debug(
             "Ethernet interface not found in gNMI subscription response from %s",
             device_ip,
         )
         return
-    enable = None
-    mtu = None
-    speed = None
-    description = None
-    fec = None
-    autoneg = None
-    adv_speeds = None
-    link_training = None
-    for u in resp.update.update:
-        for ele in u.path.elem:
-            if ele.name == "enabled":
-                enable = u.val.bool_val
-            if ele.name == "mtu":
-                mtu = u.val.uint_val
-            if ele.name == "port-speed":
-                speed = Speed.get_enum_from_str(u.val.string_val)
-            if ele.name == "description":
-                description = u.val.string_val
-            if ele.name == "port-fec":
-                fec = PortFec.get_enum_from_str(u.val.string_val)
-            if ele.name == "auto-negotiate":
-                autoneg = u.val.bool_val
-            if ele.name == "advertised-speed":
-                adv_speeds = u.val.string_val
-            if ele.name == "standalone-link-training":
-                link_training = u.val.bool_val
+    values = get_leaf_values(resp, _interface_config_leaves)
     _logger.debug(
-        "updating interface config in DB, device_ip: %s, ether: %s, enable: %s, mtu: %s, speed: %s, description: %s, autoneg: %s, adv_speeds : %s, link_training: %s .",
+        "updating interface config in DB, device_ip: %s, ether: %s, config: %s.",
         device_ip,
         ether,
-        enable,
-        mtu,
-        speed,
-        description,
-        autoneg,
-        adv_speeds,
-        link_training,
-    )
-    set_interface_config_in_db(
-        device_ip=device_ip,
-        if_name=ether,
-        enable=enable,
-        mtu=mtu,
-        speed=speed,
-        description=description,
-        fec=fec,
-        autoneg=autoneg,
-        adv_speeds=adv_speeds,
-        link_training=link_training,
+        values,
     )
+    set_interface_config_in_db(device_ip=device_ip, if_name=ether, **values)
 
 
 def handle_port_group_config_update(device_ip: str, resp: SubscribeResponse):
@@ -127,97 +190,23 @@ def handle_port_group_config_update(device_ip: str, resp: SubscribeResponse):
             device_ip,
         )
         return
-    for u in resp.update.update:
-        for ele in u.path.elem:
-            if ele.name == "speed":
-                speed_enum = Speed.get_enum_from_str(u.val.string_val)
-                if speed_enum:
-                    _logger.debug(
-                        "updating port-group config in DB, device_ip: %s, pg_id: %s, speed: %s .",
-                        device_ip,
-                        pg_id,
-                        speed_enum,
-                    )
-                    set_port_group_speed_in_db(
-                        device_ip=device_ip, group_id=pg_id, speed=speed_enum
-                    )
+    if speed_enum := get_leaf_values(resp, _port_group_config_leaves)["speed"]:
+        _logger.debug(
+            "updating port-group config in DB, device_ip: %s, pg_id: %s, speed: %s .",
+            device_ip,
+            pg_id,
+            speed_enum,
+        )
+        set_port_group_speed_in_db(device_ip=device_ip, group_id=pg_id, speed=speed_enum)
 
 
 def handle_stp_config(device_ip: str, resp: SubscribeResponse):
-    enabled_protocol = None
-    bpdu_filter = None
-    loop_guard = None
-    disabled_vlans = None
-    rootguard_timeout = None
-    portfast = None
-    hello_time = None
-    max_age = None
-    forwarding_delay = None
-    bridge_priority = None
-    for u in resp.update.update:
-        for ele in u.path.elem:
-            if ele.name == "enabled-protocol":
-                enabled_protocol = u.val.string_val
-            if ele.name == "bpdu-filter":
-                bpdu_filter = u.val.bool_val
-            if ele.name == "loop-guard":
-                loop_guard = u.val.bool_val
-            if ele.name == "disabled-vlans":
-                disabled_vlans = u.val.string_val
-            if ele.name == "rootguard-timeout":
-                rootguard_timeout = u.val.uint_val
-            if ele.name == "portfast":
-                portfast = u.val.bool_val
-            if ele.name == "hello-time":
-                hello_time = u.val.uint_val
-            if ele.name == "max-age":
-                max_age = u.val.uint_val
-            if ele.name == "forwarding-delay":
-                forwarding_delay = u.val.uint_val
-            if ele.name == "bridge-priority":
-                bridge_priority = u.val.uint_val
-    _logger.debug(
-        "Updating STP config on DB for device: %s, enabled_protocol: %s, bpdu_filter: %s, loop_guard: %s, disabled_vlans: %s, rootguard_timeout: %s, portfast: %s, hello_time: %s, max_age: %s, forwarding_delay: %s, bridge_priority: %s",
-        device_ip,
-        enabled_protocol,
-        bpdu_filter,
-        loop_guard,
-        disabled_vlans,
-        rootguard_timeout,
-        portfast,
-        hello_time,
-        max_age,
-        forwarding_delay,
-        bridge_priority,
-    )
-    set_stp_config_in_db(
-        device_ip=device_ip,
-        enabled_protocol=enabled_protocol,
-        bpdu_filter=bpdu_filter,
-        loop_guard=loop_guard,
-        disabled_vlans=disabled_vlans,
-        rootguard_timeout=rootguard_timeout,
-        portfast=portfast,
-        hello_time=hello_time,
-        max_age=max_age,
-        forwarding_delay=forwarding_delay,
-        bridge_priority=bridge_priority,
-    )
+    values = get_leaf_values(resp, _stp_config_leaves)
+    _logger.debug("Updating STP config on DB for device: %s, config: %s", device_ip, values)
+    set_stp_config_in_db(device_ip=device_ip, **values)
 
 
 def handle_stp_port_config(device_ip: str, resp: SubscribeResponse):
-    bpdu_guard = None
-    bpdu_filter = None
-    bpdu_guard_port_shutdown = None
-    link_type = None
-    guard = None
-    edge_port = None
-    if_name = None
-    portfast = None
-    stp_enabled = None
-    uplink_fast = None
-    cost = None
-    port_priority = None
     for del_item in resp.update.delete:
         for ele in del_item.elem:
             if ele.name == "interface":
@@ -226,50 +215,14 @@ def handle_stp_port_config(device_ip: str, resp: SubscribeResponse):
                     device_ip=device_ip, if_name=if_name
                 )
 
-    for u in resp.update.update:
-        for ele in u.path.elem:
-            if ele.name == "bpdu-guard":
-                bpdu_guard = u.val.bool_val
-            if ele.name == "bpdu-filter":
-                bpdu_filter = u.val.bool_val
-            if ele.name == "bpdu-guard-port-shutdown":
-                bpdu_guard_port_shutdown = u.val.bool_val
-            if ele.name == "link-type":
-                link_type = u.val.string_val
-            if ele.name == "guard":
-                guard = u.val.string_val
-            if ele.name == "edge-port":
-                edge_port = u.val.string_val
-            if ele.name == "name":
-                if_name = u.val.string_val
-            if ele.name == "portfast":
-                portfast = u.val.bool_val
-            if ele.name == "spanning-tree-enable":
-                stp_enabled = u.val.bool_val
-            if ele.name == "uplink-fast":
-                uplink_fast = u.val.bool_val
-            if ele.name == "cost":
-                cost = u.val.uint_val
-            if ele.name == "port-priority":
-                port_priority = u.val.uint_val
+    values = get_leaf_values(resp, _stp_port_config_leaves)
     _logger.debug(
-        f"Updating stp port {if_name} on db for {device_ip} with config bpdu_guard: {bpdu_guard}, bpdu_filter: {bpdu_filter}, bpdu_guard_port_shutdown: {bpdu_guard_port_shutdown}, link_type: {link_type}, guard: {guard}, edge_port: {edge_port}, portfast: {portfast}, stp_enabled: {stp_enabled}, uplink_fast: {uplink_fast}, cost: {cost}, port_priority: {bpdu_guard}."
-    )
-    return set_stp_port_config_in_db(
-        device_ip=device_ip,
-        if_name=if_name,
-        bpdu_guard=bpdu_guard,
-        bpdu_filter=bpdu_filter,
-        bpdu_guard_port_shutdown=bpdu_guard_port_shutdown,
-        link_type=link_type,
-        guard=guard,
-        edge_port=edge_port,
-        portfast=portfast,
-        stp_enabled=stp_enabled,
-        uplink_fast=uplink_fast,
-        cost=cost,
-        port_priority=port_priority,
+        "Updating stp port %s on db for %s with config %s.",
+        values["if_name"],
+        device_ip,
+        values,
     )
+    return set_stp_port_config_in_db(device_ip=device_ip, **values)
 
 
 def handle_device_state(device_ip: str, resp: SubscribeResponse):
@@ -285,143 +238,219 @@ def handle_device_state(device_ip: str, resp: SubscribeResponse):
             update_device_status(device_ip, status)
 
 
-def handle_update(device_ip: str, subscriptions: List[Subscription]):
-    # device_gnmi_stub = getGrpcStubs(device_ip)
-    subscriptionlist = SubscriptionList(
-        subscription=subscriptions,
-        mode=SubscriptionList.Mode.Value("STREAM"),
-        encoding=Encoding.Value("PROTO"),
-        updates_only=True,
+"""
+dictionary to store the handlers of the config subscription updates.
+    Key: name of the first element of the update prefix e.g. openconfig-interfaces:interfaces
+    Value: list of (handler, key function), see register_subscription_handler
+"""
+_update_handlers: Dict[str, List[Tuple[Callable, Optional[Callable]]]] = {}
+
+
+def register_subscription_handler(
+    prefix_name: str,
+    handler: Callable[[str, SubscribeResponse], None],
+    key: Callable[[SubscribeResponse], Hashable] = None,
+):
+    """
+    Registers a handler of the updates received on the config subscriptions of the devices.
+
+    .. code-block:: python
+
+        register_subscription_handler(
+            "openconfig-interfaces:interfaces", handle_interface_config_update, key=_get_interface_name
+        )
+
+    Args:
+        prefix_name (str): Name of an element of the update prefix, usually the first one i.e. the module and container.
+        handler (Callable): Called with the device IP and the SubscribeResponse.
+        key (Callable, optional): Returns the key of the update e.g. the interface name,
+            if given the handler is called by the update dispatcher in order per key,
+            otherwise it is called by the thread reading the subscription.
+    """
+    _update_handlers.setdefault(prefix_name, []).append((handler, key))
+
+
+def unregister_subscription_handler(prefix_name: str, handler: Callable):
+    """
+    Removes a handler registered by register_subscription_handler.
+    """
+    _update_handlers[prefix_name] = [
+        h for h in _update_handlers.get(prefix_name, []) if h[0] != handler
+    ]
+
+
+_interface_prefix_name = get_interface_base_path().elem[0].name
+
+register_subscription_handler(
+    _interface_prefix_name, handle_interface_config_update, key=_get_interface_name
+)
+register_subscription_handler(
+    _get_port_groups_base_path().elem[0].name, handle_port_group_config_update
+)
+register_subscription_handler(get_stp_port_path().elem[0].name, handle_stp_port_config)
+register_subscription_handler(get_device_state_url().elem[0].name, handle_device_state)
+
+
+def _get_update_routes(device_ip: str, resp: SubscribeResponse) -> List[tuple]:
+    """
+    Returns the handlers registered for the prefix of the update as (handler, key) tuples,
+    key being None for the handlers registered without key.
+    """
+    routes = []
+    for ele in resp.update.prefix.elem:
+        for handler, key in _update_handlers.get(ele.name, ()):
+            _logger.debug(
+                "gNMI subscription update received from %s for %s -> %s",
+                device_ip,
+                ele.name,
+                resp,
+            )
+            routes.append((handler, key(resp) if key else None, ele.name))
+    return routes
+
+
+def _route_update(device_ip: str, resp: SubscribeResponse):
+    """
+    Calls the handlers registered for the prefix of the update,
+    the handlers registered with key are called by the update dispatcher.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        resp (SubscribeResponse): The update.
+    """
+    for handler, key, _ in _get_update_routes(device_ip, resp):
+        if key is not None:
+            get_update_dispatcher().dispatch(device_ip, key, handler, device_ip, resp)
+        else:
+            handler(device_ip, resp)
+
+
+async def _route_update_async(device_ip: str, resp: SubscribeResponse):
+    """
+    Hands the update over to the update dispatcher from the event loop of the asyncio subscription engine,
+    waiting for room in its queues without blocking the event loop.
+    Unlike with threads, the handlers registered without key are called by the update dispatcher too,
+    in order per prefix.
+    """
+    for handler, key, prefix_name in _get_update_routes(device_ip, resp):
+        await get_update_dispatcher().dispatch_async(
+            device_ip, prefix_name if key is None else key, handler, device_ip, resp
+        )
+
+
+def _get_config_subscribe_request(subscriptions: List[Subscription]) -> SubscribeRequest:
+    return SubscribeRequest(
+        subscribe=SubscriptionList(
+            subscription=subscriptions,
+            mode=SubscriptionList.Mode.Value("STREAM"),
+            encoding=Encoding.Value("PROTO"),
+            updates_only=True,
+        )
+    )
+
+
+def _get_telemetry_subscribe_request(subscriptions: List[Subscription]) -> SubscribeRequest:
+    return SubscribeRequest(
+        subscribe=SubscriptionList(
+            subscription=subscriptions,
+            mode=SubscriptionList.Mode.Value("STREAM"),
+            encoding=Encoding.Value("JSON_IETF"),
+        )
     )
 
-    sub_req = SubscribeRequest(subscribe=subscriptionlist)
+
+def _handle_config_response(device_ip: str, resp: SubscribeResponse):
+    if not resp.sync_response:
+        _route_update(device_ip, resp)
+    else:
+        _handle_config_sync_response(device_ip, resp)
+
+
+async def _handle_config_response_async(device_ip: str, resp: SubscribeResponse):
+    if not resp.sync_response:
+        await _route_update_async(device_ip, resp)
+    else:
+        _handle_config_sync_response(device_ip, resp)
+
+
+def _handle_config_sync_response(device_ip: str, resp: SubscribeResponse):
+    _logger.info(
+        "gNMI subscription sync response received from %s -> %s",
+        device_ip,
+        resp,
+    )
+    device_sync_responses[device_ip] = resp.sync_response
+    _get_sync_event(device_ip).set()
+    _logger.debug(
+        "Subscription sync response status for devices %s",
+        device_sync_responses,
+    )
+
+
+def handle_update(device_ip: str, subscriptions: List[Subscription]):
     subscription = send_gnmi_subscribe(
-        device_ip=device_ip, subscribe_request=subscribe_to_path(sub_req)
+        device_ip=device_ip,
+        subscribe_request=subscribe_to_path(_get_config_subscribe_request(subscriptions)),
     )
-    global gnmi_subscriptions
-    gnmi_subscriptions[device_ip] = subscription
+    _track_stream(gnmi_subscriptions, device_ip, CONFIG_SUBSCRIPTION, subscription)
+    set_subscription_state(device_ip, CONFIG_SUBSCRIPTION, SYNCING)
     for resp in subscription:
         try:
-            if not resp.sync_response:
-                for ele in resp.update.prefix.elem:
-                    if ele.name == get_interface_base_path().elem[0].name:
-                        _logger.debug(
-                            "gNMI subscription interface config update received from %s -> %s",
-                            device_ip,
-                            resp,
-                        )
-                        thread = Thread(
-                            target=handle_interface_config_update,
-                            args=(device_ip, resp),
-                            daemon=True,
-                        )
-                        thread.start()
-                        # handle_interface_config_update(device_ip, resp)
-                    if ele.name == _get_port_groups_base_path().elem[0].name:
-                        ## Its a port group config update
-                        _logger.debug(
-                            "gNMI subscription port group config update received from %s -> %s",
-                            device_ip,
-                            resp,
-                        )
-                        handle_port_group_config_update(device_ip, resp)
-                    # if ele.name == get_stp_global_config_path().elem[0].name:
-                    #     _logger.debug(
-                    #         "gNMI subscription stp config update received from %s -> %s",
-                    #         device_ip,
-                    #         resp,
-                    #     )
-                    #     handle_stp_config(device_ip, resp)
-                    if ele.name == get_stp_port_path().elem[0].name:
-                        _logger.debug(
-                            "gNMI subscription stp config update received from %s -> %s",
+            _handle_config_response(device_ip, resp)
+            if resp.sync_response:
+                set_subscription_state(device_ip, CONFIG_SUBSCRIPTION, LIVE)
+        except Exception as e:
+            _logger.error(e)
+            raise
+
+
+def _handle_telemetry_response(device_ip: str, resp: SubscribeResponse):
+    try:
+        if not resp.sync_response:
+            for ele in resp.update.prefix.elem:
+                if ele.name == _interface_prefix_name:
+                    _logger.debug("gNMI subscription interface counters received from %s -> %s",
+                                  device_ip,
+                                  resp,
+                                )
+                    if get_telemetry_db() == "influxdb":
+                        _logger.debug("Subed intfc counters into influxdb for %s",device_ip,)
+                        get_telemetry_sink().put(
                             device_ip,
+                            _get_interface_name(resp),
+                            handle_interface_counters_influxdb,
                             resp,
                         )
-                        handle_stp_port_config(device_ip, resp)
-                    if ele.name == get_device_state_url().elem[0].name:
-                        _logger.debug(
-                            "gNMI subscription device state update received from %s -> %s",
+
+                    if get_telemetry_db() == "prometheus":
+                        _logger.debug("Subed intfc counters into promdb for %s",device_ip,)
+                        get_telemetry_sink().put(
                             device_ip,
+                            _get_interface_name(resp),
+                            handle_interface_counters_promdb,
                             resp,
                         )
-                        handle_device_state(device_ip, resp)
-            elif resp.sync_response:
-                global device_sync_responses
-                _logger.info(
-                    "gNMI subscription sync response received from %s -> %s",
-                    device_ip,
-                    resp,
-                )
-                device_sync_responses[device_ip] = resp.sync_response
-                _logger.debug(
-                    "Subscription sync response status for devices %s",
-                    device_sync_responses,
-                )
-            else:
-                _logger.debug(
-                    "gNMI subscription response received from %s -> %s",
-                    device_ip,
-                    resp,
-                )
+        else:
+            _logger.info("gNMI subscription sync response received from %s -> %s", device_ip, resp,)
+            device_sync_responses[device_ip] = resp.sync_response
+            _logger.debug("Subscription sync response status for devices %s",device_sync_responses,)
 
-        except Exception as e:
-            _logger.error(e)
-            raise
+    except Exception as e:
+        _logger.error(f"Error processing subscription response: {e}")
 
 
 # Modifed handle_update function to insert interface counters to telemetry DB:
 def handle_telemetry_notification(device_ip: str, subscriptions: List[Subscription]):
-    device_gnmi_stub = getGrpcStubs(device_ip)
-    subscriptionlist = SubscriptionList(
-            subscription=subscriptions,
-            mode=SubscriptionList.Mode.Value("STREAM"),
-            encoding=Encoding.Value("JSON_IETF"),
-        )
-    sub_req = SubscribeRequest(subscribe=subscriptionlist)
-    subscription = device_gnmi_stub.Subscribe(subscribe_to_path(sub_req))
-    global gnmi_subscriptions
-    gnmi_subscriptions[device_ip] = subscription
+    subscription = send_gnmi_subscribe(
+        device_ip=device_ip,
+        subscribe_request=subscribe_to_path(_get_telemetry_subscribe_request(subscriptions)),
+    )
+    _track_stream(gnmi_telemetry_subscriptions, device_ip, TELEMETRY_SUBSCRIPTION, subscription)
+    set_subscription_state(device_ip, TELEMETRY_SUBSCRIPTION, SYNCING)
     for resp in subscription:
-        try:
-            if not resp.sync_response:
-                for ele in resp.update.prefix.elem:
-                    if ele.name == get_interface_base_path().elem[0].name:
-                        _logger.debug("gNMI subscription interface counters received from %s -> %s",
-                                      device_ip, 
-                                      resp,
-                                    )
-                        if get_telemetry_db() == "influxdb":
-                            _logger.debug("Subed intfc counters into influxdb for %s",device_ip,)
-                            thread = Thread(
-                                target=handle_interface_counters_influxdb,
-                                args=(device_ip, resp),
-                                daemon=True,
-                            )
-                            thread.start()
-                            
-
-                        if get_telemetry_db() == "prometheus":
-                            _logger.debug("Subed intfc counters into promdb for %s",device_ip,)
-                            thread = Thread(
-                                target=handle_interface_counters_promdb,
-                                args=(device_ip, resp),
-                                daemon=True,
-                            )
-                            thread.start()
-            
-            elif resp.sync_response:
-                _logger.info("gNMI subscription sync response received from %s -> %s", device_ip, resp,)
-                device_sync_responses[device_ip] = resp.sync_response
-                _logger.debug("Subscription sync response status for devices %s",device_sync_responses,)
-                   
-            else:
-                device_sync_responses[device_ip] = resp.sync_response
-                
-        except Exception as e:
-            _logger.error(f"Error processing subscription response: {e}")
-
-
+        _handle_telemetry_response(device_ip, resp)
+        if resp.sync_response:
+            set_subscription_state(device_ip, TELEMETRY_SUBSCRIPTION, LIVE)
 
 
 """
@@ -432,6 +461,61 @@ dictionary to store the sync response received from the device.
 device_sync_responses = {}
 
 
+"""
+dictionary to store the event set when the sync response is received from the device.
+    Key: device_ip
+    Value: threading.Event
+"""
+_sync_events = {}
+_sync_events_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    ## The subscriptions of the parent process are not running in a forked child process.
+    global _sync_events_lock
+    gnmi_subscriptions.clear()
+    gnmi_telemetry_subscriptions.clear()
+    device_sync_responses.clear()
+    _sync_events.clear()
+    _sync_events_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _get_sync_event(device_ip: str) -> threading.Event:
+    with _sync_events_lock:
+        return _sync_events.setdefault(device_ip, threading.Event())
+
+
+def wait_for_sync(device_ip: str, timeout: float = None) -> bool:
+    """
+    Blocks until the sync response of the gNMI subscription of the device is received.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        timeout (float, optional): Max. time in seconds to wait.
+            Defaults to subscription_sync_timeout from config.
+
+    Returns:
+        bool: True if the sync response is received, False if timed out.
+    """
+    if coordinator := get_shard_coordinator():
+        return coordinator.wait_for_sync(
+            device_ip, get_subscription_sync_timeout() if timeout is None else timeout
+        )
+    if _get_sync_event(device_ip).wait(
+        get_subscription_sync_timeout() if timeout is None else timeout
+    ):
+        return True
+    _logger.error(
+        "Sync response not received for device %s , Hence not ready to receive subscription responses!!",
+        device_ip,
+    )
+    return False
+
+
 def sync_response_received(device_ip: str):
     if not device_sync_responses.get(device_ip):
         _logger.error(
@@ -477,87 +561,229 @@ def get_running_thread_names():
 def gnmi_subscribe(device_ip: str, force_resubscribe: bool = False):
     """
     Subscribe to GNMI for the given device IP.
+    The subscriptions are supervised, i.e. whenever a subscription stream ends or fails,
+    the device is subscribed again with exponential backoff until it is unsubscribed.
+    Calling it again for a subscribed device has no effect.
+    With subscription_shards configured, the device is subscribed in the worker process of its shard,
+    see subscription_shards.
 
     Args:
         device_ip (str): The IP address of the device.
         force_resubscribe (bool, optional): Whether to force resubscription even if already subscribed. Defaults to False.
 
     Returns:
-        bool: True if subscription is successful, False otherwise.
+        bool: True if subscription is successful,
+            False otherwise e.g. when forced and the previous subscriptions did not stop in time.
     """
 
-    thread_name = get_subscription_thread_name(device_ip)
-    telemetry_thread_name = get_telemetry_thread_name(device_ip)
+    if coordinator := get_shard_coordinator():
+        return coordinator.subscribe(device_ip, force_resubscribe)
+
     if force_resubscribe:
         _logger.info(
             "The force subscription is true, first removing the existing subscription if any."
         )
-        gnmi_unsubscribe(device_ip)
-
-    if thread_name in get_running_thread_names() and not force_resubscribe:
-        _logger.debug("Already subscribed for %s", device_ip)
-        _logger.debug("Currently running threads %s", get_running_thread_names())
-        return True
-    else:
-        subscriptions = get_subscription_path_for_config_change(device_ip)
-        if not subscriptions:
-            _logger.warn(
-                "No subscription paths created for %s, Check if device with its components and config is discovered in DB or rediscover device.",
-                device_ip,
+        if not gnmi_unsubscribe(device_ip):
+            _logger.error(
+                "Not subscribing %s again, its previous subscriptions did not stop yet.", device_ip
             )
             return False
-        _logger.info("Subscribing for %s", device_ip)
-        thread = Thread(
-            name=thread_name,
-            target=handle_update,
-            args=(device_ip, subscriptions),
-            daemon=True,
+
+    _logger.info("Subscribing for %s", device_ip)
+    if get_subscription_engine() == "asyncio" and get_gnmi_cassette_mode() != "replay":
+        _subscribe_async(device_ip)
+        return True
+
+    register_subscription(
+        device_ip,
+        CONFIG_SUBSCRIPTION,
+        get_subscription_thread_name(device_ip),
+        run=lambda: _run_config_subscription(device_ip),
+    )
+
+    # If telemetry_db has value then start to push interface counters
+    if get_telemetry_db():
+        register_subscription(
+            device_ip,
+            TELEMETRY_SUBSCRIPTION,
+            get_telemetry_thread_name(device_ip),
+            run=lambda: _run_telemetry_subscription(device_ip),
         )
-        thread.start()
-
-        # If telemetry_db has value then start to push interface counters
-        if get_telemetry_db():
-            ## add get_subscription_path_for_monitoring to subscritions
-            infc_conts_subscriptions = get_subscription_path_for_monitoring(device_ip)
-            thread = Thread(
-            name=telemetry_thread_name,
-            target=handle_telemetry_notification,
-            args=(device_ip, infc_conts_subscriptions),
-            daemon=True,
-            )
-            thread.start()
-        _logger.debug("Currently running threads %s", get_running_thread_names())
-        if thread_name in get_running_thread_names():
-            _logger.debug(
-                "Subscribed for %s gnmi notifications from thread %s.",
+    _logger.debug("Currently running threads %s", get_running_thread_names())
+    return True
+
+
+def _clear_sync_response(device_ip: str):
+    ## The sync response is awaited again for every new subscription stream.
+    device_sync_responses.pop(device_ip, None)
+    _get_sync_event(device_ip).clear()
+
+
+def _run_config_subscription(device_ip: str):
+    _clear_sync_response(device_ip)
+    use_wildcards = is_wildcard_subscription_enabled(device_ip)
+    _subscribe(
+        device_ip,
+        handle_update,
+        get_subscription_path_for_config_change(device_ip, use_wildcards),
+        use_wildcards,
+        get_subscription_path_for_config_change,
+    )
+
+
+def _run_telemetry_subscription(device_ip: str):
+    use_wildcards = is_wildcard_subscription_enabled(device_ip)
+    _subscribe(
+        device_ip,
+        handle_telemetry_notification,
+        get_subscription_path_for_monitoring(device_ip, use_wildcards),
+        use_wildcards,
+        get_subscription_path_for_monitoring,
+    )
+
+
+def _subscribe_async(device_ip: str):
+    """
+    Subscribes to the device on the event loop of the asyncio subscription engine, see gnmi_sub_async.
+    Unlike with threads, the handlers registered without key are called by the update dispatcher,
+    so that the event loop is never blocked by the DB. When the queue of the dispatcher is full,
+    only the stream of the device waits, see UpdateDispatcher.dispatch_async.
+    """
+    engine = get_async_subscription_engine()
+    handle = get_subscription_handle(device_ip)
+
+    def _get_config_request():
+        _clear_sync_response(device_ip)
+        return _get_config_subscribe_request(get_subscription_path_for_config_change(device_ip))
+
+    handle.add(
+        AsyncSupervisedSubscription(
+            engine,
+            device_ip,
+            CONFIG_SUBSCRIPTION,
+            get_request=_get_config_request,
+            on_response=_handle_config_response_async,
+            on_error=lambda e: _reject_wildcards(device_ip, e),
+        )
+    )
+    if get_telemetry_db():
+        handle.add(
+            AsyncSupervisedSubscription(
+                engine,
                 device_ip,
-                thread_name,
+                TELEMETRY_SUBSCRIPTION,
+                get_request=lambda: _get_telemetry_subscribe_request(
+                    get_subscription_path_for_monitoring(device_ip)
+                ),
+                on_response=_handle_telemetry_response,
+                on_error=lambda e: _reject_wildcards(device_ip, e),
             )
-            return True
-        _logger.error("Failed to subscribe for %s gnmi notifications.", device_ip)
-        return False
+        )
+
+
+def _track_stream(subscriptions: dict, device_ip: str, name: str, stream):
+    """
+    Hands the stream over to the supervised subscription run by the current thread,
+    streams subscribed without the supervisor are kept in subscriptions to be cancelled by device.
+    """
+    if not set_subscription_stream(device_ip, name, stream):
+        subscriptions[device_ip] = stream
+
+
+def _cancel_subscription(subscriptions: dict, device_ip: str):
+    if subscription := subscriptions.pop(device_ip, None):
+        _logger.info("Removing subscription for %s", device_ip)
+        subscription.cancel()
 
 
 def gnmi_subscribe_for_all_devices_in_db():
     """
     Subscribe to GNMI for all devices in the database.
+    Does nothing in a shard worker process, which subscribes to the devices assigned by the coordinator only.
     """
+    if is_shard_worker():
+        return
     for device_ip in get_all_devices_ip_from_db():
         gnmi_subscribe(device_ip)
 
 
-def get_subscription_path_for_config_change(device_ip: str):
+## Status codes of a subscription rejected because of its wildcard keys.
+_wildcard_rejection_codes = {
+    grpc.StatusCode.INVALID_ARGUMENT,
+    grpc.StatusCode.UNIMPLEMENTED,
+    grpc.StatusCode.NOT_FOUND,
+}
+
+## Devices which rejected wildcard keys, these are subscribed per interface and port group instead.
+_no_wildcard_devices = set()
+
+
+def is_wildcard_subscription_enabled(device_ip: str) -> bool:
+    """
+    Returns whether the device is subscribed with wildcard keys, as per gnmi_subscription_wildcards from config
+    unless the device rejected them before.
+
+    Args:
+        device_ip (str): The IP address of the device.
+    """
+    return get_gnmi_subscription_wildcards() and device_ip not in _no_wildcard_devices
+
+
+def _subscribe(
+    device_ip: str,
+    handler: Callable[[str, List[Subscription]], None],
+    subscriptions: List[Subscription],
+    use_wildcards: bool,
+    get_subscriptions: Callable[[str, bool], List[Subscription]],
+):
+    """
+    Runs the subscription handler with the subscriptions of the device.
+    When the device rejects the subscriptions having wildcard keys,
+    it is subscribed with the explicit keys returned by get_subscriptions instead.
+    """
+    try:
+        return handler(device_ip, subscriptions)
+    except grpc.RpcError as e:
+        if not use_wildcards or e.code() not in _wildcard_rejection_codes:
+            raise
+        _reject_wildcards(device_ip, e)
+    return handler(device_ip, get_subscriptions(device_ip, False))
+
+
+def _reject_wildcards(device_ip: str, e: Exception):
+    """
+    Subscribes the device with explicit keys from the next attempt on, if it rejected the wildcard keys.
+    """
+    if (
+        isinstance(e, grpc.RpcError)
+        and e.code() in _wildcard_rejection_codes
+        and is_wildcard_subscription_enabled(device_ip)
+    ):
+        _logger.warning(
+            "Device %s rejected the subscription with wildcard keys (%s), subscribing with explicit keys.",
+            device_ip,
+            e.code(),
+        )
+        _no_wildcard_devices.add(device_ip)
+
+
+def get_subscription_path_for_config_change(device_ip: str, use_wildcards: bool = None):
     """
     Get subscription path for the given device IP.
 
     Args:
         device_ip (str): The IP address of the device.
+        use_wildcards (bool, optional): Subscribe to all the interfaces and port groups with wildcard keys
+            instead of one subscription per interface and port group in DB.
+            Defaults to is_wildcard_subscription_enabled.
 
     Returns:
         list: A list of subscription paths.
     """
+    if use_wildcards is None:
+        use_wildcards = is_wildcard_subscription_enabled(device_ip)
     subscriptions = []
-    for eth in get_all_interfaces_name_of_device_from_db(device_ip) or []:
+    for eth in ["*"] if use_wildcards else get_all_interfaces_name_of_device_from_db(device_ip) or []:
         subscriptions.append(
             Subscription(
                 path=get_intfc_config_path(eth), mode=SubscriptionMode.TARGET_DEFINED
@@ -570,7 +796,7 @@ def get_subscription_path_for_config_change(device_ip: str):
             )
         )
 
-    for pg_id in get_all_port_group_ids_from_db(device_ip) or []:
+    for pg_id in ["*"] if use_wildcards else get_all_port_group_ids_from_db(device_ip) or []:
         subscriptions.append(
             Subscription(
                 path=get_port_group_speed_path(pg_id),
@@ -602,18 +828,22 @@ def get_subscription_path_for_config_change(device_ip: str):
     return subscriptions
 
 
-def get_subscription_path_for_monitoring(device_ip: str):
+def get_subscription_path_for_monitoring(device_ip: str, use_wildcards: bool = None):
     """
     Get subscription path for the given device IP.
 
     Args:
         device_ip (str): The IP address of the device.
+        use_wildcards (bool, optional): Subscribe to the counters of all the interfaces with a wildcard key
+            instead of one subscription per interface in DB. Defaults to is_wildcard_subscription_enabled.
 
     Returns:
         list: A list of subscription paths.
     """
+    if use_wildcards is None:
+        use_wildcards = is_wildcard_subscription_enabled(device_ip)
     subscriptions = []
-    for eth in get_all_interfaces_name_of_device_from_db(device_ip) or []:
+    for eth in ["*"] if use_wildcards else get_all_interfaces_name_of_device_from_db(device_ip) or []:
         subscriptions.append(
             Subscription(
                 path=get_interface_counters_path(eth),
@@ -624,27 +854,36 @@ def get_subscription_path_for_monitoring(device_ip: str):
     return subscriptions
 
 
-def gnmi_unsubscribe_for_all_devices_in_db():
+def gnmi_unsubscribe_for_all_devices_in_db(timeout: float = 5):
     """
     Unsubscribes all devices in the database from GNMI.
+    The subscriptions of all the devices are cancelled first, then their threads are awaited.
+
+    Args:
+        timeout (float, optional): Max. time in seconds to wait for the subscriptions of a device to stop. Defaults to 5.
     """
-    for device_ip in get_all_devices_ip_from_db():
-        gnmi_unsubscribe(device_ip)
+    if coordinator := get_shard_coordinator():
+        for device_ip in get_all_devices_ip_from_db():
+            coordinator.unsubscribe(device_ip)
+        return
+    handles = [cancel_subscriptions(device_ip) for device_ip in get_all_devices_ip_from_db()]
+    for handle in handles:
+        if handle:
+            handle.join(timeout)
 
 
-def gnmi_unsubscribe(device_ip: str, retries: int = 5, timeout: int = 1) -> None:
+def cancel_subscriptions(device_ip: str) -> Optional[SubscriptionHandle]:
     """
-    Unsubscribes from the GNMI device with the specified IP address.
+    Cancels the config and telemetry subscriptions of the device without waiting for them to stop.
 
     Args:
-        device_ip (str): The IP address of the GNMI device.
-        retries (int, optional): The number of retries. Defaults to 5.
-        timeout (int, optional): The timeout between retries. Defaults to 1.
+        device_ip (str): The IP address of the device.
 
     Returns:
-        None
+        SubscriptionHandle: Handle of the cancelled subscriptions to join, None if the device had none.
     """
     sync_response = device_sync_responses.pop(device_ip, None)
+    _get_sync_event(device_ip).clear()
     if sync_response is not None:
         _logger.debug(
             f"Removed device {device_ip} with sync_response {sync_response} from device_sync_responses dictionary."
@@ -654,37 +893,51 @@ def gnmi_unsubscribe(device_ip: str, retries: int = 5, timeout: int = 1) -> None
             f"Device {device_ip} not found in device_sync_responses dictionary."
         )
 
-    global gnmi_subscriptions
-    subscription = gnmi_subscriptions.get(device_ip)
-    if subscription:
+    if handle := pop_subscription_handle(device_ip):
+        handle.cancel()
+    ## Streams subscribed without the supervisor.
+    for subscriptions in (gnmi_subscriptions, gnmi_telemetry_subscriptions):
         try:
-            _logger.info("Removing subscription for %s", device_ip)
-            subscription.cancel()
+            _cancel_subscription(subscriptions, device_ip)
         except Exception as e:
             _logger.debug("Failed to remove subscription for %s: %s", device_ip, e)
             raise
+    return handle
 
-    thread_name = get_subscription_thread_name(device_ip)
-    while retries > 0:
-        _logger.info("Checking if subscription removed for %s", device_ip)
-        if thread_name in get_running_thread_names():
-            _logger.error("Subscription not removed for %s", device_ip)
-        else:
-            _logger.info("Removed subscription for %s", device_ip)
-            break
-        time.sleep(timeout)
-        retries -= 1
-    _logger.debug("Currently running threads %s", get_running_thread_names())
+
+def gnmi_unsubscribe(device_ip: str, retries: int = 5, timeout: int = 1) -> bool:
+    """
+    Unsubscribes from the GNMI device with the specified IP address,
+    returns as soon as the config and telemetry subscriptions are stopped.
+
+    Args:
+        device_ip (str): The IP address of the GNMI device.
+        retries (int, optional): The number of retries. Defaults to 5.
+        timeout (int, optional): The timeout between retries. Defaults to 1.
+            The subscriptions are awaited for at most retries * timeout seconds.
+
+    Returns:
+        bool: True if the subscriptions are stopped, False on timeout.
+    """
+    if coordinator := get_shard_coordinator():
+        return coordinator.unsubscribe(device_ip)
+    handle = cancel_subscriptions(device_ip)
+    if handle and not handle.join(retries * timeout):
+        _logger.error("Subscription not removed for %s", device_ip)
+        return False
+    _logger.info("Removed subscription for %s", device_ip)
+    return True
 
 
 def close_gnmi_channel(device_ip: str, retries: int = 5, timeout: int = 1) -> None:
     """
-    Closes the GNMI channel for the given device IP.
+    Unsubscribes from the device and closes the GNMI channel for the given device IP.
 
     Args:
         device_ip (str): The IP address of the device.
         retries (int, optional): The number of retries. Defaults to 5.
         timeout (int, optional): The timeout in seconds. Defaults to 1.
+            The subscriptions are awaited for at most retries * timeout seconds.
 
     Returns:
         None
@@ -692,6 +945,9 @@ def close_gnmi_channel(device_ip: str, retries: int = 5, timeout: int = 1) -> No
     # currently this function is not used.
     # we are keeping it for future use. i.e., when remove device from db, we need to close the channel.
 
+    # The subscriptions are stopped first, else they would subscribe again on a new channel.
+    gnmi_unsubscribe(device_ip, retries, timeout)
+
     # close gnmi channel
     device_gnmi_stub = getGrpcStubs(device_ip)
     try:
@@ -705,41 +961,6 @@ def close_gnmi_channel(device_ip: str, retries: int = 5, timeout: int = 1) -> No
     from orca_nw_lib.gnmi_util import remove_stub
     remove_stub(device_ip)
 
-    thread_name = get_subscription_thread_name(device_ip)
-    while retries > 0:
-        _logger.info("checking if channel closed for %s", device_ip)
-        if thread_name in get_running_thread_names():
-            _logger.error("Failed to close channel thread for %s", device_ip)
-        else:
-            _logger.info("Closed channel thread for %s", device_ip)
-            break
-        time.sleep(timeout)
-        retries -= 1
-    _logger.debug("Currently running threads %s", get_running_thread_names())
-
-
-def terminate_thread(thread):
-    """
-    Terminate a thread by raising a SystemExit exception in the thread.
-
-    Args:
-        thread: The thread to be terminated.
-
-    Raises:
-        ValueError: If the thread id does not exist.
-        SystemError: If PyThreadState_SetAsyncExc failed.
-    """
-    import ctypes
-
-    res = ctypes.pythonapi.PyThreadState_SetAsyncExc(
-        ctypes.c_long(thread.ident), ctypes.py_object(SystemExit)
-    )
-    if res == 0:
-        _logger.error("Failed to terminate thread %s", thread.name)
-    elif res > 1:
-        ctypes.pythonapi.PyThreadState_SetAsyncExc(thread.ident, None)
-        raise SystemError("PyThreadState_SetAsyncExc failed")
-
 
 def check_gnmi_subscription_and_apply_config(config_func):
     """
@@ -761,9 +982,9 @@ def check_gnmi_subscription_and_apply_config(config_func):
                 "Before config checking if device %s is fully subscribed to GNMI update notifications.",
                 kwargs.get("device_ip"),
             )
-            if gnmi_subscribe(ip) and sync_response_received(
+            if gnmi_subscribe(ip) and wait_for_sync(
                     ip
-            ):  ## Check if the snyc response has been received for the given device also attempt to subscribe to gNMI,
+            ):  ## Wait for the snyc response to be received for the given device also attempt to subscribe to gNMI,
                 # gNMI subscription will occur in case not already Subscribed.
                 result = config_func(*args, **kwargs)
                 return result
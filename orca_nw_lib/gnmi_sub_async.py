@@ -0,0 +1,251 @@
+""" Subscription engine driving the gNMI subscription streams of all the devices from one asyncio event loop """
+
+import asyncio
+import inspect
+import os
+import threading
+from typing import Awaitable, Callable, Dict, Optional, Union
+
+import grpc
+import grpc.aio
+
+from .gnmi_pb2 import SubscribeRequest, SubscribeResponse
+from .gnmi_pb2_grpc import gNMIStub
+from .gnmi_util import (
+    _channel_manager,
+    create_aio_channel,
+    get_circuit_breaker,
+    is_device_ready,
+    record_rpc_error,
+)
+from .subscription_supervisor import CONNECTING, LIVE, SYNCING, SupervisedSubscription
+from .utils import get_logging
+
+_logger = get_logging().getLogger(__name__)
+
+
+class AsyncSubscriptionEngine:
+    """
+    Runs an asyncio event loop on a single thread, on which the subscription streams of all the devices are read
+    using grpc.aio channels, i.e. a device does not take a thread per subscription.
+
+    The responses are passed to the response handlers on the event loop thread, so the handlers must not block.
+    A handler may be a coroutine function, e.g. to wait for room in the queues of the update dispatcher,
+    in which case the stream is not read until it returns, while the other streams are.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            name="orca_subscription_loop", target=self.loop.run_forever, daemon=True
+        )
+        self._thread.start()
+        ## Accessed on the event loop thread only.
+        self._channels: Dict[str, grpc.aio.Channel] = {}
+        self._channel_users: Dict[str, int] = {}
+
+    async def _get_channel(self, device_ip: str) -> grpc.aio.Channel:
+        if (channel := self._channels.get(device_ip)) is None:
+            ## Fetching the server certificate of the device blocks.
+            creds = await asyncio.to_thread(_channel_manager.get_credentials, device_ip)
+            if (channel := self._channels.get(device_ip)) is None:
+                channel = self._channels[device_ip] = create_aio_channel(device_ip, creds)
+                _logger.debug("Created asyncio gNMI channel for %s", device_ip)
+        self._channel_users[device_ip] = self._channel_users.get(device_ip, 0) + 1
+        return channel
+
+    async def _release_channel(self, device_ip: str):
+        if (users := self._channel_users.get(device_ip, 0) - 1) > 0:
+            self._channel_users[device_ip] = users
+            return
+        self._channel_users.pop(device_ip, None)
+        if channel := self._channels.pop(device_ip, None):
+            await channel.close()
+            _logger.debug("Closed asyncio gNMI channel of %s", device_ip)
+
+    async def subscribe(
+        self,
+        subscription: SupervisedSubscription,
+        request: SubscribeRequest,
+        on_response: Callable[[str, SubscribeResponse], Union[None, Awaitable[None]]],
+    ):
+        """
+        Subscribes to the device and passes the responses to on_response until the stream ends.
+
+        Args:
+            subscription (SupervisedSubscription): The subscription, its state is updated as the stream progresses.
+            request (SubscribeRequest): The subscribe request.
+            on_response (Callable): Called with the device IP and every response, including the sync response,
+                awaited if it returns an awaitable.
+
+        Raises:
+            grpc.RpcError: If the stream fails.
+            CircuitOpenError: If requests to the device are failing fast.
+        """
+        device_ip = subscription.device_ip
+        await asyncio.to_thread(is_device_ready, device_ip)
+        breaker = get_circuit_breaker(device_ip)
+        breaker.allow_request()
+        channel = await self._get_channel(device_ip)
+        try:
+            call = gNMIStub(channel).Subscribe(iter([request]))
+            subscription.set_state(SYNCING)
+            connected = False
+            async for resp in call:
+                if not connected:
+                    breaker.record_success()
+                    connected = True
+                if inspect.isawaitable(result := on_response(device_ip, resp)):
+                    await result
+                if resp.sync_response:
+                    subscription.set_state(LIVE)
+        except grpc.RpcError as e:
+            record_rpc_error(device_ip, e)
+            raise
+        finally:
+            await self._release_channel(device_ip)
+
+    def stop(self, timeout: float = 5):
+        """
+        Closes the channels and stops the event loop.
+
+        Args:
+            timeout (float, optional): Max. time in seconds to wait for the event loop to stop. Defaults to 5.
+        """
+
+        async def _close():
+            for task in asyncio.all_tasks():
+                if task is not asyncio.current_task():
+                    task.cancel()
+            for channel in list(self._channels.values()):
+                await channel.close()
+            self._channels.clear()
+            self._channel_users.clear()
+
+        if self.loop.is_running():
+            try:
+                asyncio.run_coroutine_threadsafe(_close(), self.loop).result(timeout)
+            except Exception as e:
+                _logger.debug("Failed to close asyncio gNMI channels: %s", e)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout)
+
+
+class AsyncSupervisedSubscription(SupervisedSubscription):
+    """
+    A subscription stream run as a task on the event loop of the engine,
+    which subscribes again with exponential backoff whenever the stream ends or fails, until cancelled.
+
+    Args:
+        engine (AsyncSubscriptionEngine): The engine running the subscription.
+        device_ip (str): The IP address of the device.
+        name (str): Name of the subscription e.g. "config".
+        get_request (Callable): Returns the subscribe request, called for every attempt.
+        on_response (Callable): Called on the event loop thread with the device IP and every response,
+            awaited if it returns an awaitable.
+        on_error (Callable, optional): Called with the exception when the stream fails.
+    """
+
+    def __init__(
+        self,
+        engine: AsyncSubscriptionEngine,
+        device_ip: str,
+        name: str,
+        get_request: Callable[[], SubscribeRequest],
+        on_response: Callable[[str, SubscribeResponse], Union[None, Awaitable[None]]],
+        on_error: Callable[[Exception], None] = None,
+    ):
+        super().__init__(device_ip, name, None, run=None, cancel=None)
+        self._engine = engine
+        self._get_request = get_request
+        self._on_response = on_response
+        self._on_error = on_error
+        self._task: Optional[asyncio.Task] = None
+        self._done = threading.Event()
+
+    def start(self) -> "AsyncSupervisedSubscription":
+        self._engine.loop.call_soon_threadsafe(self._start_task)
+        return self
+
+    def _start_task(self):
+        if self._stopped.is_set():
+            self._set_stopped()
+            self._done.set()
+            return
+        self._task = self._engine.loop.create_task(self._supervise_async())
+
+    async def _supervise_async(self):
+        policy = self._get_retry_policy()
+        try:
+            while not self._stopped.is_set():
+                self.set_state(CONNECTING)
+                error = None
+                try:
+                    request = await asyncio.to_thread(self._get_request)
+                    await self._engine.subscribe(self, request, self._on_response)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    error = e
+                    if self._on_error:
+                        self._on_error(e)
+                if self._stopped.is_set():
+                    break
+                await asyncio.sleep(self._backoff(policy, error))
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._set_stopped()
+            self._done.set()
+
+    def _cancel_task(self):
+        if self._task:
+            self._task.cancel()
+
+    def _cancel_stream(self):
+        ## Cancelling the task cancels the stream, wherever the task is at.
+        if not self._engine.loop.is_closed():
+            self._engine.loop.call_soon_threadsafe(self._cancel_task)
+
+    def join(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+
+_engine: Optional[AsyncSubscriptionEngine] = None
+_engine_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    ## The event loop thread does not exist in a forked child process.
+    global _engine, _engine_lock
+    _engine = None
+    _engine_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_async_subscription_engine() -> AsyncSubscriptionEngine:
+    """
+    Returns the engine shared by the subscriptions of all the devices, created on first use.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = AsyncSubscriptionEngine()
+        return _engine
+
+
+def stop_async_subscription_engine(timeout: float = 5):
+    """
+    Stops the shared engine, a new one is created on next use.
+
+    Args:
+        timeout (float, optional): Max. time in seconds to wait for the event loop to stop. Defaults to 5.
+    """
+    global _engine
+    with _engine_lock:
+        engine, _engine = _engine, None
+    if engine:
+        engine.stop(timeout)
@@ -1,14 +1,37 @@
 import json
+import os
+import random
 import ssl
-from typing import List, Iterator
-from urllib.parse import unquote
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Iterator, Optional, TypeVar
+from urllib.parse import quote, unquote
 
 import grpc
+import grpc.aio
+from grpc._common import CYGRPC_CONNECTIVITY_STATE_TO_CHANNEL_CONNECTIVITY
 from orca_nw_lib.device_db import get_device_db_obj
+from .fingerprint import record_get_response
+from .gnmi_cassette import (
+    GnmiCassetteAioStreamRecorder,
+    GnmiCassetteAioUnaryRecorder,
+    GnmiCassetteRecorder,
+    close_cassettes,
+    get_replay_stub,
+)
+from .gnmi_metrics import (
+    GnmiMetricsAioStreamInterceptor,
+    GnmiMetricsAioUnaryInterceptor,
+    GnmiMetricsInterceptor,
+)
+from .orca_exceptions import CircuitOpenError
 
 from .gnmi_pb2 import (
     JSON_IETF,
     GetRequest,
+    GetResponse,
     Path,
     PathElem,
     SetRequest,
@@ -22,58 +45,205 @@ from .utils import (
     get_device_grpc_port,
     get_device_username,
     get_device_password, get_request_timeout,
+    get_grpc_keepalive_time_ms,
+    get_grpc_keepalive_timeout_ms,
+    get_grpc_keepalive_permit_without_calls,
+    get_grpc_max_channels,
+    get_grpc_channel_idle_timeout,
+    get_grpc_retry_max_attempts,
+    get_grpc_retry_backoff,
+    get_grpc_retry_backoff_max,
+    get_gnmi_cassette_mode,
+    get_grpc_retry_codes,
+    get_grpc_circuit_breaker_threshold,
+    get_grpc_circuit_breaker_cooldown,
 )
 import re
 
 _logger = get_logging().getLogger(__name__)
 
-stubs = {}
+T = TypeVar("T")
 
+class _DeviceChannel:
+    """
+    Book-keeping of a gRPC channel to a device and the gNMI stub built on top of it.
 
-def getGrpcStubs(device_ip):
-    global stubs
-    port = get_device_grpc_port()
-    user = get_device_username()
-    passwd = get_device_password()
-    if None in (port, user, passwd):
-        _logger.error(
-            "Invalid value port : {}, user : {}, passwd : {}".format(port, user, passwd)
-        )
-        raise ValueError(
-            "Invalid value port : {}, user : {}, passwd : {}".format(port, user, passwd)
-        )
+    The connectivity state is read from the channel on demand, so that the health of a cached
+    channel can be known without probing the device. Subscribing to the state changes instead
+    would start a polling thread per channel.
+    """
 
-    if not is_grpc_device_listening(device_ip, 10):
-        raise Exception("Device %s is not reachable !!" % device_ip)
+    def __init__(self, device_ip: str, channel: grpc.Channel):
+        self.device_ip = device_ip
+        self.channel = channel
+        self.stub = gNMIStubExtension(channel)
+        self.last_used = time.monotonic()
+        self.active_streams = 0
 
-    if stubs and stubs.get(device_ip):
-        return stubs.get(device_ip)
-    else:
+    def get_state(self) -> Optional[grpc.ChannelConnectivity]:
+        """
+        Returns the connectivity state of the channel without trying to connect, None if unknown.
+        """
+        channel = self.channel
+        ## Unwrap the interceptors and the grpc.Channel down to the core channel.
+        while not hasattr(channel, "check_connectivity_state"):
+            if (channel := getattr(channel, "_channel", None)) is None:
+                return None
         try:
+            state = channel.check_connectivity_state(False)
+        except ValueError:
+            ## The channel is closed.
+            return grpc.ChannelConnectivity.SHUTDOWN
+        return CYGRPC_CONNECTIVITY_STATE_TO_CHANNEL_CONNECTIVITY.get(state)
+
+    def close(self):
+        self.channel.close()
+
+
+def get_channel_target(device_ip: str) -> str:
+    return f"{device_ip}:{get_device_grpc_port()}"
+
+
+def get_channel_options() -> tuple:
+    """
+    Returns the gRPC channel arguments used for the gNMI channels to the devices.
+    Keepalive pings are only sent while there are active calls, unless grpc_keepalive_permit_without_calls is set,
+    gRPC servers close the connection of clients pinging more often than their ping policy allows
+    (GOAWAY too_many_pings).
+    """
+    return (
+        ("grpc.ssl_target_name_override", "localhost"),
+        ("grpc.keepalive_time_ms", get_grpc_keepalive_time_ms()),
+        ("grpc.keepalive_timeout_ms", get_grpc_keepalive_timeout_ms()),
+        (
+            "grpc.keepalive_permit_without_calls",
+            int(get_grpc_keepalive_permit_without_calls()),
+        ),
+    )
+
+
+def get_channel_interceptors(device_ip: str, aio: bool = False) -> list:
+    """
+    Returns the interceptors of the gNMI channels to the device, recording the metrics of the requests
+    and, with gnmi_cassette_mode "record", the requests and responses to the cassette of the device.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        aio (bool, optional): Whether the interceptors are for a grpc.aio channel. Defaults to False.
+    """
+    if aio:
+        interceptors = [
+            GnmiMetricsAioUnaryInterceptor(device_ip),
+            GnmiMetricsAioStreamInterceptor(device_ip),
+        ]
+        if get_gnmi_cassette_mode() == "record":
+            interceptors += [
+                GnmiCassetteAioUnaryRecorder(device_ip),
+                GnmiCassetteAioStreamRecorder(device_ip),
+            ]
+        return interceptors
+    interceptors = [GnmiMetricsInterceptor(device_ip)]
+    if get_gnmi_cassette_mode() == "record":
+        interceptors.append(GnmiCassetteRecorder(device_ip))
+    return interceptors
+
+
+def create_aio_channel(device_ip: str, creds: grpc.ChannelCredentials) -> grpc.aio.Channel:
+    """
+    Creates a grpc.aio channel to the device having the same options and interceptors as the channels
+    of the channel manager. It must be called on the event loop the channel is used on.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        creds (grpc.ChannelCredentials): The credentials, see GnmiChannelManager.get_credentials.
+
+    Returns:
+        grpc.aio.Channel: The channel.
+    """
+    return grpc.aio.secure_channel(
+        get_channel_target(device_ip),
+        creds,
+        options=get_channel_options(),
+        interceptors=get_channel_interceptors(device_ip, aio=True),
+    )
+
+
+class GnmiChannelManager:
+    """
+    Keeps one gRPC channel per device and hands out gNMI stubs for it.
+
+    Channels are created under a per-device lock, so that concurrent callers for the
+    same device share a single channel (and a single TLS session on the switch).
+    Server certificates are cached, so rebuilding a channel does not fetch the
+    certificate again. Channels which are idle for longer than the configured idle
+    timeout, or least recently used ones beyond the configured max. number of channels,
+    are closed. Channels with active subscription streams are never evicted.
+    """
+
+    _sweep_interval = 1
+
+    def __init__(self):
+        self._channels: OrderedDict[str, _DeviceChannel] = OrderedDict()
+        self._lock = threading.Lock()
+        self._device_locks: Dict[str, threading.Lock] = {}
+        self._certificates: Dict[str, bytes] = {}
+        self._last_sweep = 0
+
+    def _get_device_lock(self, device_ip: str) -> threading.Lock:
+        with self._lock:
+            return self._device_locks.setdefault(device_ip, threading.Lock())
+
+    def _get_cached(self, device_ip: str) -> Optional[_DeviceChannel]:
+        with self._lock:
+            entry = self._channels.get(device_ip)
+            state = entry.get_state() if entry else None
+            if state == grpc.ChannelConnectivity.SHUTDOWN:
+                self._channels.pop(device_ip)
+                entry = None
+            if entry:
+                entry.last_used = time.monotonic()
+                self._channels.move_to_end(device_ip)
+        if state == grpc.ChannelConnectivity.TRANSIENT_FAILURE:
+            ## Only probe the device when the channel already knows it is failing.
+            if not is_grpc_device_listening(device_ip, 10):
+                raise Exception("Device %s is not reachable !!" % device_ip)
+        return entry
+
+    def _get_certificate(self, device_ip: str, port: int) -> bytes:
+        if not (sw_cert := self._certificates.get(device_ip)):
             sw_cert = ssl.get_server_certificate(
                 (device_ip, port), timeout=get_request_timeout()
             ).encode("utf-8")
+            self._certificates[device_ip] = sw_cert
+        return sw_cert
 
-            # Option 1
-            # creds = grpc.ssl_channel_credentials(root_certificates=sw_cert)
-            # stub.Get(GetRequest(path=[path], type=GetRequest.ALL, encoding=JSON_IETF),
-            #        metadata=[("username", user),
-            #                  ("password", passwd)], )
+    def get_credentials(self, device_ip: str) -> grpc.ChannelCredentials:
+        """
+        Returns the channel credentials to connect to the device,
+        i.e. the (cached) server certificate of the device combined with the user credentials.
 
-            # Option 2, In this case need not to send user/pass in metadata in get request.
-            def auth_plugin(context, callback):
-                callback([("username", user), ("password", passwd)], None)
+        Args:
+            device_ip (str): The IP address of the device.
 
-            creds = grpc.composite_channel_credentials(
-                grpc.ssl_channel_credentials(root_certificates=sw_cert),
-                grpc.metadata_call_credentials(auth_plugin),
+        Returns:
+            grpc.ChannelCredentials: The credentials for a secure channel to the device.
+        """
+        port = get_device_grpc_port()
+        user = get_device_username()
+        passwd = get_device_password()
+        if None in (port, user, passwd):
+            _logger.error(
+                "Invalid value port : {}, user : {}, passwd : {}".format(
+                    port, user, passwd
+                )
             )
-
-            optns = (("grpc.ssl_target_name_override", "localhost"),)
-            channel = grpc.secure_channel(f"{device_ip}:{port}", creds, options=optns)
-            stub = gNMIStubExtension(channel)
-            stubs[device_ip] = stub
-            return stub
+            raise ValueError(
+                "Invalid value port : {}, user : {}, passwd : {}".format(
+                    port, user, passwd
+                )
+            )
+        try:
+            sw_cert = self._get_certificate(device_ip, port)
         except TimeoutError as te:
             _logger.error(f"Connection Timeout on {device_ip} {te}")
             raise
@@ -81,41 +251,466 @@ def getGrpcStubs(device_ip):
             _logger.error(f"Connection refused by {device_ip} {cr}")
             raise
 
+        # Option 1
+        # creds = grpc.ssl_channel_credentials(root_certificates=sw_cert)
+        # stub.Get(GetRequest(path=[path], type=GetRequest.ALL, encoding=JSON_IETF),
+        #        metadata=[("username", user),
+        #                  ("password", passwd)], )
+
+        # Option 2, In this case need not to send user/pass in metadata in get request.
+        def auth_plugin(context, callback):
+            callback([("username", user), ("password", passwd)], None)
+
+        return grpc.composite_channel_credentials(
+            grpc.ssl_channel_credentials(root_certificates=sw_cert),
+            grpc.metadata_call_credentials(auth_plugin),
+        )
+
+    def _create(self, device_ip: str) -> _DeviceChannel:
+        if not is_grpc_device_listening(device_ip, 10):
+            raise Exception("Device %s is not reachable !!" % device_ip)
+        creds = self.get_credentials(device_ip)
+        channel = grpc.intercept_channel(
+            grpc.secure_channel(
+                get_channel_target(device_ip), creds, options=get_channel_options()
+            ),
+            *get_channel_interceptors(device_ip),
+        )
+        _logger.debug("Created gNMI channel for %s", device_ip)
+        return _DeviceChannel(device_ip, channel)
+
+    def get_stub(self, device_ip: str) -> "gNMIStubExtension":
+        """
+        Returns the gNMI stub of the device, creates the channel if there is none yet.
+
+        Args:
+            device_ip (str): The IP address of the device.
+
+        Returns:
+            gNMIStubExtension: The gNMI stub of the device.
+        """
+        self._evict_idle()
+        if entry := self._get_cached(device_ip):
+            return entry.stub
+        with self._get_device_lock(device_ip):
+            ## Another thread might have created the channel while waiting for the lock.
+            if entry := self._get_cached(device_ip):
+                return entry.stub
+            entry = self._create(device_ip)
+            with self._lock:
+                self._channels[device_ip] = entry
+            self._evict_lru()
+            return entry.stub
+
+    def track_stream(self, device_ip: str, call):
+        """
+        Marks the channel of the device as being used by a streaming call
+        until the call is done, so that the channel is not evicted meanwhile.
+
+        Args:
+            device_ip (str): The IP address of the device.
+            call: The streaming call, e.g. returned by gNMIStub.Subscribe.
+        """
+        with self._lock:
+            entry = self._channels.get(device_ip)
+            if not entry:
+                return
+            entry.active_streams += 1
+
+        def _on_done(_):
+            with self._lock:
+                entry.active_streams -= 1
+
+        call.add_done_callback(_on_done)
+
+    def get_state(self, device_ip: str) -> Optional[grpc.ChannelConnectivity]:
+        with self._lock:
+            return entry.get_state() if (entry := self._channels.get(device_ip)) else None
+
+    def remove(self, device_ip: str, forget_certificate: bool = True):
+        """
+        Closes and removes the channel of the device.
+
+        Args:
+            device_ip (str): The IP address of the device.
+            forget_certificate (bool, optional): Also remove the cached server certificate,
+                so that it is fetched again when the channel is recreated. Defaults to True.
+        """
+        with self._lock:
+            entry = self._channels.pop(device_ip, None)
+            if forget_certificate:
+                self._certificates.pop(device_ip, None)
+        if entry:
+            entry.close()
+
+    def _reset_after_fork(self):
+        ## The channels inherited from the parent process must neither be used nor closed by the child.
+        self._channels = OrderedDict()
+        self._lock = threading.Lock()
+        self._device_locks = {}
+
+    def close_all(self):
+        with self._lock:
+            entries = list(self._channels.values())
+            self._channels.clear()
+        for entry in entries:
+            entry.close()
+
+    def _is_evictable(self, entry: _DeviceChannel, now: float) -> bool:
+        ## A channel used within the request timeout might still have a unary call in flight.
+        return (
+            not entry.active_streams
+            and now - entry.last_used > get_request_timeout()
+        )
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        if not (idle_timeout := get_grpc_channel_idle_timeout()):
+            return
+        if now - self._last_sweep < self._sweep_interval:
+            return
+        self._last_sweep = now
+        evicted = []
+        with self._lock:
+            for device_ip, entry in list(self._channels.items()):
+                if now - entry.last_used <= idle_timeout:
+                    break  # channels are ordered from least to most recently used.
+                if self._is_evictable(entry, now):
+                    evicted.append(self._channels.pop(device_ip))
+        for entry in evicted:
+            _logger.debug("Closing idle gNMI channel of %s", entry.device_ip)
+            entry.close()
+
+    def _evict_lru(self):
+        now = time.monotonic()
+        max_channels = get_grpc_max_channels()
+        evicted = []
+        with self._lock:
+            for device_ip, entry in list(self._channels.items()):
+                if len(self._channels) <= max_channels:
+                    break
+                if self._is_evictable(entry, now):
+                    evicted.append(self._channels.pop(device_ip))
+        for entry in evicted:
+            _logger.debug(
+                "Closing least recently used gNMI channel of %s", entry.device_ip
+            )
+            entry.close()
+
+
+_channel_manager = GnmiChannelManager()
+
+
+def getGrpcStubs(device_ip):
+    """
+    Returns the gNMI stub of the device, in the gnmi_cassette_mode "replay" the stub serves
+    the requests from the recording of the device instead, see gnmi_cassette.
+
+    Args:
+        device_ip (str): The IP address of the device.
+    """
+    if get_gnmi_cassette_mode() == "replay":
+        return get_replay_stub(device_ip)
+    return _channel_manager.get_stub(device_ip)
+
+
+def get_channel_state(device_ip: str) -> Optional[grpc.ChannelConnectivity]:
+    """
+    Returns the connectivity state of the gNMI channel of the device.
+
+    Args:
+        device_ip (str): The IP address of the device.
+
+    Returns:
+        grpc.ChannelConnectivity: The state of the channel, None if there is no channel to the device.
+    """
+    return _channel_manager.get_state(device_ip)
+
+
+class RetryPolicy:
+    """
+    Retry policy of the gNMI requests, by default as per the grpc_retry_* config.
+
+    Requests failing with one of the retryable status codes are attempted up to max_attempts times.
+    Delay before a retry is a random value between 0 and backoff * 2^attempt capped at backoff_max
+    (exponential backoff with full jitter), so that the retries to many devices failing
+    at the same time do not happen in lockstep.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = None,
+        backoff: float = None,
+        backoff_max: float = None,
+        retry_codes: list = None,
+    ):
+        self.max_attempts = max(
+            1, get_grpc_retry_max_attempts() if max_attempts is None else max_attempts
+        )
+        self.backoff = get_grpc_retry_backoff() if backoff is None else backoff
+        self.backoff_max = (
+            get_grpc_retry_backoff_max() if backoff_max is None else backoff_max
+        )
+        self.retry_codes = {
+            grpc.StatusCode[code.strip().upper()] if isinstance(code, str) else code
+            for code in (get_grpc_retry_codes() if retry_codes is None else retry_codes)
+        }
+
+    def is_retryable(self, e: grpc.RpcError) -> bool:
+        return e.code() in self.retry_codes
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Returns the delay in seconds before the retry following the attempt.
+
+        Args:
+            attempt (int): Number of the failed attempt, starting with 0.
+        """
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker of the gNMI requests to a device.
+
+    After grpc_circuit_breaker_threshold consecutive failures to reach the device the circuit opens,
+    requests to the device then fail fast with CircuitOpenError instead of waiting for timeouts.
+    Once the cooldown is over a single trial request is let through (half open),
+    its success closes the circuit again, its failure opens it for another cooldown.
+    A threshold of 0 disables the circuit breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._opened_at_monotonic = 0
+        self._lock = threading.Lock()
+
+    def allow_request(self):
+        """
+        Raises:
+            CircuitOpenError: If requests to the device must fail fast.
+        """
+        if not get_grpc_circuit_breaker_threshold():
+            return
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            remaining = get_grpc_circuit_breaker_cooldown() - (
+                time.monotonic() - self._opened_at_monotonic
+            )
+            if self.state == self.OPEN and remaining <= 0:
+                _logger.info("Trying device %s again after cooldown.", self.device_ip)
+                self.state = self.HALF_OPEN
+                return
+        raise CircuitOpenError(
+            f"Requests to device {self.device_ip} are failing, "
+            f"not retrying for {max(remaining, 0):.1f} seconds."
+        )
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                _logger.info("Device %s is reachable again.", self.device_ip)
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self):
+        if not (threshold := get_grpc_circuit_breaker_threshold()):
+            return
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= threshold
+            ):
+                _logger.error(
+                    "%s consecutive failures to reach device %s, failing requests fast for %s seconds.",
+                    self.failures,
+                    self.device_ip,
+                    get_grpc_circuit_breaker_cooldown(),
+                )
+                self.state = self.OPEN
+                self.opened_at = time.time()
+                self._opened_at_monotonic = time.monotonic()
+
+    def get_state(self) -> dict:
+        with self._lock:
+            return {
+                "device_ip": self.device_ip,
+                "state": self.state,
+                "failures": self.failures,
+                "opened_at": self.opened_at,
+            }
+
+
+_circuit_breakers: Dict[str, CircuitBreaker] = {}
+_circuit_breakers_lock = threading.Lock()
+
+## Status codes meaning that the device could not be reached, other errors are responses of the device.
+_device_failure_codes = {grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED}
+
+
+def _reset_after_fork():
+    """
+    Drops the gRPC channels and the locks inherited by a forked child process,
+    the child creates its own channels when it sends requests.
+    """
+    global _circuit_breakers_lock
+    _channel_manager._reset_after_fork()
+    _circuit_breakers.clear()
+    _circuit_breakers_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_circuit_breaker(device_ip: str) -> CircuitBreaker:
+    with _circuit_breakers_lock:
+        if not (breaker := _circuit_breakers.get(device_ip)):
+            breaker = _circuit_breakers[device_ip] = CircuitBreaker(device_ip)
+        return breaker
+
+
+def get_circuit_breaker_state(device_ip: str = None):
+    """
+    Returns the state of the circuit breakers.
+
+    Args:
+        device_ip (str, optional): The IP address of the device. Defaults to all devices.
+
+    Returns:
+        dict or list[dict]: State of the circuit breaker of the device, or of all devices.
+    """
+    if device_ip:
+        return get_circuit_breaker(device_ip).get_state()
+    with _circuit_breakers_lock:
+        breakers = list(_circuit_breakers.values())
+    return [b.get_state() for b in breakers]
+
+
+def reset_circuit_breaker(device_ip: str = None):
+    """
+    Closes the circuit breaker, so that requests are sent to the device right away.
+
+    Args:
+        device_ip (str, optional): The IP address of the device. Defaults to all devices.
+    """
+    with _circuit_breakers_lock:
+        if device_ip:
+            _circuit_breakers.pop(device_ip, None)
+        else:
+            _circuit_breakers.clear()
+
+
+def record_rpc_error(device_ip: str, e: grpc.RpcError):
+    """
+    Records the failed request in the circuit breaker of the device.
+    """
+    breaker = get_circuit_breaker(device_ip)
+    if e.code() in _device_failure_codes:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+
+
+def _call_with_retry(
+    device_ip: str,
+    request: Callable[["gNMIStubExtension"], T],
+    retry_policy: RetryPolicy = None,
+) -> T:
+    """
+    Sends a request to the device as per the retry policy and the circuit breaker of the device.
+    The channel of the device is recreated before retrying a request which failed with UNAVAILABLE.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        request (Callable): Sends the request using the stub passed to it.
+        retry_policy (RetryPolicy, optional): Defaults to the policy as per config.
+
+    Raises:
+        CircuitOpenError: If requests to the device are failing fast.
+        grpc.RpcError: If the last attempt fails.
+    """
+    policy = retry_policy or RetryPolicy()
+    breaker = get_circuit_breaker(device_ip)
+    attempt = 0
+    while True:
+        breaker.allow_request()
+        try:
+            result = request(getGrpcStubs(device_ip))
+        except grpc.RpcError as e:
+            record_rpc_error(device_ip, e)
+            if e.code() == grpc.StatusCode.UNAVAILABLE:
+                # remove the channel of the device, it is created again by the next request.
+                _logger.debug("Removing stub for %s", device_ip)
+                remove_stub(device_ip)
+            attempt += 1
+            if attempt >= policy.max_attempts or not policy.is_retryable(e):
+                raise
+            delay = policy.get_delay(attempt - 1)
+            _logger.info(
+                "Request to %s failed with %s, retrying in %.2f seconds (attempt %s of %s).",
+                device_ip,
+                e.code(),
+                delay,
+                attempt + 1,
+                policy.max_attempts,
+            )
+            time.sleep(delay)
+            continue
+        except Exception:
+            ## Channel to the device could not be created.
+            breaker.record_failure()
+            raise
+        breaker.record_success()
+        return result
+
+
+def _send_get_request(
+    device_ip: str, path: list[Path], resend: bool = False
+) -> GetResponse:
+    """
+    Sends a GetRequest for the paths to the device and returns the raw response.
+    The request is retried as per the retry policy, unless it is being resent already.
+
+    Raises:
+        CircuitOpenError: If requests to the device are failing fast.
+        grpc.RpcError: If the request fails.
+    """
+    resp = _call_with_retry(
+        device_ip,
+        lambda stub: stub.Get(
+            GetRequest(path=path, type=GetRequest.ALL, encoding=JSON_IETF),
+            timeout=get_request_timeout(),
+        ),
+        RetryPolicy(max_attempts=1) if resend else None,
+    )
+    record_get_response(resp)
+    return resp
+
 
 def send_gnmi_get(device_ip, path: list[Path], resend: bool = False):
     is_device_ready(device_ip)
     op = {}
     try:
-        device_gnmi_stub = getGrpcStubs(device_ip)
-        resp = (
-            device_gnmi_stub.Get(
-                GetRequest(path=path, type=GetRequest.ALL, encoding=JSON_IETF),
-                timeout=get_request_timeout(),
-            )
-            if device_gnmi_stub
-            else _logger.error(f"no gnmi stub found for device {device_ip}")
-        )
+        resp = _send_get_request(device_ip, path, resend)
         # resp_cap=device_gnmi_stub.Capabilities(CapabilityRequest())
         # print(resp_cap)
         if resp:
-            for n in resp.notification:
-                for u in n.update:
-                    op.update(json.loads(u.val.json_ietf_val.decode("utf-8")))
+            op = get_response_to_dict(resp)
         return op
     except grpc.RpcError as e:
         _logger.error("Failed to get details from %s: %s", device_ip, e)
         if e.code() == grpc.StatusCode.UNAVAILABLE:  # check if the device is not ready
-            if not resend:
-                # remove stub from global stubs
-                _logger.debug("Removing stub for %s", device_ip)
-                remove_stub(device_ip)
-
-                _logger.info("Resending request to get details from %s", device_ip)
-                # send the same request again, it will create a new stub
-                return send_gnmi_get(device_ip=device_ip, path=path, resend=True)
-            else:
-                _logger.error("Device %s is not reachable !!" % device_ip)
-                raise
+            _logger.error("Device %s is not reachable !!" % device_ip)
+            raise
     except Exception as e:
         _logger.debug(
             f"{e} \n on device_ip : {device_ip} \n requested gnmi_path : {path}"
@@ -123,6 +718,155 @@ def send_gnmi_get(device_ip, path: list[Path], resend: bool = False):
         raise
 
 
+def _get_elems_key(elems) -> tuple:
+    ## Module prefixes of element names are not always echoed back in the responses.
+    return tuple(
+        (elem.name.split(":")[-1], tuple(sorted(elem.key.items()))) for elem in elems
+    )
+
+
+def _match_requested_path(requested: list[tuple], resp_key: tuple) -> Optional[str]:
+    """
+    Finds the requested path, the update path in a response belongs to.
+    Update path may be the requested path, a descendant of it or its ancestor.
+
+    Args:
+        requested (list[tuple]): List of (elems key, path string) of the requested paths.
+        resp_key (tuple): Elems key of the update path.
+
+    Returns:
+        str: The path string of the matching requested path, None if there is no unique match.
+    """
+    ancestors = [
+        (len(key), path_str)
+        for key, path_str in requested
+        if resp_key[: len(key)] == key
+    ]
+    if ancestors:
+        return max(ancestors)[1]
+    descendants = [
+        path_str for key, path_str in requested if key[: len(resp_key)] == resp_key
+    ]
+    return descendants[0] if len(descendants) == 1 else None
+
+
+def _demux_get_response(path: list[Path], resp: GetResponse) -> Dict[str, dict]:
+    """
+    Splits the updates in the GetResponse per requested path.
+    Updates are matched to the requested paths by their path, if that is not possible
+    the position of the notification in the response is used.
+
+    Args:
+        path (list[Path]): The requested paths.
+        resp (GetResponse): The response of a gNMI Get request for the paths.
+
+    Returns:
+        Dict[str, dict]: The JSON values per requested path, keyed by get_gnmi_path_str(path).
+    """
+    requested = [(_get_elems_key(p.elem), get_gnmi_path_str(p)) for p in path]
+    op = {path_str: {} for _, path_str in requested}
+    positional = len(resp.notification) == len(requested)
+    for index, n in enumerate(resp.notification):
+        for u in n.update:
+            path_str = _match_requested_path(
+                requested, _get_elems_key(list(n.prefix.elem) + list(u.path.elem))
+            )
+            if path_str is None and positional:
+                path_str = requested[index][1]
+            if path_str is None:
+                _logger.warning(
+                    "Could not match update path %s to any of the requested paths.",
+                    u.path,
+                )
+                continue
+            op[path_str].update(json.loads(u.val.json_ietf_val.decode("utf-8")))
+    return op
+
+
+def send_gnmi_get_batch(
+    device_ip: str,
+    path: list[Path],
+    ignore_errors: bool = False,
+    max_paths_per_request: int = 100,
+) -> Dict[str, dict]:
+    """
+    Gets many paths from the device with as few GetRequests as possible,
+    unlike send_gnmi_get the results are not merged but returned per requested path.
+
+    When a GetRequest with many paths fails (e.g. because one of the paths does not exist on the device),
+    the paths of that request are fetched one by one, to find out which of them failed.
+
+    .. code-block:: python
+
+        paths = [get_vlan_ip_details_path(v) for v in vlan_names]
+        result = send_gnmi_get_batch(device_ip, paths)
+        for vlan_name, path in zip(vlan_names, paths):
+            ip_details = result.get(get_gnmi_path_str(path))
+
+    Args:
+        device_ip (str): The IP address of the device.
+        path (list[Path]): The paths to get.
+        ignore_errors (bool, optional): Return an empty dict for the paths which failed, instead of raising. Defaults to False.
+        max_paths_per_request (int, optional): Max. number of paths in a single GetRequest. Defaults to 100.
+
+    Returns:
+        Dict[str, dict]: The JSON values per requested path, keyed by get_gnmi_path_str(path).
+
+    Raises:
+        grpc.RpcError: If getting a path fails and ignore_errors is False,
+            or the device is not available.
+    """
+    is_device_ready(device_ip)
+    unique_paths = list({get_gnmi_path_str(p): p for p in path}.values())
+    op = {}
+    for i in range(0, len(unique_paths), max_paths_per_request):
+        chunk = unique_paths[i : i + max_paths_per_request]
+        try:
+            op.update(_demux_get_response(chunk, _send_get_request(device_ip, chunk)))
+            continue
+        except grpc.RpcError as e:
+            if e.code() == grpc.StatusCode.UNAVAILABLE or (
+                len(chunk) == 1 and not ignore_errors
+            ):
+                _logger.error("Failed to get details from %s: %s", device_ip, e)
+                raise
+            _logger.debug(
+                "Batched get of %s paths failed on %s: %s, getting paths one by one.",
+                len(chunk),
+                device_ip,
+                e,
+            )
+        for p in chunk:
+            try:
+                op.update(_demux_get_response([p], _send_get_request(device_ip, [p])))
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.UNAVAILABLE or not ignore_errors:
+                    _logger.error("Failed to get details from %s: %s", device_ip, e)
+                    raise
+                _logger.debug(
+                    "Failed to get %s from %s: %s", get_gnmi_path_str(p), device_ip, e
+                )
+                op[get_gnmi_path_str(p)] = {}
+    return op
+
+
+def get_response_to_dict(resp: GetResponse) -> dict:
+    """
+    Merges the JSON values of all the updates in the GetResponse into one dict.
+
+    Args:
+        resp (GetResponse): The response of a gNMI Get request.
+
+    Returns:
+        dict: The merged JSON values.
+    """
+    op = {}
+    for n in resp.notification:
+        for u in n.update:
+            op.update(json.loads(u.val.json_ietf_val.decode("utf-8")))
+    return op
+
+
 def create_gnmi_update(path: Path, val: dict):
     return Update(
         path=path, val=TypedValue(json_ietf_val=bytes(json.dumps(val), "utf-8"))
@@ -141,28 +885,40 @@ def get_gnmi_del_reqs(paths: list[Path]):
     return SetRequest(delete=paths)
 
 
-def send_gnmi_set(req: SetRequest, device_ip: str, resend: bool = False):
+def send_gnmi_set(
+    req: SetRequest, device_ip: str, resend: bool = False, raise_errors: bool = False
+):
+    """
+    Sends a SetRequest to the device, retried as per the retry policy unless it is being resent already.
+    Errors other than the device being unavailable are only logged unless raise_errors is set.
+
+    Args:
+        req (SetRequest): The set request.
+        device_ip (str): The IP address of the device.
+        resend (bool, optional): Whether the request is being resent, i.e. not to be retried. Defaults to False.
+        raise_errors (bool, optional): Raise all errors of the request. Defaults to False.
+
+    Returns:
+        SetResponse: The response of the set request, None if it failed and raise_errors is not set.
+
+    Raises:
+        CircuitOpenError: If requests to the device are failing fast.
+        grpc.RpcError: If the device is not available, or the request fails and raise_errors is set.
+    """
     is_device_ready(device_ip)
     try:
-        device_gnmi_stub = getGrpcStubs(device_ip)
-        if device_gnmi_stub:
-            device_gnmi_stub.Set(req, timeout=get_request_timeout())
-        else:
-            _logger.error(f"no gnmi stub found for device {device_ip}")
+        return _call_with_retry(
+            device_ip,
+            lambda stub: stub.Set(req, timeout=get_request_timeout()),
+            RetryPolicy(max_attempts=1) if resend else None,
+        )
     except grpc.RpcError as e:
         _logger.info("Failed to send set request for device %s" % device_ip)
         if e.code() == grpc.StatusCode.UNAVAILABLE:  # check if the device is not ready
-            if not resend:
-                # remove the stub from global stubs
-                _logger.debug("Removing stub for device %s" % device_ip)
-                remove_stub(device_ip)
-
-                _logger.info("Re-sending set request again for device %s" % device_ip)
-                # resend the request again, it will create a new stub
-                return send_gnmi_set(req=req, device_ip=device_ip, resend=True)
-            else:
-                _logger.error("Device %s is not reachable !!" % device_ip)
-                raise
+            _logger.error("Device %s is not reachable !!" % device_ip)
+            raise
+        elif raise_errors:
+            raise
     except Exception as e:
         _logger.debug(f"{e} \n on device_ip : {device_ip} \n set request : {req}")
         raise
@@ -172,6 +928,7 @@ def get_gnmi_path(path: str) -> Path:
     """
     Generates a function comment for the given function body in a markdown code block with the correct language syntax.
     It decodes the encoded values in the filter key.
+    Parsed paths are cached, the returned path is a copy which can be modified by the caller.
 
     Args:
         path (str): The path to be processed.
@@ -182,6 +939,14 @@ def get_gnmi_path(path: str) -> Path:
         Path: The generated gnmi path.
 
     """
+    gnmi_path = Path()
+    gnmi_path.CopyFrom(_parse_gnmi_path(path))
+    return gnmi_path
+
+
+@lru_cache(maxsize=4096)
+def _parse_gnmi_path(path: str) -> Path:
+    ## Returned path is shared by the cache, it must not be modified.
     path = path.strip()
     path_elements = path.split("/")
     gnmi_path = Path(
@@ -219,6 +984,85 @@ def get_gnmi_path(path: str) -> Path:
     return gnmi_path
 
 
+class GnmiPathTemplate:
+    """
+    gNMI path template compiled once and instantiated by filling the key values,
+    a key value of the template in curly braces is a placeholder.
+
+    .. code-block:: python
+
+        if_config_path = GnmiPathTemplate("openconfig-interfaces:interfaces/interface[name={name}]/config")
+        if_config_path.get_path(name="Ethernet0")
+
+    Args:
+        template (str): The path template in the same format as accepted by get_gnmi_path.
+    """
+
+    _placeholder = re.compile(r"^\{(\w+)\}$")
+
+    def __init__(self, template: str):
+        self.template = template
+        self._path = Path()
+        self._path.CopyFrom(_parse_gnmi_path(template))
+        ## (element index, key, placeholder name) of every placeholder
+        self._placeholders = [
+            (i, k, match.group(1))
+            for i, elem in enumerate(self._path.elem)
+            for k, v in elem.key.items()
+            if (match := self._placeholder.match(v))
+        ]
+        self.fields = {f for _, _, f in self._placeholders}
+
+    def get_path(self, **values) -> Path:
+        """
+        Creates the path by filling the placeholders, values are used as they are i.e. not URL decoded.
+
+        Args:
+            values: Value per placeholder name.
+
+        Returns:
+            Path: The gnmi path.
+
+        Raises:
+            ValueError: If a placeholder value is missing.
+        """
+        if missing := self.fields - values.keys():
+            raise ValueError(
+                f"Missing values {sorted(missing)} for gnmi path template {self.template}"
+            )
+        path = Path()
+        path.CopyFrom(self._path)
+        for i, k, f in self._placeholders:
+            path.elem[i].key[k] = str(values[f])
+        return path
+
+
+def get_gnmi_path_str(path: Path) -> str:
+    """
+    Returns the canonical string of the elements of the gnmi path, it can be used as dict key for the path.
+    Keys of an element are sorted and their values are URL encoded, so the string can be parsed back with get_gnmi_path.
+    Target and origin of the path are not part of the string.
+
+    Args:
+        path (Path): The gnmi path.
+        Example : Path(elem=[PathElem(name="openconfig-interfaces:interfaces"), PathElem(name="interface", key={"name": "Ethernet0"})])
+
+    Returns:
+        str: The path string.
+        Example : openconfig-interfaces:interfaces/interface[name=Ethernet0]
+    """
+    path_elements = []
+    for elem in path.elem:
+        if elem.key:
+            keys = ",".join(
+                f"{k}={quote(v, safe='')}" for k, v in sorted(elem.key.items())
+            )
+            path_elements.append(f"{elem.name}[{keys}]")
+        else:
+            path_elements.append(elem.name)
+    return "/".join(path_elements)
+
+
 def is_device_ready(device_ip: str):
     """
     Check if the device is ready or not
@@ -243,30 +1087,28 @@ def is_device_ready(device_ip: str):
 
 def send_gnmi_subscribe(device_ip: str, subscribe_request: Iterator, resend: bool = False):
     """
-    Send the subscribe request to the device. If the device is not ready, it will resend the subscribe request.
+    Send the subscribe request to the device, retried as per the retry policy unless it is being resent already.
     Args:
         device_ip (str): The IP address of the device.
         subscribe_request (Iterator): The subscribe request iterator.
-        resend (bool, optional): Resend the subscribe request if device is not ready. Defaults to False.
+        resend (bool, optional): Whether the request is being resent, i.e. not to be retried. Defaults to False.
+
+    Raises:
+        CircuitOpenError: If requests to the device are failing fast.
     """
     is_device_ready(device_ip)
     try:
-        device_gnmi_stub = getGrpcStubs(device_ip)
-        if device_gnmi_stub:
-            return device_gnmi_stub.Subscribe(subscribe_request)
-        else:
-            _logger.error(f"no gnmi stub found for device {device_ip}")
+        subscription = _call_with_retry(
+            device_ip,
+            lambda stub: stub.Subscribe(subscribe_request),
+            RetryPolicy(max_attempts=1) if resend else None,
+        )
+        _channel_manager.track_stream(device_ip, subscription)
+        return subscription
     except grpc.RpcError as e:
         if e.code() == grpc.StatusCode.UNAVAILABLE:  # check if the device is not ready
-            if not resend:
-                # remove the device stub
-                remove_stub(device_ip)
-
-                # resend the subscribe request, it will try to connect to the device again
-                return send_gnmi_subscribe(device_ip=device_ip, subscribe_request=subscribe_request, resend=True)
-            else:
-                _logger.error("Device %s is not reachable !!" % device_ip)
-                raise
+            _logger.error("Device %s is not reachable !!" % device_ip)
+            raise
     except Exception as e:
         _logger.debug(f"{e} \n on device_ip : {device_ip} \n subscribe request : {subscribe_request}")
         raise
@@ -274,14 +1116,11 @@ def send_gnmi_subscribe(device_ip: str, subscribe_request: Iterator, resend: boo
 
 def remove_stub(device_ip: str):
     """
-    Remove the device stub from global stubs
+    Close and remove the gNMI channel of the device.
     Args:
         device_ip (str): The IP address of the device.
     """
-    global stubs
-    stub = stubs.pop(device_ip, None)
-    if stub:
-        stub.channel.close()
+    _channel_manager.remove(device_ip)
 
 
 class gNMIStubExtension(gNMIStub):
@@ -300,7 +1139,5 @@ def close_all_stubs():
         the same channel is used for all the workers, it is creating segmentation fault.
 
     """
-    global stubs
-    for i in stubs.values():
-        i.channel.close()
-    stubs = {}
\ No newline at end of file
+    _channel_manager.close_all()
+    close_cassettes()
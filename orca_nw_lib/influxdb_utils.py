@@ -1,10 +1,22 @@
 """ Utils for Influx DB """
 
+import atexit
 import os
+import random
+import threading
+import time
+from collections import deque
+from typing import List, Optional
+
 from influxdb_client import InfluxDBClient, Point
+from influxdb_client.client.exceptions import InfluxDBError
 from influxdb_client.client.write_api import SYNCHRONOUS
+from urllib3.exceptions import HTTPError
 import yaml
 from . import constants as const
+from .utils import get_logging
+
+_logger = get_logging().getLogger(__name__)
 
 _settings = {}
 
@@ -82,20 +94,317 @@ def get_write_api():
     return client.write_api(write_options=SYNCHRONOUS)
 
 
+def _get_setting(name: str, default):
+    return os.environ.get(name, _settings.get(name, default))
+
+
+def _is_transient_error(e: Exception) -> bool:
+    """
+    Returns whether writing to InfluxDB might succeed when retried,
+    i.e. on connection errors, server errors (HTTP 5xx) and rate limiting (HTTP 429).
+    Other errors e.g. invalid points or authentication failures fail again the same way.
+    """
+    if isinstance(e, (OSError, HTTPError)):
+        return True
+    if isinstance(e, InfluxDBError):
+        status = getattr(e, "status", None) or getattr(e.response, "status", None)
+        return status is not None and (status == 429 or status >= 500)
+    return False
+
+
+class InfluxBatchWriter:
+    """
+    Writes points to InfluxDB in batches from a background thread, so that writing a point never waits for InfluxDB.
+
+    A batch is written once batch_size points are queued or the oldest queued point waited for flush_interval seconds.
+    A batch failing with a transient error (connection errors, HTTP 5xx and 429) is retried with exponential backoff,
+    up to retry_max_attempts attempts before it is dropped. A batch failing otherwise is dropped right away.
+    At most max_queue_size points are queued, beyond that the oldest points are dropped,
+    so that an InfluxDB outage does not exhaust the memory.
+
+    Args:
+        client (InfluxDBClient): The InfluxDB client.
+        bucket (str): The bucket to write to.
+        org (str): The organization of the bucket.
+        batch_size (int, optional): Defaults to influxdb_batch_size from config.
+        flush_interval (float, optional): Defaults to influxdb_flush_interval from config.
+        max_queue_size (int, optional): Defaults to influxdb_max_queue_size from config.
+        retry_max_attempts (int, optional): Defaults to influxdb_retry_max_attempts from config.
+        retry_backoff (float, optional): Defaults to influxdb_retry_backoff from config.
+        retry_backoff_max (float, optional): Defaults to influxdb_retry_backoff_max from config.
+    """
+
+    def __init__(
+        self,
+        client: InfluxDBClient,
+        bucket: str,
+        org: str,
+        batch_size: int = None,
+        flush_interval: float = None,
+        max_queue_size: int = None,
+        retry_max_attempts: int = None,
+        retry_backoff: float = None,
+        retry_backoff_max: float = None,
+    ):
+        self.bucket = bucket
+        self.org = org
+        self.batch_size = max(1, batch_size or int(_get_setting(const.influxdb_batch_size, 1000)))
+        self.flush_interval = (
+            flush_interval
+            if flush_interval is not None
+            else float(_get_setting(const.influxdb_flush_interval, 1))
+        )
+        self.max_queue_size = max_queue_size or int(
+            _get_setting(const.influxdb_max_queue_size, 100000)
+        )
+        self.retry_max_attempts = max(
+            1, retry_max_attempts or int(_get_setting(const.influxdb_retry_max_attempts, 5))
+        )
+        self.retry_backoff = (
+            retry_backoff
+            if retry_backoff is not None
+            else float(_get_setting(const.influxdb_retry_backoff, 1))
+        )
+        self.retry_backoff_max = (
+            retry_backoff_max
+            if retry_backoff_max is not None
+            else float(_get_setting(const.influxdb_retry_backoff_max, 30))
+        )
+        self._write_api = client.write_api(write_options=SYNCHRONOUS)
+        ## Line protocol of the queued points and the time the oldest one was queued.
+        self._queue = deque()
+        self._oldest_at = None
+        self._writing = 0
+        self._flushing = False
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._stopped = threading.Event()
+        self.written = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_queue_depth = 0
+        self.last_error = None
+        self.last_write_at = None
+        self._thread = threading.Thread(target=self._run, name="orca_influxdb_writer", daemon=True)
+        self._thread.start()
+
+    def write(self, point: Point):
+        """
+        Queues the point to be written, never blocks.
+        The point is serialized right away, so that it can be modified and written again by the caller.
+
+        Args:
+            point (Point): The point.
+        """
+        line = point.to_line_protocol()
+        with self._lock:
+            if len(self._queue) >= self.max_queue_size:
+                self._queue.popleft()
+                self.dropped += 1
+                if self.dropped == 1 or self.dropped % 10000 == 0:
+                    _logger.warning(
+                        "InfluxDB write queue is full, dropped %s points so far.", self.dropped
+                    )
+            was_empty = not self._queue
+            if was_empty:
+                self._oldest_at = time.monotonic()
+            self._queue.append(line)
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            ## Wakes the writer to wait for the flush interval or to write the batch.
+            if was_empty or len(self._queue) >= self.batch_size:
+                self._changed.notify_all()
+
+    def _take_batch(self) -> List[str]:
+        with self._lock:
+            while not self._stopped.is_set() and not self._flushing:
+                if len(self._queue) >= self.batch_size:
+                    break
+                if self._queue and time.monotonic() - self._oldest_at >= self.flush_interval:
+                    break
+                self._changed.wait(
+                    self.flush_interval - (time.monotonic() - self._oldest_at)
+                    if self._queue
+                    else None
+                )
+            batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+            self._oldest_at = time.monotonic() if self._queue else None
+            self._flushing = self._flushing and bool(self._queue)
+            self._writing = len(batch)
+            return batch
+
+    def _write_batch(self, batch: List[str]):
+        for attempt in range(self.retry_max_attempts):
+            try:
+                self._write_api.write(bucket=self.bucket, org=self.org, record=batch)
+                with self._lock:
+                    self.written += len(batch)
+                    self.batches += 1
+                    self.last_write_at = time.time()
+                return
+            except Exception as e:
+                with self._lock:
+                    self.last_error = str(e)
+                if not _is_transient_error(e):
+                    with self._lock:
+                        self.failed += len(batch)
+                    _logger.error("Dropped %s points rejected by InfluxDB: %s", len(batch), e)
+                    return
+                if attempt + 1 == self.retry_max_attempts:
+                    break
+                delay = random.uniform(0, min(self.retry_backoff_max, self.retry_backoff * 2**attempt))
+                with self._lock:
+                    self.retries += 1
+                _logger.warning(
+                    "Failed to write %s points to InfluxDB: %s, retrying in %.1f seconds.", len(batch), e, delay
+                )
+                ## Retried right away when stopping.
+                self._stopped.wait(delay)
+        with self._lock:
+            self.failed += len(batch)
+        _logger.error(
+            "Dropped %s points after %s failed attempts to write to InfluxDB: %s",
+            len(batch),
+            self.retry_max_attempts,
+            self.last_error,
+        )
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch:
+                self._write_batch(batch)
+            with self._lock:
+                self._writing = 0
+                self._changed.notify_all()
+                if self._stopped.is_set() and not self._queue:
+                    return
+
+    def flush(self, timeout: float = None) -> bool:
+        """
+        Writes the queued points right away and waits until they are written.
+
+        Args:
+            timeout (float, optional): Max. time to wait in seconds. Defaults to no timeout.
+
+        Returns:
+            bool: True if the points are written (or dropped after failing), False on timeout.
+        """
+        with self._lock:
+            self._flushing = bool(self._queue)
+            self._changed.notify_all()
+            return self._changed.wait_for(lambda: not self._queue and not self._writing, timeout)
+
+    def close(self, timeout: float = None):
+        """
+        Writes the queued points and stops the writer thread.
+
+        Args:
+            timeout (float, optional): Max. time to wait in seconds. Defaults to no timeout.
+        """
+        with self._lock:
+            self._stopped.set()
+            self._changed.notify_all()
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            _logger.error("InfluxDB writer not stopped, %s points not written.", len(self._queue))
+        self._write_api.close()
+
+    def get_stats(self) -> dict:
+        """
+        Returns the write queue metrics.
+
+        Returns:
+            dict: With keys -
+                queue_depth: Number of points waiting to be written.
+                max_queue_depth: Highest number of points waiting so far.
+                max_queue_size, batch_size, flush_interval: The configuration.
+                written, failed, dropped: Number of points written, dropped after failed attempts,
+                    dropped because the queue was full.
+                batches, retries: Number of batches written and of failed attempts retried.
+                last_error: Error of the last failed attempt.
+                last_write_at: Time of the last successful write.
+        """
+        with self._lock:
+            return {
+                "queue_depth": len(self._queue) + self._writing,
+                "max_queue_depth": self.max_queue_depth,
+                "max_queue_size": self.max_queue_size,
+                "batch_size": self.batch_size,
+                "flush_interval": self.flush_interval,
+                "written": self.written,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "retries": self.retries,
+                "last_error": self.last_error,
+                "last_write_at": self.last_write_at,
+            }
+
+
+_writer: Optional[InfluxBatchWriter] = None
+_writer_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    ## The writer thread does not exist in a forked child process.
+    global _writer, _writer_lock
+    _writer = None
+    _writer_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_influx_writer() -> InfluxBatchWriter:
+    """
+    Returns the batch writer of the InfluxDB client, created on first use.
+
+    Raises:
+        Exception: If the InfluxDB client is not initialized.
+    """
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            if (client := get_influxdb_client()) is None:
+                raise Exception("InfluxDB client is not initialized.")
+            _writer = InfluxBatchWriter(
+                client,
+                bucket=_get_setting(const.influxdb_bucket, None),
+                org=_get_setting(const.influxdb_org, None),
+            )
+        return _writer
+
+
+def close_influx_writer(timeout: float = 10):
+    """
+    Writes the queued points and stops the batch writer, called at exit.
+
+    Args:
+        timeout (float, optional): Max. time in seconds to wait for the queued points to be written. Defaults to 10.
+    """
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer:
+        writer.close(timeout)
+
+
+atexit.register(close_influx_writer)
+
+
 def write_to_influx(point):
     """
-    Write a data point to the specified InfluxDB bucket.
+    Queue a data point to be written to the InfluxDB bucket in a batch, see InfluxBatchWriter.
 
     Args:
         point (Point): The InfluxDB Point object to be written.
     Returns:
         None
     """
-    bucket = os.environ.get(const.influxdb_bucket, _settings.get(const.influxdb_bucket))
-    write_api = get_write_api()
-    write_api.write(bucket=bucket, record=point, org=os.environ.get(const.influxdb_org, _settings.get(const.influxdb_org)))
-
-
+    get_influx_writer().write(point)
 
 
 def load_influxdb_config(orca_settings):
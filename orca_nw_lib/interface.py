@@ -1,11 +1,12 @@
 import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional
 import pytz
 
 from orca_nw_lib.interface_influxdb import insert_device_interfaces_in_influxdb
 from orca_nw_lib.interface_promdb import insert_device_interface_in_prometheus
 
-from .common import IFMode, Speed, PortFec
+from .common import DiscoveryFeature, IFMode, Speed, PortFec
+from .fingerprint import discover_if_changed
 from .device_db import get_device_db_obj
 from .gnmi_sub import check_gnmi_subscription_and_apply_config
 from .graph_db_models import Interface, SubInterface
@@ -22,9 +23,10 @@ from .interface_gnmi import (
     get_interface_from_device,
     set_if_vlan_on_device,
     set_interface_config_on_device,
+    set_interfaces_config_on_device,
     remove_vlan_from_if_from_device,
     config_interface_breakout_on_device,
-    get_breakout_from_device,
+    get_breakouts_from_device,
     delete_interface_breakout_from_device,
     delete_interface_ip_from_device,
 )
@@ -51,7 +53,22 @@ def _create_interface_graph_objects(device_ip: str, intfc_name: str = None):
     """
     interfaces_json = get_interface_from_device(device_ip, intfc_name)
     intfc_graph_obj_list: Dict[Interface, List[SubInterface]] = {}
-    if_lane_details = interfaces_json.get("sonic-port:PORT_LIST")
+    ## Index lane details by ifname and fetch the breakout groups of all the
+    # broken out ports at once instead of per interface.
+    if_lane_details = {
+        lane.get("ifname"): lane
+        for lane in interfaces_json.get("sonic-port:PORT_LIST") or []
+    }
+    breakout_aliases = {
+        get_if_alias(if_alias=alias)
+        for lane in if_lane_details.values()
+        if len((alias := lane.get("alias", "")).split("/")) > 2
+    }
+    breakouts = (
+        get_breakouts_from_device(device_ip, sorted(breakout_aliases))
+        if breakout_aliases
+        else {}
+    )
     for intfc in interfaces_json.get("openconfig-interfaces:interface") or []:
         intfc_state = intfc.get("state", {})
         config = intfc.get("config")
@@ -114,35 +131,29 @@ def _create_interface_graph_objects(device_ip: str, intfc_name: str = None):
                         sub_intf_obj.secondary = config.get("secondary")
                     sub_intf_obj_list.append(sub_intf_obj)
 
-            ## Now iterate lane details
-            for indx, value in enumerate(if_lane_details or []):
+            if value := if_lane_details.get(interface.name):
                 breakout_state = {}
                 breakout_config = {}
                 if len(value.get("alias", "").split("/")) > 2:
                     if_alias = get_if_alias(if_alias=value.get("alias"))
-                    # Get breakout details
-                    breakout_details = get_breakout_from_device(device_ip, if_alias).get(
+                    breakout_details = breakouts.get(if_alias, {}).get(
                         "openconfig-platform-port:groups", {}
                     )
                     for i in breakout_details.get("group", []):
                         breakout_config = i.get("config", {})
                         breakout_state = i.get("state", {})
-                if interface.name == value.get("ifname"):
-                    interface.alias = value.get("alias")
-                    interface.lanes = value.get("lanes")
-                    interface.valid_speeds = value.get("valid_speeds")
-                    interface.adv_speeds = value.get("adv_speeds")
-                    interface.link_training = value.get("link_training")
-                    interface.autoneg = value.get("autoneg")
-                    interface.breakout_mode = "{}x{}".format(
-                        breakout_config.get("num-breakouts"),
-                        Speed.getSpeedStrFromOCStr(breakout_config.get("breakout-speed"))
-                    ) if breakout_config else None
-                    interface.breakout_supported = len(value.get("lanes", "").split(",")) > 1
-                    interface.breakout_status = breakout_state.get("openconfig-port-breakout-ext:status", None)
-                    ## To minimize iteration for element in outer loop
-                    if_lane_details.pop(indx)
-                    break
+                interface.alias = value.get("alias")
+                interface.lanes = value.get("lanes")
+                interface.valid_speeds = value.get("valid_speeds")
+                interface.adv_speeds = value.get("adv_speeds")
+                interface.link_training = value.get("link_training")
+                interface.autoneg = value.get("autoneg")
+                interface.breakout_mode = "{}x{}".format(
+                    breakout_config.get("num-breakouts"),
+                    Speed.getSpeedStrFromOCStr(breakout_config.get("breakout-speed"))
+                ) if breakout_config else None
+                interface.breakout_supported = len(value.get("lanes", "").split(",")) > 1
+                interface.breakout_status = breakout_state.get("openconfig-port-breakout-ext:status", None)
 
             intfc_graph_obj_list[interface] = sub_intf_obj_list
         elif "lag" in if_type.lower():
@@ -234,15 +245,55 @@ def enable_all_ifs(device_ip: str):
         device_ip (str): The IP address of the device.
     """
     if_name_list = get_all_interfaces_name_of_device_from_db(device_ip)
-    for intf_name in if_name_list or []:
-        try:
-            config_interface(device_ip=device_ip, if_name=intf_name, enable=True)
-        except Exception as e:
+    if not if_name_list:
+        return
+    report = config_interfaces(
+        device_ip=device_ip,
+        if_configs={intf_name: {"enable": True} for intf_name in if_name_list},
+    )
+    for intf_name, error in (report or {}).items():
+        if error:
             _logger.debug(
-                f"Failed to enable interface {intf_name} on device {device_ip}. Error: {e}"
+                f"Failed to enable interface {intf_name} on device {device_ip}. Error: {error}"
             )
 
 
+@check_gnmi_subscription_and_apply_config
+def config_interfaces(device_ip: str, if_configs: Dict[str, dict]) -> Dict[str, Optional[str]]:
+    """
+    Configure many interfaces of a device with a single gNMI Set request.
+
+    .. code-block:: python
+
+        config_interfaces(
+            device_ip="10.10.10.10",
+            if_configs={"Ethernet0": {"enable": True}, "Ethernet4": {"mtu": 9100}},
+        )
+
+    Parameters:
+        device_ip (str): The IP address of the device.
+        if_configs (Dict[str, dict]): The configuration parameters per interface name,
+            same as kwargs of config_interface.
+
+    Returns:
+        Dict[str, Optional[str]]: The error message per interface name, None if configured successfully.
+    """
+    _logger.debug("Configuring %s interfaces on device %s", len(if_configs), device_ip)
+    try:
+        return set_interfaces_config_on_device(device_ip, if_configs)
+    except Exception as e:
+        _logger.error(
+            f"Configuring interfaces on device {device_ip} failed, Reason: {e}"
+        )
+        raise
+    finally:
+        ## discover the subinterfaces of the interfaces IP is set on,
+        # as there are no gNMI subscription available for subinterface updates.
+        for if_name, config in if_configs.items():
+            if config.get("ip_with_prefix"):
+                discover_interfaces(device_ip, if_name)
+
+
 @check_gnmi_subscription_and_apply_config
 def config_interface(device_ip: str, if_name: str, **kwargs):
     """
@@ -322,9 +373,12 @@ def discover_interfaces(
             _logger.info(
                 f"Discovering {intfc_name if intfc_name else 'all interfaces'} of device {device}."
             )
-            if_data = _create_interface_graph_objects(device.mgt_ip, intfc_name)
-            insert_device_interfaces_in_db(
-                device, if_data
+            if_data, _ = discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.interface,
+                lambda: _create_interface_graph_objects(device.mgt_ip, intfc_name),
+                lambda interfaces: insert_device_interfaces_in_db(device, interfaces),
+                sub_key=intfc_name,
             )
             if get_telemetry_db() == "influxdb":
                 insert_device_interfaces_in_influxdb(device, if_data)
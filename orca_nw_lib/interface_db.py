@@ -5,6 +5,7 @@ from .common import PortFec, Speed
 from .device_db import get_device_db_obj
 from .graph_db_models import Device, Interface, SubInterface
 from .utils import get_logging
+from .fingerprint import save_if_changed
 
 _logger = get_logging().getLogger(__name__)
 interface_lock = threading.Lock()
@@ -300,8 +301,7 @@ def insert_device_interfaces_in_db(device: Device, interfaces: dict):
     for intfc, sub_intfc in interfaces.items():
         if i := get_interface_of_device_from_db(device.mgt_ip, intfc.name):
             # Update existing node
-            copy_intfc_object_props(i, intfc)
-            i.save()
+            save_if_changed(i, copy_intfc_object_props, intfc)
             device.interfaces.connect(i)
         else:
             intfc.save()
@@ -1,16 +1,22 @@
+from typing import Dict, List, Optional
 from urllib.parse import quote_plus
 
+import grpc
+
 from orca_nw_lib.utils import validate_and_get_ip_prefix
 
 from .common import IFMode, PortFec, Speed
 from .gnmi_pb2 import Path, PathElem
 from .interface_db import get_all_interfaces_name_of_device_from_db
 from .gnmi_util import (
+    GnmiPathTemplate,
     create_gnmi_update,
     create_req_for_update,
     get_gnmi_del_req,
     get_gnmi_path,
+    get_gnmi_path_str,
     send_gnmi_get,
+    send_gnmi_get_batch,
     send_gnmi_set,
     get_logging,
 )
@@ -20,6 +26,10 @@ from .utils import get_number_of_breakouts_and_speed, get_if_alias
 
 _logger = get_logging().getLogger(__name__)
 
+_oc_ethernet_config_path = GnmiPathTemplate(
+    "openconfig-interfaces:interfaces/interface[name={name}]/openconfig-if-ethernet:ethernet/config"
+)
+
 
 def get_interface_base_path():
     """
@@ -237,7 +247,7 @@ def get_intfc_description_path(intfc_name: str):
     return path
 
 
-def set_interface_config_on_device(
+def get_interface_config_updates(
     device_ip: str,
     if_name: str,
     enable: bool = None,
@@ -255,7 +265,7 @@ def set_interface_config_on_device(
     secondary: bool = False,
 ):
     """
-    Set the interface configuration on a device.
+    Creates the gNMI updates for the interface configuration on a device.
 
     Args:
         device_ip (str): The IP address of the device.
@@ -274,9 +284,7 @@ def set_interface_config_on_device(
         link_training (bool, optional): Whether to enable link training. Defaults to None.
 
     Returns:
-        None: If no updates were made.
-        str: The response from sending the GNMI set request.
-port-fec
+        list: The gNMI updates, empty if there is nothing to configure.
     """
     updates = []
 
@@ -387,7 +395,7 @@ port-fec
         }
         updates.append(
             create_gnmi_update(
-                get_gnmi_path(f"openconfig-interfaces:interfaces/interface[name={if_name}]/openconfig-if-ethernet:ethernet/config"),
+                _oc_ethernet_config_path.get_path(name=if_name),
                 payload
             )
         )
@@ -399,7 +407,7 @@ port-fec
         }
         updates.append(
             create_gnmi_update(
-                get_gnmi_path(f"openconfig-interfaces:interfaces/interface[name={if_name}]/openconfig-if-ethernet:ethernet/config"),
+                _oc_ethernet_config_path.get_path(name=if_name),
                 payload
             )
         )
@@ -411,11 +419,27 @@ port-fec
         }
         updates.append(
             create_gnmi_update(
-                get_gnmi_path(f"openconfig-interfaces:interfaces/interface[name={if_name}]/openconfig-if-ethernet:ethernet/config"),
+                _oc_ethernet_config_path.get_path(name=if_name),
                 payload
             )
         )
-    if updates:
+    return updates
+
+
+def set_interface_config_on_device(device_ip: str, if_name: str, **kwargs):
+    """
+    Set the interface configuration on a device.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        if_name (str): The name of the interface.
+        kwargs: The interface configuration, see get_interface_config_updates.
+
+    Returns:
+        None: If no updates were made.
+        str: The response from sending the GNMI set request.
+    """
+    if updates := get_interface_config_updates(device_ip, if_name, **kwargs):
         return send_gnmi_set(
             create_req_for_update(updates),
             device_ip,
@@ -425,6 +449,63 @@ port-fec
         return None
 
 
+def set_interfaces_config_on_device(
+    device_ip: str, if_configs: Dict[str, dict]
+) -> Dict[str, Optional[str]]:
+    """
+    Set the configuration of many interfaces on a device with a single gNMI Set request.
+    If the request fails, the interfaces are configured one by one to find out
+    the failing interfaces.
+
+    .. code-block:: python
+
+        set_interfaces_config_on_device(
+            "10.10.10.10", {"Ethernet0": {"enable": True}, "Ethernet4": {"enable": True, "mtu": 9100}}
+        )
+
+    Args:
+        device_ip (str): The IP address of the device.
+        if_configs (Dict[str, dict]): The configuration per interface name,
+            see get_interface_config_updates for the keys.
+
+    Returns:
+        Dict[str, Optional[str]]: The error message per interface name, None if configured successfully.
+    """
+    report = {}
+    updates = []
+    for if_name, config in if_configs.items():
+        try:
+            updates.extend(get_interface_config_updates(device_ip, if_name, **config))
+            report[if_name] = None
+        except Exception as e:
+            report[if_name] = str(e)
+    if not updates:
+        return report
+    try:
+        send_gnmi_set(create_req_for_update(updates), device_ip, raise_errors=True)
+        return report
+    except grpc.RpcError as e:
+        if e.code() == grpc.StatusCode.UNAVAILABLE:
+            raise
+        _logger.error(
+            "Bulk interface config failed on device %s, configuring interfaces one by one. Reason: %s",
+            device_ip,
+            e,
+        )
+    for if_name, config in if_configs.items():
+        if report[if_name] is None:
+            try:
+                if if_updates := get_interface_config_updates(device_ip, if_name, **config):
+                    send_gnmi_set(
+                        create_req_for_update(if_updates), device_ip, raise_errors=True
+                    )
+            except grpc.RpcError as e:
+                report[if_name] = e.details() or str(e.code())
+            except Exception as e:
+                report[if_name] = str(e)
+    return report
+
+
 def get_interface_from_device(device_ip: str, intfc_name: str = None):
     """
     Retrieves all interfaces from a device.
@@ -792,6 +873,24 @@ def get_breakout_from_device(device_ip: str, if_alias: str):
     )
 
 
+def get_breakouts_from_device(device_ip: str, if_aliases: List[str]) -> Dict[str, dict]:
+    """
+    Retrieves the breakout configuration of many interfaces from a device with a single gNMI Get request.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        if_aliases (List[str]): The aliases of the interfaces.
+    Returns:
+        Dict[str, dict]: The breakout configuration per interface alias.
+    """
+    paths = {if_alias: get_breakout_path(if_alias) for if_alias in if_aliases}
+    result = send_gnmi_get_batch(device_ip=device_ip, path=list(paths.values()))
+    return {
+        if_alias: result.get(get_gnmi_path_str(path), {})
+        for if_alias, path in paths.items()
+    }
+
+
 def delete_interface_breakout_from_device(device_ip: str, if_alias: str):
     """
     Deletes the breakout configuration on a device.
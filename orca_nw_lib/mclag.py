@@ -1,7 +1,8 @@
 from typing import Any, Dict, List, Union
 
 from orca_nw_lib.utils import get_logging
-from .common import MclagFastConvergence
+from .common import DiscoveryFeature, MclagFastConvergence
+from .fingerprint import discover_if_changed
 
 from .device_db import get_device_db_obj
 from .mclag_db import (
@@ -131,8 +132,11 @@ def discover_mclag(device_ip: str = None):
     for device in devices:
         try:
             _logger.info(f"Discovering MCLAG on device {device}.")
-            insert_device_mclag_in_db(
-                device, _create_mclag_graph_objects(device.mgt_ip)
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.mclag,
+                lambda: _create_mclag_graph_objects(device.mgt_ip),
+                lambda mclags: insert_device_mclag_in_db(device, mclags),
             )
         except Exception as e:
             _logger.error(f"MCLAG Discovery Failed on device {device_ip}, Reason: {e}")
@@ -157,8 +161,11 @@ def discover_mclag_gw_macs(device_ip: str = None):
     for device in devices:
         try:
             _logger.info(f"Discovering MCLAG on device {device}.")
-            insert_device_mclag_gw_macs_in_db(
-                device, _create_mclag_gw_mac_obj(device.mgt_ip)
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.mclag_gw_macs,
+                lambda: _create_mclag_gw_mac_obj(device.mgt_ip),
+                lambda gw_macs: insert_device_mclag_gw_macs_in_db(device, gw_macs),
             )
         except Exception as e:
             _logger.error(
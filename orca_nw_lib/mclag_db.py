@@ -5,6 +5,7 @@ from .graph_db_models import MCLAG, MCLAG_GW_MAC, Device, Interface, PortChannel
 from .interface_db import get_interface_of_device_from_db
 from .port_chnl_db import get_port_chnl_of_device_from_db
 from .utils import get_logging
+from .fingerprint import save_if_changed
 
 _logger = get_logging().getLogger(__name__)
 
@@ -174,8 +175,7 @@ def insert_device_mclag_in_db(device: Device, mclag_to_intfc_list):
     """
     for mclag, intfcs in mclag_to_intfc_list.items():
         if mclag_in_db := get_mclag_of_device_from_db(device.mgt_ip, mclag.domain_id):
-            copy_mclag_obj_props(mclag_in_db, mclag)
-            mclag_in_db.save()
+            save_if_changed(mclag_in_db, copy_mclag_obj_props, mclag)
             device.mclags.connect(mclag_in_db)
 
         else:
@@ -271,8 +271,7 @@ def insert_device_mclag_gw_macs_in_db(
         if gw_mac_in_db := get_mclag_gw_mac_of_device_from_db(
             device.mgt_ip, mclag_gw_mac.gateway_mac
         ):
-            copy_mclag_gw_mac_props(gw_mac_in_db, mclag_gw_mac)
-            gw_mac_in_db.save()
+            save_if_changed(gw_mac_in_db, copy_mclag_gw_mac_props, mclag_gw_mac)
             device.mclag_gw_macs.connect(gw_mac_in_db)
         else:
             mclag_gw_mac.save()
@@ -1,3 +1,11 @@
 # Define a custom exception class
 class OrcaException(Exception):
     pass
+
+
+class CircuitOpenError(OrcaException):
+    """
+    Raised instead of sending a request to a device, the requests to which are failing
+    consecutively, until the cooldown period of its circuit breaker is over.
+    """
+    pass
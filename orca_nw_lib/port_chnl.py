@@ -1,7 +1,7 @@
 from time import sleep
 from typing import Dict, List
-from grpc import RpcError
-from orca_nw_lib.common import IFMode
+from orca_nw_lib.common import DiscoveryFeature, IFMode
+from .fingerprint import discover_if_changed
 
 from .port_chnl_db import (
     get_all_port_chnl_of_device_from_db,
@@ -24,8 +24,8 @@ from .port_chnl_gnmi import (
     delete_all_port_channel_member_vlan_from_device,
     remove_port_channel_ip_from_device,
     add_port_chnl_valn_members_on_device,
-    get_port_channel_ip_details_from_device,
-    get_port_channel_vlan_members_from_device,
+    get_port_channels_ip_details_from_device,
+    get_port_channels_vlan_members_from_device,
 )
 from .utils import get_logging, format_and_get_trunk_vlans
 
@@ -52,6 +52,13 @@ def _create_port_chnl_graph_object(device_ip: str) -> Dict[PortChannel, List[str
             "sonic-portchannel:LAG_MEMBER_TABLE_LIST", {}
         )
         port_chnl_json_list = port_chnl_json.get("sonic-portchannel:PORTCHANNEL_LIST", {})
+        port_chnl_names = [port_chnl.get("name") for port_chnl in port_chnl_json_list]
+        port_chnls_vlan_members = get_port_channels_vlan_members_from_device(
+            device_ip, port_chnl_names
+        ) if port_chnl_names else {}
+        port_chnls_ip_details = get_port_channels_ip_details_from_device(
+            device_ip, port_chnl_names
+        ) if port_chnl_names else {}
         for port_chnl in port_chnl_json_list:
             ifname_list = []
 
@@ -62,8 +69,8 @@ def _create_port_chnl_graph_object(device_ip: str) -> Dict[PortChannel, List[str
 
             #  Getting port channel vlan member details
             port_chnl_vlan_member = {}
-            port_chnl_vlan_member_from_device = get_port_channel_vlan_members_from_device(
-                device_ip, port_chnl.get("name")
+            port_chnl_vlan_member_from_device = port_chnls_vlan_members.get(
+                port_chnl.get("name"), {}
             )
             port_chnl_vlan_member_details = port_chnl_vlan_member_from_device.get(
                 "openconfig-vlan:config", {}
@@ -80,20 +87,19 @@ def _create_port_chnl_graph_object(device_ip: str) -> Dict[PortChannel, List[str
 
             # Getting port channel IP details
             ipv4_addr = None
-            try:
-                ip_details = get_port_channel_ip_details_from_device(device_ip, port_chnl.get("name")).get(
-                    "openconfig-if-ip:addresses", {}
-                )
-                ipv4_addresses = ip_details.get("address", [])
-                for ipv4 in ipv4_addresses or []:
-                    if (ip := ipv4.get("config", {}).get("ip", "")) and (
-                            pfx := ipv4.get("config", {}).get("prefix-length", "")
-                    ):
-                        ipv4_addr = f"{ip}/{pfx}"
-                        break
-            except RpcError as e:
+            ip_details = port_chnls_ip_details.get(port_chnl.get("name"), {}).get(
+                "openconfig-if-ip:addresses", {}
+            )
+            ipv4_addresses = ip_details.get("address", [])
+            for ipv4 in ipv4_addresses or []:
+                if (ip := ipv4.get("config", {}).get("ip", "")) and (
+                        pfx := ipv4.get("config", {}).get("prefix-length", "")
+                ):
+                    ipv4_addr = f"{ip}/{pfx}"
+                    break
+            if not ipv4_addr:
                 _logger.debug(
-                    f"No IP information found for port channel {port_chnl.get('name')} on device {device_ip}. Error: {e}")
+                    f"No IP information found for port channel {port_chnl.get('name')} on device {device_ip}.")
 
             port_chnl_obj = PortChannel(
                 lag_name=port_chnl.get("name"),
@@ -139,8 +145,11 @@ def discover_port_chnl(device_ip: str = None):
     for device in devices:
         _logger.info(f"Discovering Port Channels of device {device}.")
         try:
-            insert_device_port_chnl_in_db(
-                device, _create_port_chnl_graph_object(device.mgt_ip)
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.port_channel,
+                lambda: _create_port_chnl_graph_object(device.mgt_ip),
+                lambda chnls: insert_device_port_chnl_in_db(device, chnls),
             )
         except Exception as e:
             _logger.error(
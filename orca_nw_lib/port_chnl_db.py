@@ -3,6 +3,7 @@ from .device_db import get_device_db_obj
 from .graph_db_models import Device, Interface, PortChannel
 from .interface_db import get_interface_of_device_from_db
 from .utils import get_logging
+from .fingerprint import save_if_changed
 
 _logger = get_logging().getLogger(__name__)
 
@@ -131,8 +132,7 @@ def insert_device_port_chnl_in_db(device: Device, portchnl_to_mem_list):
     _logger.debug(f"Inserting port channels in the DB for device {device.mgt_ip} {portchnl_to_mem_list}")
     for chnl, mem_list in portchnl_to_mem_list.items() or []:
         if p_chnl := get_port_chnl_of_device_from_db(device.mgt_ip, chnl.lag_name):
-            copy_port_chnl_prop(p_chnl, chnl)
-            p_chnl.save()
+            save_if_changed(p_chnl, copy_port_chnl_prop, chnl)
             device.port_chnl.connect(p_chnl)
         else:
             chnl.save()
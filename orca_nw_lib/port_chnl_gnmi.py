@@ -1,3 +1,5 @@
+from typing import Dict, List
+
 from orca_nw_lib.common import IFMode
 from orca_nw_lib.portgroup_gnmi import get_port_chnl_mem_base_path
 from orca_nw_lib.utils import get_logging, validate_and_get_ip_prefix, format_and_get_trunk_vlans
@@ -7,7 +9,9 @@ from .gnmi_util import (
     create_req_for_update,
     get_gnmi_del_req,
     get_gnmi_path,
+    get_gnmi_path_str,
     send_gnmi_get,
+    send_gnmi_get_batch,
     send_gnmi_set,
     get_gnmi_del_reqs
 )
@@ -543,6 +547,27 @@ def get_port_channel_vlan_members_from_device(device_ip: str, port_channel_name:
     return send_gnmi_get(device_ip, [get_port_channel_vlan_memebers_path(port_channel_name=port_channel_name)])
 
 
+def get_port_channels_vlan_members_from_device(
+        device_ip: str, port_channel_names: List[str]
+) -> Dict[str, dict]:
+    """
+    Retrieves the VLAN members of many port channels from the device with a single gNMI Get request.
+
+    Parameters:
+        device_ip (str): The IP address of the device.
+        port_channel_names (List[str]): The names of the port channels.
+
+    Returns:
+        Dict[str, dict]: The VLAN members per port channel name.
+    """
+    paths = {
+        name: get_port_channel_vlan_memebers_path(port_channel_name=name)
+        for name in port_channel_names
+    }
+    result = send_gnmi_get_batch(device_ip=device_ip, path=list(paths.values()))
+    return {name: result.get(get_gnmi_path_str(path), {}) for name, path in paths.items()}
+
+
 def delete_port_channel_member_vlan_from_device(
         device_ip: str, port_channel_name: str, if_mode: IFMode, vlan_ids: list[int]
 ):
@@ -696,3 +721,27 @@ def get_port_channel_ip_details_from_device(device_ip: str, port_channel_name: s
             get_port_channel_ip_path(port_channel_name=port_channel_name)
         ],
     )
+
+
+def get_port_channels_ip_details_from_device(
+        device_ip: str, port_channel_names: List[str]
+) -> Dict[str, dict]:
+    """
+    Retrieves the IP details of many port channels from the device with a single gNMI Get request.
+    Port channels for which the IP details could not be retrieved get an empty dict.
+
+    Parameters:
+        device_ip (str): The IP address of the device.
+        port_channel_names (List[str]): The names of the port channels.
+
+    Returns:
+        Dict[str, dict]: The IP details per port channel name.
+    """
+    paths = {
+        name: get_port_channel_ip_path(port_channel_name=name)
+        for name in port_channel_names
+    }
+    result = send_gnmi_get_batch(
+        device_ip=device_ip, path=list(paths.values()), ignore_errors=True
+    )
+    return {name: result.get(get_gnmi_path_str(path), {}) for name, path in paths.items()}
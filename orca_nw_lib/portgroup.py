@@ -1,4 +1,5 @@
-from orca_nw_lib.common import Speed
+from orca_nw_lib.common import DiscoveryFeature, Speed
+from .fingerprint import discover_if_changed
 from orca_nw_lib.device_db import get_device_db_obj
 from orca_nw_lib.gnmi_sub import check_gnmi_subscription_and_apply_config
 from orca_nw_lib.graph_db_models import PortGroup
@@ -152,8 +153,12 @@ def discover_port_groups(
     devices = [get_device_db_obj(device_ip)] if device_ip else get_device_db_obj()
     for device in devices:
         _logger.info("Discovering  %s of device %s.", ('portgroup %s' % port_group_id if port_group_id else 'all portgroups'), device_ip)
-        insert_device_port_groups_in_db(
-            device, _create_port_group_graph_objects(device.mgt_ip, port_group_id)
+        discover_if_changed(
+            device.mgt_ip,
+            DiscoveryFeature.port_group,
+            lambda: _create_port_group_graph_objects(device.mgt_ip, port_group_id),
+            lambda port_groups: insert_device_port_groups_in_db(device, port_groups),
+            sub_key=port_group_id,
         )
         if config_triggered_discovery and port_group_id:
             ## if discovery is triggered due to config update via ORCA.
@@ -3,6 +3,7 @@ from orca_nw_lib.common import Speed
 from orca_nw_lib.device_db import get_device_db_obj
 import orca_nw_lib.interface_db as orca_interfaces
 from orca_nw_lib.graph_db_models import Device, Interface, PortGroup
+from orca_nw_lib.fingerprint import save_if_changed
 
 
 def copy_portgr_obj_prop(target_obj: PortGroup, src_obj: PortGroup):
@@ -51,8 +52,7 @@ def insert_device_port_groups_in_db(device: Device = None, port_groups: dict = N
     """
     for pg, mem_intfcs in port_groups.items():
         if p := get_port_group_from_db(device.mgt_ip, pg.port_group_id):
-            copy_portgr_obj_prop(p, pg)
-            p.save()
+            save_if_changed(p, copy_portgr_obj_prop, pg)
             device.port_groups.connect(p)
         else:
             pg.save()
@@ -1,4 +1,5 @@
-from orca_nw_lib.common import STPEnabledProtocol
+from orca_nw_lib.common import DiscoveryFeature, STPEnabledProtocol
+from .fingerprint import discover_if_changed
 from orca_nw_lib.device_db import get_device_db_obj
 from orca_nw_lib.graph_db_models import STP_GLOBAL
 from orca_nw_lib.stp_db import insert_device_stp_in_db, get_stp_global_from_db
@@ -60,7 +61,12 @@ def discover_stp(device_ip: str = None):
     for device in devices:
         _logger.info(f"Discovering STP on device {device}.")
         try:
-            insert_device_stp_in_db(device, _create_stp_graph_object(device.mgt_ip))
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.stp,
+                lambda: _create_stp_graph_object(device.mgt_ip),
+                lambda stp: insert_device_stp_in_db(device, stp),
+            )
         except Exception as e:
             _logger.error(f"Failed to discover STP, Reason: {e}")
             raise
@@ -2,6 +2,7 @@ from orca_nw_lib.device_db import get_device_db_obj
 from orca_nw_lib.graph_db_models import STP_GLOBAL, Device
 
 from orca_nw_lib.utils import get_logging
+from orca_nw_lib.fingerprint import save_if_changed
 
 _logger = get_logging().getLogger(__name__)
 
@@ -21,8 +22,7 @@ def insert_device_stp_in_db(device: Device, stp_obj: dict):
     _logger.info(f"Inserting STP on device {device.mgt_ip}.")
     for stp, members in stp_obj.items():
         if stp_db_obj := get_stp_global_from_db(device.mgt_ip):
-            copy_stp_global_obj(stp_db_obj, stp)
-            stp_db_obj.save()
+            save_if_changed(stp_db_obj, copy_stp_global_obj, stp)
             device.stp_global.connect(stp_db_obj)
         else:
             stp.save()
@@ -1,6 +1,7 @@
 from orca_nw_lib.utils import get_logging
 
-from orca_nw_lib.common import STPPortEdgePort
+from orca_nw_lib.common import DiscoveryFeature, STPPortEdgePort
+from .fingerprint import discover_if_changed
 from orca_nw_lib.device_db import get_device_db_obj
 
 from orca_nw_lib.gnmi_sub import check_gnmi_subscription_and_apply_config
@@ -72,7 +73,12 @@ def discover_stp_port(device_ip: str = None):
     for device in devices:
         _logger.info(f"Discovering STP on device {device}.")
         try:
-            insert_device_stp_port_in_db(device, _create_stp_port_graph_object(device.mgt_ip))
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.stp_port,
+                lambda: _create_stp_port_graph_object(device.mgt_ip),
+                lambda stp_ports: insert_device_stp_port_in_db(device, stp_ports),
+            )
         except Exception as e:
             _logger.error(f"Failed to discover STP, Reason: {e}")
             raise
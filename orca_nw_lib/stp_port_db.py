@@ -7,6 +7,7 @@ from orca_nw_lib.graph_db_models import Device, STP_PORT
 from orca_nw_lib.utils import get_logging
 
 from orca_nw_lib.device_db import get_device_db_obj
+from orca_nw_lib.fingerprint import save_if_changed
 
 _logger = get_logging().getLogger(__name__)
 
@@ -129,8 +130,7 @@ def insert_device_stp_port_in_db(device: Device, stp_port_obj: dict):
     for stp_port, members in stp_port_obj.items():
         if existing_stp_port := get_stp_port_members_from_db(device.mgt_ip, stp_port.if_name):
             # updating stp port node in db
-            copy_stp_port_obj(existing_stp_port, stp_port)
-            existing_stp_port.save()
+            save_if_changed(existing_stp_port, copy_stp_port_obj, stp_port)
             new_port_obj = existing_stp_port
         else:
             # inserting stp port node in db
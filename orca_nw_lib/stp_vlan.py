@@ -1,4 +1,6 @@
+from orca_nw_lib.common import DiscoveryFeature
 from orca_nw_lib.device_db import get_device_db_obj
+from orca_nw_lib.fingerprint import discover_if_changed
 from orca_nw_lib.graph_db_models import STP_VLAN
 from orca_nw_lib.stp_vlan_db import insert_device_stp_vlan_in_db, get_stp_vlan_from_db
 
@@ -54,8 +56,11 @@ def discover_stp_vlan(device_ip: str):
     for device in devices:
         _logger.info(f"Discovering STP VLAN of device {device}.")
         try:
-            insert_device_stp_vlan_in_db(
-                device, _create_stp_vlan_graph_object(device.mgt_ip)
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.stp_vlan,
+                lambda: _create_stp_vlan_graph_object(device.mgt_ip),
+                lambda stp_vlans: insert_device_stp_vlan_in_db(device, stp_vlans),
             )
         except Exception as e:
             _logger.error(
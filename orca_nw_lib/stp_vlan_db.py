@@ -4,6 +4,7 @@ from orca_nw_lib.utils import get_logging
 
 from orca_nw_lib.graph_db_models import Device, STP_VLAN
 from orca_nw_lib.vlan_db import get_vlan_obj_from_db_using_id
+from orca_nw_lib.fingerprint import save_if_changed
 
 _logger = get_logging().getLogger(__name__)
 
@@ -41,8 +42,7 @@ def insert_device_stp_vlan_in_db(device: Device, stp_vlan_obj: dict):
     for stp_vlan, members in stp_vlan_obj.items():
         if existing_stp_valn := get_stp_vlan_from_db(device.mgt_ip, stp_vlan.vlan_id):
             # updating stp vlan node in db
-            copy_stp_vlan_obj(existing_stp_valn, stp_vlan)
-            existing_stp_valn.save()
+            save_if_changed(existing_stp_valn, copy_stp_vlan_obj, stp_vlan)
             new_vlan_obj = existing_stp_valn
         else:
             # inserting stp vlan node in db
@@ -0,0 +1,468 @@
+""" Spreading the gNMI subscriptions of the devices over worker processes by consistent hashing of the device IPs """
+
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .subscription_supervisor import get_subscription_states
+from .utils import get_logging, get_subscription_shards
+
+_logger = get_logging().getLogger(__name__)
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent hash ring, assigning keys to nodes so that adding or removing a node
+    only moves the keys of that node. Every node is placed on the ring several times (replicas)
+    to spread the keys evenly.
+
+    Args:
+        nodes (list, optional): The nodes. Defaults to none.
+        replicas (int, optional): Number of points of every node on the ring. Defaults to 64.
+    """
+
+    def __init__(self, nodes: list = (), replicas: int = 64):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._nodes: Dict[int, object] = {}
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node):
+        for i in range(self.replicas):
+            point = _hash(f"{node}:{i}")
+            self._nodes[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node):
+        for i in range(self.replicas):
+            point = _hash(f"{node}:{i}")
+            if self._nodes.get(point) == node:
+                del self._nodes[point]
+                self._points.remove(point)
+
+    def get_node(self, key: str):
+        """
+        Returns the node of the key, None if the ring has no nodes.
+        """
+        if not self._points:
+            return None
+        i = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._nodes[self._points[i]]
+
+    def get_nodes(self) -> set:
+        return set(self._nodes.values())
+
+
+## Id of the shard when running in a shard worker process.
+_shard_id: Optional[int] = None
+
+## Name prefix of the shard worker processes.
+_WORKER_NAME_PREFIX = "orca_subscription_shard_"
+
+
+def is_shard_worker() -> bool:
+    """
+    Returns whether running in a shard worker process.
+    A spawned worker is named before it imports orca_nw_lib, so that this holds while the package is initialized.
+    """
+    return _shard_id is not None or multiprocessing.current_process().name.startswith(
+        _WORKER_NAME_PREFIX
+    )
+
+
+def _run_shard_worker(shard_id: int, conn):
+    """
+    Main function of a shard worker process, runs the commands received from the coordinator
+    until it is stopped or the coordinator exits, then unsubscribes from its devices.
+    """
+    global _shard_id
+    _shard_id = shard_id
+    from . import gnmi_sub
+
+    subscribed = set()
+
+    def _subscribe(device_ip: str, force_resubscribe: bool = False) -> bool:
+        subscribed.add(device_ip)
+        return gnmi_sub.gnmi_subscribe(device_ip, force_resubscribe)
+
+    def _unsubscribe(device_ip: str) -> bool:
+        subscribed.discard(device_ip)
+        return gnmi_sub.gnmi_unsubscribe(device_ip)
+
+    commands: Dict[str, Callable] = {
+        "subscribe": _subscribe,
+        "unsubscribe": _unsubscribe,
+        "wait_for_sync": gnmi_sub.wait_for_sync,
+        "states": get_subscription_states,
+    }
+    send_lock = threading.Lock()
+
+    def _handle(request_id: int, command: str, args: tuple):
+        try:
+            response = (request_id, True, commands[command](*args))
+        except Exception as e:
+            response = (request_id, False, f"{type(e).__name__}: {e}")
+        with send_lock:
+            conn.send(response)
+
+    request_id = None
+    while True:
+        try:
+            request_id, command, args = conn.recv()
+        except (EOFError, OSError):
+            ## The coordinator exited.
+            request_id = None
+            break
+        if command == "stop":
+            break
+        threading.Thread(target=_handle, args=(request_id, command, args), daemon=True).start()
+
+    handles = [gnmi_sub.cancel_subscriptions(device_ip) for device_ip in list(subscribed)]
+    for handle in handles:
+        if handle:
+            handle.join(5)
+    if request_id is not None:
+        with send_lock:
+            conn.send((request_id, True, None))
+    conn.close()
+
+
+class _ShardWorker:
+    """
+    A shard worker process and the pipe to send it commands.
+    """
+
+    def __init__(self, shard_id: int, context):
+        self.shard_id = shard_id
+        self._conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_run_shard_worker,
+            args=(shard_id, child_conn),
+            name=f"{_WORKER_NAME_PREFIX}{shard_id}",
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self._pending: Dict[int, Future] = {}
+        self._request_ids = itertools.count()
+        self._lock = threading.Lock()
+        threading.Thread(
+            target=self._read, name=f"orca_subscription_shard_reader_{shard_id}", daemon=True
+        ).start()
+
+    def _read(self):
+        while True:
+            try:
+                request_id, ok, value = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._pending.pop(request_id, None)
+            if not future:
+                continue
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(Exception(value))
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for future in pending.values():
+            future.set_exception(Exception(f"Shard worker {self.shard_id} exited."))
+
+    def call(self, command: str, *args, timeout: float = 60):
+        """
+        Runs the command in the worker process and returns its result.
+
+        Raises:
+            Exception: If the command failed, the worker exited or did not respond within the timeout.
+        """
+        future = Future()
+        with self._lock:
+            request_id = next(self._request_ids)
+            self._pending[request_id] = future
+            try:
+                self._conn.send((request_id, command, args))
+            except (OSError, ValueError) as e:
+                del self._pending[request_id]
+                raise Exception(f"Shard worker {self.shard_id} exited.") from e
+        return future.result(timeout)
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def stop(self, timeout: float = 10):
+        if self.is_alive():
+            try:
+                self.call("stop", timeout=timeout)
+            except Exception as e:
+                _logger.debug("Failed to stop shard worker %s: %s", self.shard_id, e)
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+        self._conn.close()
+
+
+class ShardCoordinator:
+    """
+    Spreads the subscriptions of the devices over worker processes, each process subscribing to the devices
+    of its shard and running their update handlers and DB writes, so that all the cores are used.
+
+    Devices are assigned to the shards by consistent hashing of their IP, when a worker is added, removed or exits
+    only the devices of the affected shards are moved. The workers are started with the "spawn" method by default,
+    so that they do not inherit the gRPC channels and threads of the coordinator process.
+
+    Args:
+        shards (int, optional): Number of worker processes. Defaults to subscription_shards from config.
+        start_method (str, optional): multiprocessing start method of the workers. Defaults to "spawn".
+        check_interval (float, optional): Interval in seconds to check whether the workers are alive,
+            0 to not check. Defaults to 1.
+    """
+
+    def __init__(self, shards: int = None, start_method: str = "spawn", check_interval: float = 1):
+        self._context = multiprocessing.get_context(start_method)
+        self._ring = HashRing()
+        self._workers: Dict[int, _ShardWorker] = {}
+        ## Shard of every subscribed device.
+        self._devices: Dict[str, int] = {}
+        self._shard_ids = itertools.count()
+        self._lock = threading.RLock()
+        self._stopped = threading.Event()
+        for _ in range(shards if shards is not None else get_subscription_shards()):
+            self.add_worker()
+        if check_interval:
+            threading.Thread(
+                target=self._check_workers_periodically,
+                args=(check_interval,),
+                name="orca_subscription_shard_monitor",
+                daemon=True,
+            ).start()
+
+    def _check_workers_periodically(self, interval: float):
+        while not self._stopped.wait(interval):
+            try:
+                self.check_workers()
+            except Exception as e:
+                _logger.error("Failed to check subscription shard workers: %s", e)
+
+    def add_worker(self) -> int:
+        """
+        Starts a worker process and moves the devices assigned to it by the hash ring.
+
+        Returns:
+            int: Id of the new shard.
+        """
+        with self._lock:
+            shard_id = next(self._shard_ids)
+            self._workers[shard_id] = _ShardWorker(shard_id, self._context)
+            self._ring.add_node(shard_id)
+            _logger.info("Started subscription shard worker %s", shard_id)
+            moves = self._rebalance()
+        self._move(moves)
+        return shard_id
+
+    def remove_worker(self, shard_id: int, timeout: float = 10):
+        """
+        Moves the devices of the shard to the remaining workers and stops the worker process.
+
+        Args:
+            shard_id (int): Id of the shard.
+            timeout (float, optional): Max. time in seconds to wait for the worker to stop. Defaults to 10.
+        """
+        with self._lock:
+            if shard_id not in self._workers:
+                return
+            self._ring.remove_node(shard_id)
+            moves = self._rebalance()
+            worker = self._workers.pop(shard_id)
+        self._move(moves)
+        _logger.info("Stopping subscription shard worker %s", shard_id)
+        worker.stop(timeout)
+
+    def check_workers(self) -> List[int]:
+        """
+        Removes the workers which exited, their devices are moved to the remaining workers.
+        When no worker is left, the devices are subscribed once a worker is added.
+
+        Returns:
+            List[int]: Ids of the removed shards.
+        """
+        with self._lock:
+            exited = [shard_id for shard_id, worker in self._workers.items() if not worker.is_alive()]
+        for shard_id in exited:
+            _logger.error("Subscription shard worker %s exited, moving its devices.", shard_id)
+            self.remove_worker(shard_id)
+        return exited
+
+    def _rebalance(self) -> List[Tuple[str, Optional[_ShardWorker], Optional[_ShardWorker]]]:
+        """
+        Assigns the devices to their shards as per the hash ring, called with the lock held.
+        The worker calls block for up to their timeout, hence the moves are returned to be made by _move
+        once the lock is released.
+
+        Returns:
+            List[Tuple[str, Optional[_ShardWorker], Optional[_ShardWorker]]]: The moved devices
+                with the workers they are moved from and to.
+        """
+        moves = []
+        for device_ip, shard_id in list(self._devices.items()):
+            if (target := self._ring.get_node(device_ip)) == shard_id:
+                continue
+            _logger.info("Moving subscription of %s from shard %s to %s", device_ip, shard_id, target)
+            self._devices[device_ip] = target
+            moves.append((device_ip, self._workers.get(shard_id), self._workers.get(target)))
+        return moves
+
+    def _move(self, moves: List[Tuple[str, Optional[_ShardWorker], Optional[_ShardWorker]]]):
+        for device_ip, worker, target in moves:
+            if worker and worker.is_alive():
+                try:
+                    worker.call("unsubscribe", device_ip)
+                except Exception as e:
+                    _logger.error("Failed to unsubscribe %s in shard %s: %s", device_ip, worker.shard_id, e)
+            with self._lock:
+                ## Unsubscribed or moved again in the meantime.
+                if self._workers.get(self._devices.get(device_ip)) is not target:
+                    continue
+            self._subscribe(device_ip, target)
+
+    def _subscribe(self, device_ip: str, worker: Optional[_ShardWorker], force_resubscribe: bool = False) -> bool:
+        if worker is None:
+            ## Subscribed by _rebalance when a worker is added.
+            _logger.error("No subscription shard workers are running, %s is not subscribed.", device_ip)
+            return False
+        try:
+            return worker.call("subscribe", device_ip, force_resubscribe)
+        except Exception as e:
+            _logger.error("Failed to subscribe %s in shard %s: %s", device_ip, worker.shard_id, e)
+            return False
+
+    def get_shard(self, device_ip: str) -> Optional[int]:
+        """
+        Returns the shard the device is assigned to by the hash ring.
+        """
+        with self._lock:
+            return self._ring.get_node(device_ip)
+
+    def subscribe(self, device_ip: str, force_resubscribe: bool = False) -> bool:
+        """
+        Subscribes to the device in the worker of its shard, see gnmi_sub.gnmi_subscribe.
+        """
+        with self._lock:
+            shard_id = self._devices[device_ip] = self._ring.get_node(device_ip)
+            worker = self._workers.get(shard_id)
+        return self._subscribe(device_ip, worker, force_resubscribe)
+
+    def unsubscribe(self, device_ip: str) -> bool:
+        """
+        Unsubscribes from the device in the worker of its shard, see gnmi_sub.gnmi_unsubscribe.
+        """
+        with self._lock:
+            shard_id = self._devices.pop(device_ip, None)
+            worker = self._workers.get(shard_id)
+        if not worker:
+            return True
+        return worker.call("unsubscribe", device_ip)
+
+    def wait_for_sync(self, device_ip: str, timeout: float) -> bool:
+        """
+        Waits for the sync response of the subscription of the device in the worker of its shard,
+        see gnmi_sub.wait_for_sync.
+        """
+        with self._lock:
+            worker = self._workers.get(self._devices.get(device_ip))
+        if not worker:
+            return False
+        return worker.call("wait_for_sync", device_ip, timeout, timeout=timeout + 5)
+
+    def get_assignments(self) -> Dict[str, Optional[int]]:
+        """
+        Returns the shard of every subscribed device, None for the devices waiting for a worker.
+        """
+        with self._lock:
+            return dict(self._devices)
+
+    def get_subscription_states(self) -> List[dict]:
+        """
+        Returns the states of the subscriptions of all the workers, see subscription_supervisor.get_subscription_states,
+        with the additional key shard.
+        """
+        with self._lock:
+            workers = list(self._workers.values())
+        states = []
+        for worker in workers:
+            try:
+                states.extend(
+                    dict(state, shard=worker.shard_id) for state in worker.call("states")
+                )
+            except Exception as e:
+                _logger.error("Failed to get subscription states of shard %s: %s", worker.shard_id, e)
+        return states
+
+    def stop(self, timeout: float = 10):
+        """
+        Stops all the worker processes, which unsubscribe from their devices.
+
+        Args:
+            timeout (float, optional): Max. time in seconds to wait per worker. Defaults to 10.
+        """
+        self._stopped.set()
+        with self._lock:
+            workers = list(self._workers.values())
+            self._workers.clear()
+            self._devices.clear()
+            self._ring = HashRing()
+        for worker in workers:
+            worker.stop(timeout)
+
+
+_coordinator: Optional[ShardCoordinator] = None
+_coordinator_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    ## The pipes to the workers belong to the parent process.
+    global _coordinator, _coordinator_lock
+    _coordinator = None
+    _coordinator_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_shard_coordinator() -> Optional[ShardCoordinator]:
+    """
+    Returns the coordinator of the subscription shards, created on first use,
+    None if subscription_shards is 0 or when running in a shard worker.
+    """
+    global _coordinator
+    if is_shard_worker():
+        return None
+    with _coordinator_lock:
+        if _coordinator is None and get_subscription_shards() > 0:
+            _coordinator = ShardCoordinator()
+        return _coordinator
+
+
+def stop_shard_coordinator(timeout: float = 10):
+    """
+    Stops the worker processes of the subscription shards.
+
+    Args:
+        timeout (float, optional): Max. time in seconds to wait per worker. Defaults to 10.
+    """
+    global _coordinator
+    with _coordinator_lock:
+        coordinator, _coordinator = _coordinator, None
+    if coordinator:
+        coordinator.stop(timeout)
@@ -0,0 +1,440 @@
+""" Supervision of the gNMI subscription streams, resubscribing with backoff when a stream ends """
+
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .gnmi_util import RetryPolicy
+from .utils import (
+    get_logging,
+    get_subscription_retry_backoff,
+    get_subscription_retry_backoff_max,
+)
+
+_logger = get_logging().getLogger(__name__)
+
+## States of a supervised subscription.
+CONNECTING = "connecting"
+SYNCING = "syncing"
+LIVE = "live"
+BACKOFF = "backoff"
+STOPPED = "stopped"
+
+## The subscription run by the current thread.
+_current = threading.local()
+
+
+class SupervisedSubscription:
+    """
+    A subscription stream run by its own thread, which subscribes again with exponential backoff
+    whenever the stream ends or fails, until the subscription is stopped.
+
+    The run function subscribes and handles the stream, it returns or raises when the stream ends.
+    It hands the stream over with set_subscription_stream once created, which the subscription owns from then on
+    i.e. cancelling the subscription cancels that very stream. It reports the progress of the stream
+    with set_subscription_state i.e. SYNCING once the stream is created, LIVE once the sync response is received.
+    The backoff starts over once a stream was live. A stream created while the subscription is being cancelled
+    is cancelled when it is handed over or reports SYNCING, so that cancel never misses a stream.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        name (str): Name of the subscription e.g. "config".
+        thread_name (str): Name of the thread running the subscription.
+        run (Callable): Subscribes and handles the stream.
+        cancel (Callable, optional): Cancels the stream, for streams not handed over with set_subscription_stream.
+    """
+
+    def __init__(
+        self,
+        device_ip: str,
+        name: str,
+        thread_name: str,
+        run: Callable[[], None],
+        cancel: Callable[[], None] = None,
+    ):
+        self.device_ip = device_ip
+        self.name = name
+        self.state = CONNECTING
+        self.since = time.time()
+        self.attempts = 0
+        self.restarts = 0
+        self.last_error = None
+        self.next_attempt_at = None
+        self._run = run
+        self._cancel = cancel
+        self._stream = None
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._thread_name = thread_name
+        self.thread = None
+
+    def start(self) -> "SupervisedSubscription":
+        self.thread = threading.Thread(
+            name=self._thread_name, target=self._supervise, daemon=True
+        )
+        self.thread.start()
+        return self
+
+    def set_state(self, state: str, error: str = None, next_attempt_at: float = None):
+        if self._stopped.is_set():
+            if state == SYNCING:
+                self._cancel_stream()
+            return
+        with self._lock:
+            if state != self.state:
+                _logger.debug(
+                    "Subscription %s of %s changed from %s to %s",
+                    self.name,
+                    self.device_ip,
+                    self.state,
+                    state,
+                )
+                self.since = time.time()
+            self.state = state
+            if state == LIVE:
+                self.attempts = 0
+            if error:
+                self.last_error = error
+            self.next_attempt_at = next_attempt_at
+
+    def set_stream(self, stream):
+        """
+        Sets the stream created by the current attempt, cancelled right away if the subscription is stopped.
+
+        Args:
+            stream: The subscription call, having a cancel method.
+        """
+        with self._lock:
+            self._stream = stream
+        if self._stopped.is_set():
+            self._cancel_stream()
+
+    @staticmethod
+    def _get_retry_policy() -> RetryPolicy:
+        return RetryPolicy(
+            backoff=get_subscription_retry_backoff(),
+            backoff_max=get_subscription_retry_backoff_max(),
+        )
+
+    def _backoff(self, policy: RetryPolicy, error: Exception = None) -> float:
+        """
+        Records the end of the stream and returns the delay before subscribing again.
+        """
+        error = (str(error) or repr(error)) if error else "Subscription stream ended"
+        delay = policy.get_delay(self.attempts)
+        self.attempts += 1
+        self.restarts += 1
+        _logger.warning(
+            "Subscription %s of %s ended: %s, subscribing again in %.1f seconds.",
+            self.name,
+            self.device_ip,
+            error,
+            delay,
+        )
+        self.set_state(BACKOFF, error, time.time() + delay)
+        return delay
+
+    def _set_stopped(self):
+        with self._lock:
+            self.state = STOPPED
+            self.since = time.time()
+            self.next_attempt_at = None
+
+    def _supervise(self):
+        _current.subscription = self
+        policy = self._get_retry_policy()
+        while not self._stopped.is_set():
+            self.set_state(CONNECTING)
+            error = None
+            try:
+                self._run()
+            except Exception as e:
+                error = e
+            if self._stopped.is_set():
+                break
+            self._stopped.wait(self._backoff(policy, error))
+        self._set_stopped()
+
+    def _cancel_stream(self):
+        with self._lock:
+            stream = self._stream
+        try:
+            if stream is not None:
+                stream.cancel()
+            if self._cancel:
+                self._cancel()
+        except Exception as e:
+            _logger.debug("Failed to cancel subscription %s of %s: %s", self.name, self.device_ip, e)
+
+    def cancel(self):
+        """
+        Stops the subscription without waiting, the stream is cancelled and not subscribed again.
+        """
+        self._stopped.set()
+        self._cancel_stream()
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        Waits for the thread of the cancelled subscription to end.
+
+        Args:
+            timeout (float, optional): Max. time in seconds to wait. Defaults to no timeout.
+
+        Returns:
+            bool: True if the thread ended, False on timeout.
+        """
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+        return not (self.thread and self.thread.is_alive())
+
+    def get_state(self) -> dict:
+        with self._lock:
+            return {
+                "device_ip": self.device_ip,
+                "name": self.name,
+                "state": self.state,
+                "since": self.since,
+                "attempts": self.attempts,
+                "restarts": self.restarts,
+                "last_error": self.last_error,
+                "next_attempt_at": self.next_attempt_at,
+            }
+
+
+class SubscriptionHandle:
+    """
+    The supervised subscriptions of a device, e.g. its config and telemetry subscriptions.
+
+    Args:
+        device_ip (str): The IP address of the device.
+    """
+
+    def __init__(self, device_ip: str):
+        self.device_ip = device_ip
+        self._subscriptions: Dict[str, SupervisedSubscription] = {}
+        self._lock = threading.Lock()
+        self._cancelled = False
+
+    def register(
+        self,
+        name: str,
+        thread_name: str,
+        run: Callable[[], None],
+        cancel: Callable[[], None] = None,
+    ) -> SupervisedSubscription:
+        """
+        Starts supervising the subscription, unless the device already has a subscription of the same name.
+
+        Args:
+            name (str): Name of the subscription e.g. "config".
+            thread_name (str): Name of the thread running the subscription.
+            run (Callable): Subscribes and handles the stream, see SupervisedSubscription.
+            cancel (Callable, optional): Cancels the stream, see SupervisedSubscription.
+
+        Returns:
+            SupervisedSubscription: The supervised subscription.
+
+        Raises:
+            Exception: If the handle is cancelled.
+        """
+        return self.add(SupervisedSubscription(self.device_ip, name, thread_name, run, cancel))
+
+    def add(self, subscription: SupervisedSubscription) -> SupervisedSubscription:
+        """
+        Starts the subscription, unless the device already has a subscription of the same name.
+
+        Args:
+            subscription (SupervisedSubscription): The subscription, not started yet.
+
+        Returns:
+            SupervisedSubscription: The supervised subscription.
+
+        Raises:
+            Exception: If the handle is cancelled.
+        """
+        with self._lock:
+            if self._cancelled:
+                raise Exception(f"Subscriptions of {self.device_ip} are cancelled.")
+            if existing := self._subscriptions.get(subscription.name):
+                return existing
+            self._subscriptions[subscription.name] = subscription
+        return subscription.start()
+
+    def get(self, name: str) -> Optional[SupervisedSubscription]:
+        with self._lock:
+            return self._subscriptions.get(name)
+
+    def get_subscriptions(self) -> List[SupervisedSubscription]:
+        with self._lock:
+            return list(self._subscriptions.values())
+
+    def cancel(self):
+        """
+        Cancels all the subscriptions of the device without waiting for their threads to end.
+        """
+        with self._lock:
+            self._cancelled = True
+        for subscription in self.get_subscriptions():
+            _logger.info("Stopping subscription %s of %s", subscription.name, self.device_ip)
+            subscription.cancel()
+
+    def join(self, timeout: float = None) -> bool:
+        """
+        Waits for the threads of the cancelled subscriptions to end.
+
+        Args:
+            timeout (float, optional): Max. time in seconds to wait for all the threads. Defaults to no timeout.
+
+        Returns:
+            bool: True if all the threads ended, False on timeout.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for subscription in self.get_subscriptions():
+            if not subscription.join(
+                None if deadline is None else max(deadline - time.monotonic(), 0)
+            ):
+                _logger.error(
+                    "Subscription %s of %s not stopped within %s seconds.",
+                    subscription.name,
+                    self.device_ip,
+                    timeout,
+                )
+                return False
+        return True
+
+
+"""
+dictionary to store the subscription handles.
+    Key: device_ip
+    Value: SubscriptionHandle
+"""
+_handles: Dict[str, SubscriptionHandle] = {}
+_handles_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    ## The subscription threads do not exist in a forked child process.
+    global _handles_lock
+    _handles.clear()
+    _handles_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_subscription_handle(device_ip: str) -> SubscriptionHandle:
+    """
+    Returns the handle of the subscriptions of the device, created if the device has none.
+
+    Args:
+        device_ip (str): The IP address of the device.
+    """
+    with _handles_lock:
+        if (handle := _handles.get(device_ip)) is None:
+            handle = _handles[device_ip] = SubscriptionHandle(device_ip)
+        return handle
+
+
+def pop_subscription_handle(device_ip: str) -> Optional[SubscriptionHandle]:
+    """
+    Removes the handle of the subscriptions of the device, to be cancelled by the caller.
+    Subscriptions registered afterwards get a new handle.
+
+    Args:
+        device_ip (str): The IP address of the device.
+    """
+    with _handles_lock:
+        return _handles.pop(device_ip, None)
+
+
+def register_subscription(
+    device_ip: str,
+    name: str,
+    thread_name: str,
+    run: Callable[[], None],
+    cancel: Callable[[], None] = None,
+) -> SupervisedSubscription:
+    """
+    Starts supervising the subscription, unless the device already has a subscription of the same name.
+    See SubscriptionHandle.register.
+    """
+    return get_subscription_handle(device_ip).register(name, thread_name, run, cancel)
+
+
+def unregister_subscription(device_ip: str, timeout: float = None) -> bool:
+    """
+    Cancels the subscriptions of the device and waits for their threads to end.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        timeout (float, optional): Max. time in seconds to wait. Defaults to no timeout.
+
+    Returns:
+        bool: True if the subscriptions are stopped, False on timeout.
+    """
+    if handle := pop_subscription_handle(device_ip):
+        handle.cancel()
+        return handle.join(timeout)
+    return True
+
+
+def get_subscription(device_ip: str, name: str) -> Optional[SupervisedSubscription]:
+    with _handles_lock:
+        handle = _handles.get(device_ip)
+    return handle.get(name) if handle else None
+
+
+def set_subscription_state(device_ip: str, name: str, state: str):
+    """
+    Reports the progress of a subscription stream, ignored if the subscription is not supervised.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        name (str): Name of the subscription.
+        state (str): SYNCING or LIVE.
+    """
+    subscription = getattr(_current, "subscription", None)
+    if not subscription or (subscription.device_ip, subscription.name) != (device_ip, name):
+        subscription = get_subscription(device_ip, name)
+    if subscription:
+        subscription.set_state(state)
+
+
+def set_subscription_stream(device_ip: str, name: str, stream) -> bool:
+    """
+    Hands the stream created by the current thread over to the subscription it runs,
+    see SupervisedSubscription. Unlike set_subscription_state, the subscription is never looked up by device,
+    so that the stream of a subscription still stopping is not taken for the one of its successor.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        name (str): Name of the subscription.
+        stream: The subscription call.
+
+    Returns:
+        bool: False if the current thread does not run the subscription, i.e. the stream is not supervised.
+    """
+    subscription = getattr(_current, "subscription", None)
+    if not subscription or (subscription.device_ip, subscription.name) != (device_ip, name):
+        return False
+    subscription.set_stream(stream)
+    return True
+
+
+def get_subscription_states(device_ip: str = None) -> List[dict]:
+    """
+    Returns the states of the supervised subscriptions.
+
+    Args:
+        device_ip (str, optional): The IP address of the device. Defaults to all devices.
+
+    Returns:
+        List[dict]: The states having keys device_ip, name, state (connecting, syncing, live or backoff),
+            since (time of the last state change), attempts (failed attempts since the stream was last live),
+            restarts, last_error and next_attempt_at (time of the next attempt when in backoff).
+    """
+    with _handles_lock:
+        handles = [h for ip, h in _handles.items() if device_ip is None or ip == device_ip]
+    return [s.get_state() for h in handles for s in h.get_subscriptions()]
@@ -0,0 +1,308 @@
+""" Bounded per-device queues between the telemetry subscriptions and the telemetry DB writers """
+
+import os
+import threading
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Hashable, Optional, Set
+
+from .gnmi_pb2 import SubscribeResponse
+from .utils import (
+    get_logging,
+    get_telemetry_overflow_policy,
+    get_telemetry_queue_size,
+    get_telemetry_workers,
+)
+
+_logger = get_logging().getLogger(__name__)
+
+## Overflow policies of the telemetry queues.
+DROP_OLDEST = "drop_oldest"
+COALESCE = "coalesce"
+
+
+def coalesce_responses(old: SubscribeResponse, new: SubscribeResponse) -> SubscribeResponse:
+    """
+    Merges two counter samples of the same interface, keeping the latest value of every leaf.
+
+    Args:
+        old (SubscribeResponse): The earlier sample.
+        new (SubscribeResponse): The later sample.
+
+    Returns:
+        SubscribeResponse: The new sample having the leaves of the old one it did not update.
+    """
+    leaves = {u.path.SerializeToString(deterministic=True): u for u in old.update.update}
+    for u in new.update.update:
+        leaves[u.path.SerializeToString(deterministic=True)] = u
+    merged = SubscribeResponse()
+    merged.CopyFrom(new)
+    del merged.update.update[:]
+    merged.update.update.extend(leaves.values())
+    return merged
+
+
+class DeviceTelemetryQueue:
+    """
+    Bounded queue of the telemetry samples of a device, putting never blocks.
+    When the queue is full the oldest sample is dropped. With the policy "coalesce", a sample of an interface
+    already having a sample in the queue is merged into it instead, i.e. only the latest counters are written.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        size (int): Max. number of samples in the queue.
+        policy (str): DROP_OLDEST or COALESCE.
+    """
+
+    def __init__(self, device_ip: str, size: int, policy: str):
+        if policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError(f"Invalid telemetry overflow policy {policy}")
+        self.device_ip = device_ip
+        self.size = max(1, size)
+        self.policy = policy
+        self._samples: OrderedDict = OrderedDict()
+        self._sequence = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.written = 0
+        self.failed = 0
+
+    def __len__(self):
+        return len(self._samples)
+
+    def put(self, key: Hashable, handler: Callable, resp: SubscribeResponse) -> bool:
+        """
+        Queues the sample.
+
+        Args:
+            key (Hashable): Key of the sample e.g. the interface name.
+            handler (Callable): Writes the sample, called with the device IP and the sample.
+            resp (SubscribeResponse): The sample.
+
+        Returns:
+            bool: False if a sample was dropped to make room, else True.
+        """
+        if self.policy == COALESCE:
+            key = (handler, key)
+            if queued := self._samples.get(key):
+                self._samples[key] = (handler, coalesce_responses(queued[1], resp))
+                self.coalesced += 1
+                return True
+        else:
+            key = self._sequence
+            self._sequence += 1
+        dropped = len(self._samples) >= self.size
+        if dropped:
+            self._samples.popitem(last=False)
+            self.dropped += 1
+        self._samples[key] = (handler, resp)
+        return not dropped
+
+    def pop(self) -> Optional[tuple]:
+        """
+        Returns the oldest (handler, sample), None if the queue is empty.
+        """
+        return self._samples.popitem(last=False)[1] if self._samples else None
+
+    def get_stats(self) -> dict:
+        return {
+            "depth": len(self._samples),
+            "dropped": self.dropped,
+            "coalesced": self.coalesced,
+            "written": self.written,
+            "failed": self.failed,
+        }
+
+
+class TelemetrySink:
+    """
+    Writes the telemetry samples of the devices to the telemetry DB on a fixed number of writer threads,
+    taking turns between the devices having samples queued. The samples of a device are written by one thread
+    at a time in the order they were queued, so that an older sample never overwrites a newer one.
+
+    The samples are queued in a bounded queue per device, see DeviceTelemetryQueue, so that when the telemetry DB is
+    slow or down, samples are dropped or coalesced instead of piling up in memory or blocking the subscriptions.
+
+    Args:
+        workers (int, optional): Number of writer threads. Defaults to telemetry_workers from config.
+        queue_size (int, optional): Max. number of samples queued per device. Defaults to telemetry_queue_size from config.
+        policy (str, optional): Overflow policy, "drop_oldest" or "coalesce".
+            Defaults to telemetry_overflow_policy from config.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = None, policy: str = None):
+        self.workers = max(1, workers or get_telemetry_workers())
+        self.queue_size = queue_size or get_telemetry_queue_size()
+        self.policy = policy or get_telemetry_overflow_policy()
+        if self.policy not in (DROP_OLDEST, COALESCE):
+            raise ValueError(f"Invalid telemetry overflow policy {self.policy}")
+        self._queues: Dict[str, DeviceTelemetryQueue] = {}
+        ## Devices having samples queued and none being written, in the order they are served.
+        self._ready = deque()
+        ## Devices a sample is being written of, these are added to _ready again once written.
+        self._writing: Set[str] = set()
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._threads = []
+        self._stopped = False
+
+    def _start(self):
+        with self._lock:
+            if self._threads or self._stopped:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"orca_telemetry_writer_{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def put(self, device_ip: str, key: Hashable, handler: Callable, resp: SubscribeResponse):
+        """
+        Queues the sample to be written by handler, never blocks.
+
+        Args:
+            device_ip (str): The IP address of the device the sample was received from.
+            key (Hashable): Key of the sample e.g. the interface name, samples of the same key are coalesced.
+            handler (Callable): Writes the sample, called with the device IP and the sample.
+            resp (SubscribeResponse): The sample.
+        """
+        if not self._threads:
+            self._start()
+        with self._lock:
+            if (q := self._queues.get(device_ip)) is None:
+                q = self._queues[device_ip] = DeviceTelemetryQueue(
+                    device_ip, self.queue_size, self.policy
+                )
+            was_empty = not q
+            if not q.put(key, handler, resp) and (q.dropped == 1 or q.dropped % 1000 == 0):
+                _logger.warning(
+                    "Telemetry queue of %s is full, dropped %s samples so far.", device_ip, q.dropped
+                )
+            if was_empty and q and device_ip not in self._writing:
+                self._ready.append(device_ip)
+                self._changed.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                while not self._ready and not self._stopped:
+                    self._changed.wait()
+                if not self._ready:
+                    return
+                device_ip = self._ready.popleft()
+                q = self._queues[device_ip]
+                handler, resp = q.pop()
+                self._writing.add(device_ip)
+            failed = False
+            try:
+                handler(device_ip, resp)
+            except Exception as e:
+                failed = True
+                _logger.error("Failed to write telemetry of %s: %s", device_ip, e)
+            with self._lock:
+                q.failed += failed
+                q.written += not failed
+                self._writing.discard(device_ip)
+                if q:
+                    self._ready.append(device_ip)
+                self._changed.notify_all()
+
+    def wait_idle(self, device_ip: str = None, timeout: float = None) -> bool:
+        """
+        Waits until the queued samples are written.
+
+        Args:
+            device_ip (str, optional): Only wait for the samples of this device. Defaults to all devices.
+            timeout (float, optional): Max. time to wait in seconds. Defaults to no timeout.
+
+        Returns:
+            bool: True if the samples are written, False on timeout.
+        """
+
+        def _idle():
+            if device_ip:
+                return not self._queues.get(device_ip) and device_ip not in self._writing
+            return not self._ready and not self._writing
+
+        with self._lock:
+            return self._changed.wait_for(_idle, timeout)
+
+    def get_stats(self, device_ip: str = None) -> dict:
+        """
+        Returns the queue depth and the counts of the samples per device.
+
+        Args:
+            device_ip (str, optional): The IP address of the device. Defaults to all devices.
+
+        Returns:
+            dict: With keys workers, queue_size, policy and devices, the latter having per device IP -
+                depth: Number of samples queued.
+                dropped: Number of samples dropped because the queue was full.
+                coalesced: Number of samples merged into a queued sample.
+                written, failed: Number of samples written so far.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "policy": self.policy,
+                "devices": {
+                    ip: q.get_stats()
+                    for ip, q in self._queues.items()
+                    if device_ip is None or ip == device_ip
+                },
+            }
+
+    def stop(self, timeout: float = None):
+        """
+        Stops the writer threads once the queued samples are written.
+
+        Args:
+            timeout (float, optional): Max. time to wait per writer in seconds. Defaults to no timeout.
+        """
+        with self._lock:
+            self._stopped = True
+            threads, self._threads = self._threads, []
+            self._changed.notify_all()
+        for thread in threads:
+            thread.join(timeout)
+
+
+_sink: Optional[TelemetrySink] = None
+_sink_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    ## The writer threads do not exist in a forked child process.
+    global _sink, _sink_lock
+    _sink = None
+    _sink_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_telemetry_sink() -> TelemetrySink:
+    """
+    Returns the sink shared by the telemetry subscriptions of all the devices, created on first use.
+    """
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            _sink = TelemetrySink()
+        return _sink
+
+
+def reset_telemetry_sink(timeout: float = None):
+    """
+    Stops the shared sink, a new one is created as per the config on next use.
+
+    Args:
+        timeout (float, optional): Max. time to wait per writer in seconds. Defaults to no timeout.
+    """
+    global _sink
+    with _sink_lock:
+        sink, _sink = _sink, None
+    if sink:
+        sink.stop(timeout)
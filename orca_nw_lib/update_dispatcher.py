@@ -0,0 +1,221 @@
+""" Bounded pool of threads handling the updates received on the gNMI subscriptions """
+
+import asyncio
+import os
+import queue
+import threading
+from typing import Callable, Dict, Hashable, List, Optional
+
+from .utils import get_logging, get_subscription_queue_size, get_subscription_workers
+
+_logger = get_logging().getLogger(__name__)
+
+_stop = object()
+
+
+class UpdateDispatcher:
+    """
+    Runs the handlers of the subscription updates on a fixed number of worker threads, each having a bounded queue.
+
+    Updates are assigned to a worker by device and key e.g. the interface name, so that the updates having
+    the same key are handled one after the other in the order they were received, while updates of different keys
+    are handled in parallel. When the queue of a worker is full, dispatching blocks until there is room,
+    i.e. the reading of the subscription is slowed down to the pace of the handlers.
+
+    Args:
+        workers (int, optional): Number of worker threads. Defaults to subscription_workers from config.
+        queue_size (int, optional): Max. number of updates waiting per worker.
+            Defaults to subscription_queue_size from config.
+    """
+
+    def __init__(self, workers: int = None, queue_size: int = None):
+        self.workers = max(1, workers or get_subscription_workers())
+        self.queue_size = queue_size if queue_size is not None else get_subscription_queue_size()
+        self._queues: List[queue.Queue] = [
+            queue.Queue(maxsize=self.queue_size) for _ in range(self.workers)
+        ]
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+        ## Updates dispatched but not handled yet per device.
+        self._pending: Dict[str, int] = {}
+        self._dispatched = 0
+        self._handled = 0
+        self._failed = 0
+        self._max_queue_depth = 0
+
+    def _start(self):
+        with self._lock:
+            if self._threads:
+                return
+            for i, q in enumerate(self._queues):
+                thread = threading.Thread(
+                    target=self._run, args=(q,), name=f"orca_update_worker_{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self, q: queue.Queue):
+        while True:
+            item = q.get()
+            if item is _stop:
+                return
+            device_ip, handler, args = item
+            failed = False
+            try:
+                handler(*args)
+            except Exception as e:
+                failed = True
+                _logger.error(
+                    "Failed to handle subscription update of %s with %s: %s",
+                    device_ip,
+                    getattr(handler, "__name__", handler),
+                    e,
+                )
+            with self._lock:
+                self._handled += 1
+                self._failed += failed
+                if (pending := self._pending[device_ip] - 1) > 0:
+                    self._pending[device_ip] = pending
+                else:
+                    del self._pending[device_ip]
+                    self._idle.notify_all()
+
+    def dispatch(self, device_ip: str, key: Hashable, handler: Callable, *args):
+        """
+        Queues the handler to be called with args by the worker of the device and key.
+
+        Args:
+            device_ip (str): The IP address of the device the update was received from.
+            key (Hashable): Updates having the same device and key are handled in the order they were dispatched.
+            handler (Callable): The update handler.
+            args: Arguments of the handler.
+        """
+        q = self._get_queue(device_ip, key)
+        q.put((device_ip, handler, args))
+        self._record_queue_depth(q)
+
+    async def dispatch_async(self, device_ip: str, key: Hashable, handler: Callable, *args):
+        """
+        Like dispatch, for the subscriptions read on an asyncio event loop. When the queue of the worker is full,
+        only the calling task waits for room, while the event loop keeps running the other subscriptions.
+        """
+        q = self._get_queue(device_ip, key)
+        delay = 0.001
+        while True:
+            try:
+                q.put_nowait((device_ip, handler, args))
+                break
+            except queue.Full:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 0.1)
+        self._record_queue_depth(q)
+
+    def _get_queue(self, device_ip: str, key: Hashable) -> queue.Queue:
+        if not self._threads:
+            self._start()
+        with self._lock:
+            self._pending[device_ip] = self._pending.get(device_ip, 0) + 1
+            self._dispatched += 1
+        return self._queues[hash((device_ip, key)) % self.workers]
+
+    def _record_queue_depth(self, q: queue.Queue):
+        depth = q.qsize()
+        with self._lock:
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+
+    def wait_idle(self, device_ip: str = None, timeout: float = None) -> bool:
+        """
+        Waits until all the dispatched updates are handled.
+
+        Args:
+            device_ip (str, optional): Only wait for the updates of this device. Defaults to all devices.
+            timeout (float, optional): Max. time to wait in seconds. Defaults to no timeout.
+
+        Returns:
+            bool: True if the updates are handled, False on timeout.
+        """
+        with self._lock:
+            return self._idle.wait_for(
+                lambda: not (self._pending.get(device_ip) if device_ip else self._pending),
+                timeout,
+            )
+
+    def get_stats(self) -> dict:
+        """
+        Returns the queue depths and the counts of the updates.
+
+        Returns:
+            dict: With keys -
+                workers: Number of worker threads.
+                queue_size: Max. number of updates waiting per worker.
+                queue_depths: Number of updates waiting per worker.
+                max_queue_depth: Highest number of updates waiting for a worker so far.
+                pending: Number of updates dispatched but not handled yet per device.
+                dispatched, handled, failed: Number of updates so far.
+        """
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "queue_depths": [q.qsize() for q in self._queues],
+                "max_queue_depth": self._max_queue_depth,
+                "pending": dict(self._pending),
+                "dispatched": self._dispatched,
+                "handled": self._handled,
+                "failed": self._failed,
+            }
+
+    def stop(self, timeout: float = None):
+        """
+        Stops the worker threads once the updates already dispatched are handled.
+
+        Args:
+            timeout (float, optional): Max. time to wait per worker in seconds. Defaults to no timeout.
+        """
+        with self._lock:
+            threads, self._threads = self._threads, []
+        for q in self._queues[: len(threads)]:
+            q.put(_stop)
+        for thread in threads:
+            thread.join(timeout)
+
+
+_dispatcher: Optional[UpdateDispatcher] = None
+_dispatcher_lock = threading.Lock()
+
+
+def _reset_after_fork():
+    ## The worker threads do not exist in a forked child process.
+    global _dispatcher, _dispatcher_lock
+    _dispatcher = None
+    _dispatcher_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_update_dispatcher() -> UpdateDispatcher:
+    """
+    Returns the dispatcher shared by the subscriptions of all the devices, created on first use.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = UpdateDispatcher()
+        return _dispatcher
+
+
+def reset_update_dispatcher(timeout: float = None):
+    """
+    Stops the shared dispatcher, a new one is created as per the config on next use.
+
+    Args:
+        timeout (float, optional): Max. time to wait per worker in seconds. Defaults to no timeout.
+    """
+    global _dispatcher
+    with _dispatcher_lock:
+        dispatcher, _dispatcher = _dispatcher, None
+    if dispatcher:
+        dispatcher.stop(timeout)
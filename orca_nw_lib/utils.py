@@ -5,6 +5,8 @@ import re
 import ipaddress
 import logging.config
 import logging
+import random
+from neo4j.exceptions import TransientError
 from neomodel import config, db, clear_neo4j_database
 import yaml
 from . import constants as const
@@ -27,7 +29,12 @@ def init_db_connection():
 
 
 def clean_db():
+    ## fingerprint imports utils, hence imported here.
+    from .fingerprint import clear_fingerprints
+
     clear_neo4j_database(db)
+    ## Rediscovery must write all the devices to DB again.
+    clear_fingerprints()
 
 
 def get_networks():
@@ -54,6 +61,269 @@ def get_ping_timeout():
     )
 
 
+def get_grpc_keepalive_time_ms():
+    return int(
+        os.environ.get(
+            const.grpc_keepalive_time_ms,
+            _settings.get(const.grpc_keepalive_time_ms, 300000),
+        )
+    )
+
+
+def get_grpc_keepalive_timeout_ms():
+    return int(
+        os.environ.get(
+            const.grpc_keepalive_timeout_ms,
+            _settings.get(const.grpc_keepalive_timeout_ms, 10000),
+        )
+    )
+
+
+def get_grpc_keepalive_permit_without_calls():
+    return str(
+        os.environ.get(
+            const.grpc_keepalive_permit_without_calls,
+            _settings.get(const.grpc_keepalive_permit_without_calls, False),
+        )
+    ).lower() in ("true", "1", "yes")
+
+
+def get_grpc_max_channels():
+    return int(
+        os.environ.get(
+            const.grpc_max_channels, _settings.get(const.grpc_max_channels, 512)
+        )
+    )
+
+
+def get_grpc_channel_idle_timeout():
+    return int(
+        os.environ.get(
+            const.grpc_channel_idle_timeout,
+            _settings.get(const.grpc_channel_idle_timeout, 600),
+        )
+    )
+
+
+def get_grpc_retry_max_attempts():
+    return int(
+        os.environ.get(
+            const.grpc_retry_max_attempts,
+            _settings.get(const.grpc_retry_max_attempts, 2),
+        )
+    )
+
+
+def get_grpc_retry_backoff():
+    return float(
+        os.environ.get(
+            const.grpc_retry_backoff, _settings.get(const.grpc_retry_backoff, 0.5)
+        )
+    )
+
+
+def get_grpc_retry_backoff_max():
+    return float(
+        os.environ.get(
+            const.grpc_retry_backoff_max,
+            _settings.get(const.grpc_retry_backoff_max, 10),
+        )
+    )
+
+
+def get_grpc_retry_codes():
+    return (
+        codes.split(",")
+        if (codes := os.environ.get(const.grpc_retry_codes))
+        else _settings.get(const.grpc_retry_codes, ["UNAVAILABLE"])
+    )
+
+
+def get_grpc_circuit_breaker_threshold():
+    return int(
+        os.environ.get(
+            const.grpc_circuit_breaker_threshold,
+            _settings.get(const.grpc_circuit_breaker_threshold, 5),
+        )
+    )
+
+
+def get_grpc_circuit_breaker_cooldown():
+    return float(
+        os.environ.get(
+            const.grpc_circuit_breaker_cooldown,
+            _settings.get(const.grpc_circuit_breaker_cooldown, 30),
+        )
+    )
+
+
+def get_neo4j_retry_max_attempts():
+    return int(
+        os.environ.get(
+            const.neo4j_retry_max_attempts,
+            _settings.get(const.neo4j_retry_max_attempts, 5),
+        )
+    )
+
+
+def get_neo4j_retry_backoff():
+    return float(
+        os.environ.get(
+            const.neo4j_retry_backoff, _settings.get(const.neo4j_retry_backoff, 0.1)
+        )
+    )
+
+
+def get_neo4j_retry_backoff_max():
+    return float(
+        os.environ.get(
+            const.neo4j_retry_backoff_max,
+            _settings.get(const.neo4j_retry_backoff_max, 5),
+        )
+    )
+
+
+def get_discovery_max_workers():
+    return int(
+        os.environ.get(
+            const.discovery_max_workers,
+            _settings.get(const.discovery_max_workers, 32),
+        )
+    )
+
+
+def get_discovery_sweep_concurrency():
+    return int(
+        os.environ.get(
+            const.discovery_sweep_concurrency,
+            _settings.get(const.discovery_sweep_concurrency, 256),
+        )
+    )
+
+
+def get_subscription_sync_timeout():
+    return int(
+        os.environ.get(
+            const.subscription_sync_timeout,
+            _settings.get(const.subscription_sync_timeout, 10),
+        )
+    )
+
+
+def get_gnmi_subscription_wildcards():
+    return str(
+        os.environ.get(
+            const.gnmi_subscription_wildcards,
+            _settings.get(const.gnmi_subscription_wildcards, True),
+        )
+    ).lower() in ("true", "1", "yes")
+
+
+def get_subscription_workers():
+    return int(
+        os.environ.get(
+            const.subscription_workers,
+            _settings.get(const.subscription_workers, 8),
+        )
+    )
+
+
+def get_subscription_queue_size():
+    return int(
+        os.environ.get(
+            const.subscription_queue_size,
+            _settings.get(const.subscription_queue_size, 1000),
+        )
+    )
+
+
+def get_subscription_engine():
+    """
+    Returns the engine reading the gNMI subscriptions, "threads" or "asyncio".
+    """
+    return str(
+        os.environ.get(
+            const.subscription_engine, _settings.get(const.subscription_engine, "threads")
+        )
+    ).lower()
+
+
+def get_subscription_shards():
+    return int(
+        os.environ.get(
+            const.subscription_shards, _settings.get(const.subscription_shards, 0)
+        )
+    )
+
+
+def get_telemetry_queue_size():
+    return int(
+        os.environ.get(
+            const.telemetry_queue_size, _settings.get(const.telemetry_queue_size, 1000)
+        )
+    )
+
+
+def get_telemetry_overflow_policy():
+    """
+    Returns the overflow policy of the telemetry queues, "drop_oldest" or "coalesce".
+    """
+    return str(
+        os.environ.get(
+            const.telemetry_overflow_policy,
+            _settings.get(const.telemetry_overflow_policy, "coalesce"),
+        )
+    ).lower()
+
+
+def get_telemetry_workers():
+    return int(
+        os.environ.get(const.telemetry_workers, _settings.get(const.telemetry_workers, 4))
+    )
+
+
+def get_subscription_retry_backoff():
+    return float(
+        os.environ.get(
+            const.subscription_retry_backoff,
+            _settings.get(const.subscription_retry_backoff, 1),
+        )
+    )
+
+
+def get_subscription_retry_backoff_max():
+    return float(
+        os.environ.get(
+            const.subscription_retry_backoff_max,
+            _settings.get(const.subscription_retry_backoff_max, 60),
+        )
+    )
+
+
+def get_gnmi_cassette_mode():
+    return (
+        os.environ.get(
+            const.gnmi_cassette_mode, _settings.get(const.gnmi_cassette_mode)
+        )
+        or ""
+    ).lower()
+
+
+def get_gnmi_cassette_dir():
+    return os.environ.get(
+        const.gnmi_cassette_dir, _settings.get(const.gnmi_cassette_dir, "gnmi_cassettes")
+    )
+
+
+def get_gnmi_cassette_speedup():
+    return float(
+        os.environ.get(
+            const.gnmi_cassette_speedup,
+            _settings.get(const.gnmi_cassette_speedup, 0),
+        )
+    )
+
+
 def get_device_password():
     return os.environ.get(const.device_password, _settings.get(const.device_password))
 
@@ -133,11 +403,57 @@ def get_logging(logging_config_file: str = default_logging_config):
 
 import socket
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 _logger = get_logging().getLogger(__name__)
 
 
+def call_with_neo4j_retry(func, *args, **kwargs):
+    """
+    Calls func, retried with exponential backoff while Neo4j fails it with a transient error,
+    e.g. a deadlock between discoveries of different devices writing to the same nodes.
+
+    Args:
+        func (Callable): The function writing to DB, must be safe to be called again.
+        args: Positional arguments of func.
+        kwargs: Keyword arguments of func.
+
+    Returns:
+        The return value of func.
+
+    Raises:
+        TransientError: If the last attempt fails with a transient error.
+    """
+    max_attempts = max(1, get_neo4j_retry_max_attempts())
+    for attempt in range(max_attempts):
+        try:
+            return func(*args, **kwargs)
+        except TransientError as e:
+            if attempt + 1 >= max_attempts:
+                raise
+            delay = random.uniform(
+                0, min(get_neo4j_retry_backoff_max(), get_neo4j_retry_backoff() * 2**attempt)
+            )
+            _logger.warning(
+                "Transient Neo4j error, retrying in %.2f seconds (attempt %s of %s): %s",
+                delay,
+                attempt + 1,
+                max_attempts,
+                e,
+            )
+            time.sleep(delay)
+
+
+def _has_cassette(host) -> bool:
+    ## In gnmi_cassette_mode "replay" the devices having a recording are reachable, without being probed.
+    from .gnmi_cassette import get_cassette_file
+
+    return os.path.isfile(get_cassette_file(str(host)))
+
+
 def is_grpc_device_listening(host, max_retries=1, interval=1):
+    if get_gnmi_cassette_mode() == "replay":
+        return _has_cassette(host)
     retry = 0
     status = False
     port = get_device_grpc_port()
@@ -159,6 +475,46 @@ def is_grpc_device_listening(host, max_retries=1, interval=1):
     return status
 
 
+def sweep_grpc_devices(hosts: list, concurrency: int = None):
+    """
+    Probes the gNMI port of many hosts concurrently with a single TCP connect each.
+    In gnmi_cassette_mode "replay" the hosts having a recording are reachable instead.
+
+    Args:
+        hosts (list): The IP addresses of the hosts to probe.
+        concurrency (int, optional): Max. number of hosts probed in parallel.
+            Defaults to discovery_sweep_concurrency from config.
+
+    Returns:
+        Tuple[list, list]: The reachable and the unreachable hosts, in the order of hosts.
+    """
+    port = get_device_grpc_port()
+    timeout = get_ping_timeout()
+
+    def _probe(host):
+        if get_gnmi_cassette_mode() == "replay":
+            return _has_cassette(host)
+        try:
+            with socket.create_connection((host, port), timeout=timeout):
+                return True
+        except OSError as e:
+            _logger.debug("Failed to connect to %s on port %s: %s", host, port, e)
+            return False
+
+    hosts = [str(host) for host in hosts]
+    if not hosts:
+        return [], []
+    with ThreadPoolExecutor(
+        max_workers=min(concurrency or get_discovery_sweep_concurrency(), len(hosts)),
+        thread_name_prefix="sweep",
+    ) as executor:
+        status = list(executor.map(_probe, hosts))
+    return (
+        [host for host, up in zip(hosts, status) if up],
+        [host for host, up in zip(hosts, status) if not up],
+    )
+
+
 def validate_and_get_ip_prefix(network_address: str):
     """
     Validates and extracts the IP prefix from a given network address.
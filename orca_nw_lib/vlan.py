@@ -1,6 +1,7 @@
 from orca_nw_lib.vlan_gnmi import get_vlan_details_from_device
 
-from .common import IFMode, VlanAutoState
+from .common import DiscoveryFeature, IFMode, VlanAutoState
+from .fingerprint import discover_if_changed
 
 from .device_db import get_device_db_obj
 from .stp_vlan import discover_stp_vlan
@@ -13,7 +14,7 @@ from .vlan_db import (
 from .vlan_gnmi import (
     config_vlan_on_device,
     del_vlan_from_device,
-    get_vlan_ip_details_from_device,
+    get_vlans_ip_details_from_device,
     remove_anycast_addr_from_vlan_on_device,
     remove_ip_from_vlan_on_device,
     add_vlan_members_on_device,
@@ -43,9 +44,13 @@ def _create_vlan_db_obj(device_ip: str, vlan_name: str = None):
 
     vlan_details = get_vlan_details_from_device(device_ip, vlan_name)
     vlans = []
-    for vlan in vlan_details.get("sonic-vlan:VLAN_LIST") or []:
+    vlan_list = vlan_details.get("sonic-vlan:VLAN_LIST") or []
+    vlans_ip_details = get_vlans_ip_details_from_device(
+        device_ip, [vlan.get("name") for vlan in vlan_list]
+    ) if vlan_list else {}
+    for vlan in vlan_list:
         v_name = vlan.get("name")
-        ip_details = get_vlan_ip_details_from_device(device_ip, v_name).get(
+        ip_details = vlans_ip_details.get(v_name, {}).get(
             "openconfig-if-ip:ipv4", {}
         )
         ipv4_addresses = ip_details.get("addresses", {}).get("address", [])
@@ -317,7 +322,12 @@ def discover_vlan(device_ip: str = None):
     for device in devices or []:
         try:
             _logger.info(f"Discovering VLAN on device {device}.")
-            insert_vlan_in_db(device, _create_vlan_db_obj(device.mgt_ip))
+            discover_if_changed(
+                device.mgt_ip,
+                DiscoveryFeature.vlan,
+                lambda: _create_vlan_db_obj(device.mgt_ip),
+                lambda vlans: insert_vlan_in_db(device, vlans),
+            )
         except Exception as e:
             _logger.error(f"VLAN Discovery Failed on device {device_ip}, Reason: {e}")
             raise
@@ -4,6 +4,7 @@ from orca_nw_lib.port_chnl_db import get_port_chnl_of_device_from_db
 from .device_db import get_device_db_obj
 from .graph_db_models import Device, Vlan
 from .interface_db import get_interface_of_device_from_db
+from .fingerprint import save_if_changed
 
 
 def del_vlan_from_db(device_ip, vlan_name: str = None):
@@ -120,8 +121,7 @@ def insert_vlan_in_db(device: Device, vlans_obj_vs_mem):
     for vlan, members in vlans_obj_vs_mem.items() or []:
         if v := get_vlan_obj_from_db(device.mgt_ip, vlan.name):
             # update existing vlan if already exists.
-            copy_vlan_obj_prop(v, vlan)
-            v.save()
+            save_if_changed(v, copy_vlan_obj_prop, vlan)
             device.vlans.connect(v)
         else:
             # Create a new vlan in database.
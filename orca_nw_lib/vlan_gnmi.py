@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, List
 from orca_nw_lib.common import IFMode, VlanAutoState
 from orca_nw_lib.gnmi_pb2 import Path, PathElem
 from orca_nw_lib.gnmi_util import (
@@ -6,8 +6,10 @@ from orca_nw_lib.gnmi_util import (
     create_req_for_update,
     get_gnmi_del_req,
     send_gnmi_get,
+    send_gnmi_get_batch,
     send_gnmi_set,
     get_gnmi_path,
+    get_gnmi_path_str,
 )
 from orca_nw_lib.interface_gnmi import get_if_vlan_gnmi_update_req
 from orca_nw_lib.port_chnl_gnmi import get_port_channel_vlan_gnmi_update_req
@@ -140,17 +142,47 @@ def get_vlan_details_from_device(device_ip: str, vlan_name: str = None):
     )
 
 
+def get_vlan_ip_details_path(vlan_name: str) -> Path:
+    """
+    Returns the path for the IPv4 details of a VLAN.
+
+    Args:
+        vlan_name (str): The name of the VLAN.
+
+    Returns:
+        Path: The path for the IPv4 details of the VLAN.
+    """
+    return get_gnmi_path(
+        f"/openconfig-interfaces:interfaces/interface[name={vlan_name}]/openconfig-vlan:routed-vlan/openconfig-if-ip:ipv4",
+    )
+
+
 def get_vlan_ip_details_from_device(device_ip: str, vlan_name: str):
     return send_gnmi_get(
         device_ip=device_ip,
-        path=[
-            get_gnmi_path(
-                f"/openconfig-interfaces:interfaces/interface[name={vlan_name}]/openconfig-vlan:routed-vlan/openconfig-if-ip:ipv4",
-            )
-        ],
+        path=[get_vlan_ip_details_path(vlan_name)],
     )
 
 
+def get_vlans_ip_details_from_device(device_ip: str, vlan_names: List[str]) -> Dict[str, dict]:
+    """
+    Retrieves the IPv4 details of many VLANs from a device with a single gNMI Get request.
+
+    Args:
+        device_ip (str): The IP address of the device.
+        vlan_names (List[str]): The names of the VLANs.
+
+    Returns:
+        Dict[str, dict]: The IPv4 details per VLAN name.
+    """
+    paths = {vlan_name: get_vlan_ip_details_path(vlan_name) for vlan_name in vlan_names}
+    result = send_gnmi_get_batch(device_ip=device_ip, path=list(paths.values()))
+    return {
+        vlan_name: result.get(get_gnmi_path_str(path), {})
+        for vlan_name, path in paths.items()
+    }
+
+
 def del_vlan_from_device(device_ip: str, vlan_name: str):
     return send_gnmi_set(
         get_gnmi_del_req(
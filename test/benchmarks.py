@@ -0,0 +1,528 @@
+"""
+Benchmarks of the discovery and the subscription processing against fabrics emulated by the fake SONiC gNMI server.
+
+The results are written as JSON, to compare them across commits e.g.
+
+    python test/benchmarks.py --output before.json
+    python test/benchmarks.py --sizes 1,10 --suites paths,json,subscription --output after.json
+
+Without --db the Neo4j queries return no rows and the telemetry DB writes are replaced by no-ops, so that the
+benchmarks only measure the gNMI requests and the parsing done by orca_nw_lib and run without any DB. The discovery
+and DB insert benchmarks need --db and are skipped otherwise. With --db, the Neo4j configured in orca_nw_lib.yml
+must be running, as importing orca_nw_lib already subscribes to the devices found in it.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from typing import Callable, List
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+if __name__ == "__main__" and "--db" not in sys.argv[1:]:
+    ## Importing orca_nw_lib subscribes to the devices in Neo4j, without --db all queries return no rows instead.
+    from neomodel import db
+
+    mock.patch.object(type(db), "cypher_query", return_value=([], None)).start()
+
+from fake_gnmi_server import FakeFabric, build_device_model
+
+from orca_nw_lib import gnmi_sub, gnmi_util
+from orca_nw_lib.bgp import _create_bgp_graph_objects, _create_bgp_neighbors_graph_objects
+from orca_nw_lib.device import _create_device_graph_object
+from orca_nw_lib.gnmi_metrics import get_rpc_metrics, reset_rpc_metrics
+from orca_nw_lib.gnmi_pb2 import (
+    GetResponse,
+    Notification,
+    Path,
+    PathElem,
+    SubscribeResponse,
+    TypedValue,
+    Update,
+)
+from orca_nw_lib.gnmi_util import (
+    GnmiPathTemplate,
+    close_all_stubs,
+    get_gnmi_path,
+    get_response_to_dict,
+    reset_circuit_breaker,
+)
+from orca_nw_lib.interface import _create_interface_graph_objects
+from orca_nw_lib.lldp_gnmi import get_lldp_nbr_from_device
+from orca_nw_lib.mclag import _create_mclag_gw_mac_obj, _create_mclag_graph_objects
+from orca_nw_lib.port_chnl import _create_port_chnl_graph_object
+from orca_nw_lib.portgroup import _create_port_group_graph_objects
+from orca_nw_lib.stp import _create_stp_graph_object
+from orca_nw_lib.stp_port import _create_stp_port_graph_object
+from orca_nw_lib.stp_vlan import _create_stp_vlan_graph_object
+from orca_nw_lib.telemetry_sink import get_telemetry_sink
+from orca_nw_lib.utils import get_discovery_max_workers
+from orca_nw_lib.vlan import _create_vlan_db_obj
+
+SUITES = ["paths", "json", "subscription", "fetch", "discovery", "db"]
+
+## Graph objects created per device by the discovery, in the order of the discovery.
+FEATURES = {
+    "device": _create_device_graph_object,
+    "interface": _create_interface_graph_objects,
+    "port_group": _create_port_group_graph_objects,
+    "lldp": get_lldp_nbr_from_device,
+    "vlan": _create_vlan_db_obj,
+    "port_chnl": _create_port_chnl_graph_object,
+    "mclag": _create_mclag_graph_objects,
+    "mclag_gw_mac": _create_mclag_gw_mac_obj,
+    "bgp": _create_bgp_graph_objects,
+    "bgp_neighbors": _create_bgp_neighbors_graph_objects,
+    "stp": _create_stp_graph_object,
+    "stp_port": _create_stp_port_graph_object,
+    "stp_vlan": _create_stp_vlan_graph_object,
+}
+
+
+def measure(name: str, func: Callable, repeat: int, items: int = 1, setup: Callable = None, **params) -> dict:
+    """
+    Runs func repeat times and returns the statistics of the durations.
+
+    Args:
+        name (str): Name of the benchmark.
+        func (Callable): The benchmarked function.
+        repeat (int): Number of runs.
+        items (int, optional): Number of items processed by one run, for the throughput. Defaults to 1.
+        setup (Callable, optional): Called before every run, not measured.
+        params: Parameters of the benchmark to be reported.
+
+    Returns:
+        dict: The benchmark result.
+    """
+    durations = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return {
+        "name": name,
+        "params": params,
+        "repeat": repeat,
+        "items": items,
+        "mean_s": statistics.mean(durations),
+        "stdev_s": statistics.stdev(durations) if len(durations) > 1 else 0.0,
+        "min_s": min(durations),
+        "max_s": max(durations),
+        "items_per_s": items / min(durations) if min(durations) else None,
+    }
+
+
+def skipped(name: str, reason: str, **params) -> dict:
+    return {"name": name, "params": params, "skipped": reason}
+
+
+def get_fabric(size: int, port_count: int = None) -> FakeFabric:
+    """
+    Creates a spine-leaf fabric of size devices, with 1 spine per 25 devices and at least 2 spines
+    for fabrics with leaves. Devices have 32 ports unless more are needed to connect the leaves.
+    """
+    spines = 1 if size == 1 else max(2, size // 25)
+    leaves = size - spines
+    if not port_count:
+        port_count = next(p for p in (32, 64, 128, 256) if p >= leaves)
+    return FakeFabric(spines=spines, leaves=leaves, port_count=port_count, vlans_per_leaf=4, port_channels_per_leaf=2)
+
+
+def is_neo4j_available() -> bool:
+    from neomodel import db
+
+    try:
+        db.cypher_query("RETURN 1")
+        return True
+    except Exception:
+        return False
+
+
+def get_rpc_summary() -> dict:
+    metrics = get_rpc_metrics()
+    return {
+        "requests": sum(m["count"] for m in metrics),
+        "errors": sum(c for m in metrics for code, c in m["status_codes"].items() if code != "OK"),
+        "latency_sum_s": sum(m["latency_sum"] for m in metrics),
+        "request_bytes": sum(m["request_bytes"] for m in metrics),
+        "response_bytes": sum(m["response_bytes"] for m in metrics),
+    }
+
+
+class _Counter:
+    """
+    Counts the calls of the wrapped function, to wait for the updates handled in threads.
+    """
+
+    def __init__(self, func: Callable = None):
+        self.func = func
+        self.count = 0
+        self._cond = threading.Condition()
+
+    def __call__(self, *args, **kwargs):
+        try:
+            if self.func:
+                self.func(*args, **kwargs)
+        finally:
+            with self._cond:
+                self.count += 1
+                self._cond.notify_all()
+
+    def reset(self):
+        with self._cond:
+            self.count = 0
+
+    def wait(self, count: int, timeout: float = 300):
+        with self._cond:
+            if not self._cond.wait_for(lambda: self.count >= count, timeout):
+                raise TimeoutError(f"Only {self.count} of {count} updates were handled")
+
+
+def bench_paths(args) -> List[dict]:
+    names = [f"Ethernet{i * 4}" for i in range(args.items)]
+    template = GnmiPathTemplate("openconfig-interfaces:interfaces/interface[name={name}]/config")
+    path = "openconfig-interfaces:interfaces/interface[name={}]/config"
+    return [
+        measure(
+            "get_gnmi_path_uncached",
+            lambda: [get_gnmi_path(path.format(n)) for n in names],
+            args.repeat,
+            len(names),
+            setup=gnmi_util._parse_gnmi_path.cache_clear,
+        ),
+        measure(
+            "get_gnmi_path_cached",
+            lambda: [get_gnmi_path(path.format(n)) for n in names],
+            args.repeat,
+            len(names),
+        ),
+        measure(
+            "gnmi_path_template",
+            lambda: [template.get_path(name=n) for n in names],
+            args.repeat,
+            len(names),
+        ),
+    ]
+
+
+def _parse_responses(resp: GetResponse, count: int):
+    ## The parsed responses are discarded, keeping them all alive would measure the allocator instead.
+    for _ in range(count):
+        get_response_to_dict(resp)
+
+
+def bench_json(args) -> List[dict]:
+    results = []
+    for port_count in (32, 128):
+        ## VLANs have all free ports as members, a fixed number of VLANs keeps the responses linear in the ports.
+        model = build_device_model("127.0.0.1", port_count=port_count, vlans=range(10, 26))
+        for name, value in (
+            ("interfaces", model["openconfig-interfaces:interfaces"]),
+            ("vlans", model["sonic-vlan:sonic-vlan"]),
+        ):
+            resp = GetResponse(
+                notification=[
+                    Notification(
+                        update=[
+                            Update(
+                                path=get_gnmi_path(name),
+                                val=TypedValue(json_ietf_val=json.dumps(value).encode("utf-8")),
+                            )
+                        ]
+                    )
+                ]
+            )
+            results.append(
+                measure(
+                    f"get_response_to_dict_{name}",
+                    lambda: _parse_responses(resp, args.items),
+                    args.repeat,
+                    args.items,
+                    port_count=port_count,
+                    response_bytes=resp.ByteSize(),
+                )
+            )
+    return results
+
+
+def _get_config_updates(count: int) -> List[SubscribeResponse]:
+    return [SubscribeResponse(sync_response=True)] + [
+        SubscribeResponse(
+            update=Notification(
+                timestamp=time.time_ns(),
+                prefix=get_gnmi_path(f"openconfig-interfaces:interfaces/interface[name=Ethernet{i * 4}]/config"),
+                update=[
+                    Update(path=Path(elem=[PathElem(name="mtu")]), val=TypedValue(uint_val=9100)),
+                    Update(path=Path(elem=[PathElem(name="enabled")]), val=TypedValue(bool_val=True)),
+                    Update(path=Path(elem=[PathElem(name="description")]), val=TypedValue(string_val=f"port {i}")),
+                ],
+            )
+        )
+        for i in range(count)
+    ]
+
+
+def _get_counter_updates(count: int) -> List[SubscribeResponse]:
+    counters = ["in-octets", "in-pkts", "in-discards", "in-errors", "out-octets", "out-pkts", "out-discards", "out-errors"]
+    return [SubscribeResponse(sync_response=True)] + [
+        SubscribeResponse(
+            update=Notification(
+                timestamp=time.time_ns(),
+                prefix=get_gnmi_path(f"openconfig-interfaces:interfaces/interface[name=Ethernet{i * 4}]/state/counters"),
+                update=[
+                    Update(path=Path(elem=[PathElem(name=c)]), val=TypedValue(uint_val=i * 1000 + j))
+                    for j, c in enumerate(counters)
+                ],
+            )
+        )
+        for i in range(count)
+    ]
+
+
+def bench_subscription(args) -> List[dict]:
+    device_ip = "127.0.0.1"
+    results = []
+    for name, handler, target, responses, env in (
+        (
+            "handle_update",
+            gnmi_sub.handle_update,
+            "set_interface_config_in_db",
+            _get_config_updates(args.items),
+            {},
+        ),
+        (
+            "handle_telemetry_notification",
+            gnmi_sub.handle_telemetry_notification,
+            "handle_interface_counters_influxdb",
+            _get_counter_updates(args.items),
+            {"telemetry_db": "influxdb"},
+        ),
+    ):
+        counter = _Counter(getattr(gnmi_sub, target) if args.db else None)
+        with ExitStack() as stack:
+            stack.enter_context(mock.patch.dict(os.environ, env))
+            stack.enter_context(mock.patch.object(gnmi_sub, target, counter))
+            stack.enter_context(
+                mock.patch.object(gnmi_sub, "send_gnmi_subscribe", lambda *a, **kw: iter(responses))
+            )
+
+            def _run():
+                handler(device_ip, [])
+                if target == "handle_interface_counters_influxdb":
+                    ## Counter samples are written, coalesced or dropped by the telemetry sink.
+                    get_telemetry_sink().wait_idle(device_ip)
+                else:
+                    counter.wait(len(responses) - 1)
+
+            results.append(
+                measure(name, _run, args.repeat, len(responses) - 1, setup=counter.reset, db=args.db)
+            )
+            if target == "handle_interface_counters_influxdb":
+                results[-1]["telemetry"] = get_telemetry_sink().get_stats(device_ip)["devices"].get(device_ip)
+        gnmi_sub.gnmi_subscriptions.pop(device_ip, None)
+    return results
+
+
+def _fetch_device(device_ip: str):
+    for feature in FEATURES.values():
+        feature(device_ip)
+
+
+def bench_fetch(args, fabric: FakeFabric, size: int) -> dict:
+    """
+    Creates the graph objects of all the features of all the devices, which is the device facing part of the discovery.
+    """
+
+    def _setup():
+        close_all_stubs()
+        reset_rpc_metrics()
+
+    def _run():
+        with ThreadPoolExecutor(max_workers=get_discovery_max_workers()) as executor:
+            list(executor.map(_fetch_device, fabric.device_ips))
+
+    with ExitStack() as stack:
+        if not args.db:
+            stack.enter_context(mock.patch.object(gnmi_util, "is_device_ready", lambda ip: True))
+        result = measure(
+            "discovery_fetch",
+            _run,
+            args.repeat,
+            len(fabric.device_ips),
+            setup=_setup,
+            devices=size,
+            ports=fabric.port_count,
+            db=args.db,
+        )
+    result["rpc"] = get_rpc_summary()
+    return result
+
+
+def bench_discovery(args, fabric: FakeFabric, size: int) -> dict:
+    from orca_nw_lib.discovery import trigger_discovery
+    from orca_nw_lib.utils import clean_db
+
+    def _setup():
+        gnmi_sub.gnmi_unsubscribe_for_all_devices_in_db()
+        close_all_stubs()
+        clean_db()
+        reset_rpc_metrics()
+
+    reports = []
+    result = measure(
+        "trigger_discovery",
+        lambda: reports.append(trigger_discovery(fabric.spine_ips[0])),
+        args.repeat,
+        len(fabric.device_ips),
+        setup=_setup,
+        devices=size,
+        ports=fabric.port_count,
+    )
+    result["rpc"] = get_rpc_summary()
+    result["discovered"] = sum(r["status"] == "discovered" for r in reports[-1])
+    return result
+
+
+def bench_db(args, fabric: FakeFabric, size: int) -> List[dict]:
+    from orca_nw_lib.bgp_db import insert_device_bgp_in_db, insert_device_bgp_neighbors_in_db
+    from orca_nw_lib.device_db import get_device_db_obj, insert_devices_in_db
+    from orca_nw_lib.interface_db import insert_device_interfaces_in_db
+    from orca_nw_lib.port_chnl_db import insert_device_port_chnl_in_db
+    from orca_nw_lib.portgroup_db import insert_device_port_groups_in_db
+    from orca_nw_lib.utils import clean_db
+    from orca_nw_lib.vlan_db import insert_vlan_in_db
+
+    ## Graph objects are fetched once, only the inserts are measured.
+    objects = {
+        ip: {
+            name: FEATURES[name](ip)
+            for name in ("device", "interface", "port_group", "vlan", "port_chnl", "bgp", "bgp_neighbors")
+        }
+        for ip in fabric.device_ips
+    }
+    inserts = [
+        ("device", lambda device, objs: insert_devices_in_db(objs["device"])),
+        ("interface", lambda device, objs: insert_device_interfaces_in_db(device, objs["interface"])),
+        ("port_group", lambda device, objs: insert_device_port_groups_in_db(device, objs["port_group"])),
+        ("vlan", lambda device, objs: insert_vlan_in_db(device, objs["vlan"])),
+        ("port_chnl", lambda device, objs: insert_device_port_chnl_in_db(device, objs["port_chnl"])),
+        ("bgp", lambda device, objs: insert_device_bgp_in_db(device, objs["bgp"])),
+        ("bgp_neighbors", lambda device, objs: insert_device_bgp_neighbors_in_db(device, objs["bgp_neighbors"])),
+    ]
+    results = []
+    clean_db()
+    for name, insert in inserts:
+
+        def _run():
+            for ip, objs in objects.items():
+                insert(get_device_db_obj(ip), objs)
+
+        ## The first run creates the nodes, the following ones update them.
+        results.append(
+            measure(f"insert_{name}_in_db", _run, args.repeat, len(objects), devices=size, ports=fabric.port_count)
+        )
+    return results
+
+
+def get_environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "commit": commit or None,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "discovery_max_workers": get_discovery_max_workers(),
+    }
+
+
+def run(args) -> dict:
+    results = []
+    suites = set(args.suites)
+    if "paths" in suites:
+        results += bench_paths(args)
+    if "json" in suites:
+        results += bench_json(args)
+    if "subscription" in suites:
+        results += bench_subscription(args)
+    fabric_suites = suites & {"fetch", "discovery", "db"}
+    neo4j = (args.db and is_neo4j_available()) if fabric_suites - {"fetch"} else False
+    for size in args.sizes if fabric_suites else []:
+        fabric = get_fabric(size, args.ports).start()
+        try:
+            with mock.patch.dict(os.environ, {"device_gnmi_port": str(fabric.port)}):
+                if "fetch" in suites:
+                    results.append(bench_fetch(args, fabric, size))
+                for suite, name in (("discovery", "trigger_discovery"), ("db", "insert_in_db")):
+                    if suite not in suites:
+                        continue
+                    if not neo4j:
+                        results.append(
+                            skipped(name, "Neo4j not available" if args.db else "requires --db", devices=size)
+                        )
+                    elif suite == "discovery":
+                        results.append(bench_discovery(args, fabric, size))
+                    else:
+                        results += bench_db(args, fabric, size)
+        finally:
+            close_all_stubs()
+            reset_circuit_breaker()
+            fabric.stop()
+    return {"environment": get_environment(), "results": results}
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--suites",
+        type=lambda s: s.split(","),
+        default=SUITES,
+        help=f"Comma separated benchmark suites to run, out of {','.join(SUITES)}. Defaults to all.",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=lambda s: [int(i) for i in s.split(",")],
+        default=[1, 10, 100],
+        help="Comma separated number of devices of the emulated fabrics. Defaults to 1,10,100.",
+    )
+    parser.add_argument("--ports", type=int, help="Number of ports per device. Defaults to 32, more for large fabrics.")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs per benchmark. Defaults to 3.")
+    parser.add_argument(
+        "--items", type=int, default=1000, help="Number of paths, responses or updates per run. Defaults to 1000."
+    )
+    parser.add_argument("--db", action="store_true", help="Use Neo4j and the telemetry DB configured in orca_nw_lib.yml.")
+    parser.add_argument("--output", help="File to write the JSON results to. Defaults to stdout, along with the log messages.")
+    args = parser.parse_args(argv)
+    if unknown := set(args.suites) - set(SUITES):
+        parser.error(f"Unknown suites {sorted(unknown)}")
+
+    report = json.dumps(run(args), indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report)
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,947 @@
+"""
+In-process fake of the gNMI server of SONiC devices, to exercise discovery, config and subscriptions
+without lab hardware.
+
+The device data is kept as a JSON tree in the same format as returned by SONiC, e.g.
+{"openconfig-interfaces:interfaces": {"interface": [...]}, "sonic-vlan:sonic-vlan": {...}},
+Get, Set and Subscribe requests are served by walking the tree along the requested paths.
+build_device_model() creates the tree of a synthetic device, FakeFabric runs many devices
+on loopback addresses connected by LLDP in a spine-leaf topology.
+
+.. code-block:: python
+
+    with FakeFabric(spines=2, leaves=8, port_count=32) as fabric:
+        os.environ["device_gnmi_port"] = str(fabric.port)
+        discover_device(fabric.device_ips[0])
+"""
+
+import copy
+import datetime
+import json
+import queue
+import socket
+import threading
+import time
+from concurrent import futures
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import grpc
+
+from orca_nw_lib import gnmi_pb2_grpc
+from orca_nw_lib.gnmi_pb2 import (
+    GetResponse,
+    Notification,
+    Path,
+    PathElem,
+    SetResponse,
+    SubscribeResponse,
+    SubscriptionList,
+    TypedValue,
+    Update,
+    UpdateResult,
+)
+
+## Fields identifying the entries of the lists in the device data, there is no schema to take the list keys from.
+_LIST_KEYS = (
+    "name",
+    "ifname",
+    "ifName",
+    "lagname",
+    "id",
+    "index",
+    "ip",
+    "ipPrefix",
+    "vlanid",
+    "vlan-id",
+    "domain_id",
+    "domain-id",
+    "vrf_name",
+    "neighbor",
+    "afi_safi",
+    "ip_prefix",
+    "image",
+)
+
+_tls_credentials = None
+_tls_credentials_lock = threading.Lock()
+
+
+def get_tls_credentials() -> Tuple[bytes, bytes]:
+    """
+    Returns a private key and a self signed certificate for "localhost",
+    the name the gNMI channels of orca_nw_lib expect the devices to have.
+
+    Returns:
+        Tuple[bytes, bytes]: PEM encoded key and certificate.
+    """
+    global _tls_credentials
+    with _tls_credentials_lock:
+        if _tls_credentials:
+            return _tls_credentials
+        from cryptography import x509
+        from cryptography.hazmat.primitives import hashes, serialization
+        from cryptography.hazmat.primitives.asymmetric import ec
+        from cryptography.x509.oid import NameOID
+
+        key = ec.generate_private_key(ec.SECP256R1())
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "localhost")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name)
+            .issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=365))
+            .add_extension(
+                x509.SubjectAlternativeName([x509.DNSName("localhost")]),
+                critical=False,
+            )
+            .sign(key, hashes.SHA256())
+        )
+        _tls_credentials = (
+            key.private_bytes(
+                serialization.Encoding.PEM,
+                serialization.PrivateFormat.PKCS8,
+                serialization.NoEncryption(),
+            ),
+            cert.public_bytes(serialization.Encoding.PEM),
+        )
+        return _tls_credentials
+
+
+def build_device_model(
+    mgt_ip: str,
+    hostname: str = None,
+    port_count: int = 32,
+    vlans: Iterable[int] = (),
+    port_channels: Dict[str, List[str]] = None,
+    bgp_asn: int = None,
+    bgp_neighbors: Dict[str, int] = None,
+    lldp_neighbors: Dict[str, Tuple[str, str]] = None,
+    port_group_size: int = 0,
+) -> dict:
+    """
+    Creates the device data of a synthetic SONiC device.
+
+    Args:
+        mgt_ip (str): Management IP address of the device.
+        hostname (str, optional): Defaults to a name derived from the IP address.
+        port_count (int, optional): Number of Ethernet ports, named Ethernet0, Ethernet4, ... Defaults to 32.
+        vlans (Iterable[int], optional): VLAN IDs, the VLANs have the ports not used otherwise as tagged members.
+        port_channels (Dict[str, List[str]], optional): Port channel name vs. member ports.
+        bgp_asn (int, optional): Local ASN, BGP is configured only if set.
+        bgp_neighbors (Dict[str, int], optional): Neighbor IP vs. remote ASN.
+        lldp_neighbors (Dict[str, Tuple[str, str]], optional): Local port vs. (neighbor mgmt. IP, neighbor port).
+        port_group_size (int, optional): Number of consecutive ports per port group, 0 for no port groups.
+
+    Returns:
+        dict: The device data.
+    """
+    hostname = hostname or f"sonic-{mgt_ip.replace('.', '-')}"
+    port_channels = port_channels or {}
+    lldp_neighbors = lldp_neighbors or {}
+    mac = "02:00:%02x:%02x:%02x:%02x" % tuple(int(o) for o in mgt_ip.split("."))
+    ports = [f"Ethernet{i * 4}" for i in range(port_count)]
+    lag_members = {m for members in port_channels.values() for m in members}
+    vlan_members = [p for p in ports if p not in lag_members and p not in lldp_neighbors]
+
+    interfaces = [
+        {
+            "name": port,
+            "config": {
+                "name": port,
+                "type": "iana-if-type:ethernetCsmacd",
+                "mtu": 9100,
+                "enabled": True,
+                "description": "",
+            },
+            "state": {
+                "name": port,
+                "type": "iana-if-type:ethernetCsmacd",
+                "mtu": 9100,
+                "enabled": True,
+                "description": "",
+                "admin-status": "UP",
+                "oper-status": "UP" if port in lldp_neighbors else "DOWN",
+                "mac-address": mac,
+            },
+            "openconfig-if-ethernet:ethernet": {
+                "config": {
+                    "port-speed": "openconfig-if-ethernet:SPEED_100GB",
+                    "openconfig-if-ethernet-ext2:port-fec": "openconfig-platform-types:FEC_DISABLED",
+                    "auto-negotiate": False,
+                },
+                "openconfig-vlan:switched-vlan": {"config": {}},
+            },
+            "subinterfaces": {"subinterface": [{"index": 0}]},
+        }
+        for port in ports
+    ]
+    interfaces.extend(
+        {
+            "name": name,
+            "config": {"name": name, "type": "iana-if-type:ieee8023adLag", "mtu": 9100},
+            "state": {"name": name, "admin-status": "UP", "oper-status": "UP", "mtu": 9100},
+            "openconfig-if-aggregate:aggregation": {
+                "openconfig-vlan:switched-vlan": {"config": {}}
+            },
+            "subinterfaces": {
+                "subinterface": [{"index": 0, "openconfig-if-ip:ipv4": {"addresses": {}}}]
+            },
+        }
+        for name in port_channels
+    )
+    interfaces.extend(
+        {
+            "name": f"Vlan{vid}",
+            "config": {"name": f"Vlan{vid}", "type": "iana-if-type:l3ipvlan", "mtu": 9100},
+            "state": {"name": f"Vlan{vid}", "admin-status": "UP", "oper-status": "UP"},
+            "openconfig-vlan:routed-vlan": {"openconfig-if-ip:ipv4": {}},
+        }
+        for vid in vlans
+    )
+
+    model = {
+        "openconfig-image-management:image-management": {
+            "global": {"state": {"current": "SONiC-OS-4.2.0-Enterprise_Base"}}
+        },
+        "sonic-image-management:sonic-image-management": {
+            "IMAGE_TABLE": {
+                "IMAGE_TABLE_LIST": [{"image": "SONiC-OS-4.2.0-Enterprise_Base"}]
+            }
+        },
+        "sonic-mgmt-interface:sonic-mgmt-interface": {
+            "MGMT_INTF_TABLE": {
+                "MGMT_INTF_TABLE_IPADDR_LIST": [
+                    {"ifName": "eth0", "ipPrefix": f"{mgt_ip}/24"}
+                ]
+            }
+        },
+        "sonic-device-metadata:sonic-device-metadata": {
+            "DEVICE_METADATA": {
+                "DEVICE_METADATA_LIST": [
+                    {
+                        "name": "localhost",
+                        "hostname": hostname,
+                        "hwsku": "Fake-SONiC-%dx100G" % port_count,
+                        "mac": mac,
+                        "platform": "x86_64-fake_sonic-r0",
+                        "type": "LeafRouter",
+                    }
+                ]
+            }
+        },
+        "openconfig-system:system": {
+            "openconfig-events:events": {
+                "event": [
+                    {
+                        "id": "1",
+                        "state": {"resource": "system_status", "text": "System is ready"},
+                    }
+                ]
+            }
+        },
+        "openconfig-interfaces:interfaces": {"interface": interfaces},
+        "sonic-port:sonic-port": {
+            "PORT": {
+                "PORT_LIST": [
+                    {
+                        "ifname": port,
+                        "alias": f"Eth1/{i + 1}",
+                        "lanes": ",".join(str(i * 4 + lane) for lane in range(1, 5)),
+                        "speed": 100000,
+                        "valid_speeds": "100000,40000",
+                        "adv_speeds": "all",
+                        "link_training": "off",
+                        "autoneg": "off",
+                        "admin_status": "up",
+                        "mtu": 9100,
+                    }
+                    for i, port in enumerate(ports)
+                ]
+            }
+        },
+        "openconfig-port-group:port-groups": {
+            "port-group": [
+                {
+                    "id": str(g + 1),
+                    "config": {"id": str(g + 1)},
+                    "state": {
+                        "id": str(g + 1),
+                        "member-if-start": f"Ethernet{g * port_group_size * 4}",
+                        "member-if-end": f"Ethernet{(g + 1) * port_group_size * 4 - 1}",
+                        "default-speed": "openconfig-if-ethernet:SPEED_100GB",
+                        "speed": "openconfig-if-ethernet:SPEED_100GB",
+                        "valid-speeds": [
+                            "openconfig-if-ethernet:SPEED_100GB",
+                            "openconfig-if-ethernet:SPEED_40GB",
+                        ],
+                    },
+                }
+                for g in range(port_count // port_group_size if port_group_size else 0)
+            ]
+        },
+        "sonic-portchannel:sonic-portchannel": {
+            "PORTCHANNEL": {
+                "PORTCHANNEL_LIST": [
+                    {"name": name, "admin_status": "up", "mtu": 9100, "min_links": 1}
+                    for name in port_channels
+                ]
+            },
+            "PORTCHANNEL_MEMBER": {
+                "PORTCHANNEL_MEMBER_LIST": [
+                    {"name": name, "ifname": m}
+                    for name, members in port_channels.items()
+                    for m in members
+                ]
+            },
+            "LAG_TABLE": {
+                "LAG_TABLE_LIST": [
+                    {
+                        "lagname": name,
+                        "admin_status": "up",
+                        "oper_status": "up",
+                        "mtu": 9100,
+                        "active": True,
+                        "name": "loadbalance",
+                    }
+                    for name in port_channels
+                ]
+            },
+            "LAG_MEMBER_TABLE": {
+                "LAG_MEMBER_TABLE_LIST": [
+                    {"name": name, "ifname": m, "status": "enabled"}
+                    for name, members in port_channels.items()
+                    for m in members
+                ]
+            },
+        },
+        "sonic-vlan:sonic-vlan": {
+            "VLAN": {
+                "VLAN_LIST": [
+                    {"name": f"Vlan{vid}", "vlanid": vid, "members": vlan_members}
+                    for vid in vlans
+                ]
+            },
+            "VLAN_TABLE": {
+                "VLAN_TABLE_LIST": [
+                    {
+                        "name": f"Vlan{vid}",
+                        "mtu": 9100,
+                        "admin_status": "up",
+                        "oper_status": "up",
+                        "autostate": "enable",
+                    }
+                    for vid in vlans
+                ]
+            },
+            "VLAN_MEMBER": {
+                "VLAN_MEMBER_LIST": [
+                    {"name": f"Vlan{vid}", "ifname": m, "tagging_mode": "tagged"}
+                    for vid in vlans
+                    for m in vlan_members
+                ]
+            },
+        },
+        "openconfig-mclag:mclag": {},
+        "sonic-mclag:sonic-mclag": {},
+        "openconfig-spanning-tree:stp": {
+            "global": {"config": {"enabled-protocol": []}},
+            "interfaces": {"interface": []},
+            "openconfig-spanning-tree-ext:pvst": {"vlans": []},
+        },
+        "openconfig-lldp:lldp": {
+            "state": {"enabled": True},
+            "interfaces": {
+                "interface": [
+                    {
+                        "name": local_if,
+                        "neighbors": {
+                            "neighbor": [
+                                {
+                                    "id": local_if,
+                                    "state": {
+                                        "management-address": nbr_ip,
+                                        "port-id": nbr_port,
+                                    },
+                                }
+                            ]
+                        },
+                    }
+                    for local_if, (nbr_ip, nbr_port) in lldp_neighbors.items()
+                ]
+            },
+        },
+    }
+    if bgp_asn:
+        model["sonic-bgp-global:sonic-bgp-global"] = {
+            "BGP_GLOBALS": {
+                "BGP_GLOBALS_LIST": [
+                    {"vrf_name": "default", "local_asn": bgp_asn, "router_id": mgt_ip}
+                ]
+            },
+            "BGP_GLOBALS_AF": {
+                "BGP_GLOBALS_AF_LIST": [
+                    {"vrf_name": "default", "afi_safi": "ipv4_unicast"}
+                ]
+            },
+        }
+        model["sonic-bgp-neighbor:sonic-bgp-neighbor"] = {
+            "BGP_NEIGHBOR": {
+                "BGP_NEIGHBOR_LIST": [
+                    {
+                        "vrf_name": "default",
+                        "neighbor": ip,
+                        "asn": asn,
+                        "local_asn": bgp_asn,
+                        "admin_status": True,
+                    }
+                    for ip, asn in (bgp_neighbors or {}).items()
+                ]
+            },
+            "BGP_NEIGHBOR_AF": {
+                "BGP_NEIGHBOR_AF_LIST": [
+                    {
+                        "vrf_name": "default",
+                        "neighbor": ip,
+                        "afi_safi": "ipv4_unicast",
+                        "admin_status": True,
+                    }
+                    for ip in (bgp_neighbors or {})
+                ]
+            },
+        }
+    return model
+
+
+class NotFound(Exception):
+    pass
+
+
+def _local(name: str) -> str:
+    return name.split(":")[-1]
+
+
+def _get_elems(path: Path, prefix: Path = None) -> List[PathElem]:
+    ## Element names of paths with an origin are not qualified with the module name e.g. origin="sonic-vlan", elem=[sonic-vlan, ...]
+    elems = [PathElem(name=e.name, key=e.key) for e in list(prefix.elem if prefix else []) + list(path.elem)]
+    origin = path.origin or (prefix.origin if prefix else "")
+    if elems and origin and ":" not in elems[0].name:
+        elems[0].name = f"{origin}:{elems[0].name}"
+    return elems
+
+
+def _get_child_key(node: dict, name: str) -> Optional[str]:
+    if name in node:
+        return name
+    return next((k for k in node if _local(k) == _local(name)), None)
+
+
+def _matches(entry: dict, keys) -> bool:
+    return all(
+        v == "*" or str(entry.get(_get_child_key(entry, k) or k)) == v
+        for k, v in keys.items()
+    )
+
+
+def _has_wildcard(elems: List[PathElem]) -> bool:
+    return any("*" in e.key.values() for e in elems)
+
+
+def _expand_wildcards(tree: dict, elems: List[PathElem]) -> List[List[PathElem]]:
+    ## Returns the paths of the existing list entries selected by the wildcard keys, with the keys of the entries.
+    paths = [([], tree)]
+    for elem in elems:
+        selected = []
+        for done, node in paths:
+            if not isinstance(node, dict) or (key := _get_child_key(node, elem.name)) is None:
+                continue
+            if not elem.key:
+                selected.append((done + [elem], node[key]))
+                continue
+            for entry in node[key] or []:
+                if _matches(entry, elem.key):
+                    keys = {
+                        k: str(entry.get(_get_child_key(entry, k) or k)) if v == "*" else v
+                        for k, v in elem.key.items()
+                    }
+                    selected.append((done + [PathElem(name=elem.name, key=keys)], entry))
+        paths = selected
+    return [done for done, _ in paths]
+
+
+def _get_entry_key(entry) -> tuple:
+    return tuple((k, str(entry[k])) for k in _LIST_KEYS if isinstance(entry, dict) and k in entry)
+
+
+def _resolve(tree: dict, elems: List[PathElem]):
+    """
+    Returns the data at the path, None if a container on the path does not exist.
+
+    Raises:
+        NotFound: If a list entry selected by the keys of an element does not exist.
+    """
+    node = tree
+    for elem in elems:
+        if not isinstance(node, dict) or (key := _get_child_key(node, elem.name)) is None:
+            return None
+        node = node[key]
+        if elem.key:
+            entries = [e for e in node or [] if _matches(e, elem.key)]
+            if not entries:
+                raise NotFound(f"{elem.name}{dict(elem.key)} not found")
+            node = entries[0]
+    return node
+
+
+def _get_response_key(elems: List[PathElem]) -> str:
+    ## SONiC qualifies the top level element of the response with the module of the last qualified element of the path.
+    module = next((e.name.split(":")[0] for e in reversed(elems) if ":" in e.name), "")
+    return f"{module}:{_local(elems[-1].name)}" if module else elems[-1].name
+
+
+def _merge(old, new):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for k, v in new.items():
+            key = _get_child_key(old, k) or k
+            old[key] = _merge(old[key], v) if key in old else v
+        return old
+    if isinstance(old, list) and isinstance(new, list):
+        for item in new:
+            existing = next(
+                (
+                    e
+                    for e in old
+                    if (e == item)
+                    or (
+                        isinstance(item, dict)
+                        and _get_entry_key(item)
+                        and _get_entry_key(e) == _get_entry_key(item)
+                    )
+                ),
+                None,
+            )
+            if existing is None:
+                old.append(item)
+            elif isinstance(item, dict):
+                _merge(existing, item)
+        return old
+    return new
+
+
+def _get_container(tree: dict, elems: List[PathElem], create: bool = True):
+    ## Returns the dict the last element belongs to, creating the missing containers and list entries.
+    node = tree
+    for elem in elems:
+        key = _get_child_key(node, elem.name)
+        if key is None:
+            if not create:
+                return None
+            key = elem.name
+            node[key] = [] if elem.key else {}
+        node = node[key]
+        if elem.key:
+            entry = next((e for e in node if _matches(e, elem.key)), None)
+            if entry is None:
+                if not create:
+                    return None
+                entry = dict(elem.key)
+                node.append(entry)
+            node = entry
+    return node
+
+
+def _set(tree: dict, elems: List[PathElem], value, replace: bool = False):
+    if isinstance(value, dict) and len(value) == 1:
+        ((name, val),) = value.items()
+        if _local(name) == _local(elems[-1].name):
+            value = val
+        elif not replace:
+            ## Value holds the children of the container at the path.
+            _merge(_get_container(tree, elems), value)
+            return
+    last = elems[-1]
+    parent = _get_container(tree, elems[:-1])
+    key = _get_child_key(parent, last.name) or last.name
+    if last.key:
+        entry = _get_container(parent, [last])
+        for item in value if isinstance(value, list) else [value]:
+            if replace:
+                entry.clear()
+                entry.update(last.key)
+            _merge(entry, item)
+    elif replace or key not in parent:
+        parent[key] = value
+    else:
+        parent[key] = _merge(parent[key], value)
+
+
+def _delete(tree: dict, elems: List[PathElem]):
+    parent = _get_container(tree, elems[:-1], create=False)
+    if not isinstance(parent, dict) or (key := _get_child_key(parent, elems[-1].name)) is None:
+        return
+    if elems[-1].key:
+        parent[key] = [e for e in parent[key] if not _matches(e, elems[-1].key)]
+    else:
+        del parent[key]
+
+
+def _get_typed_value(value) -> TypedValue:
+    if isinstance(value, bool):
+        return TypedValue(bool_val=value)
+    if isinstance(value, int):
+        return TypedValue(uint_val=value) if value >= 0 else TypedValue(int_val=value)
+    if isinstance(value, float):
+        return TypedValue(double_val=value)
+    if isinstance(value, str):
+        return TypedValue(string_val=value)
+    return TypedValue(json_ietf_val=json.dumps(value).encode())
+
+
+def _flatten(value, elems: List[PathElem]):
+    ## Yields the leaves of the data as (path elements, value).
+    if isinstance(value, dict):
+        for k, v in value.items():
+            yield from _flatten(v, elems + [PathElem(name=k)])
+    elif isinstance(value, list) and value and all(isinstance(e, dict) for e in value) and not elems[-1].key:
+        for entry in value:
+            keyed = PathElem(name=elems[-1].name, key=dict(_get_entry_key(entry)))
+            yield from _flatten(entry, elems[:-1] + [keyed])
+    else:
+        yield elems, value
+
+
+def _match_subscription(sub: List[PathElem], leaf: List[PathElem]) -> bool:
+    return len(sub) <= len(leaf) and all(
+        _local(s.name) == _local(l.name)
+        and all(v == "*" or l.key.get(k) == v for k, v in s.key.items())
+        for s, l in zip(sub, leaf)
+    )
+
+
+class FakeGnmiServicer(gnmi_pb2_grpc.gNMIServicer):
+    """
+    gNMI service of a fake device serving the device data.
+
+    Subscriptions in STREAM mode receive the changes done with Set requests,
+    updates are sent with the subscribed path as prefix and the changed leaves as typed values,
+    the way SONiC sends on change updates.
+    Keys of the subscribed paths can be wildcards e.g. interface[name=*], unless wildcards is False,
+    then such subscriptions are rejected with INVALID_ARGUMENT like some targets do.
+    """
+
+    def __init__(self, model: dict, latency: float = 0, wildcards: bool = True):
+        self.model = model
+        self.latency = latency
+        self.wildcards = wildcards
+        self.requests: Dict[str, int] = {"Get": 0, "Set": 0, "Subscribe": 0}
+        self._lock = threading.RLock()
+        self._subscribers: List[Tuple[List[List[PathElem]], queue.Queue]] = []
+        self._stopped = threading.Event()
+
+    def _delay(self, method: str):
+        with self._lock:
+            self.requests[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def Get(self, request, context):
+        self._delay("Get")
+        notifications = []
+        with self._lock:
+            for path in request.path:
+                elems = _get_elems(path, request.prefix)
+                try:
+                    value = _resolve(self.model, elems) if elems else self.model
+                except NotFound as e:
+                    context.abort(grpc.StatusCode.NOT_FOUND, f"Resource not found: {e}")
+                val = {_get_response_key(elems): value} if elems and value is not None else {}
+                notifications.append(
+                    Notification(
+                        timestamp=time.time_ns(),
+                        update=[
+                            Update(
+                                path=path,
+                                val=TypedValue(json_ietf_val=json.dumps(val).encode()),
+                            )
+                        ],
+                    )
+                )
+        return GetResponse(notification=notifications)
+
+    def Set(self, request, context):
+        self._delay("Set")
+        results = []
+        changes = []
+        with self._lock:
+            for path in request.delete:
+                elems = _get_elems(path, request.prefix)
+                _delete(self.model, elems)
+                results.append(UpdateResult(path=path, op=UpdateResult.DELETE))
+                changes.append((elems, None))
+            for updates, op in (
+                (request.replace, UpdateResult.REPLACE),
+                (request.update, UpdateResult.UPDATE),
+            ):
+                for u in updates:
+                    elems = _get_elems(u.path, request.prefix)
+                    try:
+                        value = json.loads(u.val.json_ietf_val) if u.val.json_ietf_val else None
+                    except ValueError:
+                        context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Invalid JSON value")
+                    _set(self.model, elems, value, replace=op == UpdateResult.REPLACE)
+                    results.append(UpdateResult(path=u.path, op=op))
+                    changes.append((elems, copy.deepcopy(_resolve(self.model, elems))))
+            self._notify(changes)
+        return SetResponse(response=results, timestamp=time.time_ns())
+
+    def _notify(self, changes):
+        for subscriptions, updates in self._subscribers:
+            for elems, value in changes:
+                leaves = _flatten(value, elems) if value is not None else [(elems, None)]
+                for leaf_elems, leaf_value in leaves:
+                    for sub in subscriptions:
+                        if not _match_subscription(sub, leaf_elems):
+                            continue
+                        prefix = Path(
+                            elem=[
+                                PathElem(name=s.name, key=l.key or s.key)
+                                for s, l in zip(sub, leaf_elems)
+                            ]
+                        )
+                        path = Path(elem=leaf_elems[len(sub):])
+                        updates.put(
+                            Notification(
+                                timestamp=time.time_ns(),
+                                prefix=prefix,
+                                delete=[path],
+                            )
+                            if leaf_value is None
+                            else Notification(
+                                timestamp=time.time_ns(),
+                                prefix=prefix,
+                                update=[Update(path=path, val=_get_typed_value(leaf_value))],
+                            )
+                        )
+
+    def Subscribe(self, request_iterator, context):
+        self._delay("Subscribe")
+        request = next(request_iterator)
+        sub_list = request.subscribe
+        subscriptions = [_get_elems(s.path, sub_list.prefix) for s in sub_list.subscription]
+        if not self.wildcards and any(_has_wildcard(sub) for sub in subscriptions):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Wildcard keys are not supported")
+        updates = queue.Queue()
+        with self._lock:
+            self._subscribers.append((subscriptions, updates))
+            if not sub_list.updates_only:
+                for sub in (
+                    expanded
+                    for sub in subscriptions
+                    for expanded in (
+                        _expand_wildcards(self.model, sub) if _has_wildcard(sub) else [sub]
+                    )
+                ):
+                    try:
+                        value = copy.deepcopy(_resolve(self.model, sub))
+                    except NotFound:
+                        continue
+                    for leaf_elems, leaf_value in _flatten(value, sub) if value is not None else []:
+                        updates.put(
+                            Notification(
+                                timestamp=time.time_ns(),
+                                prefix=Path(elem=leaf_elems[: len(sub)]),
+                                update=[
+                                    Update(
+                                        path=Path(elem=leaf_elems[len(sub):]),
+                                        val=_get_typed_value(leaf_value),
+                                    )
+                                ],
+                            )
+                        )
+        try:
+            while not updates.empty():
+                yield SubscribeResponse(update=updates.get())
+            yield SubscribeResponse(sync_response=True)
+            if sub_list.mode == SubscriptionList.ONCE:
+                return
+            while context.is_active() and not self._stopped.is_set():
+                try:
+                    yield SubscribeResponse(update=updates.get(timeout=0.1))
+                except queue.Empty:
+                    continue
+        finally:
+            with self._lock:
+                self._subscribers = [s for s in self._subscribers if s[1] is not updates]
+
+    def stop(self):
+        self._stopped.set()
+
+
+class FakeSonicDevice:
+    """
+    A fake SONiC device serving gNMI over TLS.
+
+    Args:
+        model (dict): The device data, e.g. created with build_device_model.
+        address (str, optional): Address to listen on. Defaults to "127.0.0.1".
+        port (int, optional): Port to listen on, 0 for any free port. Defaults to 0.
+        latency (float, optional): Delay in seconds before every request is served. Defaults to 0.
+        max_workers (int, optional): Max. number of requests served concurrently,
+            every open subscription takes one. Defaults to 16.
+        wildcards (bool, optional): Whether subscriptions with wildcard keys are supported. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        model: dict,
+        address: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0,
+        max_workers: int = 16,
+        wildcards: bool = True,
+    ):
+        self.address = address
+        self.port = port
+        self.servicer = FakeGnmiServicer(model, latency, wildcards)
+        self._max_workers = max_workers
+        self._server = None
+
+    @property
+    def model(self) -> dict:
+        return self.servicer.model
+
+    def start(self) -> "FakeSonicDevice":
+        ## The device can be started again after being stopped.
+        self.servicer._stopped.clear()
+        self._server = grpc.server(
+            futures.ThreadPoolExecutor(max_workers=self._max_workers)
+        )
+        gnmi_pb2_grpc.add_gNMIServicer_to_server(self.servicer, self._server)
+        self.port = self._server.add_secure_port(
+            f"{self.address}:{self.port}",
+            grpc.ssl_server_credentials([get_tls_credentials()]),
+        )
+        if not self.port:
+            raise RuntimeError(f"Could not listen on {self.address}")
+        self._server.start()
+        return self
+
+    def stop(self):
+        self.servicer.stop()
+        if self._server:
+            self._server.stop(grace=None)
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _get_free_port(address: str) -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((address, 0))
+        return sock.getsockname()[1]
+
+
+class FakeFabric:
+    """
+    Spine-leaf fabric of fake SONiC devices, every leaf is connected to every spine,
+    the links are reported by LLDP and the leaves have BGP sessions to the spines.
+
+    As orca_nw_lib connects to all devices on the same gNMI port,
+    the devices listen on the same port on different loopback addresses 127.0.0.x.
+
+    Args:
+        spines (int, optional): Number of spines. Defaults to 1.
+        leaves (int, optional): Number of leaves. Defaults to 2.
+        port_count (int, optional): Number of ports of every device. Defaults to 32.
+        vlans_per_leaf (int, optional): Number of VLANs on every leaf. Defaults to 0.
+        port_channels_per_leaf (int, optional): Number of port channels with 2 members on every leaf. Defaults to 0.
+        latency (float, optional): Delay in seconds before every request is served. Defaults to 0.
+        port (int, optional): gNMI port of the devices. Defaults to a free port.
+        base_address (str, optional): First 3 octets of the addresses of the devices. Defaults to "127.0.0".
+        wildcards (bool, optional): Whether the devices support subscriptions with wildcard keys. Defaults to True.
+    """
+
+    def __init__(
+        self,
+        spines: int = 1,
+        leaves: int = 2,
+        port_count: int = 32,
+        vlans_per_leaf: int = 0,
+        port_channels_per_leaf: int = 0,
+        latency: float = 0,
+        port: int = None,
+        base_address: str = "127.0.0",
+        wildcards: bool = True,
+    ):
+        if spines > port_count or leaves > port_count:
+            raise ValueError("Not enough ports to connect all spines and leaves.")
+        if spines + 2 * port_channels_per_leaf > port_count:
+            raise ValueError("Not enough ports for the port channels.")
+        self.port_count = port_count
+        self.spine_ips = [f"{base_address}.{i + 1}" for i in range(spines)]
+        self.leaf_ips = [f"{base_address}.{spines + i + 1}" for i in range(leaves)]
+        self.port = port or _get_free_port(self.spine_ips[0])
+        lldp = {ip: {} for ip in self.device_ips}
+        bgp = {ip: {} for ip in self.device_ips}
+        asn = {ip: 65000 + i for i, ip in enumerate(self.device_ips)}
+        ## Leaf l uses port s to connect to spine s, spine s uses port l to connect to leaf l.
+        for s, spine_ip in enumerate(self.spine_ips):
+            for l, leaf_ip in enumerate(self.leaf_ips):
+                lldp[leaf_ip][f"Ethernet{s * 4}"] = (spine_ip, f"Ethernet{l * 4}")
+                lldp[spine_ip][f"Ethernet{l * 4}"] = (leaf_ip, f"Ethernet{s * 4}")
+                bgp[leaf_ip][spine_ip] = asn[spine_ip]
+                bgp[spine_ip][leaf_ip] = asn[leaf_ip]
+        self.devices: Dict[str, FakeSonicDevice] = {}
+        for ip in self.device_ips:
+            is_leaf = ip in self.leaf_ips
+            self.devices[ip] = FakeSonicDevice(
+                build_device_model(
+                    ip,
+                    port_count=port_count,
+                    vlans=range(10, 10 + vlans_per_leaf) if is_leaf else (),
+                    port_channels={
+                        f"PortChannel{c + 1}": [
+                            f"Ethernet{(spines + 2 * c) * 4}",
+                            f"Ethernet{(spines + 2 * c + 1) * 4}",
+                        ]
+                        for c in range(port_channels_per_leaf if is_leaf else 0)
+                    },
+                    bgp_asn=asn[ip],
+                    bgp_neighbors=bgp[ip],
+                    lldp_neighbors=lldp[ip],
+                ),
+                address=ip,
+                port=self.port,
+                latency=latency,
+                wildcards=wildcards,
+            )
+
+    @property
+    def device_ips(self) -> List[str]:
+        return self.spine_ips + self.leaf_ips
+
+    def start(self) -> "FakeFabric":
+        try:
+            for device in self.devices.values():
+                device.start()
+        except Exception:
+            self.stop()
+            raise
+        return self
+
+    def stop(self):
+        for device in self.devices.values():
+            device.stop()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,117 @@
+import asyncio
+import json
+import os
+import unittest
+from concurrent import futures
+from unittest import mock
+
+import grpc
+
+from orca_nw_lib import aio, gnmi_pb2_grpc
+from orca_nw_lib.gnmi_pb2 import GetResponse, Notification, SetResponse, TypedValue, Update
+from orca_nw_lib.gnmi_util import (
+    _channel_manager,
+    create_gnmi_update,
+    create_req_for_update,
+    get_gnmi_path,
+)
+
+
+class _GnmiServicer(gnmi_pb2_grpc.gNMIServicer):
+    ## Serves the JSON values set per path.
+
+    def __init__(self):
+        self.values = {}
+
+    def Get(self, request, context):
+        return GetResponse(
+            notification=[
+                Notification(
+                    update=[
+                        Update(
+                            path=path,
+                            val=TypedValue(
+                                json_ietf_val=json.dumps(
+                                    self.values.get(path.SerializeToString(), {})
+                                ).encode()
+                            ),
+                        )
+                        for path in request.path
+                    ]
+                )
+            ]
+        )
+
+    def Set(self, request, context):
+        for u in request.update:
+            self.values[u.path.SerializeToString()] = json.loads(u.val.json_ietf_val)
+        return SetResponse()
+
+
+class TestAio(unittest.TestCase):
+    device_ip = "127.0.0.1"
+    path = get_gnmi_path("openconfig-interfaces:interfaces/interface[name=Ethernet0]/config")
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servicer = _GnmiServicer()
+        cls.server = grpc.server(futures.ThreadPoolExecutor(max_workers=4))
+        gnmi_pb2_grpc.add_gNMIServicer_to_server(cls.servicer, cls.server)
+        port = cls.server.add_secure_port(
+            f"{cls.device_ip}:0", grpc.local_server_credentials(grpc.LocalConnectionType.LOCAL_TCP)
+        )
+        cls.server.start()
+        cls.patches = [
+            mock.patch.dict(os.environ, {"device_gnmi_port": str(port)}),
+            ## Local credentials instead of TLS with the certificate of the device.
+            mock.patch.object(
+                _channel_manager,
+                "get_credentials",
+                return_value=grpc.local_channel_credentials(grpc.LocalConnectionType.LOCAL_TCP),
+            ),
+        ]
+        for patch in cls.patches:
+            patch.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        for patch in cls.patches:
+            patch.stop()
+        cls.server.stop(grace=None)
+
+    def _run(self, coro):
+        async def _run_and_close():
+            try:
+                return await coro
+            finally:
+                await aio.close_all_aio_stubs()
+
+        return asyncio.run(_run_and_close())
+
+    def test_set_and_get(self):
+        async def _set_and_get():
+            await aio.send_gnmi_set(
+                create_req_for_update(
+                    [create_gnmi_update(self.path, {"openconfig-interfaces:config": {"mtu": 1500}})]
+                ),
+                self.device_ip,
+            )
+            return await asyncio.gather(
+                *[aio.send_gnmi_get(self.device_ip, [self.path]) for _ in range(4)]
+            )
+
+        for result in self._run(_set_and_get()):
+            self.assertEqual(result, {"openconfig-interfaces:config": {"mtu": 1500}})
+
+    def test_concurrent_callers_share_channel(self):
+        async def _get_stubs():
+            return await asyncio.gather(
+                *[aio.get_aio_stub(self.device_ip) for _ in range(8)]
+            )
+
+        with mock.patch.object(
+            grpc.aio, "secure_channel", wraps=grpc.aio.secure_channel
+        ) as secure_channel:
+            stubs = self._run(_get_stubs())
+        self.assertEqual(secure_channel.call_count, 1)
+        self.assertTrue(all(stub is stubs[0] for stub in stubs))
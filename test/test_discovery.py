@@ -0,0 +1,225 @@
+import os
+import socket
+import threading
+import time
+import unittest
+from collections import Counter
+from unittest import mock
+
+from orca_nw_lib import discovery
+from orca_nw_lib.common import DiscoveryFeature
+from orca_nw_lib.utils import sweep_grpc_devices
+
+## Every leaf is connected to every spine.
+_spines = ["10.10.10.1", "10.10.10.2"]
+_leaves = ["10.10.10.3", "10.10.10.4", "10.10.10.5"]
+_topology = {
+    **{spine: set(_leaves) for spine in _spines},
+    **{leaf: set(_spines) for leaf in _leaves},
+}
+
+
+@mock.patch.dict(os.environ, {"discovery_max_workers": "2"})
+class TestTopologyDiscovery(unittest.TestCase):
+    def test_breadth_first_discovery(self):
+        lock = threading.Lock()
+        running = 0
+        max_running = 0
+        discovered = Counter()
+
+        def _discover_device_and_enable_ifs(device_ip: str) -> list:
+            nonlocal running, max_running
+            with lock:
+                running += 1
+                max_running = max(max_running, running)
+                discovered[device_ip] += 1
+            time.sleep(0.05)
+            with lock:
+                running -= 1
+            return []
+
+        with mock.patch.object(
+            discovery, "_discover_device_and_enable_ifs", _discover_device_and_enable_ifs
+        ), mock.patch.object(
+            discovery, "get_all_lldp_neighbor_device_ips", _topology.get
+        ), mock.patch.object(
+            discovery, "get_device_details", return_value=None
+        ):
+            reports = discovery._discover_device_and_lldp_info(_spines[0])
+
+        ## Every leaf reports both spines as neighbors, still every device is discovered once.
+        self.assertEqual(set(discovered), set(_topology))
+        self.assertEqual(set(discovered.values()), {1})
+        ## The leaves are discovered in parallel, by at most discovery_max_workers at a time.
+        self.assertEqual(max_running, 2)
+        depths = {r["device_ip"]: r["depth"] for r in reports}
+        self.assertEqual(depths, {_spines[0]: 0, **{leaf: 1 for leaf in _leaves}, _spines[1]: 2})
+        self.assertEqual({r["status"] for r in reports}, {"discovered"})
+
+    def test_unreachable_device(self):
+        def _discover_device_and_enable_ifs(device_ip: str) -> list:
+            if device_ip == _leaves[0]:
+                raise ConnectionError(f"Device {device_ip} is not reachable !!")
+            return []
+
+        with mock.patch.object(
+            discovery, "_discover_device_and_enable_ifs", _discover_device_and_enable_ifs
+        ), mock.patch.object(
+            discovery, "get_all_lldp_neighbor_device_ips", _topology.get
+        ), mock.patch.object(
+            discovery, "get_device_details", return_value=None
+        ):
+            reports = discovery._discover_device_and_lldp_info(_spines[0])
+
+        status = {r["device_ip"]: r["status"] for r in reports}
+        self.assertEqual(status.pop(_leaves[0]), "unreachable")
+        self.assertEqual(set(status.values()), {"discovered"})
+        self.assertEqual(len(status), 4)
+
+
+class TestNetworkSweep(unittest.TestCase):
+    device_ips = ["127.0.0.1", "127.0.0.2", "127.0.0.3"]
+
+    @classmethod
+    def setUpClass(cls):
+        ## Plain listening sockets are enough for the TCP connect probes.
+        cls.listeners = [socket.create_server((cls.device_ips[0], 0))]
+        port = cls.listeners[0].getsockname()[1]
+        cls.listeners += [socket.create_server((ip, port)) for ip in cls.device_ips[1:]]
+        cls.env = mock.patch.dict(
+            os.environ,
+            {"device_gnmi_port": str(port), "discover_networks": "127.0.0.0/29"},
+        )
+        cls.env.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.env.stop()
+        for listener in cls.listeners:
+            listener.close()
+
+    def test_sweep_grpc_devices(self):
+        hosts = [f"127.0.0.{i}" for i in (6, 1, 5, 3, 2, 4)]
+        self.assertEqual(
+            sweep_grpc_devices(hosts, concurrency=2),
+            (["127.0.0.1", "127.0.0.3", "127.0.0.2"], ["127.0.0.6", "127.0.0.5", "127.0.0.4"]),
+        )
+        self.assertEqual(sweep_grpc_devices([]), ([], []))
+
+    def test_discovery_triggered_on_reachable_hosts(self):
+        def _trigger_discovery(device_ip: str) -> list:
+            ## The first device discovers the whole fabric.
+            return [{"device_ip": ip, "status": "discovered"} for ip in self.device_ips]
+
+        with mock.patch.object(
+            discovery, "trigger_discovery", side_effect=_trigger_discovery
+        ) as trigger_discovery:
+            [report] = discovery.discover_device_from_config()
+        trigger_discovery.assert_called_once_with(self.device_ips[0])
+        self.assertEqual(report["reachable"], self.device_ips)
+        self.assertEqual(report["unreachable"], ["127.0.0.4", "127.0.0.5", "127.0.0.6"])
+        self.assertEqual(len(report["devices"]), 3)
+
+
+class TestFeatureDiscovery(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.lock = threading.Lock()
+
+    def _discover_nw_features(self, device_ip: str, feature: DiscoveryFeature):
+        with self.lock:
+            self.events.append(("start", feature))
+        ## Port channels are slow and fail.
+        if feature == DiscoveryFeature.port_channel:
+            time.sleep(0.1)
+        with self.lock:
+            self.events.append(("end", feature))
+        if feature == DiscoveryFeature.port_channel:
+            return "Port Channel Discovery Failed"
+
+    def _index(self, event: str, feature: DiscoveryFeature) -> int:
+        return self.events.index((event, feature))
+
+    def test_features_discovered_after_dependencies(self):
+        features = [
+            DiscoveryFeature.stp_vlan,
+            DiscoveryFeature.vlan,
+            DiscoveryFeature.port_channel,
+            DiscoveryFeature.stp,
+            DiscoveryFeature.bgp,
+            DiscoveryFeature.bgp_neighbors,
+        ]
+        with mock.patch.object(
+            discovery, "discover_nw_features", side_effect=self._discover_nw_features
+        ):
+            reports = discovery.discover_nw_features_concurrently("10.10.10.10", features)
+
+        self.assertEqual([r["feature"] for r in reports], features)
+        for feature, dependency in [
+            (DiscoveryFeature.vlan, DiscoveryFeature.port_channel),
+            (DiscoveryFeature.stp_vlan, DiscoveryFeature.vlan),
+            (DiscoveryFeature.stp_vlan, DiscoveryFeature.stp),
+            (DiscoveryFeature.bgp_neighbors, DiscoveryFeature.bgp),
+        ]:
+            self.assertGreater(
+                self._index("start", feature), self._index("end", dependency)
+            )
+        ## Features independent of the slow port channels do not wait for them.
+        self.assertLess(
+            self._index("end", DiscoveryFeature.bgp_neighbors),
+            self._index("end", DiscoveryFeature.port_channel),
+        )
+        ## Features depending on a failed feature are still discovered.
+        status = {r["feature"]: (r["status"], r["error"]) for r in reports}
+        self.assertEqual(
+            status[DiscoveryFeature.port_channel],
+            ("failed", "Port Channel Discovery Failed"),
+        )
+        self.assertEqual(status[DiscoveryFeature.vlan], ("succeeded", None))
+        self.assertEqual(status[DiscoveryFeature.stp_vlan], ("succeeded", None))
+
+    def test_cyclic_dependencies(self):
+        features = [DiscoveryFeature.vlan, DiscoveryFeature.port_channel]
+        with mock.patch.object(
+            discovery, "discover_nw_features", side_effect=self._discover_nw_features
+        ), mock.patch.object(
+            discovery,
+            "get_feature_dependencies",
+            side_effect=lambda feature, _: set(features) - {feature},
+        ):
+            with self.assertRaises(ValueError):
+                discovery.discover_nw_features_concurrently("10.10.10.10", features)
+        self.assertEqual(self.events, [])
+
+    def test_features_of_all_devices_share_workers(self):
+        device_ips = [f"10.10.10.{i}" for i in range(1, 5)]
+        running = 0
+        max_running = 0
+
+        def _discover_nw_features(device_ip: str, feature: DiscoveryFeature):
+            nonlocal running, max_running
+            with self.lock:
+                running += 1
+                max_running = max(max_running, running)
+            time.sleep(0.01)
+            with self.lock:
+                running -= 1
+
+        with mock.patch.object(
+            discovery, "discover_nw_features", side_effect=_discover_nw_features
+        ), mock.patch.object(
+            discovery, "_discover_device_and_lldp_info", return_value=[]
+        ), mock.patch.object(
+            discovery, "get_all_devices_ip_from_db", return_value=device_ips
+        ), mock.patch.object(
+            discovery, "create_lldp_relations_in_db"
+        ), mock.patch.object(
+            discovery, "gnmi_subscribe"
+        ):
+            reports = discovery.trigger_discovery(device_ips[0], max_workers=2)
+
+        ## 4 devices with 9 features each, but never more than max_workers writing at a time.
+        self.assertEqual(max_running, 2)
+        self.assertEqual([r["device_ip"] for r in reports], device_ips)
+        self.assertEqual({len(r["features"]) for r in reports}, {9})
+        self.assertEqual({r["status"] for r in reports}, {"refreshed"})
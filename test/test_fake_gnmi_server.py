@@ -0,0 +1,96 @@
+import os
+import threading
+import unittest
+from unittest import mock
+
+from fake_gnmi_server import FakeFabric
+
+from orca_nw_lib.gnmi_pb2 import (
+    Encoding,
+    SubscribeRequest,
+    Subscription,
+    SubscriptionList,
+    SubscriptionMode,
+)
+from orca_nw_lib.gnmi_util import close_all_stubs, reset_circuit_breaker, send_gnmi_subscribe
+from orca_nw_lib.interface import _create_interface_graph_objects
+from orca_nw_lib.interface_gnmi import (
+    get_intfc_config_path,
+    get_interface_config_from_device,
+    set_interface_config_on_device,
+)
+from orca_nw_lib.lldp_gnmi import get_lldp_nbr_from_device
+from orca_nw_lib.vlan import _create_vlan_db_obj
+
+
+class TestFakeGnmiServer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fabric = FakeFabric(spines=1, leaves=2, port_count=8, vlans_per_leaf=2).start()
+        cls.env = mock.patch.dict(os.environ, {"device_gnmi_port": str(cls.fabric.port)})
+        cls.env.start()
+        cls.leaf_ip = cls.fabric.leaf_ips[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        close_all_stubs()
+        reset_circuit_breaker()
+        cls.env.stop()
+        cls.fabric.stop()
+
+    def test_discovery_data(self):
+        interfaces = {i.name: i for i in _create_interface_graph_objects(self.leaf_ip)}
+        self.assertEqual(len(interfaces), 8)
+        self.assertEqual(interfaces["Ethernet0"].alias, "Eth1/1")
+        self.assertEqual(
+            sorted(v.name for v in _create_vlan_db_obj(self.leaf_ip)), ["Vlan10", "Vlan11"]
+        )
+        [lldp] = get_lldp_nbr_from_device(self.leaf_ip).get("openconfig-lldp:interface")
+        self.assertEqual(
+            lldp["neighbors"]["neighbor"][0]["state"]["management-address"],
+            self.fabric.spine_ips[0],
+        )
+
+    def test_set_and_subscribe(self):
+        subscription = send_gnmi_subscribe(
+            self.leaf_ip,
+            iter(
+                [
+                    SubscribeRequest(
+                        subscribe=SubscriptionList(
+                            subscription=[
+                                Subscription(
+                                    path=get_intfc_config_path("Ethernet4"),
+                                    mode=SubscriptionMode.TARGET_DEFINED,
+                                )
+                            ],
+                            mode=SubscriptionList.STREAM,
+                            encoding=Encoding.PROTO,
+                            updates_only=True,
+                        )
+                    )
+                ]
+            ),
+        )
+        responses = iter(subscription)
+        self.assertTrue(next(responses).sync_response)
+        update = []
+        reader = threading.Thread(target=lambda: update.append(next(responses)))
+        reader.start()
+
+        set_interface_config_on_device(self.leaf_ip, "Ethernet4", mtu=1500)
+        reader.join(timeout=5)
+        subscription.cancel()
+
+        self.assertEqual(
+            get_interface_config_from_device(self.leaf_ip, "Ethernet4")
+            .get("openconfig-interfaces:config", {})
+            .get("mtu"),
+            1500,
+        )
+        [resp] = update
+        self.assertEqual(resp.update.prefix.elem[1].key["name"], "Ethernet4")
+        self.assertEqual(
+            {u.path.elem[-1].name: u.val.uint_val for u in resp.update.update},
+            {"mtu": 1500},
+        )
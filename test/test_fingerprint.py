@@ -0,0 +1,94 @@
+import json
+import os
+import unittest
+from unittest import mock
+
+from neo4j.exceptions import TransientError
+
+from orca_nw_lib.common import DiscoveryFeature
+from orca_nw_lib.fingerprint import (
+    clear_fingerprints,
+    discover_if_changed,
+    record_get_response,
+)
+from orca_nw_lib.gnmi_pb2 import GetResponse, Notification, TypedValue, Update
+from orca_nw_lib.gnmi_util import get_gnmi_path
+from orca_nw_lib.utils import clean_db
+
+
+def _get_response(value: dict, timestamp: int = 0) -> GetResponse:
+    return GetResponse(
+        notification=[
+            Notification(
+                timestamp=timestamp,
+                update=[
+                    Update(
+                        path=get_gnmi_path("sonic-vlan:sonic-vlan/VLAN"),
+                        val=TypedValue(json_ietf_val=json.dumps(value).encode()),
+                    )
+                ],
+            )
+        ]
+    )
+
+
+class TestDiscoverIfChanged(unittest.TestCase):
+    def setUp(self):
+        clear_fingerprints()
+        self.written = []
+
+    def _discover(
+        self, value: dict, feature=DiscoveryFeature.vlan, timestamp: int = 0, sub_key: str = None
+    ):
+        def create():
+            record_get_response(_get_response(value, timestamp))
+            return value
+
+        return discover_if_changed(
+            "10.10.10.10", feature, create, self.written.append, sub_key=sub_key
+        )[1]
+
+    def test_skips_db_write_when_unchanged(self):
+        self.assertTrue(self._discover({"name": "Vlan1"}))
+        self.assertFalse(self._discover({"name": "Vlan1"}, timestamp=1))
+        self.assertTrue(self._discover({"name": "Vlan2"}))
+        self.assertEqual(self.written, [{"name": "Vlan1"}, {"name": "Vlan2"}])
+
+    @mock.patch("orca_nw_lib.utils.clear_neo4j_database")
+    def test_clean_db_clears_fingerprints(self, clear_neo4j_database):
+        self.assertTrue(self._discover({"name": "Vlan1"}))
+        clean_db()
+        clear_neo4j_database.assert_called_once()
+        self.assertTrue(self._discover({"name": "Vlan1"}))
+
+    def test_write_invalidates_dependent_features(self):
+        self._discover({"name": "Vlan1"}, DiscoveryFeature.stp_vlan)
+        self._discover({"name": "Ethernet0"}, DiscoveryFeature.interface)
+        self.assertFalse(self._discover({"name": "Ethernet0"}, DiscoveryFeature.interface))
+        self.assertTrue(self._discover({"name": "Vlan1"}, DiscoveryFeature.stp_vlan))
+
+    def test_full_and_partial_discoveries_invalidate_each_other(self):
+        ## MTU set to 9000 on the interface, then reverted on the device to 1500.
+        self.assertTrue(self._discover({"mtu": 9000}, DiscoveryFeature.interface, sub_key="Ethernet0"))
+        self.assertTrue(self._discover({"mtu": 1500}, DiscoveryFeature.interface))
+        ## Set to 9000 again, the DB has 1500 hence it must be written.
+        self.assertTrue(self._discover({"mtu": 9000}, DiscoveryFeature.interface, sub_key="Ethernet0"))
+        ## And the full discovery must write again after the partial one.
+        self.assertTrue(self._discover({"mtu": 1500}, DiscoveryFeature.interface))
+
+    @mock.patch.dict(os.environ, {"neo4j_retry_max_attempts": "3", "neo4j_retry_backoff": "0"})
+    def test_retries_transient_db_errors(self):
+        insert_in_db = mock.Mock(
+            side_effect=[TransientError("DeadlockDetected"), TransientError("DeadlockDetected"), None]
+        )
+        self.assertTrue(
+            discover_if_changed("10.10.10.10", DiscoveryFeature.vlan, dict, insert_in_db)[1]
+        )
+        self.assertEqual(insert_in_db.call_count, 3)
+
+        ## The fingerprint is not stored when all attempts fail, the next discovery writes again.
+        insert_in_db = mock.Mock(side_effect=TransientError("DeadlockDetected"))
+        with self.assertRaises(TransientError):
+            discover_if_changed("10.10.10.10", DiscoveryFeature.stp, dict, insert_in_db)
+        self.assertEqual(insert_in_db.call_count, 3)
+        self.assertTrue(self._discover({}, DiscoveryFeature.stp))
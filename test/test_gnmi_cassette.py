@@ -0,0 +1,154 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import grpc
+from fake_gnmi_server import FakeFabric
+
+from orca_nw_lib import aio
+from orca_nw_lib.gnmi_cassette import (
+    GET,
+    STREAM_END,
+    SUBSCRIBE,
+    SUBSCRIBE_RESPONSE,
+    CassetteRecord,
+    get_cassette_file,
+    read_cassette,
+)
+from orca_nw_lib.gnmi_pb2 import (
+    Encoding,
+    SubscribeRequest,
+    Subscription,
+    SubscriptionList,
+)
+from orca_nw_lib.discovery import trigger_discovery
+from orca_nw_lib.gnmi_sub import gnmi_unsubscribe
+from orca_nw_lib.gnmi_util import close_all_stubs, reset_circuit_breaker, send_gnmi_subscribe
+from orca_nw_lib.interface import _create_interface_graph_objects
+from orca_nw_lib.interface_gnmi import get_intfc_config_path, set_interface_config_on_device
+from orca_nw_lib.vlan import _create_vlan_db_obj
+
+
+def _get_subscribe_request() -> SubscribeRequest:
+    return SubscribeRequest(
+        subscribe=SubscriptionList(
+            subscription=[Subscription(path=get_intfc_config_path("Ethernet4"))],
+            mode=SubscriptionList.ONCE,
+            encoding=Encoding.PROTO,
+        )
+    )
+
+
+def _subscribe_once(device_ip: str) -> list:
+    return list(send_gnmi_subscribe(device_ip, iter([_get_subscribe_request()])))
+
+
+async def _subscribe_once_async(device_ip: str) -> list:
+    call = await aio.send_gnmi_subscribe(device_ip, iter([_get_subscribe_request()]))
+    responses = [resp async for resp in call]
+    await aio.close_all_aio_stubs()
+    return responses
+
+
+def _get_discovery_data(device_ip: str) -> dict:
+    return {
+        "interfaces": sorted((i.name, i.mtu) for i in _create_interface_graph_objects(device_ip)),
+        "vlans": sorted(v.name for v in _create_vlan_db_obj(device_ip)),
+    }
+
+
+class TestGnmiCassette(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.env = mock.patch.dict(os.environ, {"gnmi_cassette_dir": self.dir.name})
+        self.env.start()
+
+    def tearDown(self):
+        close_all_stubs()
+        reset_circuit_breaker()
+        self.env.stop()
+        self.dir.cleanup()
+
+    def test_record_bytes(self):
+        record = CassetteRecord(GET, 0, 0.25, grpc.StatusCode.NOT_FOUND, b"\x0a" * 200, b"missing")
+        file_path = os.path.join(self.dir.name, "records.gnmi")
+        with open(file_path, "wb") as f:
+            f.write(record.to_bytes() + record.to_bytes()[:-1])
+        [read] = read_cassette(file_path)
+        self.assertEqual(
+            (read.kind, read.elapsed, read.code, read.request, read.response),
+            (GET, 0.25, grpc.StatusCode.NOT_FOUND, b"\x0a" * 200, b"missing"),
+        )
+
+    def test_record_and_replay(self):
+        with FakeFabric(spines=1, leaves=1, port_count=8, vlans_per_leaf=2) as fabric:
+            device_ip = fabric.leaf_ips[0]
+            with mock.patch.dict(
+                os.environ, {"device_gnmi_port": str(fabric.port), "gnmi_cassette_mode": "record"}
+            ):
+                set_interface_config_on_device(device_ip, "Ethernet4", mtu=1500)
+                recorded = _get_discovery_data(device_ip)
+                recorded_updates = _subscribe_once(device_ip)
+                close_all_stubs()
+        self.assertIn(
+            SUBSCRIBE_RESPONSE, {r.kind for r in read_cassette(get_cassette_file(device_ip))}
+        )
+
+        ## The fabric is stopped, the responses can only come from the recording.
+        with mock.patch.dict(os.environ, {"gnmi_cassette_mode": "replay"}):
+            self.assertEqual(_get_discovery_data(device_ip), recorded)
+            self.assertEqual(_subscribe_once(device_ip), recorded_updates)
+            self.assertEqual(len(recorded["interfaces"]), 8)
+            self.assertTrue(recorded_updates[-1].sync_response)
+            with self.assertRaises(Exception):
+                _get_discovery_data("127.0.0.254")
+
+    def test_record_aio_and_replay(self):
+        with FakeFabric(spines=1, leaves=1, port_count=4, vlans_per_leaf=1) as fabric:
+            device_ip = fabric.leaf_ips[0]
+            with mock.patch.dict(
+                os.environ, {"device_gnmi_port": str(fabric.port), "gnmi_cassette_mode": "record"}
+            ):
+                recorded_updates = asyncio.run(_subscribe_once_async(device_ip))
+                close_all_stubs()
+        self.assertEqual(
+            [r.kind for r in read_cassette(get_cassette_file(device_ip))],
+            [SUBSCRIBE] + [SUBSCRIBE_RESPONSE] * len(recorded_updates) + [STREAM_END],
+        )
+        with mock.patch.dict(os.environ, {"gnmi_cassette_mode": "replay"}):
+            self.assertEqual(_subscribe_once(device_ip), recorded_updates)
+
+    def test_replay_discovery(self):
+        def _discover(device_ip: str) -> list:
+            try:
+                return sorted(
+                    (r["device_ip"], r["status"], r["errors"], r["neighbors"])
+                    for r in trigger_discovery(device_ip)
+                )
+            finally:
+                gnmi_unsubscribe(device_ip)
+
+        with FakeFabric(spines=1, leaves=1, port_count=8, vlans_per_leaf=2) as fabric:
+            device_ip = fabric.leaf_ips[0]
+            with mock.patch.dict(
+                os.environ,
+                {
+                    "device_gnmi_port": str(fabric.port),
+                    "gnmi_cassette_mode": "record",
+                    "subscription_sync_timeout": "5",
+                },
+            ):
+                recorded = _discover(device_ip)
+                close_all_stubs()
+
+        ## The fabric is stopped, the reachability of the devices is not probed when replaying.
+        with mock.patch.dict(
+            os.environ, {"gnmi_cassette_mode": "replay", "subscription_sync_timeout": "5"}
+        ):
+            self.assertEqual(_discover(device_ip), recorded)
+            self.assertEqual(
+                [r["status"] for r in trigger_discovery("127.0.0.254")], ["unreachable"]
+            )
+        self.assertIn(device_ip, [r[0] for r in recorded if r[1] == "discovered"])
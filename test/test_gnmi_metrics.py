@@ -0,0 +1,83 @@
+import asyncio
+import os
+import unittest
+from unittest import mock
+
+import grpc
+from fake_gnmi_server import FakeFabric
+
+from orca_nw_lib import aio
+from orca_nw_lib.gnmi_metrics import (
+    get_path_prefix,
+    get_rpc_metrics,
+    record_rpc,
+    reset_rpc_metrics,
+)
+from orca_nw_lib.gnmi_pb2 import Encoding, SubscribeRequest, Subscription, SubscriptionList
+from orca_nw_lib.gnmi_util import get_gnmi_path, reset_circuit_breaker
+from orca_nw_lib.interface_gnmi import get_intfc_config_path
+
+
+class TestGnmiMetrics(unittest.TestCase):
+    def setUp(self):
+        reset_rpc_metrics()
+
+    def test_get_path_prefix(self):
+        paths = [
+            get_gnmi_path(f"openconfig-interfaces:interfaces/interface[name={name}]/config")
+            for name in ("Ethernet0", "Ethernet4")
+        ]
+        self.assertEqual(
+            get_path_prefix(paths), "openconfig-interfaces:interfaces/interface"
+        )
+        self.assertEqual(
+            get_path_prefix(paths + [get_gnmi_path("sonic-vlan:sonic-vlan/VLAN")]), "/"
+        )
+
+    def test_record_rpc(self):
+        record_rpc("10.10.10.10", "Get", "a/b", grpc.StatusCode.OK, 0.02, 10, 100)
+        record_rpc("10.10.10.10", "Get", "a/b", grpc.StatusCode.NOT_FOUND, 40, 10)
+        record_rpc("10.10.10.11", "Set", "a/b", grpc.StatusCode.OK, 0.001)
+        [metric] = get_rpc_metrics("10.10.10.10")
+        self.assertEqual(metric["count"], 2)
+        self.assertEqual(metric["status_codes"], {"OK": 1, "NOT_FOUND": 1})
+        self.assertEqual(metric["latency_buckets"][0.025], 1)
+        self.assertEqual(metric["latency_buckets"][float("inf")], 1)
+        self.assertEqual((metric["request_bytes"], metric["response_bytes"]), (20, 100))
+        self.assertEqual(len(get_rpc_metrics()), 2)
+
+    def test_aio_requests(self):
+        async def _request(device_ip: str) -> list:
+            await aio.send_gnmi_get(device_ip, [get_intfc_config_path("Ethernet0")])
+            call = await aio.send_gnmi_subscribe(
+                device_ip,
+                iter(
+                    [
+                        SubscribeRequest(
+                            subscribe=SubscriptionList(
+                                subscription=[Subscription(path=get_intfc_config_path("Ethernet0"))],
+                                mode=SubscriptionList.ONCE,
+                                encoding=Encoding.PROTO,
+                            )
+                        )
+                    ]
+                ),
+            )
+            responses = [resp async for resp in call]
+            await aio.close_all_aio_stubs()
+            return responses
+
+        self.addCleanup(reset_circuit_breaker)
+        with FakeFabric(spines=1, leaves=1, port_count=4, vlans_per_leaf=1) as fabric:
+            device_ip = fabric.leaf_ips[0]
+            with mock.patch.dict(os.environ, {"device_gnmi_port": str(fabric.port)}):
+                responses = asyncio.run(_request(device_ip))
+        metrics = {m["method"]: m for m in get_rpc_metrics(device_ip)}
+        self.assertEqual(set(metrics), {"Get", "Subscribe"})
+        for metric in metrics.values():
+            self.assertEqual(metric["status_codes"], {"OK": 1})
+            self.assertEqual(metric["path_prefix"], "openconfig-interfaces:interfaces/interface")
+            self.assertGreater(metric["request_bytes"], 0)
+        self.assertEqual(
+            metrics["Subscribe"]["response_bytes"], sum(r.ByteSize() for r in responses)
+        )
@@ -0,0 +1,353 @@
+import os
+import threading
+import time
+import unittest
+from typing import Tuple
+from unittest import mock
+
+import grpc
+from fake_gnmi_server import FakeFabric
+
+from orca_nw_lib import gnmi_sub
+from orca_nw_lib.common import Speed
+from orca_nw_lib.gnmi_pb2 import Notification, Path, PathElem, SubscribeResponse, TypedValue, Update
+from orca_nw_lib.gnmi_sub import (
+    _interface_config_leaves,
+    _no_wildcard_devices,
+    _route_update,
+    _subscribe,
+    get_leaf_values,
+    get_subscription_path_for_config_change,
+    gnmi_unsubscribe,
+    handle_update,
+    register_subscription_handler,
+    unregister_subscription_handler,
+    wait_for_sync,
+)
+from orca_nw_lib.gnmi_util import (
+    close_all_stubs,
+    get_gnmi_path,
+    reset_circuit_breaker,
+)
+from orca_nw_lib.gnmi_sub_async import stop_async_subscription_engine
+from orca_nw_lib.interface_gnmi import set_interface_config_on_device
+from orca_nw_lib.subscription_supervisor import (
+    LIVE,
+    get_subscription_states,
+    register_subscription,
+    set_subscription_stream,
+    unregister_subscription,
+)
+
+
+def _get_response(prefix: str, **leaves) -> SubscribeResponse:
+    return SubscribeResponse(
+        update=Notification(
+            prefix=get_gnmi_path(prefix),
+            update=[
+                Update(path=Path(elem=[PathElem(name=name.replace("_", "-"))]), val=val)
+                for name, val in leaves.items()
+            ],
+        )
+    )
+
+
+class TestGnmiSub(unittest.TestCase):
+    def test_get_leaf_values(self):
+        resp = _get_response(
+            "openconfig-interfaces:interfaces/interface[name=Ethernet0]/config",
+            mtu=TypedValue(uint_val=9100),
+            enabled=TypedValue(bool_val=False),
+            port_speed=TypedValue(string_val="SPEED_25GB"),
+        )
+        values = get_leaf_values(resp, _interface_config_leaves)
+        self.assertEqual(
+            (values["mtu"], values["enable"], values["speed"], values["description"]),
+            (9100, False, Speed.SPEED_25GB, None),
+        )
+
+    def test_route_update(self):
+        handler = mock.Mock()
+        register_subscription_handler("sonic-vlan:sonic-vlan", handler)
+        self.addCleanup(unregister_subscription_handler, "sonic-vlan:sonic-vlan", handler)
+        resp = _get_response("sonic-vlan:sonic-vlan/VLAN/VLAN_LIST[name=Vlan10]")
+        _route_update("10.10.10.10", resp)
+        handler.assert_called_once_with("10.10.10.10", resp)
+
+        with mock.patch.object(gnmi_sub, "set_interface_config_in_db") as set_config:
+            _route_update(
+                "10.10.10.10",
+                _get_response(
+                    "openconfig-interfaces:interfaces/interface[name=Ethernet0]/config",
+                    mtu=TypedValue(uint_val=1500),
+                ),
+            )
+            gnmi_sub.get_update_dispatcher().wait_idle("10.10.10.10", timeout=5)
+        self.assertEqual(set_config.call_args.kwargs["if_name"], "Ethernet0")
+        self.assertEqual(set_config.call_args.kwargs["mtu"], 1500)
+        handler.assert_called_once()
+
+
+class _Stream:
+    ## Subscription stream yielding the sync response after a delay.
+
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+
+    def __iter__(self):
+        time.sleep(self.delay)
+        yield SubscribeResponse(sync_response=True)
+
+    def cancel(self):
+        pass
+
+
+class TestWaitForSync(unittest.TestCase):
+    device_ip = "10.10.10.10"
+
+    def tearDown(self):
+        gnmi_unsubscribe(self.device_ip)
+
+    def _handle_update(self, delay: float = 0):
+        with mock.patch(
+            "orca_nw_lib.gnmi_sub.send_gnmi_subscribe", return_value=_Stream(delay)
+        ):
+            handle_update(self.device_ip, [])
+
+    def test_wait_for_sync_timeout(self):
+        start = time.monotonic()
+        self.assertFalse(wait_for_sync(self.device_ip, timeout=0.2))
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+
+    def test_sync_response_wakes_waiter(self):
+        ## The sync response arrives on the subscription stream after the waiter blocks.
+        thread = threading.Thread(target=self._handle_update, args=(0.1,))
+        thread.start()
+        start = time.monotonic()
+        self.assertTrue(wait_for_sync(self.device_ip, timeout=10))
+        self.assertLess(time.monotonic() - start, 5)
+        thread.join()
+
+    def test_unsubscribe_clears_sync(self):
+        self._handle_update()
+        self.assertTrue(wait_for_sync(self.device_ip, timeout=0))
+        gnmi_unsubscribe(self.device_ip)
+        self.assertFalse(wait_for_sync(self.device_ip, timeout=0))
+class TestWildcardSubscription(unittest.TestCase):
+    def _subscribe_and_set_mtu(self, wildcards: bool) -> str:
+        fabric = FakeFabric(spines=1, leaves=0, port_count=8, wildcards=wildcards).start()
+        device_ip = fabric.spine_ips[0]
+        updated = threading.Event()
+        patches = [
+            mock.patch.dict(os.environ, {"device_gnmi_port": str(fabric.port)}),
+            mock.patch.object(gnmi_sub, "get_all_interfaces_name_of_device_from_db", return_value=["Ethernet8"]),
+            mock.patch.object(gnmi_sub, "get_all_port_group_ids_from_db", return_value=[]),
+            mock.patch.object(
+                gnmi_sub, "set_interface_config_in_db", side_effect=lambda **kw: updated.set()
+            ),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(fabric.stop)
+        self.addCleanup(reset_circuit_breaker)
+        self.addCleanup(close_all_stubs)
+        _no_wildcard_devices.discard(device_ip)
+        gnmi_sub.gnmi_unsubscribe(device_ip)
+
+        def _run():
+            try:
+                _subscribe(
+                    device_ip,
+                    gnmi_sub.handle_update,
+                    get_subscription_path_for_config_change(device_ip, True),
+                    True,
+                    get_subscription_path_for_config_change,
+                )
+            except grpc.RpcError:
+                pass
+
+        threading.Thread(target=_run, daemon=True).start()
+        self.addCleanup(gnmi_sub.gnmi_unsubscribe, device_ip)
+        self.assertTrue(gnmi_sub.wait_for_sync(device_ip, timeout=5))
+        set_interface_config_on_device(device_ip, "Ethernet8", mtu=1500)
+        self.assertTrue(updated.wait(timeout=5))
+        self.assertEqual(gnmi_sub.set_interface_config_in_db.call_args.kwargs["mtu"], 1500)
+        return device_ip
+
+    def test_wildcard_paths(self):
+        keys = [
+            dict(e.key)
+            for s in get_subscription_path_for_config_change("10.10.10.10", True)
+            for e in s.path.elem
+            if e.key
+        ]
+        self.assertEqual(keys, [{"name": "*"}, {"name": "*"}, {"id": "*"}])
+
+    def test_wildcard_subscription(self):
+        device_ip = self._subscribe_and_set_mtu(wildcards=True)
+        self.assertNotIn(device_ip, _no_wildcard_devices)
+        gnmi_sub.get_all_interfaces_name_of_device_from_db.assert_not_called()
+
+    def test_fallback_to_explicit_paths(self):
+        device_ip = self._subscribe_and_set_mtu(wildcards=False)
+        self.assertIn(device_ip, _no_wildcard_devices)
+        gnmi_sub.get_all_interfaces_name_of_device_from_db.assert_called_with(device_ip)
+
+
+class TestSubscriptionSupervisor(unittest.TestCase):
+    engine = "threads"
+
+    def _wait_for_state(self, device_ip: str, state: str, min_restarts: int = 0, timeout: float = 10) -> dict:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            [states] = [s for s in get_subscription_states(device_ip) if s["name"] == "config"]
+            if states["state"] == state and states["restarts"] >= min_restarts:
+                return states
+            time.sleep(0.01)
+        self.fail(f"Subscription of {device_ip} not {state} but {states}")
+
+    def _start_fabric(self, telemetry_db: str = "", wildcards: bool = True) -> Tuple[FakeFabric, str]:
+        fabric = FakeFabric(spines=1, leaves=0, port_count=8, wildcards=wildcards).start()
+        device_ip = fabric.spine_ips[0]
+        self.updated = threading.Event()
+        patches = [
+            mock.patch.dict(
+                os.environ,
+                {
+                    "device_gnmi_port": str(fabric.port),
+                    "telemetry_db": telemetry_db,
+                    "subscription_engine": self.engine,
+                    "subscription_retry_backoff": "0.05",
+                    "subscription_retry_backoff_max": "0.2",
+                    "grpc_circuit_breaker_threshold": "0",
+                },
+            ),
+            mock.patch.object(
+                gnmi_sub, "set_interface_config_in_db", side_effect=lambda **kw: self.updated.set()
+            ),
+            mock.patch.object(gnmi_sub, "handle_interface_counters_influxdb"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.addCleanup(fabric.stop)
+        self.addCleanup(reset_circuit_breaker)
+        self.addCleanup(close_all_stubs)
+        gnmi_sub.gnmi_unsubscribe(device_ip)
+        self.addCleanup(gnmi_sub.gnmi_unsubscribe, device_ip)
+        return fabric, device_ip
+
+    def test_resubscribe_after_device_restart(self):
+        fabric, device_ip = self._start_fabric()
+        updated = self.updated
+
+        self.assertTrue(gnmi_sub.gnmi_subscribe(device_ip))
+        self.assertTrue(gnmi_sub.gnmi_subscribe(device_ip))
+        self.assertTrue(gnmi_sub.wait_for_sync(device_ip, timeout=5))
+        self._wait_for_state(device_ip, LIVE)
+
+        device = fabric.devices[device_ip]
+        device.stop()
+        deadline = time.monotonic() + 10
+        while not get_subscription_states(device_ip)[0]["restarts"] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIsNotNone(get_subscription_states(device_ip)[0]["last_error"])
+        device.start()
+        states = self._wait_for_state(device_ip, LIVE, min_restarts=1)
+        self.assertEqual(states["attempts"], 0)
+        self.assertTrue(gnmi_sub.wait_for_sync(device_ip, timeout=5))
+
+        set_interface_config_on_device(device_ip, "Ethernet4", mtu=1500)
+        self.assertTrue(updated.wait(timeout=5))
+
+        gnmi_sub.gnmi_unsubscribe(device_ip)
+        self.assertEqual(get_subscription_states(device_ip), [])
+        self.assertNotIn(
+            gnmi_sub.get_subscription_thread_name(device_ip), gnmi_sub.get_running_thread_names()
+        )
+
+    def test_unsubscribe_stops_all_streams(self):
+        _, device_ip = self._start_fabric(telemetry_db="influxdb")
+        thread_names = {
+            gnmi_sub.get_subscription_thread_name(device_ip),
+            gnmi_sub.get_telemetry_thread_name(device_ip),
+        }
+        self.assertTrue(gnmi_sub.gnmi_subscribe(device_ip))
+        self.assertTrue(gnmi_sub.wait_for_sync(device_ip, timeout=5))
+        self.assertEqual(
+            thread_names <= set(gnmi_sub.get_running_thread_names()), self.engine == "threads"
+        )
+        self._wait_for_state(device_ip, LIVE)
+
+        start = time.monotonic()
+        self.assertTrue(gnmi_sub.gnmi_unsubscribe(device_ip))
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertFalse(thread_names & set(gnmi_sub.get_running_thread_names()))
+        self.assertEqual(get_subscription_states(device_ip), [])
+
+
+class TestSubscriptionHandle(unittest.TestCase):
+    device_ip = "10.10.10.10"
+
+    def test_stream_of_stopping_subscription(self):
+        release = threading.Event()
+        old_stream, new_stream = mock.Mock(), mock.Mock()
+
+        def _run(stream, wait: threading.Event):
+            ## The stream is read until it is cancelled.
+            cancelled = threading.Event()
+            stream.cancel.side_effect = cancelled.set
+            wait.wait(5)
+            set_subscription_stream(self.device_ip, "config", stream)
+            cancelled.wait(5)
+
+        old = register_subscription(
+            self.device_ip, "config", "old_subscription", run=lambda: _run(old_stream, release)
+        )
+        self.assertFalse(unregister_subscription(self.device_ip, timeout=0.05))
+        started = threading.Event()
+        started.set()
+        new = register_subscription(
+            self.device_ip, "config", "new_subscription", run=lambda: _run(new_stream, started)
+        )
+        self.addCleanup(unregister_subscription, self.device_ip, 5)
+        self.assertIsNot(old, new)
+
+        ## The stream created by the old subscription after it was cancelled is cancelled,
+        ## while the stream of the new subscription is not touched.
+        release.set()
+        self.assertTrue(old.join(5))
+        old_stream.cancel.assert_called_once()
+        new_stream.cancel.assert_not_called()
+
+        self.assertTrue(unregister_subscription(self.device_ip, timeout=5))
+        new_stream.cancel.assert_called()
+
+    def test_force_resubscribe_fails_when_not_stopped(self):
+        with mock.patch.object(gnmi_sub, "gnmi_unsubscribe", return_value=False), mock.patch.object(
+            gnmi_sub, "register_subscription"
+        ) as register:
+            self.assertFalse(gnmi_sub.gnmi_subscribe(self.device_ip, force_resubscribe=True))
+        register.assert_not_called()
+
+
+class TestAsyncSubscriptionEngine(TestSubscriptionSupervisor):
+    engine = "asyncio"
+
+    @classmethod
+    def tearDownClass(cls):
+        stop_async_subscription_engine()
+
+    def test_fallback_to_explicit_paths(self):
+        _, device_ip = self._start_fabric(wildcards=False)
+        _no_wildcard_devices.discard(device_ip)
+        self.addCleanup(_no_wildcard_devices.discard, device_ip)
+        with mock.patch.object(
+            gnmi_sub, "get_all_interfaces_name_of_device_from_db", return_value=["Ethernet4"]
+        ), mock.patch.object(gnmi_sub, "get_all_port_group_ids_from_db", return_value=[]):
+            self.assertTrue(gnmi_sub.gnmi_subscribe(device_ip))
+            self.assertTrue(gnmi_sub.wait_for_sync(device_ip, timeout=5))
+        self.assertIn(device_ip, _no_wildcard_devices)
+        set_interface_config_on_device(device_ip, "Ethernet4", mtu=1500)
+        self.assertTrue(self.updated.wait(timeout=5))
@@ -1,8 +1,34 @@
+import json
+import os
+import threading
 import unittest
+from unittest import mock
 from urllib.parse import quote_plus
 
-from orca_nw_lib.gnmi_pb2 import PathElem, Path
-from orca_nw_lib.gnmi_util import get_gnmi_path
+import grpc
+
+from orca_nw_lib.gnmi_pb2 import (
+    GetResponse,
+    Notification,
+    PathElem,
+    Path,
+    TypedValue,
+    Update,
+)
+from orca_nw_lib.gnmi_util import (
+    GnmiChannelManager,
+    GnmiPathTemplate,
+    RetryPolicy,
+    _DeviceChannel,
+    _call_with_retry,
+    _demux_get_response,
+    get_channel_options,
+    get_circuit_breaker_state,
+    get_gnmi_path,
+    get_gnmi_path_str,
+    reset_circuit_breaker,
+)
+from orca_nw_lib.orca_exceptions import CircuitOpenError
 
 
 class TestGetGnmiPathDecoded(unittest.TestCase):
@@ -71,3 +97,262 @@ class TestGetGnmiPathDecoded(unittest.TestCase):
         path = "openconfig-interfaces:interfaces/interface[name=Vlan1]/openconfig-if-ethernet:ethernet/ipv4/ipv4-address[address=237.84.2.178%2f24,prefix-length=24"
         with self.assertRaises(ValueError):
             get_gnmi_path(path)
+
+
+@mock.patch.dict(
+    os.environ,
+    {"request_timeout": "5", "grpc_max_channels": "2", "grpc_channel_idle_timeout": "60"},
+)
+class TestGnmiChannelManager(unittest.TestCase):
+    devices = ["10.10.10.1", "10.10.10.2", "10.10.10.3"]
+
+    def setUp(self):
+        self.manager = GnmiChannelManager()
+        create = mock.patch.object(
+            self.manager,
+            "_create",
+            side_effect=lambda device_ip: _DeviceChannel(device_ip, mock.MagicMock()),
+        )
+        self.create = create.start()
+        self.addCleanup(create.stop)
+        self.addCleanup(self.manager.close_all)
+
+    def _age_channels(self, seconds: float):
+        ## Channels used within the request timeout are never evicted.
+        for entry in self.manager._channels.values():
+            entry.last_used -= seconds
+
+    def _get_channel_ips(self) -> list:
+        return list(self.manager._channels)
+
+    def test_concurrent_callers_share_channel(self):
+        barrier = threading.Barrier(8)
+        stubs = []
+
+        def _get_stub():
+            barrier.wait()
+            stubs.append(self.manager.get_stub(self.devices[0]))
+
+        threads = [threading.Thread(target=_get_stub) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=10)
+        self.create.assert_called_once_with(self.devices[0])
+        self.assertEqual(len(stubs), 8)
+        self.assertTrue(all(stub is stubs[0] for stub in stubs))
+
+    def test_evicts_least_recently_used(self):
+        first, second, third = self.devices
+        self.manager.get_stub(first)
+        self.manager.get_stub(second)
+        self.manager.get_stub(first)
+        self._age_channels(10)
+        self.manager.get_stub(third)
+        self.assertEqual(self._get_channel_ips(), [first, third])
+
+    def test_channels_with_streams_are_not_evicted(self):
+        first, second, third = self.devices
+        self.manager.get_stub(first)
+        call = mock.Mock()
+        self.manager.track_stream(first, call)
+        self.manager.get_stub(second)
+        self._age_channels(10)
+        self.manager.get_stub(third)
+        self.assertEqual(self._get_channel_ips(), [first, third])
+
+        ## Once the stream is done the channel can be evicted again.
+        [on_done], _ = call.add_done_callback.call_args
+        on_done(call)
+        self._age_channels(10)
+        self.manager.get_stub(second)
+        self.assertEqual(self._get_channel_ips(), [third, second])
+
+    def test_evicts_idle_channels(self):
+        first, second, _ = self.devices
+        self.manager.get_stub(first)
+        self._age_channels(61)
+        self.manager._last_sweep = 0
+        self.manager.get_stub(second)
+        self.assertEqual(self._get_channel_ips(), [second])
+
+    def _create_channel(self, device_ip: str) -> _DeviceChannel:
+        ## Nothing listens on port 1, the channel is not connected unless a request is sent.
+        return _DeviceChannel(
+            device_ip,
+            grpc.intercept_channel(grpc.insecure_channel(f"{device_ip}:1"), _NoopInterceptor()),
+        )
+
+    def test_channel_state_read_on_demand(self):
+        self._create_channel(self.devices[0]).close()
+        threads = threading.active_count()
+        channels = [self._create_channel(ip) for ip in self.devices]
+        ## No thread polling the connectivity state is started per channel.
+        self.assertEqual(threading.active_count(), threads)
+        self.assertEqual({c.get_state() for c in channels}, {grpc.ChannelConnectivity.IDLE})
+        for c in channels:
+            c.close()
+        self.assertEqual({c.get_state() for c in channels}, {grpc.ChannelConnectivity.SHUTDOWN})
+
+    def test_closed_channel_is_recreated(self):
+        self.create.side_effect = self._create_channel
+        stub = self.manager.get_stub(self.devices[0])
+        self.assertEqual(self.manager.get_state(self.devices[0]), grpc.ChannelConnectivity.IDLE)
+        self.manager._channels[self.devices[0]].close()
+        self.assertIsNot(self.manager.get_stub(self.devices[0]), stub)
+        self.assertEqual(self.create.call_count, 2)
+
+
+class _NoopInterceptor(grpc.UnaryUnaryClientInterceptor):
+    def intercept_unary_unary(self, continuation, client_call_details, request):
+        return continuation(client_call_details, request)
+
+
+class TestGnmiPathStr(unittest.TestCase):
+    def test_get_gnmi_path_str(self):
+        path = get_gnmi_path(
+            "openconfig-interfaces:interfaces/interface[name=Vlan1]/openconfig-if-ethernet:ethernet/ipv4/ipv4-address[prefix-length=24,address=237.84.2.178%2f24]"
+        )
+        self.assertEqual(
+            get_gnmi_path_str(path),
+            "openconfig-interfaces:interfaces/interface[name=Vlan1]/openconfig-if-ethernet:ethernet/ipv4/ipv4-address[address=237.84.2.178%2F24,prefix-length=24]",
+        )
+
+    def test_get_gnmi_path_str_round_trip(self):
+        path = Path(
+            target="openconfig",
+            elem=[
+                PathElem(name="openconfig-platform:components"),
+                PathElem(name="component", key={"name": "1/1"}),
+                PathElem(name="port"),
+            ],
+        )
+        self.assertEqual(get_gnmi_path(get_gnmi_path_str(path)), path)
+
+
+class TestDemuxGetResponse(unittest.TestCase):
+    def _update(self, path: Path, val: dict):
+        return Update(
+            path=path, val=TypedValue(json_ietf_val=json.dumps(val).encode("utf-8"))
+        )
+
+    def test_demux_by_path(self):
+        paths = [
+            get_gnmi_path("openconfig-interfaces:interfaces/interface[name=Vlan1]/config"),
+            get_gnmi_path("openconfig-interfaces:interfaces/interface[name=Vlan2]/config"),
+        ]
+        ## Both updates have the same key, and are returned in a single notification in reverse order.
+        resp = GetResponse(
+            notification=[
+                Notification(
+                    update=[
+                        self._update(paths[1], {"openconfig-interfaces:config": {"mtu": 2}}),
+                        self._update(paths[0], {"openconfig-interfaces:config": {"mtu": 1}}),
+                    ]
+                )
+            ]
+        )
+        result = _demux_get_response(paths, resp)
+        self.assertEqual(
+            result[get_gnmi_path_str(paths[0])], {"openconfig-interfaces:config": {"mtu": 1}}
+        )
+        self.assertEqual(
+            result[get_gnmi_path_str(paths[1])], {"openconfig-interfaces:config": {"mtu": 2}}
+        )
+
+    def test_demux_by_position(self):
+        paths = [
+            get_gnmi_path("sonic-vlan:sonic-vlan/VLAN/VLAN_LIST"),
+            get_gnmi_path("sonic-vlan:sonic-vlan/VLAN_MEMBER/VLAN_MEMBER_LIST"),
+        ]
+        resp = GetResponse(
+            notification=[
+                Notification(update=[self._update(Path(), {"a": 1})]),
+                Notification(update=[self._update(Path(), {"b": 2})]),
+            ]
+        )
+        result = _demux_get_response(paths, resp)
+        self.assertEqual(result[get_gnmi_path_str(paths[0])], {"a": 1})
+        self.assertEqual(result[get_gnmi_path_str(paths[1])], {"b": 2})
+
+
+class TestGnmiPathTemplate(unittest.TestCase):
+    def test_get_path(self):
+        template = GnmiPathTemplate(
+            "openconfig-interfaces:interfaces/interface[name={name}]/subinterfaces/subinterface[index=0]"
+        )
+        self.assertEqual(
+            template.get_path(name="Ethernet0"),
+            get_gnmi_path(
+                "openconfig-interfaces:interfaces/interface[name=Ethernet0]/subinterfaces/subinterface[index=0]"
+            ),
+        )
+        with self.assertRaises(ValueError):
+            template.get_path()
+
+    def test_cached_path_is_copied(self):
+        path = get_gnmi_path("openconfig-interfaces:interfaces/interface[name=Ethernet0]")
+        path.elem.append(PathElem(name="config"))
+        self.assertEqual(
+            len(get_gnmi_path("openconfig-interfaces:interfaces/interface[name=Ethernet0]").elem), 2
+        )
+
+
+class TestChannelOptions(unittest.TestCase):
+    def test_no_keepalive_pings_without_calls_by_default(self):
+        options = dict(get_channel_options())
+        self.assertEqual(options["grpc.keepalive_permit_without_calls"], 0)
+        self.assertNotIn("grpc.http2.max_pings_without_data", options)
+        ## gRPC servers reject pings more frequent than every 5 minutes by default.
+        self.assertGreaterEqual(options["grpc.keepalive_time_ms"], 300000)
+
+    @mock.patch.dict(os.environ, {"grpc_keepalive_permit_without_calls": "true"})
+    def test_keepalive_pings_without_calls(self):
+        options = dict(get_channel_options())
+        self.assertEqual(options["grpc.keepalive_permit_without_calls"], 1)
+
+
+class _RpcError(grpc.RpcError):
+    def __init__(self, code: grpc.StatusCode):
+        self._code = code
+
+    def code(self):
+        return self._code
+
+
+@mock.patch("orca_nw_lib.gnmi_util.remove_stub")
+@mock.patch("orca_nw_lib.gnmi_util.getGrpcStubs")
+@mock.patch.dict(
+    os.environ,
+    {"grpc_circuit_breaker_threshold": "3", "grpc_circuit_breaker_cooldown": "60"},
+)
+class TestCallWithRetry(unittest.TestCase):
+    device_ip = "10.10.10.10"
+    policy = RetryPolicy(max_attempts=2, backoff=0, retry_codes=["UNAVAILABLE"])
+
+    def setUp(self):
+        reset_circuit_breaker()
+
+    def test_retries_retryable_errors(self, get_stub, remove_stub):
+        request = mock.Mock(side_effect=[_RpcError(grpc.StatusCode.UNAVAILABLE), "resp"])
+        self.assertEqual(_call_with_retry(self.device_ip, request, self.policy), "resp")
+        self.assertEqual(request.call_count, 2)
+        remove_stub.assert_called_once_with(self.device_ip)
+
+        request = mock.Mock(side_effect=_RpcError(grpc.StatusCode.INVALID_ARGUMENT))
+        with self.assertRaises(grpc.RpcError):
+            _call_with_retry(self.device_ip, request, self.policy)
+        self.assertEqual(request.call_count, 1)
+
+    def test_circuit_opens_after_consecutive_failures(self, get_stub, remove_stub):
+        request = mock.Mock(side_effect=_RpcError(grpc.StatusCode.UNAVAILABLE))
+        with self.assertRaises(grpc.RpcError):
+            _call_with_retry(self.device_ip, request, self.policy)
+        with self.assertRaises(CircuitOpenError):
+            _call_with_retry(self.device_ip, request, self.policy)
+        self.assertEqual(request.call_count, 3)
+        self.assertEqual(get_circuit_breaker_state(self.device_ip)["state"], "open")
+
+        reset_circuit_breaker(self.device_ip)
+        request = mock.Mock(return_value="resp")
+        self.assertEqual(_call_with_retry(self.device_ip, request, self.policy), "resp")
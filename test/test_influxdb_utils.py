@@ -0,0 +1,86 @@
+import threading
+import unittest
+from unittest import mock
+
+from influxdb_client import Point
+from influxdb_client.rest import ApiException
+
+from orca_nw_lib.influxdb_utils import InfluxBatchWriter
+
+
+def _get_writer(**kwargs) -> tuple:
+    client = mock.Mock()
+    write_api = client.write_api.return_value
+    kwargs = {"batch_size": 3, "flush_interval": 0.05, "max_queue_size": 100, "retry_backoff": 0.01, **kwargs}
+    return InfluxBatchWriter(client, "orca", "orca", **kwargs), write_api
+
+
+class TestInfluxBatchWriter(unittest.TestCase):
+    def test_batches(self):
+        writer, write_api = _get_writer(flush_interval=60)
+        self.addCleanup(writer.close, 5)
+        point = Point("interface_counters").tag("device_ip", "10.10.10.10")
+        for i in range(7):
+            ## Points are reused by the callers.
+            writer.write(point.field("in_octets", i))
+        self.assertTrue(writer.flush(timeout=5))
+        batches = [c.kwargs["record"] for c in write_api.write.call_args_list]
+        self.assertEqual([len(b) for b in batches], [3, 3, 1])
+        self.assertIn("in_octets=6i", batches[2][0])
+        self.assertEqual(writer.get_stats()["written"], 7)
+
+    def test_flush_interval(self):
+        writer, write_api = _get_writer()
+        self.addCleanup(writer.close, 5)
+        written = threading.Event()
+        write_api.write.side_effect = lambda **kwargs: written.set()
+        writer.write(Point("device_info").field("uptime", 1))
+        self.assertTrue(written.wait(5))
+
+    def test_retry_failed_batch(self):
+        writer, write_api = _get_writer()
+        self.addCleanup(writer.close, 5)
+        write_api.write.side_effect = [
+            ConnectionError("InfluxDB unavailable"),
+            ApiException(status=503, reason="Service Unavailable"),
+            ApiException(status=429, reason="Too Many Requests"),
+            None,
+        ]
+        writer.write(Point("device_info").field("uptime", 1))
+        self.assertTrue(writer.flush(timeout=5))
+        stats = writer.get_stats()
+        self.assertEqual(write_api.write.call_count, 4)
+        self.assertEqual(
+            (stats["written"], stats["retries"], stats["failed"]), (1, 3, 0)
+        )
+        self.assertIn("Too Many Requests", stats["last_error"])
+
+    def test_rejected_batch_not_retried(self):
+        writer, write_api = _get_writer()
+        self.addCleanup(writer.close, 5)
+        write_api.write.side_effect = [ApiException(status=400, reason="Bad Request"), None]
+        writer.write(Point("device_info").field("uptime", 1))
+        self.assertTrue(writer.flush(timeout=5))
+        writer.write(Point("device_info").field("uptime", 2))
+        self.assertTrue(writer.flush(timeout=5))
+        stats = writer.get_stats()
+        self.assertEqual(write_api.write.call_count, 2)
+        self.assertEqual(
+            (stats["written"], stats["retries"], stats["failed"]), (1, 0, 1)
+        )
+
+    def test_full_queue_drops_oldest(self):
+        writer, write_api = _get_writer(batch_size=1, max_queue_size=2, retry_max_attempts=1)
+        writing, release = threading.Event(), threading.Event()
+        write_api.write.side_effect = lambda **kwargs: writing.set() or release.wait(5)
+        writer.write(Point("device_info").field("uptime", 0))
+        self.assertTrue(writing.wait(5))
+        for i in range(1, 5):
+            writer.write(Point("device_info").field("uptime", i))
+        self.assertEqual(writer.get_stats()["dropped"], 2)
+        release.set()
+        writer.close(5)
+        self.assertTrue(write_api.close.called)
+        written = [c.kwargs["record"][0] for c in write_api.write.call_args_list]
+        self.assertEqual([line.split("=")[1] for line in written], ["0i", "3i", "4i"])
+        self.assertEqual(writer.get_stats()["queue_depth"], 0)
@@ -0,0 +1,300 @@
+import os
+import unittest
+from unittest import mock
+
+import grpc
+from fake_gnmi_server import FakeSonicDevice, build_device_model
+
+from orca_nw_lib.gnmi_util import close_all_stubs, get_gnmi_path_str, reset_circuit_breaker
+from orca_nw_lib.interface import _create_interface_graph_objects
+from orca_nw_lib.interface_gnmi import set_interfaces_config_on_device
+
+
+def _get_interfaces_json(aliases: list) -> dict:
+    ports = [f"Ethernet{i * 4}" for i in range(len(aliases))]
+    return {
+        "openconfig-interfaces:interface": [
+            {
+                "name": port,
+                "config": {"name": port, "type": "iana-if-type:ethernetCsmacd"},
+                "state": {"name": port, "mtu": 9100},
+            }
+            for port in ports
+        ],
+        "sonic-port:PORT_LIST": [
+            {
+                "ifname": port,
+                "alias": alias,
+                "lanes": ",".join(str(i * 4 + lane) for lane in range(1, 5)),
+            }
+            for i, (port, alias) in enumerate(zip(ports, aliases))
+        ],
+    }
+
+
+def _get_breakout_groups(num_breakouts: int, speed: str) -> dict:
+    return {
+        "openconfig-platform-port:groups": {
+            "group": [
+                {
+                    "index": 1,
+                    "config": {
+                        "num-breakouts": num_breakouts,
+                        "breakout-speed": f"openconfig-if-ethernet:{speed}",
+                    },
+                    "state": {"openconfig-port-breakout-ext:status": "Completed"},
+                }
+            ]
+        }
+    }
+
+
+def _breakout_component(name: str, num_breakouts: int, speed: str) -> dict:
+    return {
+        "name": name,
+        "port": {
+            "openconfig-platform-port:breakout-mode": {
+                "groups": {
+                    "group": [
+                        {
+                            "index": 1,
+                            "config": {
+                                "index": 1,
+                                "num-breakouts": num_breakouts,
+                                "breakout-speed": f"openconfig-if-ethernet:{speed}",
+                            },
+                            "state": {
+                                "index": 1,
+                                "num-breakouts": num_breakouts,
+                                "breakout-speed": f"openconfig-if-ethernet:{speed}",
+                                "openconfig-port-breakout-ext:status": "Completed",
+                            },
+                        }
+                    ]
+                }
+            }
+        },
+    }
+
+
+class TestInterfaceDiscovery(unittest.TestCase):
+    device_ip = "10.10.10.10"
+
+    def test_breakouts_fetched_once_per_device(self):
+        ## Ethernet0-12 are port 1/1 broken out to 4x25G, Ethernet16-20 port 1/5 broken out to 2x50G.
+        aliases = ["Eth1/1/1", "Eth1/1/2", "Eth1/1/3", "Eth1/1/4", "Eth1/5/1", "Eth1/5/2", "Eth1/7", "Eth1/8"]
+        groups = {
+            "1/1": _get_breakout_groups(4, "SPEED_25GB"),
+            "1/5": _get_breakout_groups(2, "SPEED_50GB"),
+        }
+
+        def _get_batch(device_ip, path):
+            return {
+                get_gnmi_path_str(p): groups[p.elem[1].key["name"]] for p in path
+            }
+
+        with mock.patch(
+            "orca_nw_lib.interface.get_interface_from_device",
+            return_value=_get_interfaces_json(aliases),
+        ), mock.patch(
+            "orca_nw_lib.interface_gnmi.send_gnmi_get_batch", side_effect=_get_batch
+        ) as get_batch:
+            interfaces = {
+                i.name: i for i in _create_interface_graph_objects(self.device_ip)
+            }
+
+        get_batch.assert_called_once()
+        self.assertEqual(
+            sorted(p.elem[1].key["name"] for p in get_batch.call_args.kwargs["path"]),
+            ["1/1", "1/5"],
+        )
+        self.assertEqual(len(interfaces), 8)
+        for name in ("Ethernet0", "Ethernet12"):
+            self.assertEqual(interfaces[name].breakout_mode, "4xSPEED_25GB")
+            self.assertEqual(interfaces[name].breakout_status, "Completed")
+        self.assertEqual(interfaces["Ethernet12"].alias, "Eth1/1/4")
+        self.assertEqual(interfaces["Ethernet20"].breakout_mode, "2xSPEED_50GB")
+        ## Lane details are looked up by ifname, also for the ports which are not broken out.
+        self.assertEqual(interfaces["Ethernet28"].alias, "Eth1/8")
+        self.assertEqual(interfaces["Ethernet28"].lanes, "29,30,31,32")
+        self.assertIsNone(interfaces["Ethernet28"].breakout_mode)
+
+    def test_no_breakouts(self):
+        with mock.patch(
+            "orca_nw_lib.interface.get_interface_from_device",
+            return_value=_get_interfaces_json(["Eth1/1", "Eth1/2"]),
+        ), mock.patch("orca_nw_lib.interface_gnmi.send_gnmi_get_batch") as get_batch:
+            interfaces = _create_interface_graph_objects(self.device_ip)
+        get_batch.assert_not_called()
+        self.assertEqual(sorted(i.alias for i in interfaces), ["Eth1/1", "Eth1/2"])
+
+
+class TestFakeDeviceInterfaceDiscovery(unittest.TestCase):
+    device_ip = "127.0.0.1"
+
+    def setUp(self):
+        model = build_device_model(self.device_ip, port_count=8)
+        ## Ethernet0-12 are the 4 lanes of port 1/1 broken out to 4x25G,
+        # Ethernet16-20 are the 2 lanes of port 1/5 broken out to 2x50G.
+        aliases = ["Eth1/1/1", "Eth1/1/2", "Eth1/1/3", "Eth1/1/4", "Eth1/5/1", "Eth1/5/2"]
+        for lane, alias in zip(model["sonic-port:sonic-port"]["PORT"]["PORT_LIST"], aliases):
+            lane["alias"] = alias
+        model["openconfig-platform:components"] = {
+            "component": [
+                _breakout_component("1/1", 4, "SPEED_25GB"),
+                _breakout_component("1/5", 2, "SPEED_50GB"),
+            ]
+        }
+        self.device = FakeSonicDevice(model, address=self.device_ip).start()
+        self.addCleanup(self.device.stop)
+        env = mock.patch.dict(os.environ, {"device_gnmi_port": str(self.device.port)})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(reset_circuit_breaker)
+        self.addCleanup(close_all_stubs)
+
+    def test_breakouts_fetched_once_per_device(self):
+        interfaces = {i.name: i for i in _create_interface_graph_objects(self.device_ip)}
+        self.assertEqual(len(interfaces), 8)
+        for name in ("Ethernet0", "Ethernet12"):
+            self.assertEqual(interfaces[name].breakout_mode, "4xSPEED_25GB")
+            self.assertEqual(interfaces[name].breakout_status, "Completed")
+        self.assertEqual(interfaces["Ethernet12"].alias, "Eth1/1/4")
+        self.assertEqual(interfaces["Ethernet20"].breakout_mode, "2xSPEED_50GB")
+        self.assertEqual(interfaces["Ethernet20"].alias, "Eth1/5/2")
+        ## Lane details are looked up by ifname, also for the ports which are not broken out.
+        self.assertEqual(interfaces["Ethernet28"].alias, "Eth1/8")
+        self.assertEqual(interfaces["Ethernet28"].lanes, "29,30,31,32")
+        self.assertIsNone(interfaces["Ethernet28"].breakout_mode)
+        ## One Get of the interfaces and the port lanes, one Get of all the breakout groups.
+        self.assertEqual(self.device.servicer.requests["Get"], 2)
+
+
+class _RpcError(grpc.RpcError):
+    def __init__(self, code: grpc.StatusCode, details: str):
+        self._code = code
+        self._details = details
+
+    def code(self):
+        return self._code
+
+    def details(self):
+        return self._details
+
+
+class TestInterfacesConfig(unittest.TestCase):
+    device_ip = "10.10.10.10"
+    if_names = ["Ethernet0", "Ethernet4", "Ethernet8"]
+
+    def _send_gnmi_set(self, req, device_ip, raise_errors=False):
+        if_names = {
+            elem.key["name"] for u in req.update for elem in u.path.elem if "name" in elem.key
+        }
+        self.set_requests.append(len(req.update))
+        if "Ethernet4" in if_names:
+            raise _RpcError(grpc.StatusCode.INVALID_ARGUMENT, "Ethernet4 is not configurable")
+
+    def setUp(self):
+        self.set_requests = []
+
+    def test_single_request(self):
+        with mock.patch(
+            "orca_nw_lib.interface_gnmi.send_gnmi_set", side_effect=self._send_gnmi_set
+        ):
+            report = set_interfaces_config_on_device(
+                self.device_ip, {"Ethernet0": {"enable": True}, "Ethernet8": {"enable": True}}
+            )
+        self.assertEqual(report, {"Ethernet0": None, "Ethernet8": None})
+        self.assertEqual(self.set_requests, [2])
+
+    def test_fallback_to_one_by_one(self):
+        with mock.patch(
+            "orca_nw_lib.interface_gnmi.send_gnmi_set", side_effect=self._send_gnmi_set
+        ):
+            report = set_interfaces_config_on_device(
+                self.device_ip,
+                {
+                    "Ethernet0": {"enable": True},
+                    "Ethernet4": {"enable": True},
+                    "Ethernet8": {"enable": True, "mtu": 9100},
+                },
+            )
+        self.assertEqual(
+            report,
+            {"Ethernet0": None, "Ethernet4": "Ethernet4 is not configurable", "Ethernet8": None},
+        )
+        ## The bulk request with all updates, then one request per interface.
+        self.assertEqual(self.set_requests, [4, 1, 1, 2])
+
+    def test_unavailable_device(self):
+        with mock.patch(
+            "orca_nw_lib.interface_gnmi.send_gnmi_set",
+            side_effect=_RpcError(grpc.StatusCode.UNAVAILABLE, "Device is not reachable"),
+        ) as send_gnmi_set:
+            with self.assertRaises(grpc.RpcError):
+                set_interfaces_config_on_device(
+                    self.device_ip, {if_name: {"enable": True} for if_name in self.if_names}
+                )
+        send_gnmi_set.assert_called_once()
+
+
+class TestFakeDeviceInterfacesConfig(unittest.TestCase):
+    device_ip = "127.0.0.1"
+
+    def setUp(self):
+        self.device = FakeSonicDevice(
+            build_device_model(self.device_ip, port_count=4), address=self.device_ip
+        )
+        ## The device rejects any Set request configuring Ethernet4.
+        set_request = self.device.servicer.Set
+        self.set_requests = []
+
+        def _set(request, context):
+            self.set_requests.append(request)
+            if any(
+                e.key.get("name") == "Ethernet4" for u in request.update for e in u.path.elem
+            ):
+                context.abort(grpc.StatusCode.INVALID_ARGUMENT, "Ethernet4 is not configurable")
+            return set_request(request, context)
+
+        self.device.servicer.Set = _set
+        self.device.start()
+        self.addCleanup(self.device.stop)
+        env = mock.patch.dict(os.environ, {"device_gnmi_port": str(self.device.port)})
+        env.start()
+        self.addCleanup(env.stop)
+        self.addCleanup(reset_circuit_breaker)
+        self.addCleanup(close_all_stubs)
+
+    def _get_mtu(self, if_name: str) -> int:
+        [intfc] = [
+            i
+            for i in self.device.model["openconfig-interfaces:interfaces"]["interface"]
+            if i["name"] == if_name
+        ]
+        return intfc["config"]["mtu"]
+
+    def test_single_set_request(self):
+        report = set_interfaces_config_on_device(
+            self.device_ip,
+            {"Ethernet0": {"mtu": 1500, "enable": False}, "Ethernet8": {"mtu": 1500}},
+        )
+        self.assertEqual(report, {"Ethernet0": None, "Ethernet8": None})
+        self.assertEqual(len(self.set_requests), 1)
+        self.assertEqual((self._get_mtu("Ethernet0"), self._get_mtu("Ethernet8")), (1500, 1500))
+
+    def test_fallback_reports_error_per_interface(self):
+        report = set_interfaces_config_on_device(
+            self.device_ip,
+            {name: {"mtu": 1500} for name in ("Ethernet0", "Ethernet4", "Ethernet8")},
+        )
+        self.assertEqual(
+            report,
+            {"Ethernet0": None, "Ethernet4": "Ethernet4 is not configurable", "Ethernet8": None},
+        )
+        ## The failed bulk request, then a request per interface.
+        self.assertEqual([len(r.update) for r in self.set_requests], [3, 1, 1, 1])
+        self.assertEqual(
+            [self._get_mtu(name) for name in ("Ethernet0", "Ethernet4", "Ethernet8")],
+            [1500, 9100, 1500],
+        )
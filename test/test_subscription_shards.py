@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+import unittest
+from unittest import mock
+
+from orca_nw_lib import constants as const
+from orca_nw_lib import gnmi_sub
+from orca_nw_lib.subscription_shards import HashRing, ShardCoordinator, _ShardWorker
+
+_device_ips = [f"10.0.{i // 250}.{i % 250 + 1}" for i in range(1000)]
+
+
+class TestHashRing(unittest.TestCase):
+    def test_keys_spread_over_nodes(self):
+        ring = HashRing([0, 1, 2, 3])
+        counts = {}
+        for ip in _device_ips:
+            counts[ring.get_node(ip)] = counts.get(ring.get_node(ip), 0) + 1
+        self.assertEqual(set(counts), {0, 1, 2, 3})
+        self.assertGreater(min(counts.values()), 150)
+
+    def test_only_keys_of_changed_node_move(self):
+        ring = HashRing([0, 1, 2])
+        before = {ip: ring.get_node(ip) for ip in _device_ips}
+        ring.add_node(3)
+        added = {ip: ring.get_node(ip) for ip in _device_ips}
+        self.assertTrue(all(added[ip] in (before[ip], 3) for ip in _device_ips))
+
+        ring.remove_node(1)
+        removed = {ip: ring.get_node(ip) for ip in _device_ips}
+        self.assertTrue(all(removed[ip] == added[ip] for ip in _device_ips if added[ip] != 1))
+        self.assertNotIn(1, ring.get_nodes())
+
+
+class TestShardCoordinator(unittest.TestCase):
+    def setUp(self):
+        ## The forked workers inherit the patched functions.
+        patches = [
+            mock.patch.object(gnmi_sub, "gnmi_subscribe", return_value=True),
+            mock.patch.object(gnmi_sub, "gnmi_unsubscribe", return_value=True),
+            mock.patch.object(gnmi_sub, "wait_for_sync", return_value=True),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.coordinator = ShardCoordinator(shards=3, start_method="fork", check_interval=0)
+        self.addCleanup(self.coordinator.stop)
+
+    def test_rebalance_when_worker_exits(self):
+        device_ips = _device_ips[:30]
+        for ip in device_ips:
+            self.assertTrue(self.coordinator.subscribe(ip))
+        before = self.coordinator.get_assignments()
+        self.assertEqual(set(before.values()), {0, 1, 2})
+        self.assertTrue(self.coordinator.wait_for_sync(device_ips[0], timeout=1))
+
+        self.coordinator._workers[1].process.kill()
+        self.coordinator._workers[1].process.join(5)
+        self.assertEqual(self.coordinator.check_workers(), [1])
+        after = self.coordinator.get_assignments()
+        self.assertEqual(set(after), set(device_ips))
+        self.assertEqual(set(after.values()), {0, 2})
+        self.assertTrue(all(after[ip] == before[ip] for ip in device_ips if before[ip] != 1))
+
+        shard_id = self.coordinator.add_worker()
+        self.assertTrue(
+            all(self.coordinator.get_assignments()[ip] in (after[ip], shard_id) for ip in device_ips)
+        )
+        self.assertTrue(self.coordinator.unsubscribe(device_ips[0]))
+        self.assertNotIn(device_ips[0], self.coordinator.get_assignments())
+
+    def test_workers_called_without_lock(self):
+        device_ips = _device_ips[:30]
+        for ip in device_ips:
+            self.coordinator.subscribe(ip)
+        moved = [ip for ip, shard_id in self.coordinator.get_assignments().items() if shard_id == 1]
+        self.coordinator._workers[1].process.kill()
+        self.coordinator._workers[1].process.join(5)
+
+        ## The devices of the exited worker are subscribed slowly in the remaining workers.
+        call = _ShardWorker.call
+        moving = threading.Event()
+
+        def _slow_call(worker, command, *args, **kwargs):
+            if command == "subscribe":
+                moving.set()
+                time.sleep(0.2)
+            return call(worker, command, *args, **kwargs)
+
+        with mock.patch.object(_ShardWorker, "call", autospec=True, side_effect=_slow_call):
+            thread = threading.Thread(target=self.coordinator.check_workers)
+            thread.start()
+            self.assertTrue(moving.wait(5))
+            start = time.monotonic()
+            assignments = self.coordinator.get_assignments()
+            self.assertTrue(self.coordinator.unsubscribe(moved[-1]))
+            self.assertLess(time.monotonic() - start, 0.2)
+            thread.join()
+        self.assertEqual(set(assignments.values()), {0, 2})
+        ## The unsubscribed device is not subscribed again by the pending moves.
+        self.assertNotIn(moved[-1], self.coordinator.get_assignments())
+
+    def test_devices_wait_for_worker_when_all_exited(self):
+        device_ips = _device_ips[:10]
+        for ip in device_ips:
+            self.coordinator.subscribe(ip)
+        for worker in self.coordinator._workers.values():
+            worker.process.kill()
+            worker.process.join(5)
+        self.assertEqual(sorted(self.coordinator.check_workers()), [0, 1, 2])
+        self.assertEqual(self.coordinator._workers, {})
+        self.assertEqual(set(self.coordinator.get_assignments().values()), {None})
+        self.assertFalse(self.coordinator.subscribe(_device_ips[10]))
+
+        shard_id = self.coordinator.add_worker()
+        self.assertEqual(set(self.coordinator.get_assignments().values()), {shard_id})
+        self.assertEqual(len(self.coordinator.get_assignments()), 11)
+
+
+class TestSpawnedShardWorkers(unittest.TestCase):
+    def test_workers_start(self):
+        ## The spawned workers import orca_nw_lib having subscription_shards set,
+        ## they must neither start shards of their own nor subscribe to the devices in DB.
+        with mock.patch.dict(os.environ, {const.subscription_shards: "2"}):
+            coordinator = ShardCoordinator(shards=2, check_interval=0)
+        self.addCleanup(coordinator.stop)
+        self.assertEqual(coordinator.get_subscription_states(), [])
+        time.sleep(1)
+        self.assertEqual(coordinator.check_workers(), [])
+        self.assertEqual(len(coordinator._workers), 2)
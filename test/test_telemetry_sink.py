@@ -0,0 +1,109 @@
+import threading
+import time
+import unittest
+
+from orca_nw_lib.gnmi_pb2 import Notification, Path, PathElem, SubscribeResponse, TypedValue, Update
+from orca_nw_lib.gnmi_util import get_gnmi_path
+from orca_nw_lib.telemetry_sink import (
+    COALESCE,
+    DROP_OLDEST,
+    DeviceTelemetryQueue,
+    TelemetrySink,
+)
+
+
+def _get_sample(if_name: str, **counters) -> SubscribeResponse:
+    return SubscribeResponse(
+        update=Notification(
+            prefix=get_gnmi_path(
+                f"openconfig-interfaces:interfaces/interface[name={if_name}]/state/counters"
+            ),
+            update=[
+                Update(path=Path(elem=[PathElem(name=name.replace("_", "-"))]), val=TypedValue(uint_val=val))
+                for name, val in counters.items()
+            ],
+        )
+    )
+
+
+def _get_counters(resp: SubscribeResponse) -> dict:
+    return {u.path.elem[0].name: u.val.uint_val for u in resp.update.update}
+
+
+class TestDeviceTelemetryQueue(unittest.TestCase):
+    def test_coalesce(self):
+        q = DeviceTelemetryQueue("10.10.10.10", 2, COALESCE)
+        q.put("Ethernet0", print, _get_sample("Ethernet0", in_octets=1, in_pkts=1))
+        q.put("Ethernet0", print, _get_sample("Ethernet0", in_octets=2))
+        self.assertEqual((len(q), q.coalesced, q.dropped), (1, 1, 0))
+        self.assertEqual(_get_counters(q.pop()[1]), {"in-octets": 2, "in-pkts": 1})
+
+        for if_name in ("Ethernet0", "Ethernet4", "Ethernet8"):
+            q.put(if_name, print, _get_sample(if_name, in_octets=3))
+        self.assertEqual(q.dropped, 1)
+        self.assertEqual(
+            [q.pop()[1].update.prefix.elem[1].key["name"] for _ in range(len(q))],
+            ["Ethernet4", "Ethernet8"],
+        )
+        self.assertIsNone(q.pop())
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            DeviceTelemetryQueue("10.10.10.10", 2, "drop_newest")
+
+
+class TestTelemetrySink(unittest.TestCase):
+    def test_slow_writer_drops_oldest(self):
+        sink = TelemetrySink(workers=1, queue_size=3, policy=DROP_OLDEST)
+        self.addCleanup(sink.stop, 5)
+        writing, release = threading.Event(), threading.Event()
+        written = []
+
+        def _write(device_ip, resp):
+            writing.set()
+            release.wait(5)
+            written.append(_get_counters(resp)["in-octets"])
+
+        sink.put("10.10.10.10", "Ethernet0", _write, _get_sample("Ethernet0", in_octets=0))
+        self.assertTrue(writing.wait(5))
+        for i in range(1, 6):
+            sink.put("10.10.10.10", "Ethernet0", _write, _get_sample("Ethernet0", in_octets=i))
+        sink.put("10.10.10.11", "Ethernet0", _write, _get_sample("Ethernet0", in_octets=10))
+        self.assertFalse(sink.wait_idle(timeout=0.01))
+
+        release.set()
+        self.assertTrue(sink.wait_idle(timeout=5))
+        ## The device just written goes behind the other device.
+        self.assertEqual(written, [0, 10, 3, 4, 5])
+        stats = sink.get_stats()["devices"]
+        self.assertEqual(
+            stats["10.10.10.10"],
+            {"depth": 0, "dropped": 2, "coalesced": 0, "written": 4, "failed": 0},
+        )
+        self.assertEqual(stats["10.10.10.11"]["written"], 1)
+
+    def test_samples_of_device_written_in_order(self):
+        sink = TelemetrySink(workers=4, queue_size=1000, policy=DROP_OLDEST)
+        self.addCleanup(sink.stop, 5)
+        lock = threading.Lock()
+        writing = {}
+        max_writing = {}
+        written = {}
+
+        def _write(device_ip, resp):
+            with lock:
+                writing[device_ip] = writing.get(device_ip, 0) + 1
+                max_writing[device_ip] = max(max_writing.get(device_ip, 0), writing[device_ip])
+            time.sleep(0.001)
+            with lock:
+                writing[device_ip] -= 1
+                written.setdefault(device_ip, []).append(_get_counters(resp)["in-octets"])
+
+        device_ips = ["10.10.10.10", "10.10.10.11"]
+        for i in range(50):
+            for device_ip in device_ips:
+                sink.put(device_ip, "Ethernet0", _write, _get_sample("Ethernet0", in_octets=i))
+        self.assertTrue(sink.wait_idle(timeout=5))
+        for device_ip in device_ips:
+            self.assertEqual(written[device_ip], list(range(50)))
+            self.assertEqual(max_writing[device_ip], 1)
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+import unittest
+
+from orca_nw_lib.update_dispatcher import UpdateDispatcher
+
+
+class TestUpdateDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = UpdateDispatcher(workers=4, queue_size=10)
+
+    def tearDown(self):
+        self.dispatcher.stop(timeout=5)
+
+    def test_order_per_key(self):
+        handled = {}
+        lock = threading.Lock()
+
+        def _handle(key, i):
+            time.sleep(0.0001 * (i % 3))
+            with lock:
+                handled.setdefault(key, []).append(i)
+
+        for i in range(100):
+            for key in ("Ethernet0", "Ethernet4", "Ethernet8"):
+                self.dispatcher.dispatch("10.10.10.10", key, _handle, key, i)
+        self.assertTrue(self.dispatcher.wait_idle(timeout=10))
+        self.assertEqual(handled, {key: list(range(100)) for key in handled})
+        self.assertEqual(len(handled), 3)
+
+    def test_stats(self):
+        release = threading.Event()
+        self.dispatcher.dispatch("10.10.10.11", "Ethernet0", lambda: None)
+        self.dispatcher.dispatch("10.10.10.10", "Ethernet0", release.wait)
+        self.dispatcher.dispatch("10.10.10.10", "Ethernet0", lambda: 1 / 0)
+        self.assertTrue(self.dispatcher.wait_idle("10.10.10.11", timeout=5))
+        self.assertEqual(self.dispatcher.get_stats()["pending"], {"10.10.10.10": 2})
+        self.assertFalse(self.dispatcher.wait_idle(timeout=0.01))
+
+        release.set()
+        self.assertTrue(self.dispatcher.wait_idle(timeout=5))
+        stats = self.dispatcher.get_stats()
+        self.assertEqual(
+            (stats["dispatched"], stats["handled"], stats["failed"], stats["pending"]),
+            (3, 3, 1, {}),
+        )
+        self.assertEqual(sum(stats["queue_depths"]), 0)
+        self.assertGreaterEqual(stats["max_queue_depth"], 1)
+
+    def test_dispatch_async_waits_without_blocking_event_loop(self):
+        dispatcher = UpdateDispatcher(workers=1, queue_size=1)
+        self.addCleanup(dispatcher.stop, 5)
+        release = threading.Event()
+
+        async def _dispatch():
+            for _ in range(3):
+                await dispatcher.dispatch_async("10.10.10.10", "Ethernet0", release.wait, 5)
+
+        async def _run() -> int:
+            ## The worker is busy with the first update, the second one fills the queue.
+            task = asyncio.create_task(_dispatch())
+            ticks = 0
+            for _ in range(10):
+                await asyncio.sleep(0.01)
+                ticks += 1
+            self.assertFalse(task.done())
+            release.set()
+            await asyncio.wait_for(task, 5)
+            return ticks
+
+        self.assertEqual(asyncio.run(_run()), 10)
+        self.assertTrue(dispatcher.wait_idle(timeout=5))
+        self.assertEqual(dispatcher.get_stats()["handled"], 3)